@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.checksum
+@file mi/core/checksum.py
+@brief Checksum kernels for drivers and playback
+
+Table driven versions of the checksums computed by the drivers, giving the
+same results as the per-character implementations, and batch versions
+which check many records of a buffer at once:
+
+    crc_kermit / crc_kermit_many          CRC-16/KERMIT (HPIES)
+    crc_xmodem                            CRC-16/XMODEM (binary framer)
+    xor_checksum / xor_checksums          XOR of the bytes (port agent LRC, NMEA, binary framer)
+    sum_bytes / sum_bytes_many            16 bit sum of the bytes (binary framer)
+    sum_hex_bytes / sum_hex_bytes_many    8 bit sum of hex encoded bytes (SAMI)
+
+The single record kernels take str, buffer or unicode data. Unicode is
+encoded as latin-1, one byte per character as the instruments send it,
+matching the ord() of each character used by the per-character versions.
+They work without numpy, the batch versions require it.
+"""
+
+__license__ = 'Apache 2.0'
+
+import binascii
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# reflected CCITT polynomial of CRC-16/KERMIT
+CRC_KERMIT_POLYNOMIAL = 0x8408
+# CCITT polynomial of CRC-16/XMODEM
+CRC_XMODEM_POLYNOMIAL = 0x1021
+
+# below this size the byte loop beats the numpy call overhead
+XOR_NUMPY_THRESHOLD = 64
+
+
+def _bytes(data):
+    """
+    @param data str, buffer or unicode
+    @return data, with unicode encoded one byte per character
+    @raise UnicodeEncodeError if a character does not fit in a byte
+    """
+    if isinstance(data, unicode):
+        return data.encode('latin-1')
+    return data
+
+
+def _crc_table(polynomial):
+    """
+    256 entry table of a reflected 16 bit CRC
+    """
+    table = []
+    for byte in xrange(256):
+        crc = byte
+        for _ in xrange(8):
+            crc = (crc >> 1) ^ polynomial if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+def _crc_table_msb(polynomial):
+    """
+    256 entry table of a 16 bit CRC, most significant bit first
+    """
+    table = []
+    for byte in xrange(256):
+        crc = byte << 8
+        for _ in xrange(8):
+            crc = ((crc << 1) ^ polynomial if crc & 0x8000 else crc << 1) & 0xffff
+        table.append(crc)
+    return table
+
+
+CRC_KERMIT_TABLE = _crc_table(CRC_KERMIT_POLYNOMIAL)
+_CRC_KERMIT_ARRAY = numpy.array(CRC_KERMIT_TABLE, dtype=numpy.uint16) if numpy is not None else None
+CRC_XMODEM_TABLE = _crc_table_msb(CRC_XMODEM_POLYNOMIAL)
+
+
+def crc_kermit(data, crc=0):
+    """
+    CRC-16/KERMIT of data
+    @param data string
+    @param crc CRC of the preceding data, to continue a running CRC
+    @return CRC as an int
+    """
+    table = CRC_KERMIT_TABLE
+    for byte in bytearray(_bytes(data)):
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xff]
+    return crc
+
+
+def crc_xmodem(data, crc=0):
+    """
+    CRC-16/XMODEM of data
+    @param data string
+    @param crc CRC of the preceding data, or the initial value
+    @return CRC as an int
+    """
+    table = CRC_XMODEM_TABLE
+    for byte in bytearray(_bytes(data)):
+        crc = ((crc << 8) & 0xffff) ^ table[(crc >> 8) ^ byte]
+    return crc
+
+
+def _records_matrix(records):
+    """
+    Pack records into the rows of a zero padded byte matrix, longest first
+    @return (matrix, lengths, order) where order maps the rows to the records
+    """
+    lengths = numpy.fromiter((len(record) for record in records), dtype=numpy.int64, count=len(records))
+    order = numpy.argsort(-lengths, kind='mergesort')
+    lengths = lengths[order]
+    width = int(lengths[0]) if len(lengths) else 0
+    matrix = numpy.zeros((len(records), width), dtype=numpy.uint8)
+    joined = ''.join([records[index] for index in order])
+    if joined:
+        matrix[numpy.arange(width) < lengths[:, None]] = numpy.frombuffer(joined, dtype=numpy.uint8)
+    return matrix, lengths, order
+
+
+def crc_kermit_many(records):
+    """
+    CRC-16/KERMIT of each record. The records are processed together, one byte
+    position at a time, so the cost is in the length of the longest record
+    rather than in the number of records.
+    @param records sequence of strings
+    @return numpy array of the CRCs, in record order
+    """
+    matrix, lengths, order = _records_matrix(records)
+    crcs = numpy.zeros(len(records), dtype=numpy.uint16)
+    # the rows are sorted by length, the rows still active at a column are a prefix
+    active = numpy.searchsorted(-lengths, -numpy.arange(matrix.shape[1]), side='left')
+    for column, rows in enumerate(active.tolist()):
+        crc = crcs[:rows]
+        crcs[:rows] = (crc >> 8) ^ _CRC_KERMIT_ARRAY[(crc ^ matrix[:rows, column]) & 0xff]
+
+    result = numpy.empty_like(crcs)
+    result[order] = crcs
+    return result
+
+
+def xor_checksum(data, seed=0):
+    """
+    XOR of the bytes of data, e.g. the port agent LRC or the NMEA checksum
+    @param data string or buffer
+    @param seed checksum of the preceding data, to continue a running checksum
+    @return checksum as an int
+    """
+    data = _bytes(data)
+    if numpy is None or len(data) < XOR_NUMPY_THRESHOLD:
+        for byte in bytearray(data):
+            seed ^= byte
+        return seed
+
+    raw = numpy.frombuffer(data, dtype=numpy.uint8)
+    words = len(raw) // 8
+    # XOR 8 bytes at a time, then fold the word into a byte
+    word = int(numpy.bitwise_xor.reduce(raw[:words * 8].view(numpy.uint64)))
+    for shift in (32, 16, 8):
+        word ^= word >> shift
+    seed ^= word & 0xff
+    for byte in raw[words * 8:].tolist():
+        seed ^= byte
+    return seed
+
+
+def xor_prefix(data):
+    """
+    Running XOR of data: the XOR of data[start:end] is prefix[end] ^ prefix[start]
+    @param data string or buffer
+    @return numpy uint8 array of len(data) + 1 entries
+    """
+    prefix = numpy.zeros(len(data) + 1, dtype=numpy.uint8)
+    numpy.bitwise_xor.accumulate(numpy.frombuffer(data, dtype=numpy.uint8), out=prefix[1:])
+    return prefix
+
+
+def xor_checksums(data, starts, ends, prefix=None):
+    """
+    XOR checksum of the records data[start:end]. Records including their checksum,
+    like port agent packets, are valid where the result is 0.
+    @param data string or buffer holding the records
+    @param starts sequence of record start offsets
+    @param ends sequence of record end offsets
+    @param prefix xor_prefix(data), if already computed
+    @return numpy uint8 array of the checksums
+    """
+    if prefix is None:
+        prefix = xor_prefix(data)
+    return prefix[numpy.asarray(ends, dtype=numpy.int64)] ^ prefix[numpy.asarray(starts, dtype=numpy.int64)]
+
+
+def sum_bytes(data, seed=0):
+    """
+    16 bit sum of the bytes of data, e.g. the WETLabs AC-S checksum
+    @param data string or buffer
+    @param seed sum of the preceding data, to continue a running sum
+    @return sum as an int
+    """
+    return (seed + sum(bytearray(_bytes(data)))) & 0xffff
+
+
+def sum_bytes_many(data, starts, ends, seed=0):
+    """
+    sum_bytes of the records data[start:end]
+    @param data string or buffer holding the records
+    @param starts sequence of record start offsets
+    @param ends sequence of record end offsets
+    @param seed initial value of each sum
+    @return numpy int64 array of the sums
+    """
+    prefix = numpy.zeros(len(data) + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.frombuffer(data, dtype=numpy.uint8), out=prefix[1:])
+    return (seed + prefix[numpy.asarray(ends, dtype=numpy.int64)] -
+            prefix[numpy.asarray(starts, dtype=numpy.int64)]) & 0xffff
+
+
+def sum_hex_bytes(s):
+    """
+    8 bit sum of the bytes of a hex encoded string, as used by the SAMI records.
+    A trailing odd character counts as a byte of its own.
+    @param s hex string
+    @return checksum as an int
+    """
+    even = len(s) & ~1
+    try:
+        total = sum(bytearray(binascii.unhexlify(s[:even])))
+        if even != len(s):
+            total += int(s[-1], 16)
+    except (TypeError, binascii.Error):
+        # not plain hex digits, fall back to int() for its parsing rules
+        total = 0
+        for index in xrange(0, len(s), 2):
+            total += int(s[index:index + 2], 16)
+    return total & 0xff
+
+
+def sum_hex_bytes_many(records):
+    """
+    sum_hex_bytes of each record
+    @param records sequence of hex strings
+    @return numpy array of the checksums, in record order
+    """
+    matrix, lengths, order = _records_matrix(records)
+    # map hex digits to their values, anything else is not a valid record
+    values = numpy.full(256, 255, dtype=numpy.uint8)
+    for digit in '0123456789abcdefABCDEF':
+        values[ord(digit)] = int(digit, 16)
+    nibbles = values[matrix]
+    padding = numpy.arange(matrix.shape[1]) >= lengths[:, None]
+    nibbles[padding] = 0
+    if (nibbles == 255).any():
+        raise ValueError('invalid hex digit in records')
+
+    if matrix.shape[1] & 1:
+        nibbles = numpy.hstack([nibbles, numpy.zeros((len(records), 1), dtype=numpy.uint8)])
+    # a trailing odd digit is a byte of its own, not the high nibble of one
+    odd = (lengths & 1).astype(bool)
+    rows = numpy.flatnonzero(odd)
+    nibbles[rows, lengths[odd]] = nibbles[rows, lengths[odd] - 1]
+    nibbles[rows, lengths[odd] - 1] = 0
+
+    byte_values = nibbles[:, 0::2].astype(numpy.int64) * 16 + nibbles[:, 1::2]
+    sums = (byte_values.sum(axis=1) & 0xff).astype(numpy.uint8)
+
+    result = numpy.empty_like(sums)
+    result[order] = sums
+    return result
@@ -19,6 +19,8 @@ from mi.core.common import BaseEnum
 
 from mi.core.exceptions import ServerError
 from mi.core.instrument.zmq_driver_client import ZmqDriverClient
+from mi.core.instrument.zmq_driver_bus import ZmqBusClient, ZmqBusDriverClient
+from mi.core.instrument.resource_monitor import read_process_usage
 from mi.core.exceptions import DriverLaunchException
 
 PYTHON_PATH = 'python'
@@ -95,6 +97,11 @@ class DriverProcess(object):
 
         log.debug("driver process started, pid: %s", self.getpid())
 
+        bus = self._driver_bus()
+        if bus:
+            self._wait_for_bus_driver(bus)
+            return
+
         self._command_port = self._get_port_from_file(self._driver_command_port_file())
         self._event_port = self._get_port_from_file(self._driver_event_port_file())
 
@@ -187,6 +194,13 @@ class DriverProcess(object):
             log.warn("no process running")
             return 0
 
+        try:
+            usage = read_process_usage(driver_pid)[1]
+            log.info("process memory usage: %dk" % usage)
+            return usage
+        except (IOError, OSError, ValueError):
+            log.debug("no /proc entry for pid %s, falling back to ps", driver_pid)
+
         ps_process = subprocess.Popen(["ps", "-o rss,pid", "-p %s" % self.getpid()], stdout=subprocess.PIPE)
         ps_process.poll()
 
@@ -247,6 +261,41 @@ class DriverProcess(object):
             time.sleep(wait_interval)
         raise ServerError('process PID file was not found: ' + filename)
 
+    def _driver_bus(self):
+        """
+        read the driver config for the shared driver bus, see mi.core.instrument.zmq_driver_bus
+        zmq_bus :: dict of connect endpoints 'command', 'publish' and 'subscribe'
+        refdes :: the reference designator the driver is addressed by on the bus
+        @returns the zmq_bus dict, None if the driver binds its own sockets
+        @raise DriverLaunchException if the bus config is incomplete
+        """
+        bus = self.config.get('zmq_bus')
+        if not bus:
+            return None
+
+        for key in ('command', 'publish', 'subscribe'):
+            if not bus.get(key):
+                raise DriverLaunchException("missing driver config: zmq_bus %s endpoint" % key)
+        if not self.config.get('refdes'):
+            raise DriverLaunchException("missing driver config: refdes")
+        return bus
+
+    def _wait_for_bus_driver(self, bus):
+        """
+        Wait for the driver to register on the driver bus.
+        @param bus the zmq_bus dict from the driver config
+        @raise ServerError if the driver does not register w/in 10sec
+        """
+        refdes = self.config.get('refdes')
+        bus_client = ZmqBusClient(bus['command'], bus['subscribe'])
+        try:
+            bus_client.wait_for_drivers([refdes])
+            log.debug("-- driver %s registered on bus %s", refdes, bus['command'])
+        except Exception as e:
+            raise ServerError('driver did not register on bus: %s' % e)
+        finally:
+            bus_client.stop_messaging()
+
     def _driver_workdir(self):
         """
         read the driver config and get the work directory.
@@ -284,7 +333,11 @@ class DriverProcess(object):
         # Start client messaging and verify messaging.
         if not self._driver_client:
             try:
-                driver_client = ZmqDriverClient('localhost', self._command_port, self._event_port)
+                bus = self._driver_bus()
+                if bus:
+                    driver_client = ZmqBusDriverClient(self.config.get('refdes'), bus['command'], bus['subscribe'])
+                else:
+                    driver_client = ZmqDriverClient('localhost', self._command_port, self._event_port)
                 self._driver_client = driver_client
             except Exception, e:
                 self.stop()
@@ -302,6 +355,10 @@ class ZMQPyClassDriverProcess(DriverProcess):
     dvr_mod :: the python module that defines the driver class
     dvr_cls :: the driver class defined in the module
 
+    Optional, to run the driver on a shared ZmqDriverBus instead of its own sockets:
+    zmq_bus :: {'command': endpoint, 'publish': endpoint, 'subscribe': endpoint}
+    refdes :: the reference designator the driver is addressed by on the bus
+
     Example:
 
     driver_config = {
@@ -336,11 +393,20 @@ class ZMQPyClassDriverProcess(DriverProcess):
         if not driver_class:
             raise DriverLaunchException("missing driver config: driver_class")
 
-        cmd_port_fname = self._driver_command_port_file()
-        evt_port_fname = self._driver_event_port_file()
         cmd_str = ''
         if mi_repo:
             cmd_str += 'import sys; sys.path.insert(0,"%s");' % mi_repo
+
+        bus = self._driver_bus()
+        if bus:
+            cmd_str += 'from %s import %s; dp = %s("%s", "%s", "%s", "%s", "%s", %s);dp.run()' \
+                       % ('mi.core.instrument.zmq_driver_bus', 'ZmqBusDriverProcess', 'ZmqBusDriverProcess',
+                          driver_module, driver_class, self.config.get('refdes'), bus['command'], bus['publish'],
+                          str(ppid))
+            return [python, '-c', cmd_str]
+
+        cmd_port_fname = self._driver_command_port_file()
+        evt_port_fname = self._driver_event_port_file()
         cmd_str += 'from %s import %s; dp = %s("%s", "%s", "%s", "%s", %s);dp.run()' \
                    % ('mi.core.instrument.zmq_driver_process', 'ZmqDriverProcess', 'ZmqDriverProcess', driver_module,
                       driver_class, cmd_port_fname, evt_port_fname, str(ppid))
@@ -460,6 +526,8 @@ class ZMQEggDriverProcess(DriverProcess):
 
         if not driver_package:
             raise DriverLaunchException("missing driver config: driver_package")
+        if self._driver_bus():
+            raise DriverLaunchException("zmq_bus is not supported for egg drivers")
         if not os.path.exists(python):
             raise DriverLaunchException("could not find python executable: %s" % python)
 
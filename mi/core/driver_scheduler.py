@@ -106,6 +106,10 @@ scheduler = DriverScheduler(config)
 scheduler = DriverScheduler()
 scheduler.add_config(config)
 
+-or, to run the jobs on the timer heap shared by the process-
+
+scheduler = DriverScheduler(config, scheduler=HeapScheduler())
+
 # To run polled jobs
 job_name = 'polled_interval_job'
 
@@ -176,7 +180,7 @@ class DriverScheduler(object):
     jobs.
     """
 
-    def __init__(self, config = None):
+    def __init__(self, config = None, scheduler = None):
         """
         config structure:
         {
@@ -186,8 +190,12 @@ class DriverScheduler(object):
             }
         }
         @param config: job configuration structure.
+        @param scheduler: scheduler backend, a PolledScheduler or a HeapScheduler.
+                          A new PolledScheduler if not given.
         """
-        self._scheduler = PolledScheduler()
+        if scheduler is None:
+            scheduler = PolledScheduler()
+        self._scheduler = scheduler
         if(config):
             self.add_config(config)
 
@@ -0,0 +1,471 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.heap_scheduler Lightweight event scheduler for drivers
+@file mi/core/heap_scheduler.py
+@brief Timer heap backend for the DriverScheduler
+
+A PolledScheduler runs its own thread and scans every job in its job
+stores each time it wakes up.  Each driver protocol builds one, and some
+drivers rebuild their jobs on every state change.
+
+The HeapScheduler supports the same absolute, interval, cron and polled
+interval jobs, but all HeapSchedulers in a process share a single
+TimerHeap: one thread sleeping until the earliest deadline of a heap of
+timers.  Adding a timer is O(log n), cancelling one is O(1) (cancelled
+timers are dropped lazily), so removing and re-adding a job is cheap.
+Interval jobs fire on start + k * interval, so they do not drift with
+the time taken to dispatch them.
+
+Usage:
+
+scheduler = HeapScheduler()
+scheduler.start()
+
+job = scheduler.add_interval_job(some_callback, seconds=3)
+scheduler.unschedule_func(some_callback)
+
+or as the backend of a DriverScheduler:
+
+scheduler = DriverScheduler(config, scheduler=HeapScheduler())
+"""
+
+__license__ = 'Apache 2.0'
+
+import heapq
+import itertools
+import time
+from datetime import datetime, timedelta
+from functools import partial
+from math import floor
+from threading import Condition, Lock, RLock, Thread
+
+from apscheduler.triggers import CronTrigger
+from apscheduler.util import convert_to_datetime, timedelta_seconds
+
+from mi.core.log import get_logger
+from mi.core.scheduler import PolledIntervalTrigger, PolledScheduler
+
+log = get_logger()
+
+# compact the heap once more than half of it is cancelled timers
+COMPACT_MIN_SIZE = 64
+
+
+def _timestamp(dt):
+    """
+    Convert a naive local datetime to seconds since the epoch
+    """
+    return time.mktime(dt.timetuple()) + dt.microsecond / 1e6
+
+
+class TimerHeap(object):
+    """
+    Heap of timers served by a single daemon thread.  Callbacks are run on
+    the timer thread, so they must be short; the HeapScheduler hands the
+    actual job off to a thread of its own.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._counter = itertools.count()
+        self._cancelled = 0
+        self._condition = Condition(Lock())
+        self._thread = None
+
+    def __len__(self):
+        return len(self._heap) - self._cancelled
+
+    def schedule(self, when, callback):
+        """
+        Call callback at when
+        @param when: time in seconds since the epoch
+        @param callback: callable taking no arguments
+        @return: timer handle to pass to cancel
+        """
+        timer = [when, next(self._counter), callback]
+        with self._condition:
+            heapq.heappush(self._heap, timer)
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name='TimerHeap')
+                self._thread.daemon = True
+                self._thread.start()
+            # only a new earliest deadline changes how long the thread sleeps
+            if self._heap[0] is timer:
+                self._condition.notify()
+        return timer
+
+    def cancel(self, timer):
+        """
+        Cancel a timer, if it has not fired yet
+        @param timer: handle returned by schedule
+        @return: True if the timer was cancelled
+        """
+        with self._condition:
+            if timer[2] is None:
+                return False
+            timer[2] = None
+            self._cancelled += 1
+            if self._cancelled > COMPACT_MIN_SIZE and self._cancelled * 2 > len(self._heap):
+                self._heap = [t for t in self._heap if t[2] is not None]
+                heapq.heapify(self._heap)
+                self._cancelled = 0
+            return True
+
+    def _next_timer(self):
+        """
+        Wait for the earliest timer to come due and take it off the heap
+        """
+        with self._condition:
+            while True:
+                while self._heap and self._heap[0][2] is None:
+                    heapq.heappop(self._heap)
+                    self._cancelled -= 1
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                delay = self._heap[0][0] - time.time()
+                if delay <= 0:
+                    timer = heapq.heappop(self._heap)
+                    callback, timer[2] = timer[2], None
+                    return callback
+                self._condition.wait(delay)
+
+    def _run(self):
+        while True:
+            callback = self._next_timer()
+            try:
+                callback()
+            except Exception:
+                log.exception('timer callback failed')
+
+
+_timer_heap = None
+_timer_heap_lock = Lock()
+
+
+def get_timer_heap():
+    """
+    @return: the TimerHeap shared by the process
+    """
+    global _timer_heap
+    with _timer_heap_lock:
+        if _timer_heap is None:
+            _timer_heap = TimerHeap()
+        return _timer_heap
+
+
+class DateTimer(object):
+    """
+    Fire once, at run_date
+    """
+    def __init__(self, run_date):
+        self.run_date = convert_to_datetime(run_date)
+        self.run_time = _timestamp(self.run_date)
+
+    def next_fire_time(self, after):
+        if self.run_time > after:
+            return self.run_time
+        return None
+
+    def __repr__(self):
+        return '<%s (run_date=%s)>' % (self.__class__.__name__, self.run_date)
+
+
+class IntervalTimer(object):
+    """
+    Fire every interval, counted from start_time rather than from the last run
+    """
+    def __init__(self, interval, start_time):
+        if not isinstance(interval, timedelta):
+            raise TypeError('interval must be a timedelta')
+        self.interval = interval
+        self.interval_length = timedelta_seconds(interval)
+        if self.interval_length <= 0:
+            raise ValueError('interval must be positive')
+        self.start_time = start_time
+
+    def next_fire_time(self, after):
+        if after < self.start_time:
+            return self.start_time + self.interval_length
+        periods = floor((after - self.start_time) / self.interval_length) + 1
+        next_time = self.start_time + periods * self.interval_length
+        if next_time <= after:
+            next_time += self.interval_length
+        return next_time
+
+    def __repr__(self):
+        return '<%s (interval=%r)>' % (self.__class__.__name__, self.interval)
+
+
+class CronTimer(object):
+    """
+    Fire on a cron schedule
+    """
+    def __init__(self, **fields):
+        self.trigger = CronTrigger(**fields)
+
+    def next_fire_time(self, after):
+        next_date = self.trigger.get_next_fire_time(datetime.fromtimestamp(after) + timedelta(microseconds=1))
+        if next_date is None:
+            return None
+        return _timestamp(next_date)
+
+    def __repr__(self):
+        return '<%s (%s)>' % (self.__class__.__name__, self.trigger)
+
+
+class PolledTimer(PolledIntervalTrigger):
+    """
+    Fire at the maximum interval since the trigger was last pulled, if there is one
+    """
+    def next_fire_time(self, after):
+        if self.next_max_date is None:
+            return None
+        return _timestamp(self.next_max_date)
+
+
+class TimerJob(object):
+    """
+    A job of a HeapScheduler
+    @param func: callable to run
+    @param timer: one of the timer classes above, determines the run times
+    @param name: name of the job, required for polled jobs
+    """
+    def __init__(self, func, timer, name=None):
+        self.func = func
+        self.timer = timer
+        self.name = name
+        self.runs = 0
+        self.next_run_time = None
+        self._timer = None
+        self._running = False
+
+    def __repr__(self):
+        return '<%s (name=%s, timer=%r)>' % (self.__class__.__name__, self.name, self.timer)
+
+
+class HeapScheduler(object):
+    """
+    Scheduler backend with the job interface of the PolledScheduler used by
+    the DriverScheduler, running on the process wide TimerHeap.
+    """
+    # seconds after the designated run time that the job is still allowed to run
+    misfire_grace_time = 1
+
+    interval = staticmethod(PolledScheduler.interval)
+
+    def __init__(self, timer_heap=None):
+        """
+        @param timer_heap: TimerHeap to schedule on, the process wide heap by default
+        """
+        # an empty TimerHeap is falsy
+        self._timer_heap = get_timer_heap() if timer_heap is None else timer_heap
+        self._lock = RLock()
+        self._jobs = {}
+        self._polled_jobs = {}
+        self.running = False
+
+    def start(self):
+        """
+        Start the timers of all jobs added so far
+        """
+        with self._lock:
+            if self.running:
+                return
+            self.running = True
+            now = time.time()
+            for job in self.get_jobs():
+                self._arm(job, now)
+
+    def shutdown(self):
+        """
+        Cancel the timers of all jobs and forget them.  Runs in progress
+        are not interrupted.
+        """
+        with self._lock:
+            self.running = False
+            for job in self.get_jobs():
+                self._disarm(job)
+            self._jobs.clear()
+            self._polled_jobs.clear()
+
+    def get_jobs(self):
+        """
+        @return: list of all scheduled jobs
+        """
+        with self._lock:
+            return [job for jobs in self._jobs.values() for job in jobs]
+
+    def add_date_job(self, func, date):
+        """
+        Schedule a job to run once
+        @param func: callable to run
+        @param date: datetime or date string to run the job at
+        @return: the job
+        @raise ValueError if the date has passed
+        """
+        timer = DateTimer(date)
+        if timer.next_fire_time(time.time()) is None:
+            raise ValueError('Not adding job since it would never be run')
+        return self._add_job(TimerJob(func, timer))
+
+    def add_interval_job(self, func, weeks=0, days=0, hours=0, minutes=0, seconds=0):
+        """
+        Schedule a job to run at fixed intervals, starting one interval from now
+        @param func: callable to run
+        @return: the job
+        """
+        interval = self.interval(weeks, days, hours, minutes, seconds)
+        return self._add_job(TimerJob(func, IntervalTimer(interval, time.time())))
+
+    def add_cron_job(self, func, year=None, month=None, day=None, week=None,
+                     day_of_week=None, hour=None, minute=None, second=None):
+        """
+        Schedule a job to run on a cron schedule
+        @param func: callable to run
+        @return: the job
+        @raise ValueError if the schedule never fires
+        """
+        timer = CronTimer(year=year, month=month, day=day, week=week, day_of_week=day_of_week,
+                          hour=hour, minute=minute, second=second)
+        if timer.next_fire_time(time.time()) is None:
+            raise ValueError('Not adding job since it would never be run')
+        return self._add_job(TimerJob(func, timer))
+
+    def add_polled_job(self, func, name, min_interval, max_interval=None):
+        """
+        Schedule a job run on request with run_polled_job, no more often than
+        min_interval, and automatically after max_interval without a run.
+        @param func: callable to run
+        @param name: name of the job, unique within this scheduler
+        @param min_interval: timedelta, minimum time between runs
+        @param max_interval: timedelta, maximum time between runs, optional
+        @return: the job
+        @raise ValueError if a polled job with this name exists
+        """
+        job = TimerJob(func, PolledTimer(min_interval, max_interval), name)
+        with self._lock:
+            if name in self._polled_jobs:
+                raise ValueError("Not adding job since a job named '%s' already exists" % name)
+            self._polled_jobs[name] = job
+            return self._add_job(job)
+
+    def run_polled_job(self, name):
+        """
+        Run the polled job with the passed name if its minimum interval has passed
+        @param name: name of the job
+        @return: True if the job is run, False otherwise
+        @raise LookupError if there is no polled job with the name
+        """
+        with self._lock:
+            job = self._polled_jobs.get(name)
+            if job is None:
+                raise LookupError("no PolledIntervalJob found named '%s'" % name)
+
+            if not job.timer.pull_trigger():
+                log.debug("Job '%s' is *NOT* ready to run", name)
+                return False
+
+            # pulling the trigger moved the maximum interval deadline
+            log.debug("Job '%s' is ready to run", name)
+            self._disarm(job)
+            self._arm(job, time.time())
+
+        self._submit(job)
+        return True
+
+    def unschedule_func(self, func):
+        """
+        Remove all jobs running func
+        @param func: callable of the jobs
+        @raise KeyError if no job runs func
+        """
+        with self._lock:
+            jobs = self._jobs.pop(func, None)
+            if not jobs:
+                raise KeyError('The given function is not scheduled in this scheduler')
+            for job in jobs:
+                self._disarm(job)
+                if job.name is not None and self._polled_jobs.get(job.name) is job:
+                    del self._polled_jobs[job.name]
+
+    def _add_job(self, job):
+        with self._lock:
+            self._jobs.setdefault(job.func, []).append(job)
+            self._arm(job, time.time())
+        log.debug('Added job %r', job)
+        return job
+
+    def _remove_job(self, job):
+        jobs = self._jobs.get(job.func, [])
+        if job in jobs:
+            jobs.remove(job)
+            if not jobs:
+                del self._jobs[job.func]
+
+    def _arm(self, job, after):
+        """
+        Put the next run of a job on the timer heap
+        """
+        if not self.running:
+            return
+        job.next_run_time = job.timer.next_fire_time(after)
+        if job.next_run_time is not None:
+            # the callback learns its own timer handle once scheduled, _fire waits for the lock held here
+            handle = []
+            job._timer = self._timer_heap.schedule(job.next_run_time,
+                                                   partial(self._fire, job, job.next_run_time, handle))
+            handle.append(job._timer)
+
+    def _disarm(self, job):
+        if job._timer is not None:
+            self._timer_heap.cancel(job._timer)
+            job._timer = None
+        job.next_run_time = None
+
+    def _fire(self, job, run_time, handle):
+        """
+        Timer callback: schedule the following run, then run the job
+        @param handle: list holding the handle of the timer calling back
+        """
+        with self._lock:
+            # a timer taken off the heap before the job was re-armed is stale
+            if job._timer is not handle[0] or not self.running:
+                return
+            job._timer = None
+            now = time.time()
+            if isinstance(job.timer, PolledTimer):
+                job.timer.pull_trigger()
+            # missed runs are coalesced into this one
+            self._arm(job, max(run_time, now))
+            if job.next_run_time is None and job.name is None:
+                self._remove_job(job)
+
+        if now - run_time > self.misfire_grace_time:
+            log.warning('Run time of job %r was missed by %.3f seconds', job, now - run_time)
+            return
+        self._submit(job)
+
+    def _submit(self, job):
+        """
+        Run a job on a thread of its own, unless it is still running
+        """
+        with self._lock:
+            if job._running:
+                log.warning('Execution of job %r skipped: previous run still in progress', job)
+                return
+            job._running = True
+            job.runs += 1
+
+        thread = Thread(target=self._run_job, args=(job,))
+        thread.daemon = True
+        thread.start()
+
+    def _run_job(self, job):
+        try:
+            job.func()
+        except Exception:
+            log.exception('Job %r raised an exception', job)
+        finally:
+            job._running = False
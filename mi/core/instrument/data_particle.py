@@ -11,6 +11,9 @@ import json
 import time
 import ntplib
 import base64
+import struct
+
+import numpy
 
 from mi.core.common import BaseEnum
 from mi.core.exceptions import SampleException, ReadOnlyException, NotImplementedException, InstrumentParameterException
@@ -55,6 +58,17 @@ class DataParticleValue(BaseEnum):
     OUT_OF_RANGE = "out_of_range"
     INVALID = "invalid"
     QUESTIONABLE = "questionable"
+    PACKED_ARRAY = "packed_array"
+
+
+class PackedArrayKey(BaseEnum):
+    """
+    Keys of the envelope replacing an array value in a packed particle
+    """
+    ENCODING = "encoding"
+    DTYPE = "dtype"
+    SHAPE = "shape"
+    DATA = "data"
 
 
 class DataParticle(object):
@@ -74,6 +88,10 @@ class DataParticle(object):
     # data_particle_type()
     _data_particle_type = None
 
+    # numpy dtypes of array valued parameters, keyed by value id.  Publishers configured
+    # to pack arrays send these values packed, see pack_arrays()
+    _array_dtypes = {}
+
     def __init__(self, raw_data,
                  port_timestamp=None,
                  internal_timestamp=None,
@@ -230,6 +248,8 @@ class DataParticle(object):
         result = self._build_base_structure()
         result[DataParticleKey.STREAM_NAME] = self.data_particle_type()
         result[DataParticleKey.VALUES] = values
+        if self._array_dtypes:
+            register_array_dtypes(result[DataParticleKey.STREAM_NAME], self._array_dtypes)
         return result
 
     def generate(self, sorted=False):
@@ -329,6 +349,137 @@ class DataParticle(object):
         return self._encoding_errors
 
 
+# array dtypes of the particles generated by this process, keyed by stream name
+_stream_array_dtypes = {}
+
+
+def register_array_dtypes(stream_name, array_dtypes):
+    """
+    Set the numpy dtypes, by value id, of the array values pack_arrays packs in a stream
+    """
+    _stream_array_dtypes[stream_name] = array_dtypes
+
+
+def get_array_dtypes(stream_name):
+    """
+    @return the numpy dtypes, by value id, registered for the array values of a stream
+    """
+    return _stream_array_dtypes.get(stream_name, {})
+
+
+# struct type codes of the numpy kinds and sizes, to pack flat sequences without numpy
+_STRUCT_CODES = {('i', 1): 'b', ('i', 2): 'h', ('i', 4): 'i', ('i', 8): 'q',
+                 ('u', 1): 'B', ('u', 2): 'H', ('u', 4): 'I', ('u', 8): 'Q',
+                 ('f', 4): 'f', ('f', 8): 'd'}
+_array_formats = {}
+
+
+def _array_format(dtype):
+    """
+    @return (dtype string, struct byte order and type code or None) of dtype
+    """
+    if dtype not in _array_formats:
+        np_dtype = numpy.dtype(dtype)
+        code = _STRUCT_CODES.get((np_dtype.kind, np_dtype.itemsize))
+        if code is not None:
+            code = ('>' if np_dtype.byteorder == '>' else '<' if np_dtype.byteorder != '=' else '=') + code
+        _array_formats[dtype] = (np_dtype.str, code)
+    return _array_formats[dtype]
+
+
+def pack_array(value, dtype):
+    """
+    Pack an array value into an envelope holding its dtype, shape and base64 encoded bytes
+    @param value sequence (or nested sequences) of numbers, which must fit in dtype
+    @param dtype numpy dtype of the packed data
+    @return envelope dictionary
+    """
+    dtype_str, code = _array_format(dtype)
+    if code is not None and isinstance(value, (list, tuple)) and not (value and isinstance(value[0], (list, tuple))):
+        # a flat sequence, struct is much faster than creating an array
+        shape = [len(value)]
+        data = struct.pack(code[0] + str(len(value)) + code[1], *value)
+    else:
+        array = numpy.asarray(value, dtype=dtype)
+        dtype_str = array.dtype.str
+        shape = list(array.shape)
+        data = array.tobytes()
+    return {PackedArrayKey.ENCODING: DataParticleValue.PACKED_ARRAY,
+            PackedArrayKey.DTYPE: dtype_str,
+            PackedArrayKey.SHAPE: shape,
+            PackedArrayKey.DATA: base64.b64encode(data)}
+
+
+def unpack_array(envelope):
+    """
+    Restore a value packed by pack_array
+    @param envelope envelope dictionary
+    @return numpy array
+    """
+    data = base64.b64decode(envelope[PackedArrayKey.DATA])
+    return numpy.frombuffer(data, dtype=envelope[PackedArrayKey.DTYPE]).reshape(envelope[PackedArrayKey.SHAPE])
+
+
+def is_packed_array(value):
+    """
+    @return True if value is an envelope created by pack_array
+    """
+    return isinstance(value, dict) and value.get(PackedArrayKey.ENCODING) == DataParticleValue.PACKED_ARRAY
+
+
+def pack_arrays(particle):
+    """
+    Pack the array values of a generated particle, as registered for its stream
+    by register_array_dtypes
+    @param particle particle dictionary, not modified
+    @return particle dictionary with the array values replaced by envelopes
+    """
+    array_dtypes = _stream_array_dtypes.get(particle.get(DataParticleKey.STREAM_NAME))
+    values = particle.get(DataParticleKey.VALUES)
+    if not array_dtypes or not values:
+        return particle
+
+    packed = []
+    for value in values:
+        dtype = array_dtypes.get(value.get(DataParticleKey.VALUE_ID))
+        if dtype is not None and value.get(DataParticleKey.VALUE) is not None:
+            try:
+                envelope = pack_array(value[DataParticleKey.VALUE], dtype)
+            except (struct.error, TypeError, ValueError):
+                # publish the value as it is rather than lose it
+                log.error('Unable to pack %s as %s', value[DataParticleKey.VALUE_ID], dtype)
+            else:
+                value = dict(value)
+                value[DataParticleKey.VALUE] = envelope
+        packed.append(value)
+
+    result = dict(particle)
+    result[DataParticleKey.VALUES] = packed
+    return result
+
+
+def unpack_arrays(particle):
+    """
+    Restore the packed values of a particle as numpy arrays
+    @param particle particle dictionary, as published, not modified
+    @return particle dictionary with the envelopes replaced by numpy arrays
+    """
+    values = particle.get(DataParticleKey.VALUES)
+    if not values or not any(is_packed_array(value.get(DataParticleKey.VALUE)) for value in values):
+        return particle
+
+    unpacked = []
+    for value in values:
+        if is_packed_array(value.get(DataParticleKey.VALUE)):
+            value = dict(value)
+            value[DataParticleKey.VALUE] = unpack_array(value[DataParticleKey.VALUE])
+        unpacked.append(value)
+
+    result = dict(particle)
+    result[DataParticleKey.VALUES] = unpacked
+    return result
+
+
 class RawDataParticleKey(BaseEnum):
     PAYLOAD = "raw"
     LENGTH = "length"
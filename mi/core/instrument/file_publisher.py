@@ -8,14 +8,23 @@ Release notes:
 initial release
 """
 import cPickle as pickle
+import csv
 import json
+import os
+from collections import OrderedDict
 
 import numpy as np
 import pandas as pd
 import xarray as xr
+from mi.core.instrument.data_particle import get_array_dtypes
 from mi.core.instrument.publisher import Publisher
 from mi.logging import log
 
+try:
+    import netCDF4
+except ImportError:
+    netCDF4 = None
+
 
 class CountPublisher(Publisher):
     def __init__(self, allowed):
@@ -127,3 +136,198 @@ class XarrayPublisher(FilePublisher):
             file_path = '%s.xr' % particle_type
             with open(file_path, 'w') as fh:
                 pickle.dump(datasets[particle_type], fh, protocol=-1)
+
+
+class StreamingFilePublisher(FilePublisher):
+    """
+    Buffers at most max_rows particles per stream and appends them to the
+    output files in chunks, so memory use does not grow with the length of
+    the input.
+    """
+    DEFAULT_MAX_ROWS = 10000
+
+    def __init__(self, allowed, max_rows=None, output_dir='.', **kwargs):
+        super(StreamingFilePublisher, self).__init__(allowed, **kwargs)
+        self.max_rows = max_rows if max_rows else self.DEFAULT_MAX_ROWS
+        self.output_dir = output_dir
+
+    def _publish(self, events, headers):
+        super(StreamingFilePublisher, self)._publish(events, headers)
+        for stream in self.samples.keys():
+            if len(self.samples[stream]) >= self.max_rows:
+                self._flush(stream)
+
+    def _flush(self, stream):
+        rows = self.samples.pop(stream, None)
+        if rows:
+            self._append(stream, self.to_columns(rows))
+
+    @staticmethod
+    def to_columns(rows):
+        """
+        @return OrderedDict of column name to the list of its values, None where
+        a row has no value, with the columns in order of first appearance
+        """
+        columns = OrderedDict()
+        for index, row in enumerate(rows):
+            for name, value in row.iteritems():
+                if name not in columns:
+                    columns[name] = [None] * len(rows)
+                columns[name][index] = value
+        return columns
+
+    def path(self, name, extension):
+        return os.path.join(self.output_dir, '%s.%s' % (name, extension))
+
+    def _write(self):
+        for stream in self.samples.keys():
+            self._flush(stream)
+        self._close()
+
+    def _append(self, stream, columns):
+        raise NotImplemented
+
+    def _close(self):
+        pass
+
+
+class ChunkedCsvPublisher(StreamingFilePublisher):
+    """
+    Appends each stream to <stream>.csv. Array values are written as JSON. As
+    the header is written with the first chunk, a chunk containing a column
+    not in the header starts a new file, <stream>_<n>.csv.
+    """
+    def __init__(self, *args, **kwargs):
+        super(ChunkedCsvPublisher, self).__init__(*args, **kwargs)
+        # stream -> (path, header, part)
+        self._files = {}
+
+    @staticmethod
+    def _format(value):
+        if value is None:
+            return ''
+        if isinstance(value, float):
+            # str truncates floats to 12 significant digits
+            return repr(value)
+        if isinstance(value, (list, tuple, dict)):
+            return json.dumps(value)
+        if isinstance(value, unicode):
+            return value.encode('utf-8')
+        return value
+
+    def _append(self, stream, columns):
+        current = self._files.get(stream)
+        new_file = current is None or not all(name in current[1] for name in columns)
+        if new_file:
+            part = 0 if current is None else current[2] + 1
+            header = list(columns) if current is None else current[1] + [c for c in columns if c not in current[1]]
+            path = self.path(stream if part == 0 else '%s_%d' % (stream, part), 'csv')
+            current = self._files[stream] = (path, header, part)
+
+        path, header, _ = current
+        empty = [None] * len(columns.values()[0])
+        data = [[self._format(value) for value in columns.get(name, empty)] for name in header]
+        with open(path, 'w' if new_file else 'a') as fh:
+            writer = csv.writer(fh)
+            if new_file:
+                writer.writerow(header)
+            writer.writerows(zip(*data))
+
+
+class NetcdfPublisher(StreamingFilePublisher):
+    """
+    Appends each stream to <stream>.nc, a NetCDF4 (HDF5) file with an unlimited
+    obs dimension. Each particle value becomes a variable along obs, arrays get
+    an additional fixed dimension per axis. Absent values are left as the fill
+    value. Integers are written as i8 and other numbers as f8, unless the
+    particle declares the dtype of the value in _array_dtypes.
+    """
+    DIMENSION = 'obs'
+
+    def __init__(self, *args, **kwargs):
+        if netCDF4 is None:
+            raise ImportError('NetcdfPublisher requires the netCDF4 package')
+        super(NetcdfPublisher, self).__init__(*args, **kwargs)
+        self._datasets = {}
+
+    def _dataset(self, stream):
+        dataset = self._datasets.get(stream)
+        if dataset is None:
+            dataset = netCDF4.Dataset(self.path(stream, 'nc'), 'w', format='NETCDF4')
+            dataset.createDimension(self.DIMENSION, None)
+            self._datasets[stream] = dataset
+        return dataset
+
+    @staticmethod
+    def variable_type(stream, name, data):
+        """
+        @return the type of a new variable for the values in data, None if they
+        cannot be written
+        """
+        declared = get_array_dtypes(stream).get(name)
+        if declared is not None:
+            declared = np.dtype(declared)
+            return '%s%d' % (declared.kind, declared.itemsize)
+        if data.dtype.kind == 'b':
+            return 'i1'
+        if data.dtype.kind in 'iu':
+            return 'i8'
+        if data.dtype.kind == 'f':
+            return 'f8'
+        return None
+
+    def _create_variable(self, dataset, stream, name, data):
+        if data.dtype.kind in 'SUO':
+            if data.ndim != 1:
+                log.error('Unable to write %s, not a string or numeric array', name)
+                return None
+            return dataset.createVariable(name, str, (self.DIMENSION,))
+
+        dtype = self.variable_type(stream, name, data)
+        if dtype is None:
+            log.error('Unable to write %s, unsupported type %s', name, data.dtype)
+            return None
+        dimensions = [self.DIMENSION]
+        for axis, size in enumerate(data.shape[1:]):
+            dimension = '%s_dim_%d' % (name, axis)
+            dataset.createDimension(dimension, size)
+            dimensions.append(dimension)
+        return dataset.createVariable(name, dtype, dimensions, zlib=True)
+
+    def _append(self, stream, columns):
+        dataset = self._dataset(stream)
+        start = len(dataset.dimensions[self.DIMENSION])
+        for name, values in columns.iteritems():
+            index = [i for i, value in enumerate(values) if value is not None]
+            if not index:
+                continue
+            data = np.array([values[i] for i in index])
+
+            variable = dataset.variables.get(name)
+            if variable is None:
+                variable = self._create_variable(dataset, stream, name, data)
+                if variable is None:
+                    continue
+            if data.dtype.kind in 'SU':
+                data = data.astype(object)
+            elif data.dtype.kind == 'f' and variable.dtype.kind in 'iu':
+                # the type was fixed by the first chunk, fractions would be truncated
+                whole = (data == np.floor(data)).reshape(len(data), -1).all(axis=1)
+                if not whole.all():
+                    log.error('Unable to write %d values of %s with fractions to an integer variable',
+                              np.count_nonzero(~whole), name)
+                    index = [i for i, keep in zip(index, whole) if keep]
+                    data = data[whole]
+                    if not index:
+                        continue
+
+            try:
+                variable[np.array(index) + start] = data
+            except (ValueError, TypeError, IndexError) as e:
+                log.error('Unable to write %s: %r', name, e)
+        dataset.sync()
+
+    def _close(self):
+        for dataset in self._datasets.itervalues():
+            dataset.close()
+        self._datasets = {}
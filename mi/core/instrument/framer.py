@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.framer
+@file mi/core/instrument/framer.py
+@brief Generic sync/length/checksum framing for binary instrument records.
+
+Many binary instruments emit records which look like:
+
+    <sync bytes> ... <length field> ... <payload> <checksum> <pad> <trailer>
+
+Rather than hand-rolling a sieve for each of these, a driver declares the
+record layout with a BinaryFramer and plugs framer.sieve into a StringChunker:
+
+    OPTAA_FRAMER = BinaryFramer('\\xff\\x00\\xff\\x00', length_offset=4, length_format='>H',
+                                checksum=ChecksumType.SUM8, checksum_format='>H', pad=1)
+    self._chunker = StringChunker(OPTAA_FRAMER.sieve)
+
+Candidate records are validated in bulk with NumPy when it is available,
+otherwise a pure python implementation is used.
+"""
+
+import struct
+
+from mi.core.checksum import crc_xmodem as crc16, sum_bytes as sum8, sum_bytes_many, xor_checksum as lrc
+from mi.core.common import BaseEnum
+from mi.core.exceptions import InstrumentParameterException
+from mi.core.log import get_logger
+
+__license__ = 'Apache 2.0'
+
+log = get_logger()
+
+try:
+    import numpy
+except ImportError:
+    log.error('Unable to import numpy, falling back to pure python framing (SLOW!)')
+    numpy = None
+
+
+# Below this many sync candidates the per-candidate python path is cheaper than setting up the arrays
+VECTORIZE_MIN_CANDIDATES = 4
+
+
+class ChecksumType(BaseEnum):
+    """
+    Supported checksum algorithms
+    SUM8  - 16 bit sum of all bytes (e.g. WETLabs AC-S)
+    SUM16 - 16 bit sum of all 16 bit words (e.g. Nortek, seed 0xb58c)
+    LRC   - XOR of all bytes
+    CRC16 - CRC-16/XMODEM (poly 0x1021, seed is the initial value)
+    """
+    SUM8 = 'sum8'
+    SUM16 = 'sum16'
+    LRC = 'lrc'
+    CRC16 = 'crc16'
+
+
+def sum16(data, seed=0, endian='<'):
+    """
+    16 bit sum of the 16 bit words in data. A trailing odd byte is ignored.
+    """
+    return (seed + sum(struct.unpack_from('%s%dH' % (endian, len(data) / 2), data))) & 0xffff
+
+
+def _unsigned_format(fmt, name):
+    """
+    Validate a struct format describing a single unsigned integer field
+    @return (size, big_endian)
+    """
+    if not fmt or fmt[-1] not in 'BHIL' or len(fmt) > 2:
+        raise InstrumentParameterException('%s must describe a single unsigned integer: %r' % (name, fmt))
+    if len(fmt) == 1:
+        fmt = '<' + fmt
+    if fmt[0] not in '<>!':
+        raise InstrumentParameterException('%s must specify byte order explicitly: %r' % (name, fmt))
+    return struct.calcsize(fmt), fmt[0] != '<'
+
+
+class BinaryFramer(object):
+    """
+    Locates complete, valid binary records in a buffer.
+
+    A record starts with the sync bytes. The body (the bytes covered by the
+    checksum, starting with the sync bytes) is either a fixed length or is
+    read from a length field:
+
+        body = field_value * length_scale + length_adjust
+
+    The body is followed by the checksum field (if any), pad bytes (not
+    validated) and the trailer (if any).
+    """
+    def __init__(self, sync, length=None, length_offset=None, length_format='>H', length_scale=1,
+                 length_adjust=0, checksum=None, checksum_seed=0, checksum_format='>H', pad=0, trailer=''):
+        """
+        @param sync Sync bytes which begin every record
+        @param length Fixed body length in bytes, or None if the record carries a length field
+        @param length_offset Offset of the length field from the start of the record
+        @param length_format struct format of the (unsigned) length field, e.g. '>H'
+        @param length_scale Multiplier applied to the length field (e.g. 2 for lengths in words)
+        @param length_adjust Value added to the scaled length field to yield the body length
+        @param checksum ChecksumType or None
+        @param checksum_seed Initial value for the checksum algorithm
+        @param checksum_format struct format of the checksum field, the byte order is also
+            used for the words summed by SUM16
+        @param pad Number of unvalidated bytes between the checksum and the trailer
+        @param trailer Fixed bytes which end every record
+        """
+        if not sync:
+            raise InstrumentParameterException('BinaryFramer requires sync bytes')
+        if (length is None) == (length_offset is None):
+            raise InstrumentParameterException('BinaryFramer requires exactly one of length or length_offset')
+        if checksum is not None and not ChecksumType.has(checksum):
+            raise InstrumentParameterException('Unknown checksum type: %r' % checksum)
+
+        self.sync = sync
+        self.length = length
+        self.length_offset = length_offset
+        self.length_format = length_format
+        self.length_scale = length_scale
+        self.length_adjust = length_adjust
+        self.checksum = checksum
+        self.checksum_seed = checksum_seed
+        self.checksum_format = checksum_format
+        self.pad = pad
+        self.trailer = trailer
+
+        self._min_body = len(sync)
+        if length is None:
+            self._length_size, self._length_big = _unsigned_format(length_format, 'length_format')
+            self._length_end = length_offset + self._length_size
+            self._min_body = max(self._min_body, self._length_end)
+
+        self._checksum_size = 0
+        if checksum is not None:
+            self._checksum_size, self._checksum_big = _unsigned_format(checksum_format, 'checksum_format')
+
+        self._tail_size = self._checksum_size + pad + len(trailer)
+        self._checksum_fn = {
+            ChecksumType.SUM8: sum8,
+            ChecksumType.SUM16: self._sum16,
+            ChecksumType.LRC: lrc,
+            ChecksumType.CRC16: crc16,
+        }.get(checksum)
+
+    def _sum16(self, data, seed=0):
+        if len(data) % 2:
+            return None
+        return sum16(data, seed, '>' if self._checksum_big else '<')
+
+    def sieve(self, raw_data):
+        """
+        Sieve function suitable for use with StringChunker.
+        @param raw_data The buffer to search
+        @retval A list of (start, end) tuples, one per valid record, in order and without overlap
+        """
+        starts = self._find_sync(raw_data)
+        if not starts:
+            return []
+
+        if numpy is not None and len(starts) >= VECTORIZE_MIN_CANDIDATES:
+            frames = self._frames_vectorized(raw_data, starts)
+        else:
+            frames = self._frames_python(raw_data, starts)
+
+        # first valid record wins, drop any candidates inside it
+        results = []
+        last_end = 0
+        for start, end in frames:
+            if start >= last_end:
+                results.append((start, end))
+                last_end = end
+        return results
+
+    def frame_at(self, raw_data, start):
+        """
+        Validate a single record starting at start
+        @retval The end index of the record or None if no valid record starts here
+        """
+        raw_data_len = len(raw_data)
+        if self.length is None:
+            if start + self._length_end > raw_data_len:
+                return None
+            value = struct.unpack_from(self.length_format, raw_data, start + self.length_offset)[0]
+            body = value * self.length_scale + self.length_adjust
+            if body < self._min_body:
+                return None
+        else:
+            body = self.length
+
+        end = start + body + self._tail_size
+        if end > raw_data_len:
+            return None
+
+        if self.checksum is not None:
+            expected = struct.unpack_from(self.checksum_format, raw_data, start + body)[0]
+            if self._checksum_fn(raw_data[start:start + body], self.checksum_seed) != expected:
+                return None
+
+        if self.trailer and not raw_data.startswith(self.trailer, end - len(self.trailer)):
+            return None
+
+        return end
+
+    def _find_sync(self, raw_data):
+        """
+        Find all (possibly overlapping) occurrences of the sync bytes
+        """
+        starts = []
+        index = raw_data.find(self.sync)
+        while index != -1:
+            starts.append(index)
+            index = raw_data.find(self.sync, index + 1)
+        return starts
+
+    def _frames_python(self, raw_data, starts):
+        frames = []
+        for start in starts:
+            end = self.frame_at(raw_data, start)
+            if end is not None:
+                frames.append((start, end))
+        return frames
+
+    def _frames_vectorized(self, raw_data, starts):
+        data = numpy.frombuffer(raw_data, dtype=numpy.uint8)
+        raw_data_len = len(data)
+        starts = numpy.array(starts, dtype=numpy.int64)
+
+        if self.length is None:
+            starts = starts[starts + self._length_end <= raw_data_len]
+            values = _read_unsigned(data, starts + self.length_offset, self._length_size, self._length_big)
+            bodies = values * self.length_scale + self.length_adjust
+        else:
+            bodies = numpy.empty_like(starts)
+            bodies.fill(self.length)
+
+        ends = starts + bodies + self._tail_size
+        mask = (bodies >= self._min_body) & (ends <= raw_data_len)
+        starts, bodies, ends = starts[mask], bodies[mask], ends[mask]
+
+        if self.checksum is not None and len(starts):
+            expected = _read_unsigned(data, starts + bodies, self._checksum_size, self._checksum_big)
+            if self.checksum == ChecksumType.SUM8:
+                computed = sum_bytes_many(raw_data, starts, starts + bodies, self.checksum_seed)
+            elif self.checksum == ChecksumType.SUM16:
+                computed = _sum16_vectorized(data, starts, bodies, self.checksum_seed, self._checksum_big)
+            else:
+                computed = numpy.array([self._checksum_fn(raw_data[s:s + b], self.checksum_seed)
+                                        for s, b in zip(starts.tolist(), bodies.tolist())], dtype=numpy.int64)
+            mask = computed == expected
+            starts, ends = starts[mask], ends[mask]
+
+        frames = zip(starts.tolist(), ends.tolist())
+        if self.trailer:
+            size = len(self.trailer)
+            frames = [(s, e) for s, e in frames if raw_data.startswith(self.trailer, e - size)]
+        return frames
+
+
+def _read_unsigned(data, offsets, size, big_endian):
+    """
+    Read an unsigned integer field of the given size at each offset in data
+    """
+    values = numpy.zeros(len(offsets), dtype=numpy.int64)
+    for i in xrange(size):
+        shift = 8 * (size - 1 - i) if big_endian else 8 * i
+        values |= data[offsets + i].astype(numpy.int64) << shift
+    return values
+
+
+def _sum16_vectorized(data, starts, bodies, seed, big_endian):
+    """
+    Sum the 16 bit words starting at each start. Words may begin at odd offsets
+    so keep separate running sums for words at even and odd positions.
+    """
+    high, low = (data[:-1], data[1:]) if big_endian else (data[1:], data[:-1])
+    words = (high.astype(numpy.int64) << 8) | low
+    result = numpy.full(len(starts), -1, dtype=numpy.int64)
+    even = bodies % 2 == 0
+    for parity in (0, 1):
+        prefix = numpy.concatenate(([0], numpy.cumsum(words[parity::2])))
+        mask = even & (starts % 2 == parity)
+        first = starts[mask] // 2
+        result[mask] = (seed + prefix[first + bodies[mask] // 2] - prefix[first]) & 0xffff
+    return result
@@ -62,6 +62,7 @@ class DriverConfigKey(BaseEnum):
     """
     PARAMETERS = 'parameters'
     SCHEDULER = 'scheduler'
+    RESOURCES = 'resources'
 
 
 # This is a copy since we can't import from pyon.
@@ -13,7 +13,7 @@ nitty-gritty interaction with individual instruments in the system.
 import time
 import re
 from functools import partial
-from threading import Thread
+from threading import Condition, Thread
 
 from mi.core.log import get_logger, get_logging_metaclass
 
@@ -23,6 +23,7 @@ from mi.core.instrument.data_particle import RawDataParticle
 from mi.core.instrument.instrument_driver import DriverConfigKey
 from mi.core.driver_scheduler import DriverScheduler
 from mi.core.driver_scheduler import DriverSchedulerConfigKey
+from mi.core.heap_scheduler import HeapScheduler
 
 from mi.core.instrument.instrument_driver import DriverAsyncEvent
 from mi.core.instrument.instrument_driver import DriverProtocolState
@@ -46,6 +47,8 @@ log = get_logger()
 
 
 MAX_BUFFER_SIZE = 32768
+# longest wait between buffer checks, for buffers updated without add_to_buffer
+MAX_BUFFER_WAIT = .1
 DEFAULT_CMD_TIMEOUT = 20
 DEFAULT_WRITE_DELAY = 0
 RE_PATTERN = type(re.compile(""))
@@ -459,7 +462,7 @@ class InstrumentProtocol(object):
         """
         log.debug("Scheduler config: %r", self._get_scheduler_config())
         log.debug("Scheduler callbacks: %r", self._scheduler_callback)
-        self._scheduler = DriverScheduler()
+        self._scheduler = DriverScheduler(scheduler=HeapScheduler())
         for name in self._scheduler_callback.keys():
             log.debug("Add job for callback: %s", name)
             self._add_scheduler_job(name)
@@ -809,11 +812,75 @@ class InstrumentProtocol(object):
             self._scheduler = None
 
 
+class EchoPacedTransmitter(object):
+    """
+    Sends commands to instruments which must be written to a character at a time.
+    Each write waits for its echo from the instrument rather than a fixed delay,
+    so the command goes as fast as the instrument takes it.
+    """
+
+    def __init__(self, protocol, echo_timeout, min_gap=0):
+        """
+        @param protocol CommandResponseInstrumentProtocol receiving the echoes
+        @param echo_timeout longest wait for an echo, the pace for instruments
+        which do not echo
+        @param min_gap shortest time between the start of two writes
+        """
+        self._protocol = protocol
+        self.echo_timeout = echo_timeout
+        self.min_gap = min_gap
+
+    def send(self, data, send=None):
+        """
+        Write data, waiting for the echo of each write
+        @param data string, written a character at a time, or a sequence of
+        strings, written one string at a time
+        @param send function writing to the instrument, the protocol connection
+        by default
+        @return True if every write was echoed
+        """
+        protocol = self._protocol
+        if send is None:
+            send = protocol._connection.send
+
+        echoed = True
+        next_write = 0
+        for chars in data:
+            delay = next_write - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+            # the echo must arrive after whatever is already in the buffer
+            offset = len(protocol._promptbuf)
+            write_time = time.time()
+            next_write = write_time + self.min_gap
+            end_time = write_time + self.echo_timeout
+            send(chars)
+
+            while True:
+                update = protocol._buffer_updates
+                promptbuf = protocol._promptbuf
+                if len(promptbuf) < offset:
+                    # buffer cleared since the write
+                    offset = 0
+                if promptbuf.find(chars, offset) >= 0:
+                    break
+                if time.time() >= end_time:
+                    echoed = False
+                    break
+                protocol._wait_for_buffer(update, end_time)
+
+        return echoed
+
+
 class CommandResponseInstrumentProtocol(InstrumentProtocol):
     """
     Base class for text-based command-response instruments.
     """
 
+    # shortest time between characters sent with a write delay
+    _min_write_gap = 0
+
     def __init__(self, prompts, newline, driver_event):
         """
         Constructor.
@@ -850,6 +917,13 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
 
         self._last_data_timestamp = 0
 
+        # Notified by add_to_buffer, to wake threads waiting for a response
+        self._buffer_condition = Condition()
+        self._buffer_updates = 0
+
+        # (prompt enum, its prompts sorted by length)
+        self._sorted_prompts = (None, None)
+
     def _get_prompts(self):
         """
         Return a list of prompts order from longest to shortest.  The
@@ -858,12 +932,54 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
         """
         if isinstance(self._prompts, list):
             prompts = self._prompts
-        else:
-            prompts = self._prompts.list()
+            prompts.sort(key=len, reverse=True)
+            return prompts
 
-        prompts.sort(lambda x, y: cmp(len(y), len(x)))
+        # prompt enums don't change, sort them once
+        prompt_enum, prompts = self._sorted_prompts
+        if prompt_enum is not self._prompts:
+            prompts = sorted(self._prompts.list(), key=len, reverse=True)
+            self._sorted_prompts = (self._prompts, prompts)
+        return list(prompts)
 
-        return prompts
+    def _notify_buffer(self):
+        """
+        Wake the threads waiting for new data, called whenever the buffers or the
+        particles have been updated
+        """
+        with self._buffer_condition:
+            self._buffer_updates += 1
+            self._buffer_condition.notify_all()
+
+    def _wait_for_buffer(self, last_update, end_time):
+        """
+        Wait for the buffers to be updated, or end_time to pass. Buffers updated
+        without _notify_buffer are noticed within MAX_BUFFER_WAIT.
+        @param last_update update count when the buffers were last checked
+        @param end_time time to stop waiting at
+        @return the current update count
+        """
+        with self._buffer_condition:
+            if self._buffer_updates == last_update:
+                remaining = end_time - time.time()
+                if remaining > 0:
+                    self._buffer_condition.wait(min(remaining, MAX_BUFFER_WAIT))
+            return self._buffer_updates
+
+    @staticmethod
+    def _find_prompt(promptbuf, prompt_list, start=0):
+        """
+        Find the first prompt of prompt_list in a prompt buffer
+        @param promptbuf prompt buffer
+        @param prompt_list prompts in order of preference
+        @param start offset the prompt buffer has already been searched up to
+        @return (prompt, index) of the prompt found, or (None, -1)
+        """
+        for item in prompt_list:
+            index = promptbuf.find(item, max(0, start - len(item) + 1))
+            if index >= 0:
+                return item, index
+        return None, -1
 
     def _get_response(self, timeout=10, expected_prompt=None, response_regex=None):
         """
@@ -912,23 +1028,33 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
 
         log.debug('_get_response: timeout=%s, prompt_list=%s, expected_prompt=%r, response_regex=%r, promptbuf=%r',
                   timeout, prompt_list, expected_prompt, pattern, self._promptbuf)
+        end_time = starttime + timeout
+        searched = None
         while True:
+            update = self._buffer_updates
             if response_regex:
-                match = response_regex.search(self._linebuf)
-                if match:
-                    return match.groups()
+                # a match may start anywhere, rescan the buffer only when it has changed
+                linebuf = self._linebuf
+                if linebuf is not searched:
+                    match = response_regex.search(linebuf)
+                    if match:
+                        return match.groups()
+                    searched = linebuf
             else:
-                for item in prompt_list:
-                    index = self._promptbuf.find(item)
+                # only search data added since the last search, unless the buffer was cleared or trimmed
+                promptbuf = self._promptbuf
+                if promptbuf is not searched:
+                    start = len(searched) if searched is not None and promptbuf.startswith(searched) else 0
+                    item, index = self._find_prompt(promptbuf, prompt_list, start)
                     if index >= 0:
-                        result = self._promptbuf[0:index + len(item)]
-                        return item, result
-
-            time.sleep(.1)
+                        return item, promptbuf[0:index + len(item)]
+                    searched = promptbuf
 
-            if time.time() > starttime + timeout:
+            if time.time() > end_time:
                 raise InstrumentTimeoutException("in InstrumentProtocol._get_response()")
 
+            self._wait_for_buffer(update, end_time)
+
     def _get_raw_response(self, timeout=10, expected_prompt=None):
         """
         Get a response from the instrument, but don't trim whitespace. Used in
@@ -951,16 +1077,20 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
             else:
                 prompt_list = expected_prompt
 
+        stripped_prompts = [(item, item.rstrip(strip_chars)) for item in prompt_list]
+        end_time = starttime + timeout
         while True:
-            for item in prompt_list:
-                if self._promptbuf.rstrip(strip_chars).endswith(item.rstrip(strip_chars)):
+            update = self._buffer_updates
+            promptbuf = self._promptbuf.rstrip(strip_chars)
+            for item, stripped in stripped_prompts:
+                if promptbuf.endswith(stripped):
                     return item, self._linebuf
-                else:
-                    time.sleep(.1)
 
-            if time.time() > starttime + timeout:
+            if time.time() > end_time:
                 raise InstrumentTimeoutException("in InstrumentProtocol._get_raw_response()")
 
+            self._wait_for_buffer(update, end_time)
+
     def _do_cmd_resp(self, cmd, *args, **kwargs):
         """
         Perform a command-response on the device.
@@ -1017,13 +1147,7 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
         # Send command.
         log.debug('_do_cmd_resp: %r, timeout=%s, write_delay=%s, expected_prompt=%r, response_regex=%r',
                   cmd_line, timeout, write_delay, expected_prompt, response_regex)
-
-        if write_delay == 0:
-            self._connection.send(cmd_line)
-        else:
-            for char in cmd_line:
-                self._connection.send(char)
-                time.sleep(write_delay)
+        self._send_paced(cmd_line, write_delay)
 
         # Wait for the prompt, prepare result and return, timeout exception
         if response_regex:
@@ -1077,12 +1201,26 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
 
         # Send command.
         log.debug('_do_cmd_no_resp: %r, timeout=%s', cmd_line, timeout)
+        self._send_paced(cmd_line, write_delay)
+
+    def _send_paced(self, cmd_line, write_delay, min_gap=None):
+        """
+        Send a command, a character at a time if there is a write delay. Each
+        character is sent once the previous one has been echoed, or write_delay
+        seconds after it if there is no echo.
+        @param cmd_line command to send
+        @param write_delay longest time between characters, 0 to send the
+        command at once
+        @param min_gap shortest time between characters, _min_write_gap by default
+        """
         if write_delay == 0:
             self._connection.send(cmd_line)
-        else:
-            for char in cmd_line:
-                self._connection.send(char)
-                time.sleep(write_delay)
+            return
+
+        if min_gap is None:
+            min_gap = self._min_write_gap
+        if not EchoPacedTransmitter(self, write_delay, min_gap).send(cmd_line):
+            log.debug('_send_paced: %r not fully echoed', cmd_line)
 
     def _do_cmd_direct(self, cmd):
         """
@@ -1127,6 +1265,9 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
                 self._got_chunk(chunk, timestamp)
                 (timestamp, chunk) = self._chunker.get_next_data()
 
+            # wake wait_for_particles
+            self._notify_buffer()
+
     ########################################################################
     # Incoming raw data callback.
     ########################################################################
@@ -1168,6 +1309,7 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
         particles = []
 
         while True:
+            update = self._buffer_updates
 
             for particle_class in particle_classes[:]:
                 if particle_class in self._particle_dict:
@@ -1182,7 +1324,7 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
             if time.time() > timeout:
                 break
 
-            time.sleep(0.1)
+            self._wait_for_buffer(update, timeout)
 
         log.debug("Timeout expired - unable to find all requested particles.")
         return particles
@@ -1200,6 +1342,7 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
         self._linebuf = (self._linebuf + data)[-maxbuf:]
         self._promptbuf = (self._promptbuf + data)[-maxbuf:]
         self._last_data_timestamp = time.time()
+        self._notify_buffer()
 
     def _max_buffer_size(self):
         return MAX_BUFFER_SIZE
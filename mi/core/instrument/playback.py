@@ -6,31 +6,43 @@
 @brief Playback process using ZMQ messaging.
 
 Usage:
-    playback datalog <module> <refdes> <event_url> <particle_url> [--allowed=<particles>]  [--max_events=<events>] <files>...
-    playback ascii <module> <refdes> <event_url> <particle_url> [--allowed=<particles>] [--max_events=<events>] <files>...
-    playback chunky <module> <refdes> <event_url> <particle_url> [--allowed=<particles>] [--max_events=<events>] <files>...
+    playback datalog <module> <refdes> <event_url> <particle_url> [--allowed=<particles>]  [--max_events=<events>] [--workers=<n>] <files>...
+    playback ascii <module> <refdes> <event_url> <particle_url> [--allowed=<particles>] [--max_events=<events>] [--workers=<n>] <files>...
+    playback chunky <module> <refdes> <event_url> <particle_url> [--allowed=<particles>] [--max_events=<events>] [--workers=<n>] <files>...
 
 Options:
     -h, --help          Show this screen
     --allowed=<particles> Comma-separated list of publishable particles
+    --workers=<n>       Number of processes used to play back files in parallel [default: 1]
 
     To run without installing:
     python -m mi.core.instrument.playback ...
 """
+import calendar
+import cPickle as pickle
 import glob
+import heapq
 import importlib
+import mmap
+import multiprocessing
 import sys
+import tempfile
 import time
 from datetime import datetime
 
 import os
 import re
+
+import numpy
 from docopt import docopt
+from mi.core.checksum import xor_checksums
 from mi.core.instrument.instrument_driver import DriverAsyncEvent
 from mi.core.instrument.instrument_protocol import \
     MenuInstrumentProtocol,\
     CommandResponseInstrumentProtocol, \
     InstrumentProtocol
+from mi.core.instrument.playback_protocol import ParseOnlyProtocolFactory
+from mi.core.instrument.port_agent_client import HEADER_SIZE
 from mi.core.instrument.publisher import Publisher
 from mi.logging import log
 from ooi_port_agent.common import PacketType
@@ -46,6 +58,16 @@ DATE_PATTERN = r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?Z?$'
 DATE_MATCHER = re.compile(DATE_PATTERN)
 DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
 
+# port agent logs are read in blocks of this size
+READ_BLOCK_SIZE = 4 * 1024 * 1024
+# offset and format of the packet size (including header) in the port agent header
+PACKET_SIZE_OFFSET = 4
+# Digi ASCII log records: <OOI-TS YYYY-MM-DDTHH:MM:SS.fff TN>\r\n...<\OOI-TS>
+OOI_TS_REGEX = re.compile(r'<OOI-TS (.+?) [TX][NS]>\r\n(.*?)<\\OOI-TS>', re.DOTALL)
+DIGI_TIME_MATCHER = re.compile(r'(\d{4}-\d{2}-\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6}))?Z?$')
+# number of distinct days kept by the Digi timestamp cache
+DAYS_CACHE_SIZE = 1024
+
 
 def string_to_ntp_date_time(datestr):
     """
@@ -84,6 +106,47 @@ def string_to_ntp_date_time(datestr):
     return timestamp
 
 
+class DigiTimestampParser(object):
+    """
+    Converts the timestamps of a Digi ASCII log to ntp time. The fixed width
+    fields are parsed as integers and the start of each day is cached, anything
+    not in the expected format is handed to string_to_ntp_date_time. The
+    result is identical to string_to_ntp_date_time.
+    """
+    def __init__(self):
+        self._days = {}
+
+    def __call__(self, datestr):
+        match = DIGI_TIME_MATCHER.match(datestr)
+        if match is None:
+            return string_to_ntp_date_time(datestr)
+
+        date, hour, minute, second, fraction = match.groups()
+        day = self._days.get(date)
+        if day is None:
+            if len(self._days) >= DAYS_CACHE_SIZE:
+                self._days.clear()
+            day = self._days[date] = self._day_seconds(date)
+
+        hour, minute, second = int(hour), int(minute), int(second)
+        if hour > 23 or minute > 59 or second > 61:
+            return string_to_ntp_date_time(datestr)
+        microseconds = int(fraction.ljust(6, '0')) if fraction else 0
+
+        return ((day + hour * 3600 + minute * 60 + second) * 1000000 + microseconds) / 1e6
+
+    @staticmethod
+    def _day_seconds(date):
+        """
+        @return seconds from 1900 to the start of a YYYY-MM-DD date
+        @throws ValueError if the date is not valid
+        """
+        year, month, day = int(date[0:4]), int(date[5:7]), int(date[8:10])
+        # validate the date, as strptime does
+        datetime(year, month, day)
+        return calendar.timegm((year, month, day, 0, 0, 0)) + int(NTP_DIFF)
+
+
 class PlaybackPacket(Packet):
     def get_data_length(self):
         return len(self.payload)
@@ -121,23 +184,277 @@ class PlaybackPacket(Packet):
                     packet = PlaybackPacket(payload=payload, header=header)
                     return packet
 
+    @staticmethod
+    def packets_from_buffer(data, final=False):
+        """
+        Extract all complete, valid packets from data
+        @param data buffer containing port agent packets
+        @param final if True, no more data will follow, incomplete packets are discarded
+        @return (list of PlaybackPacket, index of the first byte not consumed)
+        """
+        starts, ends, consumed = _packet_spans(data, final)
+        from_buffer = PacketHeader.from_buffer
+        return [PlaybackPacket(payload=data[start + HEADER_SIZE:end], header=from_buffer(data, start))
+                for start, end in zip(starts, ends)], consumed
+
+    @staticmethod
+    def packets_from_fh(file_handle, block_size=READ_BLOCK_SIZE):
+        """
+        Generate all valid packets from file_handle, reading it in large blocks
+        """
+        from_buffer = PacketHeader.from_buffer
+        data = ''
+        while True:
+            block = file_handle.read(block_size)
+            final = block == ''
+            data = data + block if data else block
+            starts, ends, consumed = _packet_spans(data, final)
+            # packets are created as they are consumed, a block's worth of
+            # packets held at once keeps the garbage collector busy
+            for start, end in zip(starts, ends):
+                yield PlaybackPacket(payload=data[start + HEADER_SIZE:end], header=from_buffer(data, start))
+            if final:
+                return
+            data = data[consumed:]
+
+
+def _packet_spans(data, final):
+    """
+    Locate all complete, valid packets in data. The sync markers, sizes and
+    checksums of all candidate packets are found at once, the chain of
+    packets is then followed from the first sync marker.
+    @param data buffer containing port agent packets
+    @param final if True, no more data will follow, incomplete packets are discarded
+    @return (packet starts, packet ends, index of the first byte not consumed)
+    """
+    data_len = len(data)
+    raw = numpy.frombuffer(data, dtype=numpy.uint8)
+    syncs = _sync_offsets(raw)
+    starts = syncs[syncs + HEADER_SIZE <= data_len]
+    ends = starts + _read_packet_sizes(raw, starts)
+    # a header claiming a packet shorter than itself is a false sync
+    sized = ends >= starts + HEADER_SIZE
+    complete = sized & (ends <= data_len)
+    # the checksum field makes the LRC of a valid packet zero
+    valid = complete.copy()
+    valid[complete] = xor_checksums(data, starts[complete], ends[complete]) == 0
+    following = numpy.searchsorted(starts, ends)
+
+    count = len(starts)
+    if valid.all() and (following[:-1] == numpy.arange(1, count)).all():
+        # a clean run of packets
+        chain, stop = numpy.arange(count), None
+    else:
+        # only the end of the buffer may hold a packet which is still being read
+        truncated = None if final else sized & ~complete
+        chain, stop = _follow_chain(starts, valid, complete, truncated, following)
+    packet_starts, packet_ends = starts[chain].tolist(), ends[chain].tolist()
+
+    if final:
+        return packet_starts, packet_ends, data_len
+    if stop is not None:
+        # incomplete packet
+        return packet_starts, packet_ends, stop
+    last_end = packet_ends[-1] if packet_ends else 0
+    # a sync marker without the rest of its header
+    partial = syncs[count:]
+    partial = partial[partial >= last_end]
+    if len(partial):
+        return packet_starts, packet_ends, int(partial[0])
+    # keep any trailing partial sync
+    return packet_starts, packet_ends, max(last_end, data_len - len(PacketHeader.sync) + 1)
+
+
+def _sync_offsets(raw):
+    """
+    @param raw numpy uint8 array
+    @return offsets of all the port agent sync markers in raw
+    """
+    sync = bytearray(PacketHeader.sync)
+    offsets = numpy.flatnonzero(raw[:max(len(raw) - len(sync) + 1, 0)] == sync[0])
+    for position, byte in enumerate(sync[1:], 1):
+        offsets = offsets[raw[offsets + position] == byte]
+    return offsets
+
+
+def _read_packet_sizes(raw, starts):
+    """
+    @param raw numpy uint8 array
+    @param starts offsets of complete port agent headers in raw
+    @return the packet size field of each header, a big endian short
+    """
+    offsets = starts + PACKET_SIZE_OFFSET
+    return (raw[offsets].astype(numpy.int64) << 8) | raw[offsets + 1]
+
+
+def _follow_chain(starts, valid, complete, truncated, following):
+    """
+    Follow the chain of packets from the first sync marker, resynchronizing
+    on the next sync marker after an invalid packet
+    @param starts offsets of the candidate packets
+    @param valid candidates with a valid length and checksum
+    @param complete candidates with a valid length ending within the buffer
+    @param truncated candidates continuing past the end of the buffer, None if the buffer is final
+    @param following index of the first candidate after the end of each candidate
+    @return (indices of the valid packets, offset of the incomplete packet or None)
+    """
+    starts, valid, complete, following = starts.tolist(), valid.tolist(), complete.tolist(), following.tolist()
+    truncated = truncated.tolist() if truncated is not None else [False] * len(starts)
+    chain = []
+    index = 0
+    while index < len(starts):
+        if valid[index]:
+            chain.append(index)
+            index = following[index]
+            continue
+        if truncated[index]:
+            return chain, starts[index]
+        if complete[index]:
+            log.warn('Skipping invalid port agent packet at offset %d', starts[index])
+        index += 1
+    return chain, None
+
+
+def build_event(event_type, val=None):
+    """
+    Construct an asynchronous driver event.
+    @param event_type a DriverAsyncEvent type specifier.
+    @param val event value for sample and test result events.
+    """
+    event = {
+        'type': event_type,
+        'value': val,
+        'time': time.time()
+    }
+
+    if isinstance(event[EventKeys.VALUE], Exception):
+        event[EventKeys.VALUE] = encode_exception(event[EventKeys.VALUE])
+
+    return event
+
+
+# parse-only protocol factories of this process, by module
+_protocol_factories = {}
+
+
+def parse_only_protocol(module, callback):
+    """
+    Create a playback protocol for module, parse-only where the module supports it
+    """
+    factory = _protocol_factories.get(module)
+    if factory is None:
+        factory = _protocol_factories[module] = ParseOnlyProtocolFactory.from_module(module)
+    return factory.create(callback)
+
+
+def playback_file(module, reader_klass, filename):
+    """
+    Play back a single file through a new parse-only protocol
+    @return list of the events generated, in order
+    """
+    events = []
+
+    def handle_event(event_type, val=None):
+        events.append(build_event(event_type, val))
+
+    protocol = parse_only_protocol(module, handle_event)
+
+    def got_data(packet):
+        try:
+            protocol.got_data(packet)
+        except KeyboardInterrupt:
+            raise
+        except Exception as e:
+            log.exception(e)
+
+    reader = reader_klass([filename], got_data)
+    for name in reader.read():
+        if name is not None and hasattr(protocol, 'got_filename'):
+            protocol.got_filename(name)
+
+    return events
+
+
+def sort_events(events, shard):
+    """
+    Order the events of a single file by timestamp. Events without a timestamp
+    (e.g. state changes or errors) keep their position relative to the
+    preceding particle.
+    @return list of (timestamp, shard, index, event)
+    """
+    decorated = []
+    timestamp = 0
+    for index, event in enumerate(events):
+        value = event.get(EventKeys.VALUE)
+        if event.get(EventKeys.TYPE) == DriverAsyncEvent.SAMPLE and isinstance(value, dict):
+            sample_time = value.get(value.get('preferred_timestamp'))
+            if sample_time is not None:
+                timestamp = sample_time
+        decorated.append((timestamp, shard, index, event))
+    decorated.sort()
+    return decorated
+
+
+def spill_events(module, reader_klass, filename, shard):
+    """
+    Play back a single file and write its events, ordered by sort_events, to
+    a temporary file so they are not returned to the parent all at once
+    @return name of the temporary file, removed by the caller
+    """
+    events = sort_events(playback_file(module, reader_klass, filename), shard)
+    fd, spill_name = tempfile.mkstemp(prefix='playback_', suffix='.spill')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            for item in events:
+                pickle.dump(item, fh, pickle.HIGHEST_PROTOCOL)
+    except:
+        os.remove(spill_name)
+        raise
+    return spill_name
+
+
+def read_spill(spill_name):
+    """
+    Generate the events written by spill_events, in order
+    """
+    with open(spill_name, 'rb') as fh:
+        while True:
+            try:
+                yield pickle.load(fh)
+            except EOFError:
+                return
+
 
 class PlaybackWrapper(object):
-    def __init__(self, module, refdes, event_url, particle_url, reader_klass, allowed, files, max_events):
+    def __init__(self, module, refdes, event_url, particle_url, reader_klass, allowed, files, max_events,
+                 workers=1):
         version = DriverWrapper.get_version(module)
         headers = {'sensor': refdes, 'deliveryType': 'streamed', 'version': version, 'module': module}
         self.max_events = max_events
         self.event_publisher = Publisher.from_url(event_url, headers)
         self.particle_publisher = Publisher.from_url(particle_url, headers, allowed, max_events)
 
-        self.protocol = self.construct_protocol(module)
+        self.module = module
+        self.reader_klass = reader_klass
+        self.workers = workers
         self.reader = reader_klass(files, self.got_data)
+        # each file gets its own protocol in the workers of a parallel playback
+        self.protocol = None
+        if not self.is_parallel():
+            self.protocol = self.construct_protocol(module, self.handle_event)
 
     def set_header_filename(self, filename):
         self.event_publisher.set_source(filename)
         self.particle_publisher.set_source(filename)
 
+    def is_parallel(self):
+        return self.workers > 1 and len(self.reader.files) > 1
+
     def playback(self):
+        if self.is_parallel():
+            self.parallel_playback()
+            return
+
         for index, filename in enumerate(self.reader.read()):
             if filename is not None:
                 self.set_header_filename(filename)
@@ -150,6 +467,55 @@ class PlaybackWrapper(object):
         if hasattr(self.particle_publisher, 'write'):
             self.particle_publisher.write()
 
+    def parallel_playback(self):
+        """
+        Play back each file with its own protocol in a pool of worker processes,
+        then publish the events of all files merged by timestamp. Equal timestamps
+        are published in file order, then in the order they were generated.
+
+        Each worker spills the sorted events of its file to a temporary file, the
+        merge reads them back one event at a time.
+
+        @note Protocol state is not carried from one file to the next as it is
+        when playing back serially.
+        """
+        files = list(self.reader.files)
+        results = []
+        pool = multiprocessing.Pool(self.workers)
+        try:
+            results = [pool.apply_async(spill_events, (self.module, self.reader_klass, filename, shard))
+                       for shard, filename in enumerate(files)]
+        finally:
+            pool.close()
+            pool.join()
+
+        # all workers are done, so the spills of those which succeeded are
+        # removed below even if another one failed
+        spills = [result.get() for result in results if result.successful()]
+        try:
+            for result in results:
+                # raises the exception of a failed worker
+                result.get()
+
+            source = None
+            count = 0
+            for _, shard, _, event in heapq.merge(*[read_spill(spill) for spill in spills]):
+                if files[shard] != source:
+                    self.publish()
+                    source = files[shard]
+                    self.set_header_filename(source)
+                self.route_event(event)
+                count += 1
+                if count % 1000 == 0:
+                    self.publish()
+        finally:
+            for spill in spills:
+                os.remove(spill)
+
+        self.publish()
+        if hasattr(self.particle_publisher, 'write'):
+            self.particle_publisher.write()
+
     def got_data(self, packet):
         try:
             self.protocol.got_data(packet)
@@ -166,10 +532,11 @@ class PlaybackWrapper(object):
                 return base
             base = base.__base__
 
-    def construct_protocol(self, proto_module):
+    @staticmethod
+    def construct_protocol(proto_module, callback):
         module = importlib.import_module(proto_module)
         if hasattr(module, 'create_playback_protocol'):
-            return module.create_playback_protocol(self.handle_event)
+            return module.create_playback_protocol(callback)
 
         log.error('Unable to import and create playback protocol from module: %r', module)
         sys.exit(1)
@@ -186,15 +553,12 @@ class PlaybackWrapper(object):
         @param event_type a DriverAsyncEvent type specifier.
         @param val event value for sample and test result events.
         """
-        event = {
-            'type': event_type,
-            'value': val,
-            'time': time.time()
-        }
-
-        if isinstance(event[EventKeys.VALUE], Exception):
-            event[EventKeys.VALUE] = encode_exception(event[EventKeys.VALUE])
+        self.route_event(build_event(event_type, val))
 
+    def route_event(self, event):
+        """
+        Send an event to the appropriate publisher
+        """
         if event[EventKeys.TYPE] == DriverAsyncEvent.ERROR:
             log.error(event)
 
@@ -218,6 +582,7 @@ class DatalogReader(object):
         if not all([os.path.isfile(f) for f in self.files]):
             raise Exception('Not all files found')
         self._filehandle = None
+        self._packets = None
         self.target_types = [PacketType.FROM_INSTRUMENT, PacketType.PA_CONFIG]
 
     def read(self):
@@ -239,9 +604,18 @@ class DatalogReader(object):
 
             yield
 
+    def _read_packets(self, file_handle):
+        """
+        Generate the packets contained in file_handle
+        """
+        return PlaybackPacket.packets_from_fh(file_handle)
+
     def _process_packet(self):
-        packet = PlaybackPacket.packet_from_fh(self._filehandle)
+        if self._packets is None:
+            self._packets = self._read_packets(self._filehandle)
+        packet = next(self._packets, None)
         if packet is None:
+            self._packets = None
             return False
         if packet.header.packet_type in self.target_types:
             self.callback(packet)
@@ -250,9 +624,8 @@ class DatalogReader(object):
 
 class DigiDatalogAsciiReader(DatalogReader):
     def __init__(self, files, callback):
-        self.ooi_ts_regex = re.compile(r'<OOI-TS (.+?) [TX][NS]>\r\n(.*?)<\\OOI-TS>', re.DOTALL)
-        self.buffer = ''
-        self.MAXBUF = 65535
+        self.ooi_ts_regex = OOI_TS_REGEX
+        self.parse_timestamp = DigiTimestampParser()
 
         super(DigiDatalogAsciiReader, self).__init__(files, callback)
 
@@ -268,33 +641,47 @@ class DigiDatalogAsciiReader(DatalogReader):
             return None
         return match.group(1)
 
-    def _process_packet(self):
-        chunk = self._filehandle.read(1024)
-        if chunk != '':
-            self.buffer += chunk
-            new_index = 0
-            for match in self.ooi_ts_regex.finditer(self.buffer):
-                payload = match.group(2)
-                try:
-                    packet_time = string_to_ntp_date_time(match.group(1))
-                    header = PacketHeader(packet_type=PacketType.FROM_INSTRUMENT,
-                                          payload_size=len(payload), packet_time=packet_time)
-                    header.set_checksum(payload)
-                    packet = PlaybackPacket(payload=payload, header=header)
-                    self.callback(packet)
-                except ValueError:
-                    log.error('Unable to extract timestamp from record: %r' % match.group())
-                new_index = match.end()
-
-            if new_index > 0:
-                self.buffer = self.buffer[new_index:]
-
-            if len(self.buffer) > self.MAXBUF:
-                self.buffer = self.buffer[-self.MAXBUF:]
+    def _read_packets(self, file_handle):
+        """
+        Generate a packet for each run of records with the same timestamp,
+        scanning the memory mapped file with a single pass of the record regex.
+        Records with different timestamps are never merged, the packet time is
+        the port timestamp of the particles parsed from the record.
+        """
+        try:
+            data = mmap.mmap(file_handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file
+            return
 
-            return True
+        try:
+            timestamp = None
+            payloads = []
+            for match in self.ooi_ts_regex.finditer(data):
+                record_timestamp, payload = match.group(1, 2)
+                if record_timestamp != timestamp:
+                    try:
+                        record_time = self.parse_timestamp(record_timestamp)
+                    except ValueError:
+                        log.error('Unable to extract timestamp from record: %r' % match.group())
+                        continue
+                    if payloads:
+                        yield self._packet(packet_time, ''.join(payloads))
+                        payloads = []
+                    timestamp, packet_time = record_timestamp, record_time
+                payloads.append(payload)
+
+            if payloads:
+                yield self._packet(packet_time, ''.join(payloads))
+        finally:
+            data.close()
 
-        return False
+    @staticmethod
+    def _packet(packet_time, payload):
+        header = PacketHeader(packet_type=PacketType.FROM_INSTRUMENT, payload_size=len(payload),
+                              packet_time=packet_time)
+        header.set_checksum(payload)
+        return PlaybackPacket(payload=payload, header=header)
 
 
 class ChunkyDatalogReader(DatalogReader):
@@ -321,6 +708,7 @@ def main():
     allowed = options.get('--allowed')
     if allowed is not None:
         allowed = [_.strip() for _ in allowed.split(',')]
+    workers = int(options.get('--workers') or 1)
     max_events = options.get('--max_events')
     if max_events is None or max_events=='':
         max_events = Publisher.DEFAULT_MAX_EVENTS
@@ -341,7 +729,7 @@ def main():
     else:
         reader = None
 
-    wrapper = PlaybackWrapper(module, refdes, event_url, particle_url, reader, allowed, files, max_events)
+    wrapper = PlaybackWrapper(module, refdes, event_url, particle_url, reader, allowed, files, max_events, workers)
     wrapper.playback()
 
 if __name__ == '__main__':
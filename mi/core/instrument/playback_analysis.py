@@ -1,23 +1,47 @@
 #!/usr/bin/env python
-import io
-import struct
+"""
+@package mi.core.instrument.playback_analysis
+@file mi/core/instrument/playback_analysis.py
+@brief Classify raw data archive files for playback.
+
+Usage:
+    playback_analysis <root> [<sensor>] [--index=<index>] [--workers=<n>]
+
+Options:
+    -h, --help          Show this screen
+    --index=<index>     Index of previously classified files, only new or changed files are scanned
+    --workers=<n>       Number of processes scanning files [default: 1]
+"""
+import json
+import mmap
+import multiprocessing
 import os
 import re
 from datetime import datetime, timedelta
-import sys
+
+import numpy
+from docopt import docopt
 from tqdm import tqdm
 
+from mi.core.checksum import xor_checksum, xor_checksums
+
 __author__ = 'petercable'
 
 datere = re.compile('(\d{8}T\d{4}_UTC)')
+ascii_marker = '<OOI-TS '
 binary_sync = '\xa3\x9d\x7a'
-file_scan_depth = 256000
+
+# port agent packet header: sync, type, packet size (including header), checksum, seconds, fraction
+header_size = 16
+packet_type_offset = 3
+packet_size_offset = 4
+packet_time_offset = 8
+
+index_version = 1
 
 
 def lrc(data, seed=0):
-    for b in bytearray(data):
-        seed ^= b
-    return seed
+    return xor_checksum(data, seed)
 
 
 def find_sensor(filename):
@@ -33,82 +57,205 @@ def find_time_range(filename):
         return dt, dt + timedelta(1)
 
 
-def check_chunk_ascii(chunk):
-    return 'OOI-TS' in chunk
-
-
-def check_chunk_binary(chunk, fh):
-    # look for binary sync
-    sync_index = chunk.find(binary_sync)
-    if sync_index != -1:
-        # make sure we have enough bytes to read the packet size
-        if len(chunk) < sync_index + 4:
-            chunk += fh.read(4)
-
-        if len(chunk) >= sync_index + 4:
-            packet_size = struct.unpack_from('>H', chunk, sync_index+4)[0]
-            # make sure we have at least packet size bytes
-            if len(chunk) < sync_index + packet_size:
-                chunk += fh.read(packet_size)
-
-            if len(chunk) >= sync_index + packet_size:
-                # The LRC of the entire packet should be 0 if this is a valid packet
-                if lrc(chunk[sync_index:sync_index+packet_size]) == 0:
-                    return True
-    return False
-
-
-def find_type(path, f):
-    found_ascii = False
-    found_binary = False
-    ffw = False
-    with io.open(os.path.join(path, f), 'rb') as fh:
-        while not all((found_ascii, found_binary)):
-            chunk = fh.read(256)
-            if chunk == '':
-                break
-
-            if not found_ascii:
-                found_ascii = check_chunk_ascii(chunk)
-            if not found_binary:
-                found_binary = check_chunk_binary(chunk, fh)
-
-            # If we have scanned through the file to at least file_scan_depth
-            # then seek file_scan_depth from the end of file and search from
-            # there
-            if not ffw and fh.tell() >= file_scan_depth:
-                ffw = True
-                here = fh.tell()
-                fh.seek(-file_scan_depth, io.SEEK_END)
-                # go back where we were if the file happens to be smaller than
-                # file_scan_depth x 2
-                if fh.tell() < here:
-                    fh.seek(here)
-
-    return found_ascii, found_binary
-
-
-def walk_tree(root, sensor):
-    found = []
+def packet_stats(data):
+    """
+    Statistics of the port agent packets in data, computed with array operations
+    over all sync candidates at once
+    @param data string or buffer (e.g. mmap) containing port agent packets
+    @return dict with the number of valid packets, by packet type, their payload
+        bytes, the bytes not part of any valid packet and the time range of the
+        packets (ntp seconds)
+    """
+    raw = numpy.frombuffer(data, dtype=numpy.uint8)
+    size = len(raw)
+    if size < header_size:
+        return _packet_stats(numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64), raw)
+
+    sync = bytearray(binary_sync)
+    starts = numpy.flatnonzero((raw[:-2] == sync[0]) & (raw[1:-1] == sync[1]) & (raw[2:] == sync[2]))
+    starts = starts[starts <= size - header_size]
+    sizes = raw[starts + packet_size_offset].astype(numpy.int64) << 8 | raw[starts + packet_size_offset + 1]
+    ends = starts + sizes
+    complete = (sizes >= header_size) & (ends <= size)
+    starts, ends = starts[complete], ends[complete]
+
+    # The LRC of the entire packet should be 0 if this is a valid packet
+    valid = xor_checksums(raw, starts, ends) == 0
+    starts, ends = starts[valid], ends[valid]
+
+    if len(starts) > 1 and (starts[1:] < ends[:-1]).any():
+        # a sync inside a packet happened to have a valid LRC, keep the outer packet
+        keep = numpy.zeros(len(starts), dtype=bool)
+        last_end = 0
+        for index, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+            if start >= last_end:
+                keep[index] = True
+                last_end = end
+        starts, ends = starts[keep], ends[keep]
+
+    return _packet_stats(starts, ends, raw)
+
+
+def _packet_stats(starts, ends, raw):
+    types = raw[starts + packet_type_offset]
+    # big endian seconds and fraction of each header
+    times = raw[starts[:, None] + numpy.arange(packet_time_offset, header_size)].copy().view('>u4')
+    times = times[:, 0] + times[:, 1] / 2.0 ** 32
+    counts = numpy.bincount(types, minlength=1) if len(types) else numpy.zeros(0, dtype=numpy.int64)
+    packet_bytes = int((ends - starts).sum())
+    return {
+        'packets': len(starts),
+        'types': {str(t): int(count) for t, count in enumerate(counts) if count},
+        'payload_bytes': packet_bytes - len(starts) * header_size,
+        'skipped_bytes': len(raw) - packet_bytes,
+        'start': float(times.min()) if len(times) else None,
+        'stop': float(times.max()) if len(times) else None,
+    }
+
+
+def ascii_stats(data):
+    """
+    @return dict with the number of Digi timestamped records in data
+    """
+    return {'records': sum(1 for _ in re.finditer(re.escape(ascii_marker), data))}
+
+
+def classify(data):
+    """
+    Classify data by the records it contains
+    @param data string or buffer (e.g. mmap) holding the contents of a file
+    @return (found_ascii, found_binary, stats), stats as returned by
+        packet_stats for binary data, ascii_stats for ascii data, else None
+    """
+    stats = packet_stats(data)
+    found_binary = stats['packets'] > 0
+    found_ascii = data.find(ascii_marker) >= 0
+    if not found_binary:
+        stats = ascii_stats(data) if found_ascii else None
+    return found_ascii, found_binary, stats
+
+
+def scan_file(filename):
+    """
+    Classify a file and collect its record statistics, in a single pass over
+    the mapped file
+    @return index entry for the file
+    """
+    stat = os.stat(filename)
+    found_ascii, found_binary, stats = False, False, None
+    if stat.st_size:
+        with open(filename, 'rb') as fh:
+            data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                found_ascii, found_binary, stats = classify(data)
+            finally:
+                data.close()
+    return {'size': stat.st_size, 'mtime': stat.st_mtime, 'type': [found_ascii, found_binary], 'stats': stats}
+
+
+def _scan_file_worker(filename):
+    return filename, scan_file(filename)
+
+
+class FileIndex(object):
+    """
+    On-disk index of scanned files. An entry is only valid while the size and
+    modification time of the file are unchanged, and is dropped once the file
+    no longer exists.
+    """
+    def __init__(self, filename=None):
+        self.filename = filename
+        self.entries = {}
+        if filename is not None and os.path.exists(filename):
+            with open(filename) as fh:
+                contents = json.load(fh)
+            if contents.get('version') == index_version:
+                self.entries = contents['files']
+
+    def lookup(self, path):
+        entry = self.entries.get(path)
+        if entry is None:
+            return None
+        stat = os.stat(path)
+        if entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime:
+            return None
+        return entry
+
+    def update(self, path, entry):
+        self.entries[path] = entry
+
+    def prune(self):
+        """
+        Remove the entries of files which no longer exist
+        @return number of entries removed
+        """
+        missing = [path for path in self.entries if not os.path.exists(path)]
+        for path in missing:
+            del self.entries[path]
+        return len(missing)
+
+    def save(self):
+        if self.filename is None:
+            return
+        temp = self.filename + '.tmp'
+        with open(temp, 'w') as fh:
+            json.dump({'version': index_version, 'files': self.entries}, fh)
+        os.rename(temp, self.filename)
+
+    def scan(self, paths, workers=1):
+        """
+        Scan all new or changed files in a pool of worker processes
+        @return dict of path to index entry for all paths
+        """
+        pruned = self.prune()
+        stale = [path for path in paths if self.lookup(path) is None]
+        if stale:
+            print('Scanning %d of %d files' % (len(stale), len(paths)))
+            if workers > 1:
+                pool = multiprocessing.Pool(workers)
+                try:
+                    results = pool.imap_unordered(_scan_file_worker, stale, chunksize=16)
+                    for path, entry in tqdm(results, total=len(stale), leave=True):
+                        self.update(path, entry)
+                finally:
+                    pool.close()
+                    pool.join()
+            else:
+                for path in tqdm(stale, leave=True):
+                    self.update(path, scan_file(path))
+        if stale or pruned:
+            self.save()
+
+        return {path: self.entries[path] for path in paths}
+
+
+def walk_tree(root, sensor, index=None, workers=1):
+    candidates = []
     for path, dirs, files in os.walk(root):
         files = [f for f in files if f.endswith('.dat') and 'DigiCmd' not in f]
         if sensor is not None:
             files = [f for f in files if sensor in f]
         if files:
             files.sort()
-            print('Processing %d files in %s: ' % (len(files), path))
-            for index in tqdm(xrange(len(files)), leave=True):
-                f = files[index]
-                sensor = find_sensor(f)
+            for index_in_dir, f in enumerate(files):
                 time_range = find_time_range(f)
                 # if there is a next file, grab the start time from it
-                if len(files) > index+1:
-                    next_time_range = find_time_range(files[index+1])
-                    time_range = time_range[0], next_time_range[0]
+                if time_range and len(files) > index_in_dir+1:
+                    next_time_range = find_time_range(files[index_in_dir+1])
+                    if next_time_range:
+                        time_range = time_range[0], next_time_range[0]
                 if time_range:
                     start, stop = time_range
-                    record_type = find_type(path, f)
-                    found.append((sensor, start, stop, record_type, os.path.join(path, f)))
+                    candidates.append((find_sensor(f), start, stop, os.path.join(path, f)))
+
+    if index is None:
+        index = FileIndex()
+    entries = index.scan([filename for _, _, _, filename in candidates], workers)
+
+    found = []
+    for file_sensor, start, stop, filename in candidates:
+        record_type = tuple(entries[filename]['type'])
+        found.append((file_sensor, start, stop, record_type, filename))
     return found
 
 
@@ -149,11 +296,11 @@ def analyze(items):
 
 
 def main():
-    root = sys.argv[1]
-    sensor = None
-    if len(sys.argv) > 2:
-        sensor = sys.argv[2]
-    found = walk_tree(root, sensor)
+    options = docopt(__doc__)
+    root = options['<root>']
+    sensor = options['<sensor>']
+    index = FileIndex(options['--index'])
+    found = walk_tree(root, sensor, index, int(options['--workers']))
     found.sort()
     results = {}
     for _ in found:
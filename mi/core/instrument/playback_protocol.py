@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.playback_protocol
+@file mi/core/instrument/playback_protocol.py
+@brief Parse-only protocols for playback.
+
+Playback only uses the chunker and the particle extraction path of a
+protocol (got_data -> _got_chunk -> _extract_sample), but a driver's
+create_playback_protocol builds the full protocol: state machine,
+parameter, command and driver dictionaries and scheduler hooks. When many
+short files are played back each with its own protocol, this setup
+dominates the runtime.
+
+ParseOnlyProtocol skips the driver's constructor. It runs the constructor
+of the framework base class only (InstrumentProtocol,
+CommandResponseInstrumentProtocol or MenuInstrumentProtocol), which sets up
+the empty dictionaries and the line buffers, then wires up a chunker with
+the driver's sieve_function and a state machine stand-in. Drivers whose
+parsing depends on anything else set up by their constructor would break,
+so it is only used for the protocols listed in PARSE_ONLY_PROTOCOLS, each
+checked against the full protocol by the conformance test. Any other
+module gets its full playback protocol.
+"""
+
+import importlib
+
+from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.instrument_driver import DriverProtocolState
+from mi.core.instrument.instrument_protocol import \
+    MenuInstrumentProtocol, \
+    CommandResponseInstrumentProtocol, \
+    InstrumentProtocol
+from mi.core.log import get_logger
+
+__license__ = 'Apache 2.0'
+
+log = get_logger()
+
+
+# protocol class created by create_playback_protocol, by driver module, for
+# the drivers whose parsing depends on nothing set up by their constructor
+PARSE_ONLY_PROTOCOLS = {
+    'mi.instrument.mclane.ras.ppsdn.driver': 'Protocol',
+    'mi.instrument.mclane.ras.rasfl.driver': 'Protocol',
+    'mi.instrument.nortek.aquadopp.playback.driver': 'Protocol',
+    'mi.instrument.satlantic.ocr_507_icsw.ooicore.driver': 'SatlanticOCR507InstrumentProtocol',
+    'mi.instrument.satlantic.suna_deep.ooicore.driver': 'Protocol',
+    'mi.instrument.seabird.sbe16plus_v2.ctdbp_no.driver': 'SBE16NOProtocol',
+    'mi.instrument.seabird.sbe16plus_v2.ctdpf_jb.driver': 'SBE19Protocol',
+    'mi.instrument.seabird.sbe16plus_v2.ctdpf_sbe43.driver': 'SBE43Protocol',
+    'mi.instrument.seabird.sbe54tps.driver': 'Protocol',
+    'mi.instrument.sunburst.sami2_ph.ooicore.driver': 'Protocol',
+    'mi.instrument.sunburst.sami2_pco2.pco2a.driver': 'Protocol',
+    'mi.instrument.sunburst.sami2_pco2.pco2b.driver': 'Protocol',
+    'mi.instrument.uw.bars.ooicore.driver': 'Protocol',
+    'mi.instrument.uw.hpies.ooicore.driver': 'Protocol',
+}
+
+
+class PlaybackStateMachine(object):
+    """
+    Stands in for the protocol state machine during playback. The state never
+    changes and events are discarded.
+    """
+    def __init__(self, state):
+        self.current_state = state
+
+    def get_current_state(self):
+        return self.current_state
+
+    def on_event(self, event, *args, **kwargs):
+        log.debug('Ignoring protocol event during playback: %r', event)
+        return None, None
+
+
+class ParseOnlyProtocol(object):
+    """
+    Base of the parse-only protocols, combined with a driver protocol class
+    by for_class. Only the chunker and the particle generating path of the
+    driver protocol are set up.
+    """
+    # parse-only protocol classes, by driver protocol class
+    _classes = {}
+
+    def __init__(self, driver_event):
+        """
+        @param driver_event callback for the particles and events generated
+        """
+        base = self.framework_class()
+        if base is MenuInstrumentProtocol:
+            base.__init__(self, None, None, None, driver_event)
+        elif base is CommandResponseInstrumentProtocol:
+            base.__init__(self, None, None, driver_event)
+        else:
+            base.__init__(self, driver_event)
+
+        self._protocol_fsm = PlaybackStateMachine(DriverProtocolState.UNKNOWN)
+        self._chunker = StringChunker(self.sieve_function)
+
+    @classmethod
+    def framework_class(cls):
+        """
+        @return the first framework protocol class the driver protocol derives from
+        """
+        for base in cls.__mro__:
+            if base in (MenuInstrumentProtocol, CommandResponseInstrumentProtocol, InstrumentProtocol):
+                return base
+
+    @classmethod
+    def for_class(cls, protocol_class):
+        """
+        @param protocol_class driver protocol class
+        @return parse-only subclass of protocol_class
+        """
+        klass = cls._classes.get(protocol_class)
+        if klass is None:
+            klass = cls._classes[protocol_class] = type('ParseOnly' + protocol_class.__name__,
+                                                        (cls, protocol_class), {})
+        return klass
+
+
+class ParseOnlyProtocolFactory(object):
+    """
+    Creates the playback protocols of a driver module, parse-only where
+    the module is listed in PARSE_ONLY_PROTOCOLS
+    """
+    def __init__(self, module):
+        """
+        @param module driver module providing create_playback_protocol
+        """
+        self.module = module
+        self.protocol_class = None
+        class_name = PARSE_ONLY_PROTOCOLS.get(module.__name__)
+        if class_name is not None:
+            self.protocol_class = ParseOnlyProtocol.for_class(getattr(module, class_name))
+        else:
+            log.info('%s is not in PARSE_ONLY_PROTOCOLS, playing back with its full protocol', module.__name__)
+
+    @classmethod
+    def from_module(cls, module_name):
+        """
+        Factory for the playback protocols of a driver module
+        """
+        return cls(importlib.import_module(module_name))
+
+    def create(self, driver_event):
+        """
+        Create a new playback protocol
+        @param driver_event callback for the particles and events generated
+        """
+        if self.protocol_class is None:
+            return self.module.create_playback_protocol(driver_event)
+        return self.protocol_class(driver_event)
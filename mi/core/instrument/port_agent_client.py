@@ -15,6 +15,7 @@ import time
 
 import ntplib
 
+from mi.core.checksum import xor_checksum
 from mi.core.exceptions import InstrumentConnectionException, InstrumentException
 from mi.core.log import get_logger
 
@@ -25,16 +26,14 @@ __license__ = 'Apache 2.0'
 log = get_logger()
 
 
-# pure python LRC in case we don't have ooi_port_agent
+# python LRC in case we don't have ooi_port_agent
 def py_lrc(data, seed=0):
-    for val in bytearray(data):
-        seed ^= val
-    return seed
+    return xor_checksum(data, seed)
 
 try:
     from ooi_port_agent.lrc import lrc
 except ImportError:
-    log.error('Unable to import compiled LRC function, falling back to pure python implementation (SLOW!)')
+    log.error('Unable to import compiled LRC function, falling back to python implementation')
     lrc = py_lrc
 
 
@@ -16,6 +16,7 @@ import urlparse
 from collections import deque
 from threading import Thread
 
+from mi.core.instrument.data_particle import DataParticleValue, pack_arrays
 from mi.core.instrument.instrument_driver import DriverAsyncEvent
 from mi.logging import log
 
@@ -38,15 +39,18 @@ class Publisher(object):
     DEFAULT_MAX_EVENTS = 500
     DEFAULT_PUBLISH_INTERVAL = 5
     SOURCE = 'source'
+    ARRAY_ENCODING = 'array_encoding'
 
-    def __init__(self, allowed, max_events=None, publish_interval=None):
+    def __init__(self, allowed, max_events=None, publish_interval=None, pack_arrays=False):
         self._allowed = allowed
+        self._pack_arrays = pack_arrays
         self._deque = deque()
         self._max_events = max_events if max_events else self.DEFAULT_MAX_EVENTS
         self._publish_interval = publish_interval if publish_interval else self.DEFAULT_PUBLISH_INTERVAL
         self._running = False
         self._headers = {}
-        log.info('Publisher: max_events: %d publish_interval: %d', self._max_events, self._publish_interval)
+        log.info('Publisher: max_events: %d publish_interval: %d pack_arrays: %r',
+                 self._max_events, self._publish_interval, self._pack_arrays)
 
     def _run(self):
         self._running = True
@@ -65,6 +69,9 @@ class Publisher(object):
         if self.SOURCE not in msg_headers:
             today = datetime.datetime.utcnow().date()
             msg_headers[self.SOURCE] = 'live-%s' % today
+        if self._pack_arrays:
+            # tell consumers to expect packed array values, see data_particle.unpack_arrays
+            msg_headers[self.ARRAY_ENCODING] = DataParticleValue.PACKED_ARRAY
         return msg_headers
 
     def set_source(self, source):
@@ -80,11 +87,16 @@ class Publisher(object):
 
     def enqueue(self, event):
         try:
+            if self._pack_arrays and event.get('type') == DriverAsyncEvent.SAMPLE and 'value' in event:
+                event = dict(event, value=pack_arrays(event['value']))
             json.dumps(event)
             self._deque.append(event)
         except Exception as e:
             log.error('Unable to encode event as JSON: %r', e)
 
+    def queue_size(self):
+        return len(self._deque)
+
     def requeue(self, events):
         self._deque.extendleft(reversed(events))
 
@@ -146,6 +158,9 @@ class Publisher(object):
 
         result = urlparse.urlsplit(url)
         queue, query = extract_param('queue', result.query)
+        pack, query = extract_param('pack_arrays', query)
+        if pack is not None and pack.lower() not in ('', '0', 'false', 'no'):
+            kwargs['pack_arrays'] = True
         url = result.scheme + '://' + result.netloc + result.path
 
         username = password = 'guest'
@@ -184,6 +199,14 @@ class Publisher(object):
             from file_publisher import XarrayPublisher
             return XarrayPublisher(allowed, **kwargs)
 
+        elif result.scheme == 'chunkedcsv':
+            from file_publisher import ChunkedCsvPublisher
+            return ChunkedCsvPublisher(allowed, output_dir=result.netloc + result.path or '.', **kwargs)
+
+        elif result.scheme == 'netcdf':
+            from file_publisher import NetcdfPublisher
+            return NetcdfPublisher(allowed, output_dir=result.netloc + result.path or '.', **kwargs)
+
         if publisher:
             if queue is None:
                 raise Exception('No queue provided!')
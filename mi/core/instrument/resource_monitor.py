@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.resource_monitor
+@file mi/core/instrument/resource_monitor.py
+@brief Resource accounting and throttling for a driver process
+
+The DriverWrapper samples CPU time and RSS of its own process from /proc,
+the size of the protocol chunker buffer and the depth of the publisher
+queues. When a sample is over the budget set in the driver config, the
+wrapper sheds load: raw particles are dropped, over the CPU or RSS budget
+only one in keep_every of the other particles is published, and particles
+beyond the particle queue cap are dropped. Events are never dropped.
+
+Driver config, all keys optional:
+
+    resources:
+        interval: 5                 # seconds between samples
+        max_cpu_percent: 90
+        max_rss_kb: 500000
+        max_particle_queue: 10000
+        max_chunker_buffer: 65536   # caps StringChunker.max_buff_size
+        publish_raw: false          # publish raw particles while within budget
+        keep_every: 10              # over the CPU or RSS budget, publish one particle in keep_every
+"""
+
+__license__ = 'Apache 2.0'
+
+import os
+import resource
+import threading
+import time
+
+from mi.core.common import BaseEnum
+from mi.core.log import get_logger
+
+log = get_logger()
+
+DEFAULT_INTERVAL = 5
+DEFAULT_KEEP_EVERY = 10
+
+try:
+    CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+    PAGE_SIZE_KB = os.sysconf('SC_PAGE_SIZE') / 1024
+except (AttributeError, ValueError, OSError):
+    CLOCK_TICKS = 100
+    PAGE_SIZE_KB = 4
+
+
+class ResourceKey(BaseEnum):
+    """
+    Keys of a resource usage sample
+    """
+    TIME = 'time'
+    CPU_SECONDS = 'cpu_seconds'
+    CPU_PERCENT = 'cpu_percent'
+    RSS_KB = 'rss_kb'
+    CHUNKER_BUFFER = 'chunker_buffer'
+    EVENT_QUEUE = 'event_queue'
+    PARTICLE_QUEUE = 'particle_queue'
+    PARTICLE_RATE = 'particle_rate'
+    DROPPED_RAW = 'dropped_raw'
+    DROPPED_PARTICLES = 'dropped_particles'
+    OVER_BUDGET = 'over_budget'
+
+
+def read_process_usage(pid='self'):
+    """
+    Read CPU time and resident memory of a process from /proc.
+    @param pid process id, 'self' for this process
+    @return (cpu seconds, rss in KB)
+    @raise IOError if /proc is not available or the process does not exist
+    """
+    with open('/proc/%s/stat' % pid) as f:
+        stat = f.read()
+    # the command name may contain spaces, fields are counted after it
+    fields = stat[stat.rindex(')') + 2:].split()
+    utime, stime = int(fields[11]), int(fields[12])
+
+    with open('/proc/%s/statm' % pid) as f:
+        rss_pages = int(f.read().split()[1])
+
+    return float(utime + stime) / CLOCK_TICKS, rss_pages * PAGE_SIZE_KB
+
+
+def _own_usage():
+    """
+    CPU seconds and RSS KB of this process, from getrusage where /proc is not available
+    """
+    try:
+        return read_process_usage()
+    except (IOError, OSError, ValueError):
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        # ru_maxrss is the peak, the best available without /proc
+        return usage.ru_utime + usage.ru_stime, usage.ru_maxrss
+
+
+class ResourcePolicy(object):
+    """
+    Budget and throttling settings from the 'resources' section of the driver config
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, max_cpu_percent=None, max_rss_kb=None,
+                 max_particle_queue=None, max_chunker_buffer=None, publish_raw=False,
+                 keep_every=DEFAULT_KEEP_EVERY):
+        self.interval = interval
+        self.max_cpu_percent = max_cpu_percent
+        self.max_rss_kb = max_rss_kb
+        self.max_particle_queue = max_particle_queue
+        self.max_chunker_buffer = max_chunker_buffer
+        self.publish_raw = publish_raw
+        self.keep_every = keep_every
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        @param config dict of policy settings, None for the defaults
+        @raise TypeError on an unknown setting
+        """
+        return cls(**(config or {}))
+
+    def over_budget(self, sample):
+        """
+        @param sample resource usage sample
+        @return list of the budget keys the sample exceeds
+        """
+        limits = [(ResourceKey.CPU_PERCENT, self.max_cpu_percent),
+                  (ResourceKey.RSS_KB, self.max_rss_kb)]
+        exceeded = [key for key, limit in limits if limit is not None and sample[key] > limit]
+        # particles are dropped at the cap, so the queue never grows past it
+        if self.max_particle_queue is not None and sample[ResourceKey.PARTICLE_QUEUE] >= self.max_particle_queue:
+            exceeded.append(ResourceKey.PARTICLE_QUEUE)
+        return exceeded
+
+
+class ResourceMonitor(object):
+    """
+    Samples the resource usage of a DriverWrapper and decides which
+    particles it publishes.
+    """
+
+    def __init__(self, wrapper, policy=None):
+        """
+        @param wrapper the DriverWrapper being monitored
+        @param policy ResourcePolicy, defaults to no budget
+        """
+        self.wrapper = wrapper
+        self.policy = policy or ResourcePolicy()
+        self.over_budget = False
+        self.shedding = False
+        self.dropped_raw = 0
+        self.dropped_particles = 0
+        self._last_sample = None
+        self._last_particle_count = 0
+        self._shed_count = 0
+        self._running = False
+        self._lock = threading.Lock()
+
+    def _chunker(self):
+        protocol = getattr(self.wrapper.driver, '_protocol', None)
+        return getattr(protocol, '_chunker', None)
+
+    def sample(self):
+        """
+        Take a resource usage sample, apply the chunker cap and update the
+        over budget state.
+        @return dict of ResourceKey values
+        """
+        now = time.time()
+        cpu_seconds, rss_kb = _own_usage()
+
+        chunker = self._chunker()
+        chunker_buffer = 0
+        if chunker is not None:
+            cap = self.policy.max_chunker_buffer
+            if cap is not None and chunker.max_buff_size > cap:
+                log.info('Capping chunker buffer at %d bytes', cap)
+                chunker.max_buff_size = cap
+            chunker_buffer = len(chunker.buffer)
+
+        with self._lock:
+            particle_count = self.wrapper.particle_count
+            cpu_percent = particle_rate = 0.0
+            if self._last_sample is not None:
+                elapsed = now - self._last_sample[ResourceKey.TIME]
+                if elapsed > 0:
+                    cpu_percent = 100 * (cpu_seconds - self._last_sample[ResourceKey.CPU_SECONDS]) / elapsed
+                    particle_rate = (particle_count - self._last_particle_count) / elapsed
+
+            sample = {
+                ResourceKey.TIME: now,
+                ResourceKey.CPU_SECONDS: cpu_seconds,
+                ResourceKey.CPU_PERCENT: cpu_percent,
+                ResourceKey.RSS_KB: rss_kb,
+                ResourceKey.CHUNKER_BUFFER: chunker_buffer,
+                ResourceKey.EVENT_QUEUE: self.wrapper.event_publisher.queue_size(),
+                ResourceKey.PARTICLE_QUEUE: self.wrapper.particle_publisher.queue_size(),
+                ResourceKey.PARTICLE_RATE: particle_rate,
+            }
+
+            exceeded = self.policy.over_budget(sample)
+            if exceeded and not self.over_budget:
+                log.warn('Driver over resource budget (%s), throttling particles', ', '.join(exceeded))
+            elif self.over_budget and not exceeded:
+                log.info('Driver back within resource budget, dropped %d raw and %d particles',
+                         self.dropped_raw, self.dropped_particles)
+            self.over_budget = bool(exceeded)
+            # over the CPU or RSS budget particles are shed until a sample is back within budget
+            shedding = ResourceKey.CPU_PERCENT in exceeded or ResourceKey.RSS_KB in exceeded
+            if shedding and not self.shedding:
+                self._shed_count = 0
+            self.shedding = shedding
+
+            sample[ResourceKey.OVER_BUDGET] = exceeded
+            sample[ResourceKey.DROPPED_RAW] = self.dropped_raw
+            sample[ResourceKey.DROPPED_PARTICLES] = self.dropped_particles
+            self._last_sample = sample
+            self._last_particle_count = particle_count
+
+        return sample
+
+    def last_sample(self):
+        """
+        @return the most recent sample, taking one if none has been taken
+        """
+        return self._last_sample or self.sample()
+
+    def admit_particle(self, particle):
+        """
+        Decide whether a particle is published.
+        @param particle generated particle (the value of a SAMPLE event)
+        @return True to publish the particle
+        """
+        if particle.get('stream_name') == 'raw':
+            if self.policy.publish_raw and not self.over_budget:
+                return True
+            if self.policy.publish_raw:
+                self.dropped_raw += 1
+            return False
+
+        # the queue cap is checked per particle, a flood is not left to grow until the next sample
+        cap = self.policy.max_particle_queue
+        if cap is not None and self.wrapper.particle_publisher.queue_size() >= cap:
+            if not self.over_budget:
+                log.warn('Driver particle queue at cap (%d), throttling particles', cap)
+                self.over_budget = True
+            self.dropped_particles += 1
+            return False
+
+        if self.shedding:
+            keep = self._shed_count % self.policy.keep_every == 0
+            self._shed_count += 1
+            if not keep:
+                self.dropped_particles += 1
+                return False
+        return True
+
+    def _run(self):
+        self._running = True
+        while self._running:
+            try:
+                self.sample()
+            except Exception as e:
+                log.error('Unable to sample driver resource usage: %r', e)
+            time.sleep(self.policy.interval)
+
+    def start(self):
+        t = threading.Thread(target=self._run)
+        t.setDaemon(True)
+        t.start()
+
+    def stop(self):
+        self._running = False
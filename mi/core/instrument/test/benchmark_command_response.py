@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+@package mi.core.instrument.test.benchmark_command_response
+@file mi/core/instrument/test/benchmark_command_response.py
+@brief Time of the parameter get and set sequences of a command-response protocol.
+
+A simulated instrument answers each command from a thread of its own after
+a fixed latency. The protocol reads its parameters with a get command each
+(_update_params) and writes them with a set command each (_apply_params).
+
+Usage:
+    benchmark_command_response [--params=<n>] [--latency=<ms>] [--poll]
+
+Options:
+    -h, --help          Show this screen
+    --params=<n>        Number of parameters [default: 30]
+    --latency=<ms>      Time the instrument takes to answer a command [default: 10]
+    --poll              Also time the responses found by polling the buffers every 0.1 s
+
+    To run without installing:
+    python -m mi.core.instrument.test.benchmark_command_response ...
+"""
+import threading
+import time
+
+from docopt import docopt
+
+from mi.core.common import BaseEnum
+from mi.core.instrument.instrument_protocol import CommandResponseInstrumentProtocol
+
+__license__ = 'Apache 2.0'
+
+NEWLINE = '\r\n'
+
+
+class Prompt(BaseEnum):
+    COMMAND = 'S>'
+
+
+class ProtocolState(BaseEnum):
+    COMMAND = 'PROTOCOL_STATE_COMMAND'
+
+
+class Command(BaseEnum):
+    GET = 'get'
+    SET = 'set'
+
+
+class SimulatedInstrument(object):
+    """
+    Connection to an instrument answering "get <name>" with "<name>=<value>"
+    and "set <name> <value>" with a prompt, latency seconds after the command
+    """
+    def __init__(self, protocol, latency):
+        self.protocol = protocol
+        self.latency = latency
+        self.values = {}
+
+    def send(self, data):
+        command = data.split()
+        reply = Prompt.COMMAND
+        if command[0] == Command.GET:
+            reply = '%s=%d%s%s' % (command[1], self.values.get(command[1], 0), NEWLINE, Prompt.COMMAND)
+        elif command[0] == Command.SET:
+            self.values[command[1]] = int(command[2])
+        threading.Timer(self.latency, self.protocol.add_to_buffer, [data + reply]).start()
+
+
+class SimulatedProtocol(CommandResponseInstrumentProtocol):
+    def __init__(self, params, latency):
+        CommandResponseInstrumentProtocol.__init__(self, Prompt, NEWLINE, lambda *args: None)
+        self._connection = SimulatedInstrument(self, latency)
+        for index in xrange(params):
+            self._param_dict.add('param_%d' % index, r'param_%d=(\d+)' % index,
+                                 lambda match: int(match.group(1)), str,
+                                 startup_param=True, default_value=index)
+        self._add_build_handler(Command.GET, self._build_command)
+        self._add_build_handler(Command.SET, self._build_command)
+        self._add_response_handler(Command.GET, self._parse_get_response)
+
+    def _build_command(self, cmd, *args):
+        return ' '.join((cmd,) + tuple(str(arg) for arg in args)) + NEWLINE
+
+    def _parse_get_response(self, response, prompt):
+        self._param_dict.update(response)
+
+    def get_current_state(self):
+        return ProtocolState.COMMAND
+
+    def _wakeup(self, timeout, delay=1):
+        # the simulated instrument never sleeps
+        return Prompt.COMMAND
+
+    def _update_params(self):
+        for name in self._param_dict.get_keys():
+            self._do_cmd_resp(Command.GET, name)
+
+    def _set_params(self, *args, **kwargs):
+        for name, value in args[0].iteritems():
+            self._do_cmd_resp(Command.SET, name, value)
+
+    def _apply_params(self):
+        self._set_params(self.get_startup_config(), True)
+
+
+def poll_buffers(protocol):
+    """
+    Find responses by checking the buffers every 0.1 s, as the response
+    waiters did before they were woken by new data
+    """
+    def wait_for_buffer(last_update, end_time):
+        time.sleep(.1)
+        return protocol._buffer_updates
+
+    protocol._wait_for_buffer = wait_for_buffer
+
+
+def run(label, protocol):
+    for method in (protocol._update_params, protocol._apply_params):
+        start = time.time()
+        method()
+        print '  %-6s %-14s %6.2f s' % (label, method.__name__, time.time() - start)
+
+
+def main():
+    options = docopt(__doc__)
+    params = int(options['--params'])
+    latency = int(options['--latency']) / 1000.0
+
+    print '%d parameters, %d ms latency' % (params, latency * 1000)
+    run('wait', SimulatedProtocol(params, latency))
+    if options['--poll']:
+        protocol = SimulatedProtocol(params, latency)
+        poll_buffers(protocol)
+        run('poll', protocol)
+
+
+if __name__ == '__main__':
+    main()
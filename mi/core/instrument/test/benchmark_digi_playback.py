@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+@package mi.core.instrument.test.benchmark_digi_playback
+@file mi/core/instrument/test/benchmark_digi_playback.py
+@brief Throughput of the Digi ASCII log reader used by playback.
+
+Writes a synthetic Digi log of timestamped instrument records and times
+reading it with DigiDatalogAsciiReader, and parsing its timestamps alone.
+
+Usage:
+    benchmark_digi_playback [--days=<n>] [--rate=<hz>] [--burst=<n>]
+
+Options:
+    -h, --help          Show this screen
+    --days=<n>          Days of records in the log [default: 3]
+    --rate=<hz>         Records per second [default: 1]
+    --burst=<n>         Records written with each timestamp [default: 1]
+
+    To run without installing:
+    python -m mi.core.instrument.test.benchmark_digi_playback ...
+"""
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from docopt import docopt
+
+from mi.core.instrument.playback import DigiDatalogAsciiReader, DigiTimestampParser
+
+__license__ = 'Apache 2.0'
+
+START = datetime(2014, 9, 18)
+
+
+def write_log(days, rate, burst):
+    """
+    Write a synthetic Digi log
+    @param days days of records
+    @param rate records per second
+    @param burst records sharing each timestamp
+    @return (file name, size in bytes, number of records, timestamps)
+    """
+    rand = random.Random(days)
+    handle, name = tempfile.mkstemp(prefix='digi_', suffix='.log')
+    count = int(days * 86400 * rate)
+    timestamps = []
+    with os.fdopen(handle, 'wb') as f:
+        for index in xrange(0, count, burst):
+            timestamp = (START + timedelta(seconds=index / float(rate))).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3]
+            timestamps.append(timestamp)
+            for _ in xrange(min(burst, count - index)):
+                payload = '%s\r\n' % ','.join('%.4f' % rand.random() for _ in xrange(rand.randint(4, 12)))
+                f.write('<OOI-TS %s TN>\r\n%s<\\OOI-TS>\r\n\r\n' % (timestamp, payload))
+    return name, os.path.getsize(name), count, timestamps
+
+
+def read_log(name):
+    packets = []
+    for _ in DigiDatalogAsciiReader([name], packets.append).read():
+        pass
+    return len(packets)
+
+
+def parse_timestamps(timestamps):
+    parse = DigiTimestampParser()
+    for timestamp in timestamps:
+        parse(timestamp)
+    return len(timestamps)
+
+
+def main():
+    options = docopt(__doc__)
+    name, size, count, timestamps = write_log(float(options['--days']), float(options['--rate']),
+                                              int(options['--burst']))
+    try:
+        print '%d records, %.1f MB' % (count, size / 1e6)
+
+        start = time.time()
+        packets = read_log(name)
+        elapsed = time.time() - start
+        print '  %-18s %8d packets %7.2f s %7.1f MB/s' % ('read', packets, elapsed, size / elapsed / 1e6)
+
+        start = time.time()
+        parsed = parse_timestamps(timestamps)
+        print '  %-18s %8d stamps  %7.2f s' % ('parse timestamps', parsed, time.time() - start)
+    finally:
+        os.remove(name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+@package mi.core.instrument.test.benchmark_packed_arrays
+@file mi/core/instrument/test/benchmark_packed_arrays.py
+@brief Payload size and encode/decode time of particles with packed arrays.
+
+Serializes RGA scan and ADCP PD0 particles as published, with their arrays
+as JSON lists and packed by pack_arrays, and times encoding (json.dumps) and
+decoding (json.loads, then unpack_arrays for the packed form).
+
+Usage:
+    benchmark_packed_arrays [--points=<n>] [--number=<n>]
+
+Options:
+    -h, --help          Show this screen
+    --points=<n>        Points in the RGA scan [default: 2000]
+    --number=<n>        Particles encoded and decoded per timing [default: 500]
+
+    To run without installing:
+    python -m mi.core.instrument.test.benchmark_packed_arrays ...
+"""
+import json
+import random
+import struct
+import timeit
+
+from docopt import docopt
+
+from mi.core.instrument.data_particle import pack_arrays, unpack_arrays
+from mi.instrument.harvard.massp.rga.driver import RGASampleParticle
+from mi.instrument.teledyne.workhorse.particles import Pd0BeamParticle
+from mi.instrument.teledyne.workhorse.pd0_parser import AdcpPd0Record
+from mi.instrument.teledyne.workhorse.test.test_data import RSN_SAMPLE_RAW_DATA
+
+__license__ = 'Apache 2.0'
+
+
+def timed(function, number):
+    return min(timeit.repeat(function, number=number, repeat=3)) / number * 1000
+
+
+def run(label, particle, number):
+    plain = json.dumps(particle)
+    packed = json.dumps(pack_arrays(particle))
+    encode = timed(lambda: json.dumps(particle), number)
+    encode_packed = timed(lambda: json.dumps(pack_arrays(particle)), number)
+    decode = timed(lambda: json.loads(plain), number)
+    decode_packed = timed(lambda: unpack_arrays(json.loads(packed)), number)
+    print '%-12s size %6d -> %6d bytes  encode %.3f -> %.3f ms  decode %.3f -> %.3f ms' % (
+        label, len(plain), len(packed), encode, encode_packed, decode, decode_packed)
+
+
+def main():
+    options = docopt(__doc__)
+    points = int(options['--points'])
+    number = int(options['--number'])
+
+    rand = random.Random(points)
+    scan = struct.pack('<%di' % points, *[rand.randint(0, 2000000) for _ in xrange(points)])
+    run('rga scan', RGASampleParticle(scan, port_timestamp=3600000000.0).generate(), number)
+    run('adcp beam', Pd0BeamParticle(AdcpPd0Record(RSN_SAMPLE_RAW_DATA),
+                                     port_timestamp=3600000000.0).generate(), number)
+
+
+if __name__ == '__main__':
+    main()
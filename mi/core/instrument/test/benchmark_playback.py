@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+@package mi.core.instrument.test.benchmark_playback
+@file mi/core/instrument/test/benchmark_playback.py
+@brief Throughput of the port agent log readers used by playback.
+
+Writes synthetic port agent logs and times reading them with the block
+reader (packets_from_fh) and the byte-at-a-time reader (packet_from_fh).
+
+Usage:
+    benchmark_playback [--packets=<n>] [--gap=<bytes>] [--noise=<n>] [--skip-old]
+
+Options:
+    -h, --help          Show this screen
+    --packets=<n>       Number of packets in each log [default: 200000]
+    --gap=<bytes>       Bytes of garbage between the packets of the gapped log [default: 32]
+    --noise=<n>         Corrupt the checksum of one packet in n of the noisy log [default: 100]
+    --skip-old          Only time the block reader
+
+    To run without installing:
+    python -m mi.core.instrument.test.benchmark_playback ...
+"""
+import os
+import random
+import struct
+import tempfile
+import time
+
+from docopt import docopt
+
+from mi.core.checksum import xor_checksum
+from mi.core.instrument.playback import PlaybackPacket
+from mi.core.instrument.port_agent_client import HEADER_SIZE
+
+__license__ = 'Apache 2.0'
+
+HEADER_FORMAT = '>3sBHHII'
+SYNC = '\xa3\x9d\x7a'
+
+
+def port_agent_packet(payload, seconds):
+    fields = [SYNC, 1, len(payload) + HEADER_SIZE, 0, seconds, 0]
+    fields[3] = xor_checksum(struct.pack(HEADER_FORMAT, *fields) + payload)
+    return struct.pack(HEADER_FORMAT, *fields) + payload
+
+
+def write_log(packets, gap=0, noise=0):
+    """
+    Write a synthetic port agent log
+    @param packets number of packets
+    @param gap bytes of garbage between packets
+    @param noise corrupt the checksum of one packet in noise, 0 for none
+    @return (file name, size in bytes)
+    """
+    rand = random.Random(packets)
+    handle, name = tempfile.mkstemp(prefix='playback_', suffix='.dat')
+    with os.fdopen(handle, 'wb') as f:
+        for index in xrange(packets):
+            payload = 'S,%08d,%s\r\n' % (index, ','.join('%.4f' % rand.random() for _ in xrange(rand.randint(4, 40))))
+            packet = port_agent_packet(payload, 3600000000 + index)
+            if noise and index % noise == noise - 1:
+                packet = packet[:-1] + chr(ord(packet[-1]) ^ 0xff)
+            f.write(packet)
+            if gap:
+                f.write('#' * gap)
+    return name, os.path.getsize(name)
+
+
+def read_blocks(name):
+    with open(name, 'rb') as f:
+        return sum(1 for _ in PlaybackPacket.packets_from_fh(f))
+
+
+def read_bytes(name):
+    count = 0
+    with open(name, 'rb') as f:
+        while PlaybackPacket.packet_from_fh(f) is not None:
+            count += 1
+    return count
+
+
+def run(name, size, reader):
+    start = time.time()
+    count = reader(name)
+    elapsed = time.time() - start
+    print '  %-14s %8d packets %7.2f s %7.1f MB/s' % (reader.__name__, count, elapsed, size / elapsed / 1e6)
+
+
+def main():
+    options = docopt(__doc__)
+    packets = int(options['--packets'])
+    logs = [('clean', {}),
+            ('gap %s' % options['--gap'], {'gap': int(options['--gap'])}),
+            ('noise 1/%s' % options['--noise'], {'noise': int(options['--noise'])})]
+    readers = [read_blocks] if options['--skip-old'] else [read_blocks, read_bytes]
+
+    for label, kwargs in logs:
+        name, size = write_log(packets, **kwargs)
+        try:
+            print '%s log, %.1f MB' % (label, size / 1e6)
+            for reader in readers:
+                run(name, size, reader)
+        finally:
+            os.remove(name)
+
+
+if __name__ == '__main__':
+    main()
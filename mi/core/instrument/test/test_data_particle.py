@@ -23,10 +23,15 @@ from mi.core.log import get_logger ; log = get_logger()
 from mi.core.exceptions import SampleException, ReadOnlyException, NotImplementedException, InstrumentParameterException
 from mi.core.instrument.data_particle import DataParticle, DataParticleKey, DataParticleValue
 from mi.core.instrument.data_particle import RawDataParticle, CommonDataParticleType
+from mi.core.instrument.data_particle import pack_array, unpack_array, pack_arrays, unpack_arrays, PackedArrayKey, \
+    register_array_dtypes
+from mi.core.instrument.instrument_driver import DriverAsyncEvent
+from mi.core.instrument.publisher import Publisher
 from mi.core.instrument.port_agent_client import PortAgentPacket
 
 TEST_PARTICLE_VERSION = 1
 TEST_PARTICLE_TYPE = 'test_particle_foo'
+ARRAY_PARTICLE_TYPE = 'test_particle_array'
 
 @attr('UNIT', group='mi')
 class TestUnitDataParticle(MiUnitTestCase):
@@ -55,6 +60,25 @@ class TestUnitDataParticle(MiUnitTestCase):
                        DataParticleKey.VALUE: "305.16"}]
             return result
 
+    class ArrayDataParticle(DataParticle):
+        """
+        DataParticle with array values, packed by publishers configured for it
+        """
+        _data_particle_type = ARRAY_PARTICLE_TYPE
+        _array_dtypes = {'counts': '<i4', 'velocity': '<i2', 'missing': '<f8'}
+
+        def _build_parsed_values(self):
+            return [{DataParticleKey.VALUE_ID: 'counts', DataParticleKey.VALUE: tuple(range(-500000, 500000, 1000))},
+                    {DataParticleKey.VALUE_ID: 'velocity', DataParticleKey.VALUE: [[1, -2], [-32768, 32767]]},
+                    {DataParticleKey.VALUE_ID: 'missing', DataParticleKey.VALUE: None},
+                    {DataParticleKey.VALUE_ID: 'temp', DataParticleKey.VALUE: 23.45}]
+
+    class PlainArrayDataParticle(ArrayDataParticle):
+        """
+        The same particle without array dtypes
+        """
+        _array_dtypes = {}
+
     class BadDataParticle(DataParticle):
          """
          Define a data particle that doesn't initialize _data_particle_type.
@@ -232,3 +256,72 @@ class TestUnitDataParticle(MiUnitTestCase):
 
         with self.assertRaises(NotImplementedException):
             particle.data_particle_type()
+
+    def test_pack_array(self):
+        """
+        Test that packed arrays restore to the same values
+        """
+        for value, dtype in [(range(-100, 100), '<i4'), ([0.1, float('nan'), -1e300], '<f8'), ([], 'u1'),
+                             ([[1, 2, 3], [4, 5, 6]], '<i2')]:
+            envelope = pack_array(value, dtype)
+            self.assertEqual(json.loads(json.dumps(envelope)), envelope)
+            restored = unpack_array(envelope)
+            self.assertEqual(restored.dtype.str, envelope[PackedArrayKey.DTYPE])
+            self.assertEqual(repr(restored.tolist()), repr(value))
+
+    def test_pack_arrays(self):
+        """
+        Test packing and unpacking the array values of a particle
+        """
+        particle = self.ArrayDataParticle(self.sample_raw_data, port_timestamp=self.sample_port_timestamp).generate()
+        values = particle[DataParticleKey.VALUES]
+
+        packed = pack_arrays(particle)
+        self.assertEqual(particle[DataParticleKey.VALUES], values)
+        self.assertEqual(packed[DataParticleKey.VALUES][2:], values[2:])
+        self.assertLess(len(json.dumps(packed)), len(json.dumps(particle)))
+
+        unpacked = unpack_arrays(json.loads(json.dumps(packed)))
+        self.assertEqual([value[DataParticleKey.VALUE].tolist() for value in unpacked[DataParticleKey.VALUES][:2]],
+                         [list(values[0][DataParticleKey.VALUE]), values[1][DataParticleKey.VALUE]])
+
+        # values which do not fit their dtype are left as they are
+        register_array_dtypes(ARRAY_PARTICLE_TYPE, dict(self.ArrayDataParticle._array_dtypes, counts='<i2'))
+        try:
+            self.assertEqual(pack_arrays(particle)[DataParticleKey.VALUES][0], values[0])
+        finally:
+            register_array_dtypes(ARRAY_PARTICLE_TYPE, self.ArrayDataParticle._array_dtypes)
+
+        # particles without array values pass through untouched
+        plain = self.parsed_test_particle.generate()
+        self.assertIs(pack_arrays(plain), plain)
+        self.assertIs(unpack_arrays(plain), plain)
+
+    def test_publisher_pack_arrays(self):
+        """
+        Test that arrays are only packed by publishers configured for it
+        """
+        particle = self.ArrayDataParticle(self.sample_raw_data, port_timestamp=self.sample_port_timestamp).generate()
+        event = {'type': DriverAsyncEvent.SAMPLE, 'value': particle}
+
+        for url, packed in [('log://', False), ('log://?pack_arrays=true', True), ('log://?pack_arrays=0', False)]:
+            publisher = Publisher.from_url(url)
+            publisher.enqueue(event)
+            published = publisher._deque.pop()['value'][DataParticleKey.VALUES][0][DataParticleKey.VALUE]
+            self.assertEqual(isinstance(published, dict), packed)
+            self.assertEqual(Publisher.ARRAY_ENCODING in publisher._merge_headers({}), packed)
+
+    def test_unpacked_output(self):
+        """
+        Test that particles with array dtypes are unchanged unless they are packed
+        """
+        baseline = self.PlainArrayDataParticle(self.sample_raw_data, port_timestamp=self.sample_port_timestamp)
+        particle = self.ArrayDataParticle(self.sample_raw_data, port_timestamp=self.sample_port_timestamp)
+        expected = baseline.generate()
+        generated = particle.generate()
+        expected[DataParticleKey.DRIVER_TIMESTAMP] = generated[DataParticleKey.DRIVER_TIMESTAMP]
+        self.assertEqual(json.dumps(generated), json.dumps(expected))
+
+        publisher = Publisher.from_url('log://')
+        publisher.enqueue({'type': DriverAsyncEvent.SAMPLE, 'value': generated})
+        self.assertEqual(json.dumps(publisher._deque.pop()['value']), json.dumps(expected))
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.test.test_file_publisher
+@file mi/core/instrument/test/test_file_publisher.py
+@brief Test cases for the streaming file publishers
+"""
+
+__license__ = 'Apache 2.0'
+
+import copy
+import csv
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+from nose.plugins.attrib import attr
+
+from mi.core.instrument import file_publisher
+from mi.core.instrument.data_particle import register_array_dtypes
+from mi.core.instrument.file_publisher import ChunkedCsvPublisher, FilePublisher, NetcdfPublisher, \
+    StreamingFilePublisher
+from mi.core.instrument.instrument_driver import DriverAsyncEvent
+from mi.core.instrument.publisher import Publisher
+from mi.core.unit_test import MiUnitTestCase
+
+
+def particle_events(count):
+    rand = random.Random(7)
+    events = []
+    for n in xrange(count):
+        stream = rand.choice(['ctd_sample', 'ctd_status'])
+        values = [{'value_id': 'temperature', 'value': rand.uniform(-2, 30)},
+                  {'value_id': 'counts', 'value': rand.randint(0, 1 << 40)},
+                  {'value_id': 'serial', 'value': 'SN%d' % rand.randint(0, 99)},
+                  {'value_id': 'spectrum', 'value': [rand.randint(0, 4095) for _ in xrange(4)]}]
+        if n > count / 2 and stream == 'ctd_status':
+            # a parameter appearing part way through the run
+            values.append({'value_id': 'battery', 'value': rand.uniform(10, 14)})
+        events.append({'type': DriverAsyncEvent.SAMPLE,
+                       'value': {'stream_name': stream, 'internal_timestamp': 3600000000.0 + n,
+                                 'quality_flag': 'ok', 'values': values}})
+    return events
+
+
+def number_events(stream, values):
+    return [{'type': DriverAsyncEvent.SAMPLE,
+             'value': {'stream_name': stream, 'internal_timestamp': 3600000000.0 + n,
+                       'quality_flag': 'ok', 'values': [{'value_id': 'value', 'value': value}]}}
+            for n, value in enumerate(values)]
+
+
+def publish_all(publisher, events, check=None):
+    for event in copy.deepcopy(events):
+        publisher.enqueue(event)
+        if len(publisher._deque) >= 25:
+            publisher.publish()
+            if check:
+                check(publisher)
+    publisher.publish()
+    if isinstance(publisher, StreamingFilePublisher):
+        publisher.write()
+
+
+@attr('UNIT', group='mi')
+class StreamingFilePublisherUnitTest(MiUnitTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.events = particle_events(500)
+        self.expected = FilePublisher(None)
+        publish_all(self.expected, self.events)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def check_bounded(self, publisher):
+        for rows in publisher.samples.itervalues():
+            self.assertLess(len(rows), publisher.max_rows)
+
+    def read_csv(self, stream):
+        rows = []
+        for name in sorted(os.listdir(self.tmpdir)):
+            if name == stream + '.csv' or name.startswith(stream + '_'):
+                with open(os.path.join(self.tmpdir, name)) as fh:
+                    rows.extend(csv.DictReader(fh))
+        return rows
+
+    def test_from_url(self):
+        publisher = Publisher.from_url('chunkedcsv://' + self.tmpdir)
+        self.assertIsInstance(publisher, ChunkedCsvPublisher)
+        self.assertEqual(publisher.output_dir, self.tmpdir)
+
+    def test_csv(self):
+        publisher = ChunkedCsvPublisher(None, max_rows=30, output_dir=self.tmpdir)
+        publish_all(publisher, self.events, self.check_bounded)
+
+        self.assertEqual(sorted(os.listdir(self.tmpdir)), ['ctd_sample.csv', 'ctd_status.csv', 'ctd_status_1.csv'])
+        for stream, expected in self.expected.samples.iteritems():
+            rows = self.read_csv(stream)
+            self.assertEqual(len(rows), len(expected))
+            for row, sample in zip(rows, expected):
+                self.assertEqual(float(row['temperature']), sample['temperature'])
+                self.assertEqual(int(row['counts']), sample['counts'])
+                self.assertEqual(row['serial'], sample['serial'])
+                self.assertEqual(json.loads(row['spectrum']), sample['spectrum'])
+                self.assertEqual(float(row['internal_timestamp']), sample['internal_timestamp'])
+                if 'battery' in sample:
+                    self.assertEqual(float(row['battery']), sample['battery'])
+                else:
+                    self.assertIn(row.get('battery'), ('', None))
+
+    @unittest.skipIf(file_publisher.netCDF4 is None, 'netCDF4 not installed')
+    def test_netcdf(self):
+        publisher = NetcdfPublisher(None, max_rows=30, output_dir=self.tmpdir)
+        publish_all(publisher, self.events, self.check_bounded)
+
+        for stream, expected in self.expected.samples.iteritems():
+            dataset = file_publisher.netCDF4.Dataset(os.path.join(self.tmpdir, stream + '.nc'))
+            try:
+                self.assertEqual(len(dataset.dimensions['obs']), len(expected))
+                variables = dataset.variables
+                self.assertEqual(list(variables['temperature'][:]), [s['temperature'] for s in expected])
+                self.assertEqual(list(variables['counts'][:]), [s['counts'] for s in expected])
+                self.assertEqual(list(variables['serial'][:]), [s['serial'] for s in expected])
+                self.assertEqual(variables['spectrum'][:].tolist(), [s['spectrum'] for s in expected])
+                if 'battery' in variables:
+                    battery = variables['battery'][:]
+                    for value, sample in zip(battery, expected):
+                        if 'battery' in sample:
+                            self.assertEqual(value, sample['battery'])
+                        else:
+                            self.assertIs(value, file_publisher.np.ma.masked)
+            finally:
+                dataset.close()
+
+    @unittest.skipIf(file_publisher.netCDF4 is None, 'netCDF4 not installed')
+    def test_netcdf_int_then_float(self):
+        publisher = NetcdfPublisher(None, max_rows=25, output_dir=self.tmpdir)
+        values = range(25) + [n + (.5 if n % 2 else 0.) for n in xrange(25, 50)]
+        publish_all(publisher, number_events('mixed_sample', values))
+
+        # the integers of the first chunk make the variable i8, fractions are not truncated into it
+        dataset = file_publisher.netCDF4.Dataset(os.path.join(self.tmpdir, 'mixed_sample.nc'))
+        try:
+            self.assertEqual(dataset.variables['value'].dtype, file_publisher.np.int64)
+            written = dataset.variables['value'][:]
+            for value, expected in zip(written, values):
+                if expected % 1:
+                    self.assertIs(value, file_publisher.np.ma.masked)
+                else:
+                    self.assertEqual(value, expected)
+        finally:
+            dataset.close()
+
+    def test_netcdf_variable_types(self):
+        register_array_dtypes('declared_sample', {'cells': '<i2', 'flags': 'u1'})
+        np = file_publisher.np
+        for stream, name, data, expected in [('mixed_sample', 'value', np.array([1, 2]), 'i8'),
+                                             ('mixed_sample', 'value', np.array([1.5, 2]), 'f8'),
+                                             ('mixed_sample', 'value', np.array([[1, 2], [3, 4]]), 'i8'),
+                                             ('mixed_sample', 'value', np.array([True, False]), 'i1'),
+                                             ('mixed_sample', 'value', np.array([{}]), None),
+                                             ('declared_sample', 'cells', np.array([[1, 2]]), 'i2'),
+                                             ('declared_sample', 'flags', np.array([1]), 'u1'),
+                                             ('declared_sample', 'other', np.array([1]), 'i8'),
+                                             ('declared_sample', 'other', np.array([1.]), 'f8')]:
+            self.assertEqual(NetcdfPublisher.variable_type(stream, name, data), expected)
+
+        # the first chunk of an undeclared integer column fixes the variable as i8
+        with patch.object(file_publisher, 'netCDF4') as netcdf:
+            dataset = netcdf.Dataset.return_value
+            dataset.variables = {}
+            dataset.createVariable.return_value.dtype = np.dtype('i8')
+            publisher = NetcdfPublisher(None, max_rows=30, output_dir=self.tmpdir)
+            publish_all(publisher, number_events('mixed_sample', range(30)))
+        self.assertIn(((('value', 'i8', ['obs']), {'zlib': True})), dataset.createVariable.call_args_list)
+
+    def test_netcdf_unavailable(self):
+        with patch.object(file_publisher, 'netCDF4', None):
+            self.assertRaises(ImportError, NetcdfPublisher, None)
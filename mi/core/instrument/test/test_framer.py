@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.test.test_framer
+@file mi/core/instrument/test/test_framer.py
+@brief Test cases for the binary framer module
+"""
+
+__license__ = 'Apache 2.0'
+
+import struct
+
+from mock import patch
+from nose.plugins.attrib import attr
+
+from mi.core import checksum
+from mi.core.exceptions import InstrumentParameterException
+from mi.core.instrument import framer
+from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.framer import BinaryFramer, ChecksumType, sum8, sum16, lrc, crc16
+from mi.core.unit_test import MiUnitTestCase
+
+
+OPTAA_SYNC = '\xff\x00\xff\x00'
+NORTEK_SYNC = '\xa5\x10'
+NORTEK_SEED = 0xb58c
+
+
+def optaa_record(payload):
+    body = OPTAA_SYNC + struct.pack('>H', len(payload) + 6) + payload
+    return body + struct.pack('>H', sum8(body)) + '\x00'
+
+
+def nortek_record(payload):
+    body = NORTEK_SYNC + payload
+    return body + struct.pack('<H', sum16(body, NORTEK_SEED))
+
+
+@attr('UNIT', group='mi')
+class UnitTestBinaryFramer(MiUnitTestCase):
+    def setUp(self):
+        self.optaa = BinaryFramer(OPTAA_SYNC, length_offset=4, length_format='>H',
+                                  checksum=ChecksumType.SUM8, checksum_format='>H', pad=1)
+        self.nortek = BinaryFramer(NORTEK_SYNC, length=22, checksum=ChecksumType.SUM16,
+                                   checksum_seed=NORTEK_SEED, checksum_format='<H')
+
+    def assert_both_paths(self, bfr, raw_data, expected):
+        """
+        Verify the vectorized and pure python paths agree with the expected result
+        """
+        self.assertEqual(bfr.sieve(raw_data), expected)
+        with patch.object(framer, 'VECTORIZE_MIN_CANDIDATES', 0):
+            self.assertEqual(bfr.sieve(raw_data), expected)
+        with patch.object(framer, 'numpy', None), patch.object(checksum, 'numpy', None):
+            self.assertEqual(bfr.sieve(raw_data), expected)
+
+    def test_checksums(self):
+        self.assertEqual(sum8('\x01\x02\xff'), 0x102)
+        self.assertEqual(sum8('\xff' * 300), (0xff * 300) & 0xffff)
+        self.assertEqual(sum16('\x01\x02\x03\x04'), 0x0201 + 0x0403)
+        self.assertEqual(sum16('\x01\x02\x03\x04', endian='>'), 0x0102 + 0x0304)
+        self.assertEqual(sum16('', NORTEK_SEED), NORTEK_SEED)
+        self.assertEqual(lrc('\x01\x03\x07'), 0x05)
+        self.assertEqual(crc16('123456789'), 0x31c3)
+
+    def test_optaa(self):
+        records = [optaa_record('\x01\x02' * n) for n in (10, 11, 40)]
+        raw_data = 'noise' + records[0] + records[1] + '\xff\x00' + records[2] + OPTAA_SYNC + '\x00'
+        expected = []
+        index = 5
+        for record in records:
+            expected.append((index, index + len(record)))
+            index += len(record)
+            if record is records[1]:
+                index += 2
+        self.assert_both_paths(self.optaa, raw_data, expected)
+
+    def test_bad_checksum(self):
+        good = optaa_record('\x10' * 20)
+        bad = good[:-3] + '\x00\x00\x00'
+        self.assert_both_paths(self.optaa, bad + good + good, [(len(bad), len(bad) + len(good)),
+                                                               (len(bad) + len(good), len(bad) + 2 * len(good))])
+
+    def test_fragment(self):
+        record = optaa_record('\x10' * 20)
+        for index in xrange(len(record)):
+            self.assert_both_paths(self.optaa, 'noise' + record[:index], [])
+
+    def test_nortek(self):
+        records = [nortek_record(chr(n) * 20) for n in range(5)]
+        # odd-aligned records exercise the odd word sums
+        raw_data = 'x' + ''.join(records) + 'yz' + records[0]
+        expected = [(1 + 24 * n, 25 + 24 * n) for n in range(5)] + [(123, 147)]
+        self.assert_both_paths(self.nortek, raw_data, expected)
+
+    def test_overlapping_sync(self):
+        # a false sync inside a record must not hide the record, nor produce an overlap
+        record = nortek_record('\xa5\x10' + '\x00' * 18)
+        raw_data = '\xa5' + record + record
+        self.assert_both_paths(self.nortek, raw_data, [(1, 25), (25, 49)])
+
+    def test_trailer(self):
+        bfr = BinaryFramer('\xa5\x05', length_offset=2, length_format='<H', length_scale=2, trailer='\x06\x06')
+        record = '\xa5\x05\x04\x00abcd'
+        self.assert_both_paths(bfr, record + '\x06\x06' + record + '\x06\x07', [(0, 10)])
+
+    def test_lrc_crc(self):
+        for checksum, fn in ((ChecksumType.LRC, lrc), (ChecksumType.CRC16, crc16)):
+            bfr = BinaryFramer('\x7e', length=9, checksum=checksum, checksum_format='>H')
+            record = '\x7e12345678'
+            record += struct.pack('>H', fn(record))
+            self.assert_both_paths(bfr, record * 5, [(11 * n, 11 * (n + 1)) for n in range(5)])
+
+    def test_chunker(self):
+        records = [optaa_record(chr(n) * 30) for n in range(3)]
+        chunker = StringChunker(self.optaa.sieve)
+        raw_data = 'garbage'.join(records)
+        for index in xrange(0, len(raw_data), 7):
+            chunker.add_chunk(raw_data[index:index + 7], index)
+
+        for record in records:
+            _, chunk = chunker.get_next_data()
+            self.assertEqual(chunk, record)
+        self.assertEqual(chunker.get_next_data(), (None, None))
+
+    def test_invalid_config(self):
+        self.assertRaises(InstrumentParameterException, BinaryFramer, '')
+        self.assertRaises(InstrumentParameterException, BinaryFramer, 'a')
+        self.assertRaises(InstrumentParameterException, BinaryFramer, 'a', length=1, length_offset=1)
+        self.assertRaises(InstrumentParameterException, BinaryFramer, 'a', length_offset=1, length_format='>h')
+        self.assertRaises(InstrumentParameterException, BinaryFramer, 'a', length=1, checksum='md5')
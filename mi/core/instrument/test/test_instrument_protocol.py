@@ -12,6 +12,7 @@ __author__ = 'Steve Foley'
 __license__ = 'Apache 2.0'
 
 import re
+import threading
 import time
 import ntplib
 import datetime
@@ -23,6 +24,7 @@ from mi.core.instrument.instrument_driver import DriverParameter
 from mi.core.instrument.instrument_protocol import InstrumentProtocol
 from mi.core.instrument.instrument_protocol import MenuInstrumentProtocol
 from mi.core.instrument.instrument_protocol import CommandResponseInstrumentProtocol
+from mi.core.instrument.instrument_protocol import EchoPacedTransmitter
 from mi.core.instrument.protocol_param_dict import ParameterDictVisibility
 from mi.core.instrument.instrument_driver import ConfigMetadataKey
 from mi.instrument.satlantic.par_ser_600m.driver import SAMPLE_REGEX
@@ -613,6 +615,78 @@ class TestUnitCommandInstrumentProtocol(MiUnitTestCase):
                           self.protocol._do_cmd_resp,
                           self.TestEvent.TEST, expected_prompt=">", response_regex=regex1)
 
+    def test_response_latency(self):
+        """
+        Test that responses are returned as soon as they arrive rather than on the next poll
+        """
+        def send(data):
+            # simulated instrument, responding from its own thread
+            threading.Timer(.005, self.protocol.add_to_buffer, ["%s >" % data]).start()
+
+        self.protocol._connection.send = send
+        self.protocol._wakeup = Mock()
+        regex = re.compile(r'(do it)')
+
+        starttime = time.time()
+        for _ in xrange(20):
+            self.assertEqual(self.protocol._do_cmd_resp(self.TestEvent.TEST, timeout=5),
+                             self._parse_test_response(self._build_simple_command(None) + " >", ">"))
+            self.assertEqual(self.protocol._do_cmd_resp(self.TestEvent.TEST, response_regex=regex, timeout=5),
+                             self._parse_test_response("do it", ""))
+            self.protocol._linebuf = self.protocol._promptbuf = ''
+            send('raw')
+            self.assertEqual(self.protocol._get_raw_response(timeout=5), ('>', 'raw >'))
+        # polling every .1 seconds took at least 6 seconds
+        log.info('60 responses in %.2fs', time.time() - starttime)
+
+    def test_echo_paced_send(self):
+        """
+        Test sending a character at a time to a simulated slow-echo device
+        """
+        sent = []
+
+        def echo(data):
+            # echo each character 5 ms later, as a slow serial device would
+            sent.append(data)
+            threading.Timer(.005, self.protocol.add_to_buffer, [data]).start()
+
+        self.protocol._connection.send = echo
+        self.protocol._wakeup = Mock()
+        cmd_line = 'set param=12345\r\n'
+        self.protocol._build_handlers[self.TestEvent.TEST] = lambda cmd: cmd_line
+
+        # a fixed write delay took 16 * .2 seconds
+        starttime = time.time()
+        self.protocol._do_cmd_no_resp(self.TestEvent.TEST, write_delay=.2)
+        log.info('%d characters echo paced in %.3fs', len(cmd_line), time.time() - starttime)
+        self.assertEqual(sent, list(cmd_line))
+
+        # the minimum gap still applies
+        starttime = time.time()
+        self.assertTrue(EchoPacedTransmitter(self.protocol, .2, min_gap=.05).send('abcd'))
+        self.assertGreaterEqual(time.time() - starttime, .15)
+
+        # without an echo the write delay is the pace
+        self.protocol._connection.send = sent.append
+        starttime = time.time()
+        self.assertFalse(EchoPacedTransmitter(self.protocol, .05).send(['ab', 'cd']))
+        self.assertGreaterEqual(time.time() - starttime, .1)
+        self.assertEqual(sent[-2:], ['ab', 'cd'])
+
+    def test_prompt_search(self):
+        """
+        Test that prompts arriving in pieces, or after the buffer is cleared, are found
+        """
+        self.protocol._prompts = ['S>', 'long prompt>']
+        threading.Timer(.05, self.protocol.add_to_buffer, ['data long pro']).start()
+        threading.Timer(.1, self.protocol.add_to_buffer, ['mpt>S>']).start()
+        self.assertEqual(self.protocol._get_response(timeout=5), ('long prompt>', 'data long prompt>'))
+
+        self.protocol._promptbuf = 'S'
+        threading.Timer(.05, setattr, [self.protocol, '_promptbuf', '']).start()
+        threading.Timer(.1, self.protocol.add_to_buffer, ['S>']).start()
+        self.assertEqual(self.protocol._get_response(timeout=5), ('S>', 'S>'))
+
 
 @attr('UNIT', group='mi')
 class TestUnitMenuInstrumentProtocol(MiUnitTestCase):
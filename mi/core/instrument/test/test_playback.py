@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.test.test_playback
+@file mi/core/instrument/test/test_playback.py
+@brief Test cases for the playback log readers
+"""
+
+__license__ = 'Apache 2.0'
+
+import os
+import shutil
+import struct
+import tempfile
+from cPickle import PicklingError
+from StringIO import StringIO
+
+from mock import patch
+from nose.plugins.attrib import attr
+
+from mi.core.instrument.instrument_driver import DriverAsyncEvent
+from mi.core.instrument.playback import PlaybackPacket, PlaybackWrapper, ChunkyDatalogReader, DigiDatalogAsciiReader, \
+    DigiTimestampParser, string_to_ntp_date_time
+from mi.core.instrument.port_agent_client import HEADER_FORMAT, HEADER_SIZE, py_lrc
+from mi.core.unit_test import MiUnitTestCase
+
+
+def port_agent_packet(payload, packet_type=1, seconds=3600000000):
+    fields = [0xa3, 0x9d, 0x7a, packet_type, len(payload) + HEADER_SIZE, 0, seconds, 0]
+    fields[5] = py_lrc(struct.pack(HEADER_FORMAT, *fields) + payload)
+    return struct.pack(HEADER_FORMAT, *fields) + payload
+
+
+@attr('UNIT', group='mi')
+class PlaybackPacketUnitTest(MiUnitTestCase):
+    def setUp(self):
+        self.payloads = ['payload %d ' % n * n for n in xrange(1, 50)]
+        self.packets = [port_agent_packet(payload, seconds=3600000000 + n) for n, payload in enumerate(self.payloads)]
+        self.raw = ''.join(self.packets)
+
+    def read_all(self, raw_data, block_size):
+        return [packet.payload for packet in PlaybackPacket.packets_from_fh(StringIO(raw_data), block_size)]
+
+    def test_block_sizes(self):
+        for block_size in (1, 7, 100, 4096):
+            self.assertEqual(self.read_all(self.raw, block_size), self.payloads)
+
+    def test_timestamps(self):
+        packets, consumed = PlaybackPacket.packets_from_buffer(self.raw)
+        self.assertEqual(consumed, len(self.raw))
+        self.assertEqual([packet.get_timestamp() for packet in packets],
+                         [3600000000 + n for n in xrange(len(self.payloads))])
+
+    def test_noise(self):
+        # garbage, a false sync with an impossible length, a bad checksum and a truncated packet
+        bad = port_agent_packet('corrupt')[:-1] + 'X'
+        raw_data = 'junk' + ''.join(self.packets[:5]) + '\xa3\x9d\x7a\x01\xff' + ''.join(self.packets[5:]) + bad + \
+            port_agent_packet('tail') + port_agent_packet('partial')[:-3]
+        for block_size in (1, 13, 4096):
+            self.assertEqual(self.read_all(raw_data, block_size), self.payloads + ['tail'])
+
+    def test_sync_in_payload(self):
+        payloads = ['\xa3\x9d\x7a', 'x\xa3\x9d\x7a\x01\x00\x20' + 'y' * 20, 'z\xa3\x9d']
+        raw_data = ''.join(port_agent_packet(payload) for payload in payloads)
+        for block_size in (1, 5, 4096):
+            self.assertEqual(self.read_all(raw_data, block_size), payloads)
+
+    def test_noisy_block(self):
+        # each invalid packet is skipped without losing the packets following it
+        packets = list(self.packets)
+        for index in xrange(0, len(packets), 3):
+            packets[index] = packets[index][:-1] + 'X'
+        packets, consumed = PlaybackPacket.packets_from_buffer(''.join(packets), final=True)
+        self.assertEqual([packet.payload for packet in packets],
+                         [payload for index, payload in enumerate(self.payloads) if index % 3])
+
+    def test_incomplete(self):
+        packet = port_agent_packet('abc')
+        packets, consumed = PlaybackPacket.packets_from_buffer('xyz' + packet[:-1])
+        self.assertEqual(packets, [])
+        self.assertEqual(consumed, 3)
+        packets, consumed = PlaybackPacket.packets_from_buffer('xyz' + packet[:-1], final=True)
+        self.assertEqual(packets, [])
+        self.assertEqual(consumed, len(packet) + 2)
+
+
+class LineProtocol(object):
+    """
+    Minimal playback protocol generating a sample for each "<timestamp>,<value>" line
+    """
+    def __init__(self, callback):
+        self.callback = callback
+        self.buffer = ''
+
+    def got_data(self, packet):
+        self.buffer += packet.get_data()
+        lines = self.buffer.split('\n')
+        self.buffer = lines.pop()
+        for line in lines:
+            timestamp, value = line.split(',')
+            if value == 'error':
+                self.callback(DriverAsyncEvent.ERROR, line)
+                continue
+            if value == 'unpicklable':
+                self.callback(DriverAsyncEvent.ERROR, lambda: line)
+                continue
+            self.callback(DriverAsyncEvent.SAMPLE, {'stream_name': 'line', 'preferred_timestamp': 'internal_timestamp',
+                                                    'internal_timestamp': float(timestamp), 'values': value})
+
+
+def create_playback_protocol(callback):
+    return LineProtocol(callback)
+
+
+@attr('UNIT', group='mi')
+class ParallelPlaybackUnitTest(MiUnitTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        # overlapping time ranges, including identical timestamps in different files
+        contents = [[(t, 'a%d' % t) for t in xrange(0, 3000, 3)],
+                    [(t, 'b%d' % t) for t in xrange(1000, 4000, 2)] + [(3999, 'error')],
+                    [(t, 'c%d' % t) for t in xrange(5000, 6000)]]
+        for index, lines in enumerate(contents):
+            with open(os.path.join(self.tmpdir, 'file%d.log' % index), 'w') as fh:
+                fh.write(''.join('%d,%s\n' % line for line in lines))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def play(self, workers):
+        wrapper = PlaybackWrapper(__name__, 'REFDES', 'log://', 'log://', ChunkyDatalogReader, None,
+                                  [os.path.join(self.tmpdir, '*.log')], 100, workers)
+        particles = []
+        events = []
+        with patch.object(wrapper.particle_publisher, 'enqueue', particles.append), \
+                patch.object(wrapper.event_publisher, 'enqueue', events.append):
+            wrapper.playback()
+        return particles, events
+
+    def test_parallel_matches_serial(self):
+        serial, serial_events = self.play(1)
+        parallel, parallel_events = self.play(3)
+
+        self.assertEqual(len(serial), 1000 + 1500 + 1000)
+        key = lambda value: (value['internal_timestamp'], value['values'])
+        self.assertEqual(sorted([event['value'] for event in serial], key=key),
+                         sorted([event['value'] for event in parallel], key=key))
+        self.assertEqual([event['value'] for event in serial_events], [event['value'] for event in parallel_events])
+
+        # merged by timestamp, ties in file order
+        timestamps = [event['value']['internal_timestamp'] for event in parallel]
+        self.assertEqual(timestamps, sorted(timestamps))
+        values = [event['value']['values'] for event in parallel]
+        index = values.index('a999')
+        self.assertEqual(values[index:index + 4], ['a999', 'b1000', 'a1002', 'b1002'])
+
+        # deterministic
+        self.assertEqual([event['value'] for event in parallel], [event['value'] for event in self.play(2)[0]])
+
+    def test_parallel_spills(self):
+        spill_dir = os.path.join(self.tmpdir, 'spill')
+        os.mkdir(spill_dir)
+        with patch('tempfile.tempdir', spill_dir):
+            wrapper = PlaybackWrapper(__name__, 'REFDES', 'log://', 'log://', ChunkyDatalogReader, None,
+                                      [os.path.join(self.tmpdir, '*.log')], 100, 3)
+            # the workers build their own protocols
+            self.assertIsNone(wrapper.protocol)
+            particles = []
+            with patch.object(wrapper.particle_publisher, 'enqueue', particles.append):
+                wrapper.playback()
+        self.assertEqual(len(particles), 1000 + 1500 + 1000)
+        self.assertEqual(os.listdir(spill_dir), [])
+
+    def test_failed_worker(self):
+        # the spills of the other files are removed as well as the one being written
+        with open(os.path.join(self.tmpdir, 'file3.log'), 'w') as fh:
+            fh.write('6000,c6000\n6001,unpicklable\n')
+        spill_dir = os.path.join(self.tmpdir, 'spill')
+        os.mkdir(spill_dir)
+        with patch('tempfile.tempdir', spill_dir):
+            wrapper = PlaybackWrapper(__name__, 'REFDES', 'log://', 'log://', ChunkyDatalogReader, None,
+                                      [os.path.join(self.tmpdir, '*.log')], 100, 3)
+            self.assertRaises(PicklingError, wrapper.playback)
+        self.assertEqual(os.listdir(spill_dir), [])
+
+
+def digi_record(timestamp, payload, suffix='TN'):
+    return '<OOI-TS %s %s>\r\n%s<\\OOI-TS>\r\n\r\n' % (timestamp, suffix, payload)
+
+
+@attr('UNIT', group='mi')
+class DigiDatalogAsciiReaderUnitTest(MiUnitTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, name, contents):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'w') as fh:
+            fh.write(contents)
+        return path
+
+    def test_timestamp_parser(self):
+        parse = DigiTimestampParser()
+        for datestr in ['2014-09-18T00:00:00.083', '2014-09-18T00:00:00.083Z', '2014-09-18T00:00:00',
+                        '2014-09-18T00:00:00Z', '2016-02-29T23:59:59.999999', '1999-12-31T12:30:45.5',
+                        '2014-09-18T00:00:00.083']:
+            self.assertEqual(parse(datestr), string_to_ntp_date_time(datestr))
+
+        for datestr in ['2014-09-18 00:00:00.083', '2014-02-30T00:00:00.0', '2014-09-18T00:00:00.12345678',
+                        '2014-09-18T00:00:00.abc', 'garbage']:
+            self.assertRaises(ValueError, parse, datestr)
+
+    def test_read(self):
+        records = [('2014-09-18T00:00:%02d.%03d' % (n / 10, n % 10 * 100), 'record %d\r\n' % n * (n % 4))
+                   for n in xrange(200)]
+        contents = ''.join(digi_record(timestamp, payload) for timestamp, payload in records)
+        contents += digi_record('not a time', 'dropped', 'XS')
+        path = self.write('digi.log', 'leading noise' + contents + '<OOI-TS 2014-09-18T00:00:21.000 TN>\r\npartial')
+        empty = self.write('empty.log', '')
+
+        packets = []
+        reader = DigiDatalogAsciiReader([path, empty], packets.append)
+        self.assertEqual([name for name in reader.read() if name is not None], [path, empty])
+
+        self.assertEqual([packet.get_data() for packet in packets], [payload for _, payload in records])
+        self.assertEqual([packet.get_timestamp() for packet in packets],
+                         [string_to_ntp_date_time(timestamp) for timestamp, _ in records])
+
+    def test_same_timestamp_merged(self):
+        records = [('2014-09-18T00:00:00.000', 'a\r\n'), ('2014-09-18T00:00:00.000', 'b\r\n'),
+                   ('2014-09-18T00:00:00.100', 'c\r\n'), ('bad', 'dropped'), ('2014-09-18T00:00:00.100', 'd\r\n'),
+                   ('2014-09-18T00:00:00.000', 'e\r\n'), ('2014-09-18T00:00:00.000', 'f\r\n')]
+        path = self.write('digi.log', ''.join(digi_record(timestamp, payload) for timestamp, payload in records))
+
+        packets = []
+        list(DigiDatalogAsciiReader([path], packets.append).read())
+        self.assertEqual([(packet.get_timestamp(), packet.get_data()) for packet in packets],
+                         [(string_to_ntp_date_time('2014-09-18T00:00:00.000'), 'a\r\nb\r\n'),
+                          (string_to_ntp_date_time('2014-09-18T00:00:00.100'), 'c\r\nd\r\n'),
+                          (string_to_ntp_date_time('2014-09-18T00:00:00.000'), 'e\r\nf\r\n')])
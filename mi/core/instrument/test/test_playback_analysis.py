@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.test.test_playback_analysis
+@file mi/core/instrument/test/test_playback_analysis.py
+@brief Test cases for the raw data file classifier
+"""
+
+__license__ = 'Apache 2.0'
+
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+
+from mock import patch
+from nose.plugins.attrib import attr
+
+from mi.core.instrument import playback_analysis
+from mi.core.instrument.playback_analysis import FileIndex, lrc, packet_stats, walk_tree
+from mi.core.unit_test import MiUnitTestCase
+
+HEADER_FORMAT = '>4BHHII'
+
+
+def port_agent_packet(payload, packet_type=1, seconds=3600000000, fraction=0):
+    fields = [0xa3, 0x9d, 0x7a, packet_type, len(payload) + 16, 0, seconds, fraction]
+    fields[5] = lrc(struct.pack(HEADER_FORMAT, *fields) + payload)
+    return struct.pack(HEADER_FORMAT, *fields) + payload
+
+
+@attr('UNIT', group='mi')
+class PacketStatsUnitTest(MiUnitTestCase):
+    def test_lrc(self):
+        self.assertEqual(lrc(''), 0)
+        self.assertEqual(lrc('\x01\x02\x04', 8), 15)
+
+    def test_packet_stats(self):
+        packets = [port_agent_packet('data %d' % n, 1 + n % 3, 3600000000 + n, 1 << 31) for n in xrange(10)]
+        # a payload containing a valid packet is counted once
+        packets.append(port_agent_packet(port_agent_packet('inner'), 1, 3600000100))
+        data = 'noise' + ''.join(packets[:5]) + '\xa3\x9d\x7a\x01\x00\x03' + ''.join(packets[5:]) + \
+            port_agent_packet('bad')[:-1] + 'X' + port_agent_packet('partial')[:-2]
+
+        stats = packet_stats(data)
+        self.assertEqual(stats['packets'], 11)
+        self.assertEqual(stats['types'], {'1': 5, '2': 3, '3': 3})
+        self.assertEqual(stats['payload_bytes'], sum(len(packet) - 16 for packet in packets))
+        self.assertEqual(stats['skipped_bytes'], len(data) - sum(len(packet) for packet in packets))
+        self.assertEqual(stats['start'], 3600000000.5)
+        self.assertEqual(stats['stop'], 3600000100)
+
+    def test_empty(self):
+        for data in ['', 'short', 'no packets in here at all']:
+            stats = packet_stats(data)
+            self.assertEqual(stats['packets'], 0)
+            self.assertEqual(stats['skipped_bytes'], len(data))
+            self.assertIsNone(stats['start'])
+
+
+@attr('UNIT', group='mi')
+class FileIndexUnitTest(MiUnitTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.files = {
+            'CTD_20150101T0000_UTC.dat': ''.join(port_agent_packet('sample %d' % n) for n in xrange(100)),
+            'CTD_20150102T0000_UTC.dat': '<OOI-TS 2015-01-02T00:00:00.000 TN>\r\nsample\r\n<\\OOI-TS>\r\n' * 5,
+            'CTD_20150103T0000_UTC.dat': 'sample\r\n' * 10,
+            'CTD_DigiCmd_20150103T0000_UTC.dat': 'ignored',
+        }
+        for name, contents in self.files.iteritems():
+            self.write(name, contents)
+        self.index_file = os.path.join(self.tmpdir, 'index.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, name, contents):
+        with open(os.path.join(self.tmpdir, name), 'w') as fh:
+            fh.write(contents)
+
+    def test_walk_tree(self):
+        found = walk_tree(self.tmpdir, None, FileIndex(self.index_file), 2)
+        self.assertEqual([(sensor, record_type) for sensor, _, _, record_type, _ in found],
+                         [('CTD', (False, True)), ('CTD', (True, False)), ('CTD', (False, False))])
+        self.assertEqual(found, walk_tree(self.tmpdir, None))
+
+        entries = FileIndex(self.index_file).entries
+        binary = entries[os.path.join(self.tmpdir, 'CTD_20150101T0000_UTC.dat')]
+        self.assertEqual(binary['stats']['packets'], 100)
+        ascii_file = entries[os.path.join(self.tmpdir, 'CTD_20150102T0000_UTC.dat')]
+        self.assertEqual(ascii_file['stats'], {'records': 5})
+
+    def test_only_changed_files_scanned(self):
+        walk_tree(self.tmpdir, None, FileIndex(self.index_file))
+
+        with patch.object(playback_analysis, 'scan_file', side_effect=playback_analysis.scan_file) as scan_mock:
+            walk_tree(self.tmpdir, None, FileIndex(self.index_file))
+            self.assertEqual(scan_mock.call_count, 0)
+
+            self.write('CTD_20150103T0000_UTC.dat', port_agent_packet('now binary'))
+            found = walk_tree(self.tmpdir, 'CTD', FileIndex(self.index_file))
+            self.assertEqual(scan_mock.call_count, 1)
+            self.assertEqual(found[-1][3], (False, True))
+
+    def test_single_pass(self):
+        # each file is read once, through its mapping
+        with patch.object(playback_analysis.mmap, 'mmap', side_effect=mmap.mmap) as mmap_mock:
+            walk_tree(self.tmpdir, None)
+        self.assertEqual(mmap_mock.call_count, 3)
+
+    def test_removed_files_pruned(self):
+        walk_tree(self.tmpdir, None, FileIndex(self.index_file))
+        removed = os.path.join(self.tmpdir, 'CTD_20150102T0000_UTC.dat')
+        os.remove(removed)
+
+        found = walk_tree(self.tmpdir, None, FileIndex(self.index_file))
+        self.assertEqual(len(found), 2)
+        entries = FileIndex(self.index_file).entries
+        self.assertNotIn(removed, entries)
+        self.assertEqual(len(entries), 2)
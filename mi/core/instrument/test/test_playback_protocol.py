@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.test.test_playback_protocol
+@file mi/core/instrument/test/test_playback_protocol.py
+@brief Conformance of the parse-only playback protocols with the full driver protocols
+"""
+
+__license__ = 'Apache 2.0'
+
+import importlib
+import os
+
+from mock import patch
+from nose.plugins.attrib import attr
+
+import mi.instrument
+from mi.core.instrument.data_particle import DataParticleKey
+from mi.core.instrument.instrument_driver import DriverAsyncEvent
+from mi.core.instrument import playback_protocol
+from mi.core.instrument.playback_protocol import ParseOnlyProtocol, ParseOnlyProtocolFactory, PlaybackStateMachine, \
+    PARSE_ONLY_PROTOCOLS
+from mi.core.log import get_logger
+from mi.core.unit_test import MiUnitTestCase
+
+log = get_logger()
+
+PACKET_SIZE = 1024
+
+
+class Packet(object):
+    def __init__(self, data, timestamp):
+        self.data = data
+        self.timestamp = timestamp
+
+    def get_data(self):
+        return self.data
+
+    def get_data_length(self):
+        return len(self.data)
+
+    def get_timestamp(self):
+        return self.timestamp
+
+    def get_as_dict(self):
+        return {'type': 1, 'length': len(self.data), 'checksum': 0, 'raw': self.data}
+
+
+def playback_modules():
+    """
+    The names of all driver modules under mi.instrument defining create_playback_protocol
+    """
+    root = os.path.dirname(mi.instrument.__file__)
+    names = []
+    for path, dirs, files in os.walk(root):
+        dirs[:] = [name for name in dirs if name != 'test']
+        for name in files:
+            if name.endswith('.py'):
+                with open(os.path.join(path, name)) as fh:
+                    if '\ndef create_playback_protocol(' in fh.read():
+                        module = os.path.relpath(os.path.join(path, name[:-3]), root).replace(os.sep, '.')
+                        names.append('%s.%s' % (mi.instrument.__name__, module))
+    return sorted(names)
+
+
+def sample_data(module_name):
+    """
+    The string constants of the driver's unit test module and of the test
+    classes (and mixins) it defines, which include the sample data
+    """
+    package = module_name.rsplit('.', 1)[0]
+    test_module = importlib.import_module(package + '.test.test_driver')
+    constants = dict(vars(test_module))
+    for value in vars(test_module).values():
+        if isinstance(value, type) and value.__module__ == test_module.__name__:
+            constants.update((name, getattr(value, name)) for name in dir(value))
+    return [value for name, value in sorted(constants.items())
+            if name.isupper() and isinstance(value, str) and value]
+
+
+def play(protocol, events, data):
+    del events[:]
+    for index in xrange(0, len(data), PACKET_SIZE):
+        protocol.got_data(Packet(data[index:index + PACKET_SIZE], 3600000000.0 + index))
+    particles = []
+    for event_type, value in events:
+        if event_type == DriverAsyncEvent.SAMPLE:
+            value = dict(value)
+            value.pop(DataParticleKey.DRIVER_TIMESTAMP, None)
+            particles.append(value)
+    return particles
+
+
+@attr('UNIT', group='mi')
+class ParseOnlyProtocolUnitTest(MiUnitTestCase):
+    def test_state_machine(self):
+        fsm = PlaybackStateMachine('DRIVER_STATE_UNKNOWN')
+        self.assertEqual(fsm.on_event('EVENT'), (None, None))
+        self.assertEqual(fsm.get_current_state(), 'DRIVER_STATE_UNKNOWN')
+
+    def test_full_protocol(self):
+        # modules not known to support parsing only get their full protocol
+        with patch.object(playback_protocol.log, 'info') as info:
+            factory = ParseOnlyProtocolFactory.from_module('mi.instrument.mclane.ras.d1000.driver')
+        self.assertIsNone(factory.protocol_class)
+        self.assertEqual(info.call_count, 1)
+        protocol = factory.create(lambda *args: None)
+        self.assertNotIsInstance(protocol, ParseOnlyProtocol)
+        self.assertIs(type(protocol), factory.module.PlaybackProtocol)
+
+    def test_conformance(self):
+        modules = playback_modules()
+        self.assertEqual(sorted(set(PARSE_ONLY_PROTOCOLS) - set(modules)), [])
+
+        failures = []
+        for module_name in modules:
+            try:
+                if module_name in PARSE_ONLY_PROTOCOLS:
+                    self.check_conformance(module_name, PARSE_ONLY_PROTOCOLS[module_name])
+                else:
+                    self.check_fallback(module_name)
+            except Exception as e:
+                log.exception('Playback protocol of %s does not conform', module_name)
+                failures.append('%s: %r' % (module_name, e))
+        self.assertEqual(failures, [])
+
+    def check_fallback(self, module_name):
+        module = importlib.import_module(module_name)
+        protocol = ParseOnlyProtocolFactory.from_module(module_name).create(lambda *args: None)
+        self.assertNotIsInstance(protocol, ParseOnlyProtocol)
+        self.assertIs(type(protocol), type(module.create_playback_protocol(lambda *args: None)))
+
+    def check_conformance(self, module_name, class_name):
+        module = importlib.import_module(module_name)
+        samples = sample_data(module_name)
+        self.assertTrue(samples, 'no sample data')
+        data = '\r\n'.join(samples)
+
+        full_events = []
+        full = module.create_playback_protocol(lambda *args: full_events.append(args))
+        self.assertIs(type(full), getattr(module, class_name))
+        expected = play(full, full_events, data)
+        self.assertTrue(expected, 'no particles')
+
+        factory = ParseOnlyProtocolFactory.from_module(module_name)
+        fast_events = []
+        fast = factory.create(lambda *args: fast_events.append(args))
+        self.assertIsInstance(fast, ParseOnlyProtocol)
+        self.assertIsInstance(fast, type(full))
+        self.assertEqual(play(fast, fast_events, data), expected)
+        # play again to check no state is shared between parse-only protocols
+        self.assertEqual(play(factory.create(lambda *args: fast_events.append(args)), fast_events, data), expected)
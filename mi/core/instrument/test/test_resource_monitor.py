@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.test.test_resource_monitor
+@file mi/core/instrument/test/test_resource_monitor.py
+@brief Test cases for driver resource accounting and throttling
+"""
+
+__license__ = 'Apache 2.0'
+
+import re
+import time
+
+from nose.plugins.attrib import attr
+
+from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.instrument_driver import DriverAsyncEvent
+from mi.core.instrument.resource_monitor import read_process_usage, ResourceKey
+from mi.core.instrument.wrapper import DriverWrapper, CommandHandler, Commands
+from mi.core.unit_test import MiUnitTest
+
+SAMPLE_REGEX = re.compile(r'S,\d+\r\n')
+
+
+class FloodProtocol(object):
+    """
+    Protocol publishing a raw and a parsed particle for each sample record
+    """
+
+    def __init__(self, driver_event):
+        self._driver_event = driver_event
+        self._chunker = StringChunker(self.sieve_function)
+
+    @staticmethod
+    def sieve_function(raw_data):
+        return [(m.start(), m.end()) for m in SAMPLE_REGEX.finditer(raw_data)]
+
+    def got_data(self, data):
+        self._driver_event(DriverAsyncEvent.SAMPLE, {'stream_name': 'raw', 'values': [{'value': data}]})
+        self._chunker.add_chunk(data, time.time())
+        timestamp, chunk = self._chunker.get_next_data()
+        while chunk:
+            self._driver_event(DriverAsyncEvent.SAMPLE, {'stream_name': 'flood_sample', 'values': [{'value': chunk}]})
+            timestamp, chunk = self._chunker.get_next_data()
+
+
+class FloodDriver(object):
+    def __init__(self, send_event, refdes):
+        self._send_event = send_event
+        self._protocol = FloodProtocol(self._driver_event)
+
+    def _driver_event(self, event_type, val=None):
+        self._send_event({'type': event_type, 'value': val, 'time': time.time()})
+
+    def set_init_params(self, config):
+        pass
+
+
+@attr('UNIT', group='mi')
+class TestResourceMonitor(MiUnitTest):
+    def create_wrapper(self, resources=None):
+        init_params = {'resources': resources} if resources else {}
+        wrapper = DriverWrapper(__name__, 'FloodDriver', 'REFDES', 'count://', 'count://', init_params)
+        wrapper.construct_driver()
+        return wrapper
+
+    def flood(self, wrapper, records):
+        protocol = wrapper.driver._protocol
+        for index in xrange(records):
+            protocol.got_data('S,%d\r\n' % index)
+            # malformed data accumulates in the chunker
+            protocol.got_data('#### garbage %d' % index)
+
+    def test_read_process_usage(self):
+        cpu_seconds, rss_kb = read_process_usage()
+        self.assertGreater(rss_kb, 0)
+        self.assertGreaterEqual(cpu_seconds, 0)
+        self.assertRaises(IOError, read_process_usage, 'not_a_pid')
+
+    def test_default_policy(self):
+        wrapper = self.create_wrapper()
+        self.flood(wrapper, 100)
+
+        # raw is not published, nothing else is throttled
+        self.assertEqual(wrapper.particle_publisher.queue_size(), 100)
+        self.assertEqual(wrapper.particle_count, 100)
+        sample = wrapper.resource_monitor.sample()
+        self.assertEqual(sample[ResourceKey.OVER_BUDGET], [])
+        self.assertEqual(sample[ResourceKey.DROPPED_RAW], 0)
+        self.assertEqual(sample[ResourceKey.DROPPED_PARTICLES], 0)
+        self.assertEqual(sample[ResourceKey.PARTICLE_QUEUE], 100)
+        self.assertEqual(wrapper.driver._protocol._chunker.max_buff_size, 8192)
+
+    def test_flood(self):
+        wrapper = self.create_wrapper({'max_particle_queue': 100, 'max_chunker_buffer': 1024, 'publish_raw': True})
+        monitor = wrapper.resource_monitor
+        monitor.sample()
+        chunker = wrapper.driver._protocol._chunker
+        self.assertEqual(chunker.max_buff_size, 1024)
+
+        # raw is published while within budget, each record gives two raw and one parsed particle
+        self.flood(wrapper, 10)
+        self.assertEqual(wrapper.particle_publisher.queue_size(), 30)
+        self.assertFalse(monitor.over_budget)
+
+        self.flood(wrapper, 1000)
+        self.assertTrue(monitor.over_budget)
+        self.assertEqual(wrapper.particle_publisher.queue_size(), 100)
+        self.assertLessEqual(len(chunker.buffer), 1024)
+        # 70 more particles fit under the cap, 47 raw and 23 parsed, the rest are dropped
+        self.assertEqual(monitor.dropped_raw, 2000 - 47)
+        self.assertEqual(monitor.dropped_particles, 1000 - 23)
+
+        # events are never throttled
+        wrapper.driver._driver_event(DriverAsyncEvent.STATE_CHANGE, 'DRIVER_STATE_AUTOSAMPLE')
+        self.assertEqual(wrapper.event_publisher.queue_size(), 1)
+
+        sample = monitor.sample()
+        self.assertEqual(sample[ResourceKey.OVER_BUDGET], [ResourceKey.PARTICLE_QUEUE])
+        self.assertLessEqual(sample[ResourceKey.CHUNKER_BUFFER], 1024)
+        self.assertGreater(sample[ResourceKey.PARTICLE_RATE], 0)
+
+        # draining the queue brings the driver back within budget
+        wrapper.particle_publisher.publish()
+        sample = monitor.sample()
+        self.assertEqual(sample[ResourceKey.OVER_BUDGET], [])
+        self.assertEqual(sample[ResourceKey.PARTICLE_QUEUE], 0)
+        self.assertEqual(sample[ResourceKey.PARTICLE_RATE], 0)
+        self.flood(wrapper, 1)
+        self.assertEqual(wrapper.particle_publisher.queue_size(), 3)
+
+    def test_cpu_budget(self):
+        wrapper = self.create_wrapper({'max_cpu_percent': 0, 'publish_raw': True})
+        wrapper.resource_monitor.sample()
+        end_time = time.time() + .1
+        while time.time() < end_time:
+            pass
+        sample = wrapper.resource_monitor.sample()
+        self.assertEqual(sample[ResourceKey.OVER_BUDGET], [ResourceKey.CPU_PERCENT])
+
+        # over the cpu budget raw is dropped and one in keep_every parsed particles is published
+        self.flood(wrapper, 10)
+        self.assertEqual(wrapper.particle_publisher.queue_size(), 1)
+        self.assertEqual(wrapper.resource_monitor.dropped_raw, 20)
+        self.assertEqual(wrapper.resource_monitor.dropped_particles, 9)
+
+    def test_cpu_flood(self):
+        wrapper = self.create_wrapper({'max_cpu_percent': 0, 'keep_every': 4})
+        monitor = wrapper.resource_monitor
+        monitor.sample()
+        end_time = time.time() + .1
+        while time.time() < end_time:
+            pass
+        self.assertEqual(monitor.sample()[ResourceKey.OVER_BUDGET], [ResourceKey.CPU_PERCENT])
+
+        # raw is not published at all, the parsed particles are shed
+        self.flood(wrapper, 1000)
+        self.assertEqual(wrapper.particle_publisher.queue_size(), 250)
+        self.assertEqual(monitor.dropped_particles, 750)
+        self.assertEqual(monitor.dropped_raw, 0)
+
+        # back within budget nothing is shed
+        monitor.policy.max_cpu_percent = None
+        self.assertEqual(monitor.sample()[ResourceKey.OVER_BUDGET], [])
+        wrapper.particle_publisher.publish()
+        self.flood(wrapper, 10)
+        self.assertEqual(wrapper.particle_publisher.queue_size(), 10)
+        self.assertEqual(monitor.dropped_particles, 750)
+
+    def test_resource_usage_command(self):
+        wrapper = self.create_wrapper()
+        handler = CommandHandler(wrapper, 'inproc://workers')
+        event = handler._execute(Commands.RESOURCE_USAGE, [], {})
+        self.assertEqual(event['type'], DriverAsyncEvent.RESULT)
+        self.assertItemsEqual(event['value'].keys(), ResourceKey.list())
+
+        self.assertRaises(TypeError, self.create_wrapper, {'max_memory': 1})
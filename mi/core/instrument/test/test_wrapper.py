@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.test.test_wrapper
+@file mi/core/instrument/test/test_wrapper.py
+@brief Test cases for the cached overall state of the DriverWrapper
+"""
+
+__license__ = 'Apache 2.0'
+
+import json
+import time
+import timeit
+
+from mock import patch
+from nose.plugins.attrib import attr
+
+from mi.core.instrument.instrument_driver import DriverAsyncEvent
+from mi.core.instrument.wrapper import DriverWrapper, CommandHandler, Commands, VERSION_CACHE, _decode, _encode_reply
+from mi.core.log import get_logger
+from mi.core.unit_test import MiUnitTest
+
+log = get_logger()
+
+PARAMETER_COUNT = 200
+
+
+class StateDriver(object):
+    """
+    Driver with a sizeable parameter dictionary and metadata
+    """
+
+    def __init__(self, send_event, refdes):
+        self._send_event = send_event
+        self.state = 'DRIVER_STATE_COMMAND'
+        self.parameters = {'param_%d' % i: i for i in xrange(PARAMETER_COUNT)}
+        self.metadata = {'parameters': {name: {'display_name': name.title(), 'description': 'parameter description ' * 10,
+                                               'value': {'type': 'int', 'default': 0}}
+                                        for name in self.parameters}}
+        self.init_params = {}
+
+    def get_resource_capabilities(self):
+        return [['DRIVER_EVENT_ACQUIRE_SAMPLE', 'DRIVER_EVENT_START_AUTOSAMPLE'], sorted(self.parameters)]
+
+    def get_resource_state(self):
+        return self.state
+
+    def get_config_metadata(self):
+        return self.metadata
+
+    def get_cached_config(self):
+        return dict(self.parameters)
+
+    def get_init_params(self):
+        return self.init_params
+
+    def set_init_params(self, config):
+        self.init_params = config
+
+    def set_resource(self, params):
+        self.parameters.update(params)
+
+    def send_state_change(self):
+        self._send_event({'type': DriverAsyncEvent.STATE_CHANGE, 'value': self.state, 'time': time.time()})
+
+
+@attr('UNIT', group='mi')
+class TestDriverWrapper(MiUnitTest):
+    def setUp(self):
+        self.wrapper = DriverWrapper(__name__, 'StateDriver', 'REFDES', 'count://', 'count://', {})
+        self.wrapper.construct_driver()
+        self.driver = self.wrapper.driver
+        self.handler = CommandHandler(self.wrapper, 'inproc://workers')
+
+    def overall_state(self):
+        reply = self.handler.cmd_driver({'cmd': Commands.OVERALL_STATE})
+        return json.loads(_encode_reply(reply))
+
+    def expected_state(self):
+        return _decode({'capabilities': self.driver.get_resource_capabilities(),
+                        'state': self.driver.get_resource_state(),
+                        'metadata': self.driver.get_config_metadata(),
+                        'parameters': self.driver.get_cached_config(),
+                        'direct_config': {},
+                        'init_params': self.driver.get_init_params()})
+
+    def test_get_version(self):
+        VERSION_CACHE.clear()
+        with patch('mi.core.instrument.wrapper.yaml') as yaml:
+            yaml.load.return_value = {'driver_metadata': {'version': '1.2.3'}}
+            version = DriverWrapper.get_version('mi.instrument.seabird.sbe16plus_v2.ctdbp_no.driver')
+            self.assertEqual(DriverWrapper.get_version('mi.instrument.seabird.sbe16plus_v2.ctdbp_no.driver'), version)
+            self.assertEqual(DriverWrapper.get_version(__name__), 'UNVERSIONED')
+        self.assertEqual(version, '1.2.3')
+        self.assertEqual(yaml.load.call_count, 1)
+
+    def test_overall_state(self):
+        reply = self.overall_state()
+        self.assertEqual(reply['type'], DriverAsyncEvent.RESULT)
+        self.assertEqual(reply['cmd'], {'cmd': Commands.OVERALL_STATE, 'args': [], 'kwargs': {}})
+        self.assertEqual(reply['value'], self.expected_state())
+
+        # unchanged state reuses the serialized value
+        value = self.wrapper.overall_state()
+        self.assertIs(self.wrapper.overall_state(), value)
+
+        # parameters changed without a config change event
+        self.driver.parameters['param_0'] = -1
+        self.assertEqual(self.overall_state()['value'], self.expected_state())
+        value = self.wrapper.overall_state()
+
+        # state changed without a state change event
+        self.driver.state = 'DRIVER_STATE_AUTOSAMPLE'
+        self.assertEqual(self.overall_state()['value'], self.expected_state())
+        value = self.wrapper.overall_state()
+
+        # state change events
+        self.driver.send_state_change()
+        self.assertIsNot(self.wrapper.overall_state(), value)
+        value = self.wrapper.overall_state()
+
+        # commands sent to the driver
+        self.handler.cmd_driver({'cmd': 'set_init_params', 'args': [{'parameters': {'param_1': 5}}]})
+        self.assertEqual(self.overall_state()['value']['init_params'], {'parameters': {'param_1': 5}})
+
+    def test_polling_latency(self):
+        def poll():
+            _encode_reply(self.handler.cmd_driver({'cmd': Commands.OVERALL_STATE}))
+
+        def poll_changed():
+            self.wrapper.state_changed()
+            poll()
+
+        cached = min(timeit.repeat(poll, number=100, repeat=3)) / 100
+        uncached = min(timeit.repeat(poll_changed, number=100, repeat=3)) / 100
+        log.info('overall state latency: cached %.3fms, changed %.3fms', cached * 1000, uncached * 1000)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.test.test_zmq_driver_bus
+@file mi/core/instrument/test/test_zmq_driver_bus.py
+@brief Test cases for drivers sharing a ZmqDriverBus
+"""
+
+__license__ = 'Apache 2.0'
+
+import socket
+import threading
+import time
+from collections import defaultdict
+
+import zmq
+from mock import Mock
+from nose.plugins.attrib import attr
+
+from mi.core.driver_process import ZMQPyClassDriverProcess, DriverProcessType
+from mi.core.exceptions import InstrumentCommandException, DriverLaunchException, InstrumentException
+from mi.core.instrument.zmq_driver_bus import ZmqDriverBus, ZmqBusDriverProcess, ZmqBusClient
+from mi.core.log import get_logger
+from mi.core.unit_test import MiUnitTest
+
+log = get_logger()
+
+DRIVER_COUNT = 50
+EVENTS_PER_DRIVER = 100
+
+
+class BusTestDriver(object):
+    """
+    Minimal driver answering a command and sending events
+    """
+
+    def __init__(self, evt_callback):
+        self._send_event = evt_callback
+
+    def get_resource_state(self, *args, **kwargs):
+        return 'DRIVER_STATE_COMMAND'
+
+    def publish(self, count):
+        for index in xrange(count):
+            self._send_event({'type': 'DRIVER_ASYNC_EVENT_SAMPLE', 'value': index})
+        return count
+
+    def fail(self, *args, **kwargs):
+        raise InstrumentCommandException('failed')
+
+
+@attr('UNIT', group='mi')
+class TestZmqDriverBus(MiUnitTest):
+    def setUp(self):
+        self.bus = ZmqDriverBus('inproc://command', 'inproc://publish', 'inproc://subscribe')
+        self.bus.start()
+        self.addCleanup(self.bus.stop)
+        self.client = ZmqBusClient('inproc://command', 'inproc://subscribe')
+        self.addCleanup(self.client.stop_messaging)
+        self.events = defaultdict(list)
+        self.event_lock = threading.Lock()
+
+    def start_driver(self, refdes, command_endpoint='inproc://command', publish_endpoint='inproc://publish',
+                     ready_interval=None):
+        process = ZmqBusDriverProcess(__name__, 'BusTestDriver', refdes, command_endpoint, publish_endpoint, None)
+        if ready_interval is not None:
+            process.ready_interval = ready_interval
+        self.assertTrue(process.construct_driver())
+        process.start_messaging()
+        self.addCleanup(self.stop_driver, process)
+        return process
+
+    def stop_driver(self, process):
+        process.stop_messaging()
+        process.cmd_thread.join()
+        process.evt_thread.join()
+
+    def on_event(self, refdes, evt):
+        with self.event_lock:
+            self.events[refdes].append(evt)
+
+    def wait_for_events(self, count, timeout=30):
+        end_time = time.time() + timeout
+        while time.time() < end_time:
+            with self.event_lock:
+                if sum(len(events) for events in self.events.values()) >= count:
+                    return
+            time.sleep(.01)
+
+    def test_command_and_discover(self):
+        self.start_driver('REFDES-1')
+        self.start_driver('REFDES-10')
+        self.assertEqual(self.client.wait_for_drivers(['REFDES-1', 'REFDES-10']), ['REFDES-1', 'REFDES-10'])
+
+        self.assertEqual(self.client.cmd_dvr('REFDES-1', 'get_resource_state'), 'DRIVER_STATE_COMMAND')
+        self.assertRaises(InstrumentCommandException, self.client.cmd_dvr, 'REFDES-1', 'fail')
+        self.assertRaises(InstrumentCommandException, self.client.cmd_dvr, 'REFDES-1', 'not_a_command')
+        self.assertRaises(InstrumentCommandException, self.client.cmd_dvr, 'REFDES-2', 'get_resource_state')
+
+        # subscriptions match by prefix, only REFDES-1 events are delivered
+        self.client.start_messaging(self.on_event, ['REFDES-1'])
+        self.client.cmd_dvr('REFDES-10', 'publish', 1)
+        while not self.events:
+            self.client.cmd_dvr('REFDES-1', 'publish', 1)
+            time.sleep(.01)
+        self.assertEqual(self.events.keys(), ['REFDES-1'])
+
+        self.assertEqual(self.client.cmd_dvr('REFDES-10', 'stop_driver_process'), 'stop_driver_process')
+        end_time = time.time() + 5
+        while 'REFDES-10' in self.client.discover() and time.time() < end_time:
+            time.sleep(.01)
+        self.assertEqual(self.client.discover(), ['REFDES-1'])
+
+    def test_many_drivers(self):
+        refdes_list = ['CE01ISSM-MFD35-%02d-PRESFA000' % index for index in xrange(DRIVER_COUNT)]
+
+        start_time = time.time()
+        for refdes in refdes_list:
+            self.start_driver(refdes)
+        self.assertEqual(self.client.wait_for_drivers(refdes_list), refdes_list)
+        startup_time = time.time() - start_time
+
+        # one subscriber for all drivers, wait for the subscription to reach every driver
+        self.client.start_messaging(self.on_event)
+        for refdes in refdes_list:
+            while not self.events[refdes]:
+                self.client.cmd_dvr(refdes, 'publish', 1)
+                time.sleep(.01)
+        self.events.clear()
+
+        start_time = time.time()
+        for refdes in refdes_list:
+            self.assertEqual(self.client.cmd_dvr(refdes, 'publish', EVENTS_PER_DRIVER), EVENTS_PER_DRIVER)
+        self.wait_for_events(DRIVER_COUNT * EVENTS_PER_DRIVER)
+        event_time = time.time() - start_time
+
+        log.info('%d drivers registered in %.3fs, %d events in %.3fs (%d/s)', DRIVER_COUNT, startup_time,
+                 DRIVER_COUNT * EVENTS_PER_DRIVER, event_time, DRIVER_COUNT * EVENTS_PER_DRIVER / event_time)
+
+        self.assertItemsEqual(self.events.keys(), refdes_list)
+        for refdes in refdes_list:
+            self.assertEqual([evt['value'] for evt in self.events[refdes]], range(EVENTS_PER_DRIVER))
+        self.assertLess(startup_time, 10)
+
+    def test_register_on_reply(self):
+        router = Mock()
+        self.bus._route(router, ['REFDES-1', 'client', 'reply'])
+        self.assertEqual(self.bus.drivers, set(['REFDES-1']))
+        router.send_multipart.assert_called_once_with(['client', '', 'reply'])
+
+    def test_bus_restart(self):
+        endpoints = []
+        for _ in xrange(3):
+            sock = socket.socket()
+            sock.bind(('127.0.0.1', 0))
+            endpoints.append('tcp://127.0.0.1:%d' % sock.getsockname()[1])
+            sock.close()
+        command, publish, subscribe = endpoints
+
+        bus = ZmqDriverBus(command, publish, subscribe)
+        bus.start()
+        self.start_driver('REFDES-1', command, publish, ready_interval=.2)
+        client = ZmqBusClient(command, subscribe)
+        self.assertEqual(client.wait_for_drivers(['REFDES-1']), ['REFDES-1'])
+        client.stop_messaging()
+        bus.stop()
+
+        # the driver registers with the new bus without being restarted
+        bus = ZmqDriverBus(command, publish, subscribe)
+        bus.start()
+        self.addCleanup(bus.stop)
+        client = ZmqBusClient(command, subscribe)
+        self.addCleanup(client.stop_messaging)
+        self.assertEqual(client.wait_for_drivers(['REFDES-1'], timeout=5), ['REFDES-1'])
+        self.assertEqual(client.cmd_dvr('REFDES-1', 'get_resource_state'), 'DRIVER_STATE_COMMAND')
+
+    def test_request_timeout(self):
+        # nothing bound at the endpoint
+        client = ZmqBusClient('inproc://no_bus', 'inproc://no_bus_subscribe')
+        self.addCleanup(client.stop_messaging)
+        start_time = time.time()
+        self.assertRaises(InstrumentException, client.wait_for_drivers, ['REFDES-1'], timeout=.5)
+        self.assertLess(time.time() - start_time, 5)
+
+        # a registered driver which never replies
+        sock = zmq.Context.instance().socket(zmq.DEALER)
+        sock.setsockopt(zmq.IDENTITY, 'REFDES-SILENT')
+        sock.connect('inproc://command')
+        self.addCleanup(sock.close, linger=0)
+        sock.send('READY')
+        self.client.timeout = .5
+        self.client.wait_for_drivers(['REFDES-SILENT'])
+        self.assertRaises(InstrumentException, self.client.cmd_dvr, 'REFDES-SILENT', 'get_resource_state')
+
+        # the client recovers from the timeout
+        self.start_driver('REFDES-1')
+        self.client.wait_for_drivers(['REFDES-1'])
+        self.assertEqual(self.client.cmd_dvr('REFDES-1', 'get_resource_state'), 'DRIVER_STATE_COMMAND')
+
+    def test_launch_config(self):
+        config = {'dvr_mod': __name__,
+                  'dvr_cls': 'BusTestDriver',
+                  'process_type': (DriverProcessType.PYTHON_MODULE,),
+                  'refdes': 'REFDES-1',
+                  'zmq_bus': {'command': 'tcp://localhost:5590',
+                              'publish': 'tcp://localhost:5591',
+                              'subscribe': 'tcp://localhost:5592'}}
+        command = ZMQPyClassDriverProcess(config)._process_command()
+        self.assertIn('ZmqBusDriverProcess', command[-1])
+        self.assertIn('"REFDES-1", "tcp://localhost:5590", "tcp://localhost:5591"', command[-1])
+
+        del config['refdes']
+        self.assertRaises(DriverLaunchException, ZMQPyClassDriverProcess(config)._process_command)
@@ -14,6 +14,7 @@ Options:
 
 """
 import base64
+import copy
 
 import importlib
 import json
@@ -29,8 +30,9 @@ from docopt import docopt
 from logging import _levelNames
 from mi.core.common import BaseEnum
 from mi.core.exceptions import UnexpectedError, InstrumentCommandException, InstrumentException
-from mi.core.instrument.instrument_driver import DriverAsyncEvent
+from mi.core.instrument.instrument_driver import DriverAsyncEvent, DriverConfigKey
 from mi.core.instrument.publisher import Publisher
+from mi.core.instrument.resource_monitor import ResourceMonitor, ResourcePolicy
 from mi.core.log import get_logger, get_logging_metaclass
 from mi.core.service_registry import ConsulServiceRegistry
 
@@ -50,6 +52,7 @@ class Commands(BaseEnum):
     STOP_WORKER = 'stop_worker'
     DEFAULT = 'default'
     SET_LOG_LEVEL = 'set_log_level'
+    RESOURCE_USAGE = 'resource_usage'
 
 
 class EventKeys(BaseEnum):
@@ -64,6 +67,12 @@ class EventKeys(BaseEnum):
 # semaphore to prevent multiple simultaneous commands into the driver
 COMMAND_SEM = threading.BoundedSemaphore(1)
 
+# driver version by module, metadata.yml is only read once per module
+VERSION_CACHE = {}
+
+# events after which a cached overall state is stale
+STATE_EVENTS = (DriverAsyncEvent.STATE_CHANGE, DriverAsyncEvent.CONFIG_CHANGE, DriverAsyncEvent.DRIVER_CONFIG)
+
 
 def encode_exception(exception):
     if not isinstance(exception, InstrumentException):
@@ -81,6 +90,29 @@ def _decode(data):
     return data
 
 
+class SerializedValue(object):
+    """
+    A reply value already decoded and serialized to JSON
+    """
+    __slots__ = ('json',)
+
+    def __init__(self, value):
+        self.json = json.dumps(_decode(value))
+
+
+def _encode_reply(event):
+    """
+    Serialize a reply event, splicing in a value which is already serialized
+    """
+    value = event.get(EventKeys.VALUE)
+    if not isinstance(value, SerializedValue):
+        return json.dumps(_decode(event))
+
+    # an event always has a time and type besides the value
+    others = json.dumps(_decode({k: v for k, v in event.iteritems() if k != EventKeys.VALUE}))
+    return '{"%s": %s, %s' % (EventKeys.VALUE, value.json, others[1:])
+
+
 def _transform(value):
     flag = '_base64:'
     if isinstance(value, basestring):
@@ -131,6 +163,7 @@ class CommandHandler(threading.Thread):
             Commands.TEST_EVENTS: self._test_events,
             Commands.STOP_DRIVER: self._stop_driver,
             Commands.STOP_WORKER: self._stop_worker,
+            Commands.RESOURCE_USAGE: self._resource_usage,
         }
 
     def _execute(self, raw_command, raw_args, raw_kwargs):
@@ -199,15 +232,12 @@ class CommandHandler(threading.Thread):
         return 'ping from wrapper pid:%s, resource:%s' % (os.getpid(), self.driver)
 
     def _overall_state(self, *args, **kwargs):
-        direct_config = {}
-        if hasattr(self.driver, 'get_direct_config'):
-            direct_config = self.driver.get_direct_config()
-        return {'capabilities': self.driver.get_resource_capabilities(),
-                'state': self.driver.get_resource_state(),
-                'metadata': self.driver.get_config_metadata(),
-                'parameters': self.driver.get_cached_config(),
-                'direct_config': direct_config,
-                'init_params': self.driver.get_init_params()}
+        return self.wrapper.overall_state()
+
+    def _resource_usage(self, *args, **kwargs):
+        if kwargs.get('sample'):
+            return self.wrapper.resource_monitor.sample()
+        return self.wrapper.resource_monitor.last_sample()
 
     def _send_command(self, command, *args, **kwargs):
         if not COMMAND_SEM.acquire(False):
@@ -224,6 +254,8 @@ class CommandHandler(threading.Thread):
             return reply
 
         finally:
+            # any command may change the driver state
+            self.wrapper.state_changed()
             COMMAND_SEM.release()
 
     def cmd_driver(self, msg):
@@ -253,8 +285,8 @@ class CommandHandler(threading.Thread):
                 address, _, request = sock.recv_multipart()
                 msg = json.loads(request)
                 log.info('received message: %r', msg)
-                reply = _decode(self.cmd_driver(msg))
-                sock.send_multipart([address, '', json.dumps(reply)])
+                reply = _encode_reply(self.cmd_driver(msg))
+                sock.send_multipart([address, '', reply])
             except zmq.ContextTerminated:
                 log.info('ZMQ Context terminated, exiting worker thread')
                 break
@@ -363,7 +395,12 @@ class DriverWrapper(object):
         self.load_balancer = None
         self.status_thread = None
         self.particle_count = 0
+        self.state_version = 0
+        self._state_snapshot = None
+        self._state_lock = threading.Lock()
         self.version = self.get_version(driver_module)
+        self.resource_monitor = ResourceMonitor(self, ResourcePolicy.from_config(
+            (init_params or {}).get(DriverConfigKey.RESOURCES)))
 
         headers = {'sensor': self.refdes, 'deliveryType': 'streamed', 'version': self.version, 'module': driver_module}
         log.info('Publish headers set to: %r', headers)
@@ -372,13 +409,54 @@ class DriverWrapper(object):
 
     @staticmethod
     def get_version(driver_module):
+        if driver_module in VERSION_CACHE:
+            return VERSION_CACHE[driver_module]
+
+        version = 'UNVERSIONED'
         module = importlib.import_module(driver_module)
         dirname = os.path.dirname(module.__file__)
         metadata_file = os.path.join(dirname, 'metadata.yml')
         if os.path.exists(metadata_file):
             metadata = yaml.load(open(metadata_file))
-            return metadata.get('driver_metadata', {}).get('version')
-        return 'UNVERSIONED'
+            version = metadata.get('driver_metadata', {}).get('version')
+
+        VERSION_CACHE[driver_module] = version
+        return version
+
+    def state_changed(self):
+        """
+        Mark the cached overall state stale.
+        """
+        self.state_version += 1
+
+    def overall_state(self):
+        """
+        Capabilities, state, metadata, parameters, direct access config and init params
+        of the driver. The serialized reply is reused until the driver state or parameters
+        change, or the driver sends a state, config or port agent config event.
+        @return SerializedValue of the overall state dict
+        """
+        with self._state_lock:
+            version = self.state_version
+            state = self.driver.get_resource_state()
+            parameters = self.driver.get_cached_config()
+
+            snapshot = self._state_snapshot
+            if snapshot is not None and snapshot[:3] == (version, state, parameters):
+                return snapshot[3]
+
+            direct_config = {}
+            if hasattr(self.driver, 'get_direct_config'):
+                direct_config = self.driver.get_direct_config()
+            value = SerializedValue({'capabilities': self.driver.get_resource_capabilities(),
+                                     'state': state,
+                                     'metadata': self.driver.get_config_metadata(),
+                                     'parameters': parameters,
+                                     'direct_config': direct_config,
+                                     'init_params': self.driver.get_init_params()})
+
+            self._state_snapshot = (version, state, copy.deepcopy(parameters), value)
+            return value
 
     def construct_driver(self):
         """
@@ -404,11 +482,15 @@ class DriverWrapper(object):
         if evt[EventKeys.TYPE] == DriverAsyncEvent.ERROR:
             log.error(evt)
 
+        if evt[EventKeys.TYPE] in STATE_EVENTS:
+            self.state_changed()
+
         if evt[EventKeys.TYPE] == DriverAsyncEvent.SAMPLE:
-            if evt[EventKeys.VALUE].get('stream_name') == 'raw':
-                # don't publish raw
+            # raw is only published if the resource policy allows it
+            if not self.resource_monitor.admit_particle(evt[EventKeys.VALUE]):
                 return
 
+            self.particle_count += 1
             self.particle_publisher.enqueue(evt)
         else:
             self.event_publisher.enqueue(evt)
@@ -440,6 +522,7 @@ class DriverWrapper(object):
         """
         self.event_publisher.start()
         self.particle_publisher.start()
+        self.resource_monitor.start()
 
         self.load_balancer = LoadBalancer(self, self.num_workers)
         self.port = self.load_balancer.port
@@ -456,6 +539,7 @@ class DriverWrapper(object):
         Close messaging resource for the driver. Set flags to cause
         command and event threads to close sockets and conclude.
         """
+        self.resource_monitor.stop()
         self.load_balancer.stop()
 
 
@@ -0,0 +1,490 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.zmq_driver_bus
+@file mi/core/instrument/zmq_driver_bus.py
+@brief Shared ZMQ command and event bus for many driver processes.
+
+Without the bus every ZmqDriverProcess binds its own command and event
+sockets and writes their ports to files, and every client connects to every
+driver. With the bus a node runs one ZmqDriverBus proxy:
+
+    command    ROUTER   clients send (refdes, command), drivers connect a
+                        DEALER with identity refdes and register on connect
+                        and every READY_INTERVAL seconds after
+    publish    XSUB     drivers publish (refdes, event)
+    subscribe  XPUB     clients subscribe by refdes, or to everything
+
+Drivers are discovered by asking the bus which refdes are registered, rather
+than by polling port files. A restarted bus learns of the connected drivers
+from their next READY or command reply.
+
+    bus = ZmqDriverBus('tcp://*:5590', 'tcp://*:5591', 'tcp://*:5592')
+    bus.start()
+
+    client = ZmqBusClient('tcp://localhost:5590', 'tcp://localhost:5592')
+    client.discover()
+    client.cmd_dvr('CE01ISSM-MFD35-02-PRESFA000', 'get_resource_state')
+"""
+
+__license__ = 'Apache 2.0'
+
+import cPickle as pickle
+import threading
+import time
+import traceback
+from Queue import Empty
+
+import zmq
+
+from mi.core.common import BaseEnum
+from mi.core.exceptions import InstrumentCommandException, InstrumentException
+from mi.core.instrument.driver_client import DriverClient
+from mi.core.instrument.zmq_driver_process import ZmqDriverProcess, _encode_exception
+from mi.core.log import get_logger
+
+log = get_logger()
+
+# seconds between checks of the stop flags
+POLL_INTERVAL = 0.1
+# seconds between driver registrations, so a restarted bus learns of the driver
+READY_INTERVAL = 5
+# seconds a client waits for the reply to a request
+REQUEST_TIMEOUT = 10
+
+
+class BusMessage(BaseEnum):
+    """
+    Control frames sent from a driver to the bus command socket
+    """
+    READY = 'READY'
+    DONE = 'DONE'
+
+
+# refdes frame of a client request asking for the registered drivers
+DISCOVER = ''
+
+
+def _dumps(obj):
+    return pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+
+
+class ZmqDriverBus(object):
+    """
+    Proxy forwarding commands to drivers by refdes and events from drivers
+    to subscribers. All four sockets are serviced by a single thread.
+    """
+
+    def __init__(self, command_endpoint, publish_endpoint, subscribe_endpoint, context=None):
+        """
+        @param command_endpoint bind endpoint of the command ROUTER
+        @param publish_endpoint bind endpoint drivers publish events to
+        @param subscribe_endpoint bind endpoint clients subscribe to events on
+        @param context zmq context, defaults to the process wide instance
+        """
+        self.command_endpoint = command_endpoint
+        self.publish_endpoint = publish_endpoint
+        self.subscribe_endpoint = subscribe_endpoint
+        self.context = context or zmq.Context.instance()
+        self.drivers = set()
+        self.stop_bus_thread = True
+        self.bus_thread = None
+        self._bound = threading.Event()
+
+    def start(self):
+        """
+        Bind the bus sockets and service them in a daemon thread.
+        Returns once the sockets are bound.
+        """
+        self._bound.clear()
+        self.bus_thread = threading.Thread(target=self.run)
+        self.bus_thread.daemon = True
+        self.bus_thread.start()
+        self._bound.wait()
+
+    def stop(self):
+        """
+        Stop the bus thread and wait for it to close the sockets.
+        """
+        self.stop_bus_thread = True
+        if self.bus_thread:
+            self.bus_thread.join()
+            self.bus_thread = None
+
+    def run(self):
+        """
+        Bind the bus sockets and forward messages until stopped.
+        """
+        router = self.context.socket(zmq.ROUTER)
+        # an unroutable command raises instead of being dropped, so the client gets a reply
+        router.setsockopt(zmq.ROUTER_MANDATORY, 1)
+        router.bind(self.command_endpoint)
+        xsub = self.context.socket(zmq.XSUB)
+        xsub.bind(self.publish_endpoint)
+        xpub = self.context.socket(zmq.XPUB)
+        xpub.bind(self.subscribe_endpoint)
+        log.info('Driver bus bound command %s, publish %s, subscribe %s',
+                 self.command_endpoint, self.publish_endpoint, self.subscribe_endpoint)
+
+        poller = zmq.Poller()
+        poller.register(router, zmq.POLLIN)
+        poller.register(xsub, zmq.POLLIN)
+        poller.register(xpub, zmq.POLLIN)
+
+        self.stop_bus_thread = False
+        self._bound.set()
+        while not self.stop_bus_thread:
+            ready = dict(poller.poll(POLL_INTERVAL * 1000))
+            if xsub in ready:
+                xpub.send_multipart(xsub.recv_multipart())
+            if xpub in ready:
+                # subscriptions travel upstream to the publishing drivers
+                xsub.send_multipart(xpub.recv_multipart())
+            if router in ready:
+                self._route(router, router.recv_multipart())
+
+        for sock in (router, xsub, xpub):
+            sock.close(linger=0)
+        log.info('Driver bus closed')
+
+    def _route(self, router, frames):
+        """
+        Dispatch a message received on the command ROUTER.
+        Driver control:    [refdes, READY | DONE]
+        Driver reply:      [refdes, client, reply]
+        Client request:    [client, '', refdes, request]
+        """
+        if len(frames) == 2 and frames[1] == BusMessage.READY:
+            self._register(frames[0])
+
+        elif len(frames) == 2 and frames[1] == BusMessage.DONE:
+            log.debug('Driver left bus: %s', frames[0])
+            self.drivers.discard(frames[0])
+
+        elif len(frames) == 3:
+            # only a connected driver replies, it may have registered with a previous bus
+            self._register(frames[0])
+            self._send(router, [frames[1], '', frames[2]])
+
+        elif len(frames) == 4 and frames[1] == '':
+            client, _, refdes, request = frames
+            if refdes == DISCOVER:
+                self._send(router, [client, '', _dumps(sorted(self.drivers))])
+            elif refdes not in self.drivers or not self._send(router, [refdes, client, request]):
+                self.drivers.discard(refdes)
+                reply = InstrumentCommandException('Driver %s is not on the bus.' % refdes)
+                self._send(router, [client, '', _dumps(reply)])
+
+        else:
+            log.warn('Driver bus dropped malformed message of %d frames', len(frames))
+
+    def _register(self, refdes):
+        if refdes not in self.drivers:
+            log.debug('Driver registered on bus: %s', refdes)
+            self.drivers.add(refdes)
+
+    def _send(self, router, frames):
+        """
+        @return False if the peer addressed by the first frame is not connected
+        """
+        try:
+            router.send_multipart(frames)
+            return True
+        except zmq.ZMQError as e:
+            if e.errno != zmq.EHOSTUNREACH:
+                raise
+            log.warn('Driver bus peer %r is not connected', frames[0])
+            return False
+
+
+class ZmqBusDriverProcess(ZmqDriverProcess):
+    """
+    A driver process taking commands and publishing events through a
+    ZmqDriverBus rather than binding its own sockets.
+    """
+
+    def __init__(self, driver_module, driver_class, refdes, command_endpoint, publish_endpoint, ppid,
+                 context=None):
+        """
+        @param driver_module The python module containing the driver code.
+        @param driver_class The python driver class.
+        @param refdes Reference designator the driver is addressed by on the bus.
+        @param command_endpoint Connect endpoint of the bus command socket.
+        @param publish_endpoint Connect endpoint drivers publish events to.
+        @param ppid ID of the parent process, used to self destruct when
+        parent dies in test cases.
+        @param context zmq context, defaults to the process wide instance
+        """
+        ZmqDriverProcess.__init__(self, driver_module, driver_class, None, None, ppid)
+        self.refdes = refdes
+        self.command_endpoint = command_endpoint
+        self.publish_endpoint = publish_endpoint
+        self.context = context or zmq.Context.instance()
+        self.ready_interval = READY_INTERVAL
+
+    def start_messaging(self):
+        """
+        Connect to the bus, register the refdes and start the command and
+        event threads.
+        """
+        def recv_cmd_msg(zmq_driver_process):
+            """
+            Await commands from the bus on a DEALER socket identified by refdes,
+            forwarding them to the driver and replying to the requesting client.
+            The driver registers again every ready_interval seconds, the DEALER
+            reconnects to a restarted bus but the bus does not know the driver.
+            """
+            sock = zmq_driver_process.context.socket(zmq.DEALER)
+            sock.setsockopt(zmq.IDENTITY, zmq_driver_process.refdes)
+            sock.connect(zmq_driver_process.command_endpoint)
+            sock.send(BusMessage.READY)
+            next_ready = time.time() + zmq_driver_process.ready_interval
+            log.info('Driver process %s registered on bus %s',
+                     zmq_driver_process.refdes, zmq_driver_process.command_endpoint)
+
+            while not zmq_driver_process.stop_cmd_thread:
+                if time.time() >= next_ready:
+                    try:
+                        sock.send(BusMessage.READY, zmq.NOBLOCK)
+                    except zmq.Again:
+                        log.debug('Driver process %s not connected to bus', zmq_driver_process.refdes)
+                    next_ready = time.time() + zmq_driver_process.ready_interval
+                if not sock.poll(POLL_INTERVAL * 1000):
+                    continue
+                client, request = sock.recv_multipart()
+                reply = zmq_driver_process.cmd_driver(pickle.loads(request))
+                try:
+                    reply = _dumps(reply)
+                except Exception as e:
+                    log.error('Driver process %s reply not picklable: %s', zmq_driver_process.refdes, e)
+                    reply = _dumps(InstrumentCommandException('Driver reply could not be sent: %s' % e))
+                sock.send_multipart([client, reply])
+
+            sock.send(BusMessage.DONE)
+            sock.close(linger=1000)
+            log.info('Driver process %s left bus.', zmq_driver_process.refdes)
+
+        def send_evt_msg(zmq_driver_process):
+            """
+            Await events on the driver process event queue and publish them
+            to the bus with the refdes as topic.
+            """
+            sock = zmq_driver_process.context.socket(zmq.PUB)
+            sock.connect(zmq_driver_process.publish_endpoint)
+
+            while not zmq_driver_process.stop_evt_thread:
+                try:
+                    evt = zmq_driver_process.events.get(timeout=POLL_INTERVAL)
+                except Empty:
+                    continue
+                if isinstance(evt, Exception):
+                    evt = _encode_exception(evt)
+                sock.send_multipart([zmq_driver_process.refdes, _dumps(evt)])
+
+            sock.close(linger=1000)
+            log.info('Driver process %s event socket closed', zmq_driver_process.refdes)
+
+        self.stop_cmd_thread = False
+        self.stop_evt_thread = False
+        self.cmd_thread = threading.Thread(target=recv_cmd_msg, args=(self, ))
+        self.evt_thread = threading.Thread(target=send_evt_msg, args=(self, ))
+        self.cmd_thread.daemon = True
+        self.evt_thread.daemon = True
+        self.cmd_thread.start()
+        self.evt_thread.start()
+        self.messaging_started = True
+
+
+class ZmqBusClient(object):
+    """
+    A single connection to a ZmqDriverBus, used to discover and command
+    every driver on it and to receive their events.
+    """
+
+    def __init__(self, command_endpoint, subscribe_endpoint, context=None, timeout=REQUEST_TIMEOUT):
+        """
+        @param command_endpoint Connect endpoint of the bus command socket.
+        @param subscribe_endpoint Connect endpoint clients subscribe to events on.
+        @param context zmq context, defaults to the process wide instance
+        @param timeout seconds to wait for the reply to a request
+        """
+        self.command_endpoint = command_endpoint
+        self.subscribe_endpoint = subscribe_endpoint
+        self.context = context or zmq.Context.instance()
+        self.timeout = timeout
+        self._cmd_socket = None
+        self._cmd_lock = threading.Lock()
+        self.evt_callback = None
+        self.event_thread = None
+        self.stop_event_thread = True
+
+    def _request(self, refdes, msg, timeout=None):
+        """
+        Send a request to the bus and wait for the reply.
+        @param timeout seconds to wait for the reply, defaults to the client timeout
+        @raise InstrumentException if there is no reply within timeout
+        """
+        if timeout is None:
+            timeout = self.timeout
+        with self._cmd_lock:
+            if self._cmd_socket is None:
+                self._cmd_socket = self.context.socket(zmq.REQ)
+                self._cmd_socket.connect(self.command_endpoint)
+            self._cmd_socket.send_multipart([refdes, _dumps(msg)])
+            if not self._cmd_socket.poll(max(timeout, 0) * 1000):
+                # a REQ socket cannot send again until it has a reply, start over with a new one
+                self._cmd_socket.close(linger=0)
+                self._cmd_socket = None
+                raise InstrumentException('No reply from bus %s within %ss' % (self.command_endpoint, timeout))
+            return pickle.loads(self._cmd_socket.recv())
+
+    def discover(self, timeout=None):
+        """
+        @param timeout seconds to wait for the bus, defaults to the client timeout
+        @return sorted list of the refdes of the drivers registered on the bus
+        @raise InstrumentException if the bus does not reply within timeout
+        """
+        return self._request(DISCOVER, None, timeout)
+
+    def wait_for_drivers(self, refdes_list, timeout=10, interval=0.1):
+        """
+        Wait for drivers to register on the bus.
+        @param refdes_list refdes of the drivers to wait for
+        @param timeout seconds to wait
+        @param interval seconds between discovery requests
+        @return list of the drivers found, all of refdes_list
+        @raise InstrumentException if any driver has not registered within timeout
+        """
+        expected = set(refdes_list)
+        end_time = time.time() + timeout
+        while True:
+            try:
+                missing = expected.difference(self.discover(end_time - time.time()))
+            except InstrumentException as e:
+                raise InstrumentException('Drivers not found on bus: %s (%s)' % (', '.join(sorted(expected)), e))
+            if not missing:
+                return sorted(expected)
+            if time.time() > end_time:
+                raise InstrumentException('Drivers not found on bus: %s' % ', '.join(sorted(missing)))
+            time.sleep(interval)
+
+    def cmd_dvr(self, refdes, cmd, *args, **kwargs):
+        """
+        Command a driver on the bus and return its reply.
+        @param refdes The driver to command.
+        @param cmd The driver command identifier.
+        @param args Positional arguments of the command.
+        @param kwargs Keyword arguments of the command.
+        @retval Command result.
+        @raise InstrumentException if there is no reply within the client timeout
+        """
+        msg = {'cmd': cmd, 'args': args, 'kwargs': kwargs}
+        log.debug('Sending command %s to %s.', msg, refdes)
+        reply = self._request(refdes, msg)
+        log.debug('Reply: %s.', reply)
+
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    def start_messaging(self, evt_callback=None, refdes_list=None):
+        """
+        Subscribe to driver events with a single socket.
+        @param evt_callback called with (refdes, event) for each event
+        @param refdes_list refdes to subscribe to, None for all drivers
+        """
+        self.evt_callback = evt_callback
+        subscribed = threading.Event()
+
+        def recv_evt_messages(client):
+            sock = client.context.socket(zmq.SUB)
+            sock.connect(client.subscribe_endpoint)
+            exact = None
+            if refdes_list is None:
+                sock.setsockopt(zmq.SUBSCRIBE, '')
+            else:
+                # subscriptions match by prefix, keep only exact refdes
+                exact = set(refdes_list)
+                for refdes in exact:
+                    sock.setsockopt(zmq.SUBSCRIBE, refdes)
+            subscribed.set()
+
+            while not client.stop_event_thread:
+                if not sock.poll(POLL_INTERVAL * 1000):
+                    continue
+                refdes, evt = sock.recv_multipart()
+                if exact is not None and refdes not in exact:
+                    continue
+                if client.evt_callback:
+                    try:
+                        client.evt_callback(refdes, pickle.loads(evt))
+                    except Exception:
+                        log.error('Event callback failed: %s', traceback.format_exc())
+
+            sock.close(linger=0)
+            log.info('Bus client event socket closed.')
+
+        self.stop_event_thread = False
+        self.event_thread = threading.Thread(target=recv_evt_messages, args=(self, ))
+        self.event_thread.daemon = True
+        self.event_thread.start()
+        subscribed.wait()
+
+    def stop_messaging(self):
+        """
+        Close the command socket and stop the event thread.
+        """
+        with self._cmd_lock:
+            if self._cmd_socket is not None:
+                self._cmd_socket.close(linger=0)
+                self._cmd_socket = None
+        self.stop_event_thread = True
+        if self.event_thread:
+            self.event_thread.join()
+            self.event_thread = None
+        self.evt_callback = None
+
+
+class ZmqBusDriverClient(DriverClient):
+    """
+    DriverClient for one driver on a ZmqDriverBus, so callers of
+    ZmqDriverClient need not know which mode a driver runs in.
+    """
+
+    def __init__(self, refdes, command_endpoint, subscribe_endpoint):
+        """
+        @param refdes Reference designator of the driver.
+        @param command_endpoint Connect endpoint of the bus command socket.
+        @param subscribe_endpoint Connect endpoint clients subscribe to events on.
+        """
+        DriverClient.__init__(self)
+        self.refdes = refdes
+        self.bus_client = ZmqBusClient(command_endpoint, subscribe_endpoint)
+
+    def start_messaging(self, evt_callback=None):
+        """
+        Start receiving events of this driver.
+        @param evt_callback called with each event
+        """
+        self.evt_callback = evt_callback
+
+        def callback(refdes, evt):
+            if self.evt_callback:
+                self.evt_callback(evt)
+
+        self.bus_client.start_messaging(callback, [self.refdes])
+        log.info('Driver client messaging started for %s.', self.refdes)
+
+    def stop_messaging(self):
+        """
+        Close the bus client.
+        """
+        self.bus_client.stop_messaging()
+        self.evt_callback = None
+        log.info('Driver client messaging closed for %s.', self.refdes)
+
+    def cmd_dvr(self, cmd, *args, **kwargs):
+        """
+        Command the driver and return its reply.
+        """
+        return self.bus_client.cmd_dvr(self.refdes, cmd, *args, **kwargs)
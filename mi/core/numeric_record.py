@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.numeric_record
+@file mi/core/numeric_record.py
+@brief Parse delimited ASCII records of numeric fields
+
+Wide ASCII records (spectra, met packages) were parsed with a regex group and
+an int() or float() call per field. A RecordSchema describes the fields of a
+record once, then parses each record with a numpy text parse per run of
+same-typed fields. Short runs, and runs numpy cannot read exactly, are
+converted value by value, so the values and errors are always those int()
+and float() give.
+
+    schema = RecordSchema([('date', int),
+                           ('time', float),
+                           ('channels', int, 256),
+                           (None, None, 4),
+                           ('checksum', int)])
+    for name, value in schema.parse(record):
+        ...
+"""
+
+__license__ = 'Apache 2.0'
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# below this many values int() and float() beat the numpy call overhead
+NUMPY_RUN_THRESHOLD = 16
+
+# numpy saturates out of range integers to these, they are checked with int()
+_INT64_MAX = 2 ** 63 - 1
+_INT64_MIN = -2 ** 63
+
+
+class RecordField(object):
+    """
+    A field, or a fixed size array of fields, of a record
+    """
+
+    def __init__(self, name, value_type, count=None):
+        """
+        @param name name of the field, None to skip the field
+        @param value_type int, float or str. Ignored for skipped fields.
+        @param count number of values of an array field, None for a single value
+        """
+        if name is not None and value_type not in (int, float, str):
+            raise TypeError('unsupported type %r for field %s' % (value_type, name))
+        if count is not None and count < 1:
+            raise ValueError('field %s must have at least one value' % name)
+
+        self.name = name
+        self.value_type = value_type
+        self.count = count
+
+    @property
+    def width(self):
+        """
+        @return number of delimited values making up the field
+        """
+        return 1 if self.count is None else self.count
+
+    def __repr__(self):
+        return 'RecordField(%r, %r, %r)' % (self.name, self.value_type, self.count)
+
+
+class RecordSchema(object):
+    """
+    Fields of a delimited numeric record
+    """
+
+    def __init__(self, fields, delimiter=','):
+        """
+        @param fields sequence of RecordField or (name, type[, count]) tuples, in record order
+        @param delimiter field delimiter
+        """
+        self.fields = [f if isinstance(f, RecordField) else RecordField(*f) for f in fields]
+        self.delimiter = delimiter
+
+        # consecutive fields of the same numeric type form a run, converted together
+        # [value_type, first token, last token + 1]
+        self._runs = []
+        # (name, first token, last token + 1 for arrays or None) of the fields returned
+        self._layout = []
+        offset = 0
+        for field in self.fields:
+            end = offset + field.width
+            if field.name is not None:
+                self._layout.append((field.name, offset, end if field.count is not None else None))
+                if field.value_type is not str:
+                    if self._runs and self._runs[-1][0] is field.value_type and self._runs[-1][2] == offset:
+                        self._runs[-1][2] = end
+                    else:
+                        self._runs.append([field.value_type, offset, end])
+            offset = end
+        self.width = offset
+
+    def parse(self, record):
+        """
+        Parse a record
+        @param record delimited values, without any line terminator
+        @return list of (name, value) tuples in field order, array fields as lists.
+        Skipped fields are not returned.
+        @raise ValueError if the record does not have the fields of the schema or a value does not convert
+        """
+        tokens = record.split(self.delimiter)
+        if len(tokens) != self.width:
+            raise ValueError('expected %d fields, record has %d' % (self.width, len(tokens)))
+
+        values = list(tokens)
+        for value_type, start, end in self._runs:
+            converted = None
+            if numpy is not None and end - start >= NUMPY_RUN_THRESHOLD:
+                converted = self._convert_numpy(value_type, tokens[start:end])
+            if converted is None:
+                converted = map(value_type, tokens[start:end])
+            values[start:end] = converted
+
+        return [(name, values[start] if end is None else values[start:end]) for name, start, end in self._layout]
+
+    def _convert_numpy(self, value_type, tokens):
+        """
+        Convert a run of tokens with one numpy text parse
+        @return list of values, None if the tokens have to be converted by int() or float()
+        """
+        dtype = numpy.int64 if value_type is int else numpy.float64
+        try:
+            parsed = numpy.fromstring(self.delimiter.join(tokens), dtype=dtype, sep=self.delimiter)
+        except ValueError:
+            return None
+        # numpy stops at the first value it cannot read
+        if len(parsed) != len(tokens):
+            return None
+        if value_type is int and (parsed.max() == _INT64_MAX or parsed.min() == _INT64_MIN):
+            return None
+        return parsed.tolist()
@@ -12,53 +12,144 @@ __author__ = 'Johnathon Rusk'
 __license__ = 'Apache 2.0'
 
 import psycopg2
+import psycopg2.pool
 import json
-from threading import RLock
+from threading import BoundedSemaphore, Event, Lock, RLock, Thread
 from collections import MutableMapping
 
+from mi.core.log import get_logger
+
+log = get_logger()
+
+# First PostgreSQL version supporting INSERT ... ON CONFLICT
+UPSERT_SERVER_VERSION = 90500
+MAX_POOL_CONNECTIONS = 4
+
+_pools = {}
+_poolsLock = Lock()
+
+# marks a pending delete in the write-behind cache
+DELETED = object()
+
+
+class BlockingConnectionPool(psycopg2.pool.ThreadedConnectionPool):
+    """
+    Connection pool which waits for a connection to be returned when all of them
+    are in use, where ThreadedConnectionPool raises PoolError. Connections are
+    not shared by key.
+    """
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        psycopg2.pool.ThreadedConnectionPool.__init__(self, minconn, maxconn, *args, **kwargs)
+        self._available = BoundedSemaphore(maxconn)
+
+    def getconn(self, key = None):
+        self._available.acquire()
+        try:
+            return psycopg2.pool.ThreadedConnectionPool.getconn(self, key)
+        except:
+            self._available.release()
+            raise
+
+    def putconn(self, conn = None, key = None, close = False):
+        try:
+            psycopg2.pool.ThreadedConnectionPool.putconn(self, conn, key, close)
+        finally:
+            self._available.release()
+
+
+def getConnectionPool(database, user, password, host, port):
+    """
+    Connection pool shared by all sessions to the same database with the same credentials
+    """
+    key = (database, user, password, host, port)
+    with _poolsLock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = BlockingConnectionPool(
+                1, MAX_POOL_CONNECTIONS, database = database, user = user, password = password, host = host, port = port)
+        return pool
+
+
 class DatabaseSession(object):
-    def __init__(self, database, user, password, host, port):
+    def __init__(self, database, user, password, host, port, pool = None):
         self.database = database
         self.user = user
         self.password = password
         self.host = host
         self.port = port
+        self.pool = pool
         self.reentrantDepth = 0
-
+        self.failed = False
+
+    def getPool(self):
+        if self.pool is None:
+            self.pool = getConnectionPool(self.database, self.user, self.password, self.host, self.port)
+        return self.pool
+
+    def serverVersion(self):
+        with self:
+            return getattr(self.conn, 'server_version', 0)
+
     def __enter__(self):
         if self.reentrantDepth == 0:
-            # Connect to an existing database
-            self.conn = psycopg2.connect(database = self.database, user = self.user, password = self.password, host = self.host, port = self.port)
-            # Open a cursor to perform database operations
+            # Borrow a connection from the pool
+            self.conn = self.getPool().getconn()
+            # Open a cursor to perform database operations
             self.cur = self.conn.cursor()
+            self.failed = False
         self.reentrantDepth = self.reentrantDepth + 1
         return self.cur
-
+
     def __exit__(self, exception_type, exception_value, traceback):
         self.reentrantDepth = self.reentrantDepth - 1
+        if exception_type is not None and not issubclass(exception_type, (KeyError, TypeError)):
+            self.failed = True
         if self.reentrantDepth == 0:
-            # Make the changes to the database persistent
-            self.conn.commit()
-            # Close communication with the database
-            self.cur.close()
-            self.conn.close()
+            try:
+                if self.failed:
+                    self.conn.rollback()
+                else:
+                    # Make the changes to the database persistent
+                    self.conn.commit()
+                self.cur.close()
+            finally:
+                # Return the connection to the pool, discarding it if the session failed
+                self.getPool().putconn(self.conn, close = self.failed)
+                self.conn = self.cur = None
 
 
 class PersistentStoreDict(MutableMapping):
-    def __init__(self, driver_name, reference_designator, host = "127.0.0.1", port = "5432"):
+    """
+    Dictionary persisted in the instrument_driver.persistent_store table.
+
+    Connections are borrowed from a pool shared by all stores of a database.
+    With cache enabled all items are read once and kept in memory. Writes then
+    go to the database immediately and reach the cache once written, unless
+    flushInterval is set, in which case they are written behind, in one batch
+    every flushInterval seconds and on flush() or close().
+    """
+    def __init__(self, driver_name, reference_designator, host = "127.0.0.1", port = "5432",
+                 cache = False, flushInterval = None, pool = None):
         self.rLock = RLock()
-        self.databaseSession = DatabaseSession("metadata", "awips", "awips", host, port)
+        self.databaseSession = DatabaseSession("metadata", "awips", "awips", host, port, pool)
         self.driver_name = driver_name
         self.reference_designator = reference_designator
         self.stmt_getitem = "SELECT json_value FROM instrument_driver.persistent_store WHERE driver_name = %s AND reference_designator = %s AND key = %s"
-        self.stmt_setitem_insert = "INSERT INTO instrument_driver.persistent_store (driver_name, reference_designator, key, json_value) VALUES (%s, %s, %s, %s)"
-        self.stmt_setitem_update = "UPDATE instrument_driver.persistent_store SET json_value = %s WHERE driver_name = %s AND reference_designator = %s AND key = %s"
+        self.stmt_getmany = "SELECT key, json_value FROM instrument_driver.persistent_store WHERE driver_name = %s AND reference_designator = %s AND key IN %s"
+        self.stmt_getall = "SELECT key, json_value FROM instrument_driver.persistent_store WHERE driver_name = %s AND reference_designator = %s"
+        # {0} is replaced by a "(%s, %s, %s, %s)" row for each item
+        self.stmt_upsert = ("INSERT INTO instrument_driver.persistent_store (driver_name, reference_designator, key, json_value) VALUES {0} "
+                            "ON CONFLICT (driver_name, reference_designator, key) DO UPDATE SET json_value = EXCLUDED.json_value")
+        # Note: "INSERT ... ON CONFLICT" not supported before PostgreSQL 9.5
+        self.stmt_upsert_legacy = ("WITH updated AS (UPDATE instrument_driver.persistent_store SET json_value = %(json_value)s WHERE driver_name = %(driver_name)s AND reference_designator = %(reference_designator)s AND key = %(key)s RETURNING key) "
+                                   "INSERT INTO instrument_driver.persistent_store (driver_name, reference_designator, key, json_value) SELECT %(driver_name)s, %(reference_designator)s, %(key)s, %(json_value)s WHERE NOT EXISTS (SELECT 1 FROM updated)")
         self.stmt_delitem = "DELETE FROM instrument_driver.persistent_store WHERE driver_name = %s AND reference_designator = %s AND key = %s"
+        self.stmt_delmany = "DELETE FROM instrument_driver.persistent_store WHERE driver_name = %s AND reference_designator = %s AND key IN %s"
         self.stmt_iter = "SELECT key FROM instrument_driver.persistent_store WHERE driver_name = %s AND reference_designator = %s"
         self.stmt_len = "SELECT COUNT(key) FROM instrument_driver.persistent_store WHERE driver_name = %s AND reference_designator = %s"
         # Note: "CREATE SCHEMA IF NOT EXISTS" not supported in PostgreSQL 9.2
         self.stmt_setupDatabase_checkIfSchemaExists = "SELECT EXISTS(SELECT 1 FROM pg_namespace WHERE nspname = 'instrument_driver')"
-        self.stmt_setupDatabase_createSchema = "CREATE SCHEMA instrument_driver AUTHORIZATION awips"
+        self.stmt_setupDatabase_createSchema = "CREATE SCHEMA instrument_driver AUTHORIZATION awips"
         self.stmt_setupDatabase_createTableIfNotExists = ("CREATE TABLE IF NOT EXISTS instrument_driver.persistent_store("
                                                           "driver_name text NOT NULL,"
                                                           "reference_designator text NOT NULL,"
@@ -66,10 +157,30 @@ class PersistentStoreDict(MutableMapping):
                                                           "json_value text NOT NULL,"
                                                           "PRIMARY KEY (driver_name, reference_designator, key))")
         self.__setupDatabase()
+        self.legacyUpsert = self.databaseSession.serverVersion() < UPSERT_SERVER_VERSION
+
+        self.cache = None
+        # key -> value to write, or DELETED
+        self.pending = {}
+        self.flushInterval = flushInterval if cache else None
+        self.flushStopped = Event()
+        self.flushThread = None
+        if cache:
+            with self.databaseSession as cur:
+                cur.execute(self.stmt_getall, [self.driver_name, self.reference_designator])
+                self.cache = dict((key, json.loads(jsonValue)) for key, jsonValue in cur.fetchall())
+        if self.flushInterval:
+            self.flushThread = Thread(target = self.__flushPeriodically)
+            self.flushThread.setDaemon(True)
+            self.flushThread.start()
 
     def __getitem__(self, key):
         self.__checkKeyType(key)
         with self.rLock:
+            if self.cache is not None:
+                if key not in self.cache:
+                    raise KeyError("No item found with key: '{0}'".format(key))
+                return self.cache[key]
             with self.databaseSession as cur:
                 cur.execute(self.stmt_getitem, [self.driver_name, self.reference_designator, key])
                 result = cur.fetchone()
@@ -78,33 +189,42 @@ class PersistentStoreDict(MutableMapping):
                 return json.loads(result[0])
 
     def __setitem__(self, key, value):
-        self.__checkKeyType(key)
-        self.__checkValueType(value)
-        with self.rLock:
-            with self.databaseSession as cur:
-                if key in self:
-                    cur.execute(self.stmt_setitem_update, [json.dumps(value), self.driver_name, self.reference_designator, key])
-                else:
-                    cur.execute(self.stmt_setitem_insert, [self.driver_name, self.reference_designator, key, json.dumps(value)])
+        self.update({key: value})
 
     def __delitem__(self, key):
         self.__checkKeyType(key)
         with self.rLock:
-            with self.databaseSession as cur:
-                if key not in self:
+            if self.cache is not None:
+                if key not in self.cache:
                     raise KeyError("No item found with key: '{0}'".format(key))
+                if self.flushInterval:
+                    del self.cache[key]
+                    self.pending[key] = DELETED
+                    return
+                with self.databaseSession as cur:
+                    cur.execute(self.stmt_delitem, [self.driver_name, self.reference_designator, key])
+                del self.cache[key]
+                return
+            with self.databaseSession as cur:
                 cur.execute(self.stmt_delitem, [self.driver_name, self.reference_designator, key])
-
+                if cur.rowcount == 0:
+                    raise KeyError("No item found with key: '{0}'".format(key))
+
     def __iter__(self):
         with self.rLock:
-            with self.databaseSession as cur:
-                cur.execute(self.stmt_iter, [self.driver_name, self.reference_designator])
-                result = cur.fetchall()
-                for row in result:
-                    yield row[0]
-
+            if self.cache is not None:
+                keys = self.cache.keys()
+            else:
+                with self.databaseSession as cur:
+                    cur.execute(self.stmt_iter, [self.driver_name, self.reference_designator])
+                    keys = [row[0] for row in cur.fetchall()]
+        for key in keys:
+            yield key
+
     def __len__(self):
         with self.rLock:
+            if self.cache is not None:
+                return len(self.cache)
             with self.databaseSession as cur:
                 cur.execute(self.stmt_len, [self.driver_name, self.reference_designator])
                 result = cur.fetchone()
@@ -112,6 +232,97 @@ class PersistentStoreDict(MutableMapping):
                     raise Exception("Program error: Database query for __len__ method failed to return a value.")
                 return result[0]
 
+    def update(self, *args, **kwargs):
+        """
+        Set several items, with a single statement (one per item before PostgreSQL 9.5)
+        """
+        items = dict(*args, **kwargs)
+        for key, value in items.iteritems():
+            self.__checkKeyType(key)
+            self.__checkValueType(value)
+        if not items:
+            return
+        with self.rLock:
+            if self.flushInterval:
+                self.cache.update(items)
+                self.pending.update(items)
+                return
+            with self.databaseSession as cur:
+                self.__upsert(cur, items)
+            if self.cache is not None:
+                self.cache.update(items)
+
+    def get_many(self, keys):
+        """
+        @return dict of the items found for keys, with a single round trip to the database
+        """
+        keys = list(keys)
+        for key in keys:
+            self.__checkKeyType(key)
+        with self.rLock:
+            if self.cache is not None:
+                return dict((key, self.cache[key]) for key in keys if key in self.cache)
+            if not keys:
+                return {}
+            with self.databaseSession as cur:
+                cur.execute(self.stmt_getmany, [self.driver_name, self.reference_designator, tuple(keys)])
+                return dict((key, json.loads(jsonValue)) for key, jsonValue in cur.fetchall())
+
+    def flush(self):
+        """
+        Write any pending changes to the database, with one statement for the
+        deleted items and one for the others
+        """
+        with self.rLock:
+            if not self.pending:
+                return
+            pending = self.pending
+            self.pending = {}
+            try:
+                with self.databaseSession as cur:
+                    deleted = [key for key, value in pending.iteritems() if value is DELETED]
+                    if deleted:
+                        cur.execute(self.stmt_delmany, [self.driver_name, self.reference_designator, tuple(deleted)])
+                    self.__upsert(cur, dict((key, value) for key, value in pending.iteritems()
+                                            if value is not DELETED))
+            except:
+                # keep the changes, unless overwritten meanwhile, for the next flush
+                pending.update(self.pending)
+                self.pending = pending
+                raise
+
+    def close(self):
+        """
+        Stop writing behind and flush any pending changes
+        """
+        self.flushStopped.set()
+        if self.flushThread is not None:
+            self.flushThread.join()
+            self.flushThread = None
+        self.flush()
+
+    def __upsert(self, cur, items):
+        if not items:
+            return
+        if self.legacyUpsert:
+            cur.executemany(self.stmt_upsert_legacy, [{'driver_name': self.driver_name,
+                                                       'reference_designator': self.reference_designator,
+                                                       'key': key, 'json_value': json.dumps(value)}
+                                                      for key, value in items.iteritems()])
+            return
+        parameters = []
+        for key, value in items.iteritems():
+            parameters.extend([self.driver_name, self.reference_designator, key, json.dumps(value)])
+        cur.execute(self.stmt_upsert.format(", ".join(["(%s, %s, %s, %s)"] * len(items))), parameters)
+
+    def __flushPeriodically(self):
+        while not self.flushStopped.wait(self.flushInterval):
+            try:
+                self.flush()
+            except Exception as e:
+                log.error('Unable to flush persistent store for %s %s: %r',
+                          self.driver_name, self.reference_designator, e)
+
     def __checkKeyType(self, key):
         if type(key) not in [str, unicode]:
             raise TypeError("Key must be of type 'str' or 'unicode'.")
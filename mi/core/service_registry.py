@@ -1,7 +1,8 @@
+import base64
 import json
 import time
 from collections import MutableMapping
-from threading import Thread
+from threading import Event, RLock, Thread
 
 import consul
 from mi.core.exceptions import InstrumentParameterException
@@ -11,6 +12,11 @@ from requests import ConnectionError
 DRIVER_SERVICE_NAME = 'instrument_driver'
 DRIVER_SERVICE_TTL = 60
 CONSUL = consul.Consul()
+# maximum number of operations in a consul transaction
+MAX_TXN_OPERATIONS = 64
+# blocking query wait for the persistent store cache watch
+WATCH_WAIT = '60s'
+WATCH_RETRY_INTERVAL = 5
 
 
 class ConsulServiceRegistry(object):
@@ -71,28 +77,163 @@ class ConsulServiceRegistry(object):
 
 
 class ConsulPersistentStore(MutableMapping):
-    def __init__(self, reference_designator, prefix='persist'):
+    """
+    Dictionary persisted in the consul KV store, under <refdes>/<prefix>/.
+
+    With cache enabled all items are read once and kept in memory, consistent
+    with changes made by others through a blocking query watch. Writes update
+    the cache immediately and are sent to consul in a single transaction,
+    either right away or, when flush_interval is set, every flush_interval
+    seconds and on flush() or close().
+    """
+    def __init__(self, reference_designator, prefix='persist', cache=False, flush_interval=None, client=None):
         self.refdes = reference_designator
         self.prefix = prefix
+        self.client = client if client is not None else CONSUL
+
+        self._lock = RLock()
+        self._cache = None
+        self._index = None
+        # key -> json value to write, or None to delete
+        self._pending = {}
+        # incremented by each flush, results of watches spanning a flush may be stale
+        self._generation = 0
+        self._flush_interval = flush_interval if cache else None
+        self._stopped = Event()
+        self._flusher = None
+        self._watcher = None
+
+        if cache:
+            with self._lock:
+                self._load(*self._get_all())
+            self._watcher = Thread(target=self._watch)
+            self._watcher.setDaemon(True)
+            self._watcher.start()
+            if self._flush_interval:
+                self._flusher = Thread(target=self._flush_periodically)
+                self._flusher.setDaemon(True)
+                self._flusher.start()
 
     def __getitem__(self, key):
+        if self._cache is not None:
+            self._make_key(key)
+            with self._lock:
+                return self._cache[key]
         return self._get_one(key)
 
     def __iter__(self):
+        if self._cache is not None:
+            with self._lock:
+                return iter(self._cache.keys())
         return self._get_iter()
 
     def __delitem__(self, key):
+        if self._cache is not None:
+            self._make_key(key)
+            with self._lock:
+                del self._cache[key]
+                self._pending[key] = None
+                self._write_through()
+            return
         self._delete(key)
 
     def __setitem__(self, key, value):
+        if self._cache is not None:
+            self._make_key(key)
+            json_value = json.dumps(value)
+            with self._lock:
+                self._cache[key] = json.loads(json_value)
+                self._pending[key] = json_value
+                self._write_through()
+            return
         self._put(key, value)
 
     def __len__(self):
+        if self._cache is not None:
+            with self._lock:
+                return len(self._cache)
         return len(list(self._get_iter()))
 
     def __repr__(self):
         return str(dict(self.iteritems()))
 
+    def flush(self):
+        """
+        Write any pending changes to consul
+        """
+        with self._lock:
+            if not self._pending:
+                return
+            pending = self._pending
+            self._pending = {}
+            operations = []
+            for key, json_value in pending.iteritems():
+                if json_value is None:
+                    operations.append({'KV': {'Verb': 'delete', 'Key': self._make_key(key)}})
+                else:
+                    operations.append({'KV': {'Verb': 'set', 'Key': self._make_key(key),
+                                              'Value': base64.b64encode(json_value)}})
+            try:
+                self._generation += 1
+                for index in xrange(0, len(operations), MAX_TXN_OPERATIONS):
+                    self.client.txn.put(operations[index:index + MAX_TXN_OPERATIONS])
+            except Exception as e:
+                # keep the changes, unless overwritten meanwhile, for the next flush
+                pending.update(self._pending)
+                self._pending = pending
+                if isinstance(e, ConnectionError):
+                    raise InstrumentParameterException('Unable to connect to Consul')
+                raise
+
+    def close(self):
+        """
+        Stop the cache threads and write any pending changes
+        """
+        self._stopped.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+
+    def _write_through(self):
+        if not self._flush_interval:
+            self.flush()
+
+    def _flush_periodically(self):
+        while not self._stopped.wait(self._flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                log.error('Unable to flush persistent store for %s: %r', self.refdes, e)
+
+    def _load(self, index, values):
+        """
+        Replace the cache with the values read from consul, keeping any pending changes
+        """
+        cache = {}
+        for each in values or []:
+            cache[self._strip_key(each['Key'])] = json.loads(each['Value'])
+        for key, json_value in self._pending.iteritems():
+            if json_value is None:
+                cache.pop(key, None)
+            else:
+                cache[key] = json.loads(json_value)
+        self._cache = cache
+        self._index = index
+
+    def _watch(self):
+        while not self._stopped.is_set():
+            generation = self._generation
+            try:
+                index, values = self._get_all(index=self._index, wait=WATCH_WAIT)
+            except Exception as e:
+                log.error('Unable to watch persistent store for %s: %r', self.refdes, e)
+                self._stopped.wait(WATCH_RETRY_INTERVAL)
+                continue
+            with self._lock:
+                if index != self._index and generation == self._generation and not self._stopped.is_set():
+                    self._load(index, values)
+
     def _make_key(self, key=None):
         if key is None:
             return '/'.join((self.refdes, self.prefix))
@@ -101,11 +242,14 @@ class ConsulPersistentStore(MutableMapping):
             raise InstrumentParameterException('Persistent store keys MUST be strings')
         return '/'.join((self.refdes, self.prefix, key))
 
+    def _strip_key(self, key):
+        return key.split(self._make_key(), 1)[1][1:]
+
     def _put(self, key, value):
         try:
             my_key = self._make_key(key)
             json_value = json.dumps(value)
-            CONSUL.kv.put(my_key, json_value)
+            self.client.kv.put(my_key, json_value)
         except ConnectionError:
             raise InstrumentParameterException('Unable to connect to Consul')
 
@@ -115,27 +259,28 @@ class ConsulPersistentStore(MutableMapping):
             # fetch first, as consul will not raise KeyError
             # when deleting a KV that does not exist.
             self._get_one(key)
-            CONSUL.kv.delete(my_key)
+            self.client.kv.delete(my_key)
         except ConnectionError:
             raise InstrumentParameterException('Unable to connect to Consul')
 
     def _get_one(self, key):
         key = self._make_key(key)
         try:
-            _, value = CONSUL.kv.get(key)
+            _, value = self.client.kv.get(key)
             if value is None:
                 raise KeyError
             return json.loads(value['Value'])
         except ConnectionError:
             raise InstrumentParameterException('Unable to connect to Consul')
 
-    def _get_iter(self):
-        key = self._make_key()
+    def _get_all(self, index=None, wait=None):
         try:
-            _, value = CONSUL.kv.get(key, recurse=True)
-            if value is None:
-                return iter(())
-            return (each['Key'].split(key, 1)[1][1:] for each in value)
+            return self.client.kv.get(self._make_key(), recurse=True, index=index, wait=wait)
         except ConnectionError:
             raise InstrumentParameterException('Unable to connect to Consul')
 
+    def _get_iter(self):
+        _, value = self._get_all()
+        if value is None:
+            return iter(())
+        return (self._strip_key(each['Key']) for each in value)
@@ -5,33 +5,47 @@
 @author Peter Cable
 @brief Move messages from rabbitMQ to QPID
 
+Messages are sent to QPID asynchronously, with up to <window> messages
+awaiting settlement by the QPID broker. A rabbitMQ message is only acked once
+QPID has settled it, and settled messages are acked in batches.
+
 Usage:
-    shovel <rabbit_url> <rabbit_queue> <rabbit_key> <qpid_url> <qpid_queue>
+    shovel <rabbit_url> <rabbit_queue> <rabbit_key> <qpid_url> <qpid_queue> [options]
 
 Options:
     -h, --help          Show this screen.
+    --prefetch=<n>      rabbitMQ prefetch count [default: 200]
+    --window=<n>        Maximum messages awaiting QPID settlement [default: 100]
+    --ack-batch=<n>     Settled messages to ack upstream at once [default: 50]
 
 """
 import time
+from collections import deque
 from threading import Thread
 
 import qpid.messaging as qm
 from docopt import docopt
 from kombu import Connection, Queue, Exchange
 from kombu.mixins import ConsumerMixin
-from librabbitmq import ChannelError
 from mi.core.log import LoggerManager
 from mi.logging import log
 
 LoggerManager()
 
+DEFAULT_PREFETCH = 200
+DEFAULT_WINDOW = 100
+DEFAULT_ACK_BATCH = 50
+# seconds before settled messages are acked even if a batch is not complete
+ACK_INTERVAL = 1
+
 
 class QpidProducer(object):
-    def __init__(self, url, queue, username='guest', password='guest'):
+    def __init__(self, url, queue, username='guest', password='guest', window=DEFAULT_WINDOW):
         self.url = url
         self.username = username
         self.password = password
         self.queue = queue
+        self.window = window
         self.sender = None
 
     def connect(self):
@@ -43,6 +57,8 @@ class QpidProducer(object):
                 connection.open()
                 session = connection.session()
                 self.sender = session.sender('%s; {create: always, node: {type: queue, durable: true}}' % self.queue)
+                # an asynchronous send blocks while the window is full
+                self.sender.capacity = self.window
                 log.info('Shovel connected to QPID')
                 return
             except qm.ConnectError:
@@ -50,20 +66,50 @@ class QpidProducer(object):
                 time.sleep(delay)
                 delay = min(max_delay, delay*2)
 
-    def send(self, message, headers):
+    def send(self, message, headers, sync=True):
+        """
+        Send a message to QPID
+        @param message message content
+        @param headers message properties
+        @param sync wait for the broker to settle the message. Otherwise only
+        wait while <window> messages are unsettled.
+        """
         if self.sender is None:
             self.connect()
         message = qm.Message(content=message, content_type='text/plain', durable=True,
                              properties=headers, user_id='guest')
-        self.sender.send(message, sync=True)
+        self.sender.send(message, sync=sync)
+
+    def unsettled(self):
+        """
+        @return number of sent messages the broker has not settled yet
+        """
+        if self.sender is None:
+            return 0
+        return self.sender.unsettled()
 
 
 class RabbitConsumer(ConsumerMixin):
-    def __init__(self, url, queue, routing_key, qpid):
+    def __init__(self, url, queue, routing_key, qpid, prefetch=DEFAULT_PREFETCH, ack_batch=DEFAULT_ACK_BATCH):
+        """
+        @param prefetch maximum unacked messages rabbitMQ delivers. Should be at least
+        the QPID window plus ack_batch so delivery does not stall waiting for acks.
+        @param ack_batch settled messages acked at once
+        """
         self.connection = Connection(hostname=url)
         self.exchange = Exchange(name='amq.direct', type='direct', channel=self.connection)
         self.qpid = qpid
+        self.prefetch = prefetch
+        self.ack_batch = ack_batch
+        # messages are settled by QPID in the order sent
+        self.pending = deque()
+        self.settled = deque()
+        self.last_ack = time.time()
+        # broker acks can cover all earlier deliveries, virtual transports ack one message at a time
+        self.multiple_ack = self.connection.transport.driver_type == 'amqp'
         self.count = 0
+        self.sent = 0
+        self.acks = 0
 
         kwargs = {
             'exchange': self.exchange,
@@ -77,30 +123,94 @@ class RabbitConsumer(ConsumerMixin):
         try:
             self.queue = Queue(**kwargs)
             self.queue.queue_declare(passive=True)
-        except ChannelError:
+        except self.connection.channel_errors:
             self.queue = Queue(auto_delete=True, **kwargs)
 
     def get_consumers(self, Consumer, channel):
         c = Consumer([self.queue], callbacks=[self.on_message])
-        c.qos(prefetch_count=100)
+        c.qos(prefetch_count=self.prefetch)
         return [c]
 
     def on_message(self, body, message):
         try:
-            self.qpid.send(str(body), message.headers)
-            message.ack()
-            self.count += 1
-        except Exception as e:
+            self.qpid.send(str(body), message.headers, sync=False)
+        except Exception:
             log.exception('Exception while publishing message to QPID, requeueing')
+            self.requeue(message)
+            return
+
+        self.pending.append(message)
+        self.sent += 1
+        self.on_iteration()
+
+    def on_iteration(self):
+        try:
+            self.settle()
+        except Exception:
+            log.exception('Exception while settling messages sent to QPID, requeueing')
+            self.requeue()
+
+    def settle(self):
+        """
+        Move messages settled by QPID from pending, and ack them upstream once a
+        batch is complete or ACK_INTERVAL has passed.
+        """
+        for _ in xrange(len(self.pending) - self.qpid.unsettled()):
+            self.settled.append(self.pending.popleft())
+        self.ack()
+
+    def ack(self, flush=False):
+        """
+        Ack settled messages upstream
+        @param flush ack even if a batch is not complete
+        """
+        if self.settled and (flush or len(self.settled) >= self.ack_batch or
+                             time.time() - self.last_ack >= ACK_INTERVAL):
+            if self.multiple_ack:
+                self.settled[-1].ack(multiple=True)
+            else:
+                for message in self.settled:
+                    message.ack()
+            self.count += len(self.settled)
+            self.acks += 1
+            self.settled.clear()
+            self.last_ack = time.time()
+
+    def requeue(self, message=None):
+        """
+        Requeue the messages QPID has not settled and reconnect to QPID on the next send.
+        The settlement state of a failed connection is not trusted, so messages sent since
+        the last settle may be delivered twice.
+        """
+        try:
+            self.ack(flush=True)
+        except Exception:
+            log.exception('Unable to ack settled messages')
+
+        for pending in self.pending:
+            pending.requeue()
+        self.pending.clear()
+        if message is not None:
             message.requeue()
-            self.qpid.sender = None
+        self.qpid.sender = None
+
+    def on_connection_revived(self):
+        # rabbitMQ requeues the unacked messages of a lost connection, they can no longer be acked
+        self.pending.clear()
+        self.settled.clear()
+
+    def in_flight(self):
+        """
+        @return number of messages sent to QPID or settled but not yet acked upstream
+        """
+        return len(self.pending) + len(self.settled)
 
     def get_current_queue_depth(self):
         try:
             result = self.queue.queue_declare(passive=True)
             name = result.queue
             count = result.message_count
-        except ChannelError:
+        except self.connection.channel_errors:
             if self.count > 0:
                 log.exception('Exception getting queue count')
             name = 'UNK'
@@ -126,7 +236,8 @@ class StatsReporter(Thread):
                     rate = float(sent_count - self.last_count) / elapsed
                 else:
                     rate = -1
-                log.info('Queue: %s Depth: %d Sent Count: %d Rate: %.2f/s', queue_name, queue_depth, sent_count, rate)
+                log.info('Queue: %s Depth: %d Sent Count: %d Rate: %.2f/s In Flight: %d Ack Batches: %d',
+                         queue_name, queue_depth, sent_count, rate, self.rabbit.in_flight(), self.rabbit.acks)
 
             self.last_time = now
             self.last_count = sent_count
@@ -142,10 +253,13 @@ def main():
     rabbit_url = options['<rabbit_url>']
     rabbit_queue = options['<rabbit_queue>']
     rabbit_key = options['<rabbit_key>']
+    prefetch = int(options['--prefetch'])
+    window = int(options['--window'])
+    ack_batch = int(options['--ack-batch'])
     log.info('Starting shovel: %r', options)
 
-    qpid = QpidProducer(qpid_url, qpid_queue)
-    rabbit = RabbitConsumer(rabbit_url, rabbit_queue, rabbit_key, qpid)
+    qpid = QpidProducer(qpid_url, qpid_queue, window=window)
+    rabbit = RabbitConsumer(rabbit_url, rabbit_queue, rabbit_key, qpid, prefetch=prefetch, ack_batch=ack_batch)
     reporter = StatsReporter(rabbit)
     reporter.daemon = True
     reporter.start()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.test.test_checksum
+@file mi/core/test/test_checksum.py
+@brief Test cases for the checksum kernels, against the per-character implementations
+"""
+
+__license__ = 'Apache 2.0'
+
+import random
+
+from mock import patch
+from nose.plugins.attrib import attr
+
+from mi.core import checksum
+from mi.core.checksum import crc_kermit, crc_kermit_many, crc_xmodem, sum_bytes, sum_bytes_many, sum_hex_bytes, \
+    sum_hex_bytes_many, xor_checksum, xor_checksums, xor_prefix
+from mi.core.unit_test import MiUnitTest
+
+
+def reference_crc3kerm(buf):
+    crcta = [0, 4225, 8450, 12675, 16900, 21125, 25350, 29575,
+             33800, 38025, 42250, 46475, 50700, 54925, 59150, 63375]
+    crctb = [0, 4489, 8978, 12955, 17956, 22445, 25910, 29887,
+             35912, 40385, 44890, 48851, 51820, 56293, 59774, 63735]
+    crc = 0
+    for i in range(0, len(buf)):
+        c = crc ^ ord(buf[i])
+        hi4 = (c & 240) >> 4
+        lo4 = c & 15
+        crc = (crc >> 8) ^ (crcta[hi4] ^ crctb[lo4])
+    return crc
+
+
+def reference_lrc(data, seed=0):
+    for val in bytearray(data):
+        seed ^= val
+    return seed
+
+
+def reference_lrc_ord(data, seed=0):
+    for c in data:
+        seed ^= ord(c)
+    return seed
+
+
+def reference_sami_crc(s):
+    cs = 0
+    for index in xrange(0, len(s), 2):
+        cs += int(s[index:index + 2], 16)
+    cs &= 0xFF
+    return cs
+
+
+@attr('UNIT', group='mi')
+class TestChecksum(MiUnitTest):
+    def setUp(self):
+        rand = random.Random(42)
+        self.records = [''.join(chr(rand.randint(0, 255)) for _ in xrange(rand.randint(0, 300)))
+                        for _ in xrange(200)]
+        self.records += ['', 'a', '#1_TEST 1 2 3', '\xff' * 1000]
+        self.hex_records = [''.join(rand.choice('0123456789abcdefABCDEF') for _ in xrange(rand.randint(0, 80)))
+                            for _ in xrange(200)]
+
+    def test_crc_kermit(self):
+        for record in self.records:
+            self.assertEqual(crc_kermit(record), reference_crc3kerm(record))
+        # running CRC
+        self.assertEqual(crc_kermit('world', crc_kermit('hello ')), crc_kermit('hello world'))
+        # the check value of CRC-16/KERMIT
+        self.assertEqual(crc_kermit('123456789'), 0x2189)
+
+    def test_crc_xmodem(self):
+        # the check value of CRC-16/XMODEM
+        self.assertEqual(crc_xmodem('123456789'), 0x31c3)
+        self.assertEqual(crc_xmodem('6789', crc_xmodem('12345')), 0x31c3)
+        self.assertEqual(crc_xmodem(''), 0)
+
+    def test_unicode(self):
+        # one byte per character, as the ord() based versions
+        for record in self.records[:20] + ['\xff' * 1000]:
+            text = record.decode('latin-1')
+            self.assertEqual(crc_kermit(text), reference_crc3kerm(text))
+            self.assertEqual(xor_checksum(text), reference_lrc_ord(text))
+            self.assertEqual(crc_xmodem(text), crc_xmodem(record))
+            self.assertEqual(sum_bytes(text), sum_bytes(record))
+        self.assertRaises(UnicodeEncodeError, xor_checksum, u'\u20ac')
+        self.assertRaises(UnicodeEncodeError, crc_kermit, u'\u20ac')
+
+    def test_crc_kermit_many(self):
+        self.assertEqual(crc_kermit_many(self.records).tolist(), [reference_crc3kerm(r) for r in self.records])
+        self.assertEqual(crc_kermit_many([]).tolist(), [])
+        self.assertEqual(crc_kermit_many(['', '']).tolist(), [0, 0])
+
+    def test_xor_checksum(self):
+        for record in self.records:
+            self.assertEqual(xor_checksum(record), reference_lrc(record))
+            self.assertEqual(xor_checksum(record, 0x5a), reference_lrc(record, 0x5a))
+            self.assertEqual(xor_checksum(buffer(record)), reference_lrc(record))
+
+    def test_without_numpy(self):
+        with patch.object(checksum, 'numpy', None):
+            for record in self.records:
+                self.assertEqual(xor_checksum(record, 0x5a), reference_lrc(record, 0x5a))
+                self.assertEqual(crc_kermit(record), reference_crc3kerm(record))
+                self.assertEqual(sum_hex_bytes(record.encode('hex')), reference_sami_crc(record.encode('hex')))
+
+    def test_xor_checksums(self):
+        data = ''.join(self.records)
+        starts, ends = [], []
+        offset = 0
+        for record in self.records:
+            starts.append(offset)
+            offset += len(record)
+            ends.append(offset)
+        expected = [reference_lrc(record) for record in self.records]
+        self.assertEqual(xor_checksums(data, starts, ends).tolist(), expected)
+        self.assertEqual(xor_checksums(data, starts, ends, xor_prefix(data)).tolist(), expected)
+        self.assertEqual(xor_checksums(data, [], []).tolist(), [])
+
+    def test_sum_bytes(self):
+        self.assertEqual(sum_bytes('\x01\x02\xff'), 0x102)
+        self.assertEqual(sum_bytes('\xff' * 300, 5), (5 + 0xff * 300) & 0xffff)
+
+        data = ''.join(self.records)
+        starts, ends = [], []
+        offset = 0
+        for record in self.records:
+            starts.append(offset)
+            offset += len(record)
+            ends.append(offset)
+        self.assertEqual(sum_bytes_many(data, starts, ends, 7).tolist(), [sum_bytes(r, 7) for r in self.records])
+        self.assertEqual(sum_bytes_many(data, [], []).tolist(), [])
+
+    def test_sum_hex_bytes(self):
+        for record in self.hex_records + ['', 'F', ' 1 2', '+1']:
+            self.assertEqual(sum_hex_bytes(record), reference_sami_crc(record))
+        self.assertRaises(ValueError, sum_hex_bytes, '0G')
+        self.assertRaises(ValueError, sum_hex_bytes, '00G')
+
+    def test_sum_hex_bytes_many(self):
+        self.assertEqual(sum_hex_bytes_many(self.hex_records).tolist(),
+                         [reference_sami_crc(r) for r in self.hex_records])
+        self.assertEqual(sum_hex_bytes_many(['abc', 'ab', 'a']).tolist(), [0xab + 0xc, 0xab, 0xa])
+        self.assertEqual(sum_hex_bytes_many([]).tolist(), [])
+        self.assertRaises(ValueError, sum_hex_bytes_many, ['00', '0G'])
@@ -0,0 +1,523 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.test.test_heap_scheduler
+@file mi/core/test/test_heap_scheduler.py
+@brief Unit tests for the timer heap scheduler, ported from the scheduler and
+       driver scheduler tests
+"""
+
+__license__ = 'Apache 2.0'
+
+import datetime
+import time
+
+from apscheduler.util import timedelta_seconds
+from nose.plugins.attrib import attr
+
+from mi.core.driver_scheduler import DriverScheduler
+from mi.core.driver_scheduler import DriverSchedulerConfigKey
+from mi.core.driver_scheduler import TriggerType
+from mi.core.exceptions import SchedulerException
+from mi.core.heap_scheduler import HeapScheduler, IntervalTimer, TimerHeap, get_timer_heap
+from mi.core.log import get_logger
+from mi.core.unit_test import MiUnitTest
+
+log = get_logger()
+
+
+class SchedulerTestMixin(object):
+    """
+    Event recording and assertions shared by the test cases
+    """
+    def _callback(self):
+        """
+        event callback for event processing
+        """
+        log.debug("Event triggered.")
+        self._triggered.append(datetime.datetime.now())
+
+    def assert_datetime_close(self, ldate, rdate, delta_seconds=0.1):
+        """
+        compare two date time objects to see if they are equal within delta_seconds
+        """
+        seconds = timedelta_seconds(ldate - rdate)
+        self.assertLessEqual(abs(seconds), delta_seconds)
+
+    def assert_event_triggered(self, expected_arrival=None, poll_time=0.1, timeout=10):
+        """
+        Verify a timer was triggered within the timeout, and if expected arrival
+        is set, check the time it arrived too.
+        """
+        endtime = datetime.datetime.now() + datetime.timedelta(0, timeout)
+
+        while len(self._triggered) == 0 and datetime.datetime.now() < endtime:
+            time.sleep(poll_time)
+
+        self.assertGreater(len(self._triggered), 0)
+        arrival_time = self._triggered.pop(0)
+        if expected_arrival is not None:
+            self.assert_datetime_close(arrival_time, expected_arrival, poll_time)
+
+    def assert_event_not_triggered(self, timeout=4):
+        time.sleep(timeout)
+        self.assertEqual(len(self._triggered), 0)
+
+
+@attr('UNIT', group='mi')
+class TestTimerHeap(MiUnitTest):
+    def test_order_and_cancel(self):
+        """
+        Timers fire in deadline order, cancelled timers don't fire
+        """
+        heap = TimerHeap()
+        fired = []
+        now = time.time()
+        for delay in (0.3, 0.1, 0.2, 0.15):
+            heap.schedule(now + delay, lambda d=delay: fired.append(d))
+        timer = heap.schedule(now + 0.05, lambda: fired.append('cancelled'))
+        self.assertTrue(heap.cancel(timer))
+        self.assertFalse(heap.cancel(timer))
+        self.assertEqual(len(heap), 4)
+
+        time.sleep(0.5)
+        self.assertEqual(fired, [0.1, 0.15, 0.2, 0.3])
+        self.assertEqual(len(heap), 0)
+
+    def test_compaction(self):
+        """
+        Mass cancellation doesn't leave the heap full of dead timers
+        """
+        heap = TimerHeap()
+        far = time.time() + 3600
+        timers = [heap.schedule(far + i, lambda: None) for i in xrange(1000)]
+        for timer in timers[:900]:
+            heap.cancel(timer)
+        self.assertEqual(len(heap), 100)
+        self.assertLess(len(heap._heap), 1000)
+        for timer in timers[900:]:
+            heap.cancel(timer)
+        self.assertEqual(len(heap), 0)
+
+    def test_shared_heap(self):
+        """
+        All schedulers share the process timer heap
+        """
+        self.assertIs(get_timer_heap(), get_timer_heap())
+        self.assertIs(HeapScheduler()._timer_heap, HeapScheduler()._timer_heap)
+
+    def test_interval_timer(self):
+        """
+        Interval run times stay on the start + k * interval grid
+        """
+        timer = IntervalTimer(datetime.timedelta(seconds=3), 1000.0)
+        self.assertEqual(timer.next_fire_time(900.0), 1003.0)
+        self.assertEqual(timer.next_fire_time(1000.0), 1003.0)
+        self.assertEqual(timer.next_fire_time(1003.0), 1006.0)
+        # late runs don't push the following runs back
+        self.assertEqual(timer.next_fire_time(1003.7), 1006.0)
+        # missed runs are skipped
+        self.assertEqual(timer.next_fire_time(1010.2), 1012.0)
+
+        timer = IntervalTimer(datetime.timedelta(seconds=0.1), 0.0)
+        self.assertAlmostEqual(timer.next_fire_time(1e6), 1e6 + 0.1, places=6)
+
+        with self.assertRaises(ValueError):
+            IntervalTimer(datetime.timedelta(0), 0.0)
+        with self.assertRaises(TypeError):
+            IntervalTimer(3, 0.0)
+
+
+@attr('UNIT', group='mi')
+class TestHeapScheduler(SchedulerTestMixin, MiUnitTest):
+    """
+    Port of the PolledScheduler tests
+    """
+    def setUp(self):
+        self._scheduler = HeapScheduler()
+        self._scheduler.start()
+        self._triggered = []
+
+    def tearDown(self):
+        self._scheduler.shutdown()
+
+    def test_absolute_time(self):
+        dt = datetime.datetime.now() + datetime.timedelta(0, 1)
+        self._scheduler.add_date_job(self._callback, dt)
+        self.assert_event_triggered(dt)
+        # run once jobs are dropped after running
+        self.assertEqual(self._scheduler.get_jobs(), [])
+
+        with self.assertRaises(ValueError):
+            self._scheduler.add_date_job(self._callback, datetime.datetime.now() - datetime.timedelta(0, 1))
+
+    def test_elapse_time(self):
+        now = datetime.datetime.now()
+        interval = HeapScheduler.interval(seconds=1)
+
+        self._scheduler.add_interval_job(self._callback, seconds=1)
+        self.assert_event_triggered(now + interval)
+        self.assert_event_triggered(now + interval * 2)
+        self.assert_event_triggered(now + interval * 3)
+
+        # Now shutdown the scheduler and verify we aren't firing events
+        self._scheduler.shutdown()
+        self._triggered = []
+        self.assert_event_not_triggered(2)
+
+    def test_cron_syntax(self):
+        self._scheduler.add_cron_job(self._callback, second='*/2')
+        self.assert_event_triggered()
+        self.assert_event_triggered()
+
+    def test_polled_time(self):
+        """
+        Test a polled job with an interval.  Also test some exceptions
+        """
+        now = datetime.datetime.now()
+        test_name = 'test_job'
+        min_interval = HeapScheduler.interval(seconds=1)
+        max_interval = HeapScheduler.interval(seconds=2)
+
+        # Verify that triggered events work.
+        self._scheduler.add_polled_job(self._callback, test_name, min_interval, max_interval)
+        self.assertEqual(len(self._scheduler.get_jobs()), 1)
+        self.assert_event_triggered(now + max_interval)
+
+        # after a triggered event the min time should be extended.
+        self.assertFalse(self._scheduler.run_polled_job(test_name))
+        time.sleep(1)
+        now = datetime.datetime.now()
+        self.assertTrue(self._scheduler.run_polled_job(test_name))
+        self.assert_event_triggered(now)
+
+        # after a polled event the wait time should also be extended
+        self.assert_event_triggered(now + max_interval)
+
+        # Test exceptions. Job name doesn't exist
+        with self.assertRaises(LookupError):
+            self._scheduler.run_polled_job('foo')
+
+        # Verify that an exception is raised if we try to add a job with the same name
+        with self.assertRaises(ValueError):
+            self._scheduler.add_polled_job(self._callback, test_name, min_interval, max_interval)
+
+    def test_polled_time_no_interval(self):
+        test_name = 'test_job'
+        min_interval = HeapScheduler.interval(seconds=1)
+
+        self._scheduler.add_polled_job(self._callback, test_name, min_interval)
+        self.assertEqual(len(self._scheduler.get_jobs()), 1)
+
+        self.assertTrue(self._scheduler.run_polled_job(test_name))
+        self.assertFalse(self._scheduler.run_polled_job(test_name))
+        time.sleep(1.1)
+        self.assertTrue(self._scheduler.run_polled_job(test_name))
+
+    def test_polled_time_no_interval_not_started(self):
+        """
+        Jobs added before the scheduler is started are armed when it starts
+        """
+        test_name = 'test_job'
+        min_interval = HeapScheduler.interval(seconds=1)
+
+        self._scheduler = HeapScheduler()
+        self.assertFalse(self._scheduler.running)
+
+        job = self._scheduler.add_polled_job(self._callback, test_name, min_interval, min_interval)
+        self.assertIsNotNone(job)
+        self.assertIsNone(job.next_run_time)
+
+        self._scheduler.start()
+        self.assertIsNotNone(job.next_run_time)
+        self.assert_event_triggered()
+
+    def test_replace_job(self):
+        """
+        Removing and re-adding a job only moves its timer
+        """
+        heap = self._scheduler._timer_heap
+        before = len(heap)
+        for _ in xrange(1000):
+            dt = datetime.datetime.now() + datetime.timedelta(0, 60)
+            self._scheduler.add_date_job(self._callback, dt)
+            self._scheduler.unschedule_func(self._callback)
+        self.assertEqual(len(heap), before)
+
+        with self.assertRaises(KeyError):
+            self._scheduler.unschedule_func(self._callback)
+
+    def test_timer_heap(self):
+        heap = TimerHeap()
+        self.assertIs(HeapScheduler(heap)._timer_heap, heap)
+        self.assertIs(HeapScheduler()._timer_heap, get_timer_heap())
+
+    def test_stale_timer(self):
+        """
+        A timer taken off the heap before its job was re-armed does not arm the job again
+        """
+        heap = TimerHeap()
+        scheduler = HeapScheduler(heap)
+        scheduler.start()
+        self.addCleanup(scheduler.shutdown)
+        job = scheduler.add_polled_job(self._callback, 'test_job', HeapScheduler.interval(seconds=0),
+                                       HeapScheduler.interval(seconds=60))
+        stale_callback = job._timer[2]
+
+        self.assertTrue(scheduler.run_polled_job('test_job'))
+        timer = job._timer
+        stale_callback()
+        self.assertIs(job._timer, timer)
+        self.assertEqual(len(heap), 1)
+        self.assertEqual(job.runs, 1)
+
+    def test_skip_running_job(self):
+        """
+        A job still running when its next run comes due is not run twice
+        """
+        def slow_callback():
+            self._callback()
+            time.sleep(1)
+
+        self._scheduler.add_interval_job(slow_callback, seconds=0.25)
+        time.sleep(1.6)
+        self._scheduler.shutdown()
+        self.assertEqual(len(self._triggered), 2)
+
+
+@attr('UNIT', group='mi')
+class TestHeapDriverScheduler(SchedulerTestMixin, MiUnitTest):
+    """
+    Port of the DriverScheduler tests, using the HeapScheduler backend
+    """
+    def setUp(self):
+        self._scheduler = DriverScheduler(scheduler=HeapScheduler())
+        self._triggered = []
+
+    def tearDown(self):
+        self._scheduler._scheduler.shutdown()
+
+    def assert_scheduler_exception(self, config, regexp):
+        """
+        add_config raises a SchedulerException with a message matching regexp
+        """
+        with self.assertRaises(SchedulerException) as context:
+            self._scheduler.add_config(config)
+        self.assertRegexpMatches(context.exception.msg, regexp)
+
+    def test_job_removal(self):
+        config = {
+            'interval_job': {
+                DriverSchedulerConfigKey.TRIGGER: {
+                    DriverSchedulerConfigKey.TRIGGER_TYPE: TriggerType.INTERVAL,
+                    DriverSchedulerConfigKey.SECONDS: 1
+                },
+                DriverSchedulerConfigKey.CALLBACK: self._callback
+            }
+        }
+        self._scheduler.add_config(config)
+        self.assert_event_triggered()
+
+        # now remove scheduler job and check that it's not triggering anymore
+        self._scheduler.remove_job(self._callback)
+        self._triggered = []
+        self.assert_event_not_triggered(2)
+
+        # check that it raises exception if the removal is re-attempted
+        with self.assertRaises(KeyError):
+            self._scheduler.remove_job(self._callback)
+
+    def test_absolute_job(self):
+        dt = datetime.datetime.now() + datetime.timedelta(0, 1)
+        config = {
+            'absolute_job': {
+                DriverSchedulerConfigKey.TRIGGER: {
+                    DriverSchedulerConfigKey.TRIGGER_TYPE: TriggerType.ABSOLUTE,
+                    DriverSchedulerConfigKey.DATE: dt
+                },
+                DriverSchedulerConfigKey.CALLBACK: self._callback
+            }
+        }
+        self._scheduler.add_config(config)
+        self.assert_event_triggered(dt)
+
+    def test_cron_job(self):
+        config = {
+            'cron_job': {
+                DriverSchedulerConfigKey.TRIGGER: {
+                    DriverSchedulerConfigKey.TRIGGER_TYPE: TriggerType.CRON,
+                    DriverSchedulerConfigKey.SECOND: '*/3'
+                },
+                DriverSchedulerConfigKey.CALLBACK: self._callback
+            }
+        }
+        self._scheduler.add_config(config)
+        self.assert_event_triggered()
+
+    def test_interval_job(self):
+        config = {
+            'interval_job': {
+                DriverSchedulerConfigKey.TRIGGER: {
+                    DriverSchedulerConfigKey.TRIGGER_TYPE: TriggerType.INTERVAL,
+                    DriverSchedulerConfigKey.SECONDS: 1
+                },
+                DriverSchedulerConfigKey.CALLBACK: self._callback
+            }
+        }
+        now = datetime.datetime.now()
+        self._scheduler.add_config(config)
+        self.assert_event_triggered(now + datetime.timedelta(seconds=1))
+        self.assert_event_triggered(now + datetime.timedelta(seconds=2))
+
+    def test_polled_interval_job(self):
+        test_name = 'interval_job'
+        config = {
+            test_name: {
+                DriverSchedulerConfigKey.TRIGGER: {
+                    DriverSchedulerConfigKey.TRIGGER_TYPE: TriggerType.POLLED_INTERVAL,
+                    DriverSchedulerConfigKey.MINIMAL_INTERVAL: {DriverSchedulerConfigKey.SECONDS: 1},
+                    DriverSchedulerConfigKey.MAXIMUM_INTERVAL: {DriverSchedulerConfigKey.SECONDS: 3},
+                },
+                DriverSchedulerConfigKey.CALLBACK: self._callback
+            }
+        }
+        self._scheduler.add_config(config)
+
+        # Verify automatic trigger
+        self.assert_event_triggered()
+
+        # Test the polled trigger
+        self.assertFalse(self._scheduler.run_job(test_name))
+        time.sleep(1.1)
+        self.assertTrue(self._scheduler.run_job(test_name))
+        self.assert_event_triggered()
+
+        # Check the automatic trigger again
+        self.assert_event_triggered()
+
+    def test_common_job_exception(self):
+        test_name = 'some_test'
+        config = {}
+
+        self.assert_scheduler_exception('not_a_dict', 'scheduler config not a dict')
+        self.assert_scheduler_exception(config, 'scheduler config empty')
+
+        config[test_name] = None
+        self.assert_scheduler_exception(config, 'job config empty')
+
+        config[test_name] = 'not_a_dict'
+        self.assert_scheduler_exception(config, 'job config not a dict')
+
+        config[test_name] = {}
+        self.assert_scheduler_exception(config, 'trigger definition missing')
+
+        config[test_name] = {DriverSchedulerConfigKey.CALLBACK: self._callback}
+        self.assert_scheduler_exception(config, 'trigger definition missing')
+
+        config[test_name] = {
+            DriverSchedulerConfigKey.TRIGGER: {
+                DriverSchedulerConfigKey.TRIGGER_TYPE: 'some_type',
+            },
+            DriverSchedulerConfigKey.CALLBACK: self._callback
+        }
+        self.assert_scheduler_exception(config, "unknown trigger type 'some_type'")
+
+        config[test_name] = {
+            DriverSchedulerConfigKey.TRIGGER: {
+                DriverSchedulerConfigKey.TRIGGER_TYPE: TriggerType.ABSOLUTE
+            },
+        }
+        self.assert_scheduler_exception(config, 'callback definition missing')
+
+        config[test_name][DriverSchedulerConfigKey.CALLBACK] = 'not_a_method'
+        self.assert_scheduler_exception(config, 'callback incorrect type:')
+
+    def test_absolute_job_exception(self):
+        test_name = 'some_test'
+        config = {
+            test_name: {
+                DriverSchedulerConfigKey.TRIGGER: {
+                    DriverSchedulerConfigKey.TRIGGER_TYPE: TriggerType.ABSOLUTE
+                },
+                DriverSchedulerConfigKey.CALLBACK: self._callback
+            }
+        }
+
+        self.assert_scheduler_exception(config, 'trigger missing parameter: date')
+
+        config[test_name][DriverSchedulerConfigKey.TRIGGER][DriverSchedulerConfigKey.DATE] = 'not a date object'
+        self.assert_scheduler_exception(config, 'failed to schedule job: Invalid date string')
+
+    def test_cron_job_exception(self):
+        test_name = 'some_test'
+        config = {
+            test_name: {
+                DriverSchedulerConfigKey.TRIGGER: {
+                    DriverSchedulerConfigKey.TRIGGER_TYPE: TriggerType.CRON
+                },
+                DriverSchedulerConfigKey.CALLBACK: self._callback
+            }
+        }
+
+        self.assert_scheduler_exception(config, 'at least one cron parameter required')
+
+        config[test_name][DriverSchedulerConfigKey.TRIGGER][DriverSchedulerConfigKey.WEEK] = 'n'
+        self.assert_scheduler_exception(config, 'failed to schedule job:')
+
+    def test_interval_job_exception(self):
+        test_name = 'some_test'
+        config = {
+            test_name: {
+                DriverSchedulerConfigKey.TRIGGER: {
+                    DriverSchedulerConfigKey.TRIGGER_TYPE: TriggerType.INTERVAL
+                },
+                DriverSchedulerConfigKey.CALLBACK: self._callback
+            }
+        }
+
+        self.assert_scheduler_exception(config, 'at least interval parameter required')
+
+        config[test_name][DriverSchedulerConfigKey.TRIGGER][DriverSchedulerConfigKey.WEEKS] = 'n'
+        self.assert_scheduler_exception(config, 'failed to schedule job:')
+
+    def test_polled_interval_job_exception(self):
+        test_name = 'some_test'
+        config = {
+            test_name: {
+                DriverSchedulerConfigKey.TRIGGER: {
+                    DriverSchedulerConfigKey.TRIGGER_TYPE: TriggerType.POLLED_INTERVAL
+                },
+                DriverSchedulerConfigKey.CALLBACK: self._callback
+            }
+        }
+        trigger = config[test_name][DriverSchedulerConfigKey.TRIGGER]
+
+        self.assert_scheduler_exception(config, 'minimum_interval missing from trigger configuration')
+
+        trigger[DriverSchedulerConfigKey.MINIMAL_INTERVAL] = None
+        self.assert_scheduler_exception(config, 'minimum_interval missing from trigger configuration')
+
+        trigger[DriverSchedulerConfigKey.MINIMAL_INTERVAL] = {}
+        self.assert_scheduler_exception(config, 'at least interval parameter required')
+
+        trigger[DriverSchedulerConfigKey.MINIMAL_INTERVAL][DriverSchedulerConfigKey.WEEKS] = 'n'
+        self.assert_scheduler_exception(config, 'failed to schedule job:')
+
+        trigger[DriverSchedulerConfigKey.MAXIMUM_INTERVAL] = {DriverSchedulerConfigKey.WEEKS: 'n'}
+        self.assert_scheduler_exception(config, 'failed to schedule job:')
+
+        # Schedule a job with a min interval > max interval
+        trigger[DriverSchedulerConfigKey.MINIMAL_INTERVAL][DriverSchedulerConfigKey.WEEKS] = 2
+        trigger[DriverSchedulerConfigKey.MAXIMUM_INTERVAL][DriverSchedulerConfigKey.WEEKS] = 1
+        self.assert_scheduler_exception(config, 'failed to schedule job: min_interval < max_interval')
+
+        # Schedule a job twice
+        trigger[DriverSchedulerConfigKey.MINIMAL_INTERVAL][DriverSchedulerConfigKey.WEEKS] = 1
+        trigger[DriverSchedulerConfigKey.MAXIMUM_INTERVAL][DriverSchedulerConfigKey.WEEKS] = 2
+        self._scheduler.add_config(config)
+        self.assert_scheduler_exception(config, "failed to schedule job: Not adding job since a job named "
+                                                "'some_test' already exists")
+
+        # Run a job that doesn't exist
+        with self.assertRaisesRegexp(LookupError, "no PolledIntervalJob found named"):
+            self._scheduler.run_job('who_are_you')
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.test.test_numeric_record
+@file mi/core/test/test_numeric_record.py
+@brief Test cases for the delimited numeric record parser, against int() and float() per field
+"""
+
+__license__ = 'Apache 2.0'
+
+import random
+
+from mock import patch
+from nose.plugins.attrib import attr
+
+from mi.core.numeric_record import RecordSchema, RecordField
+from mi.core.unit_test import MiUnitTest
+
+FIELDS = [('frame', str),
+          ('date', int),
+          ('time', float),
+          ('counts', int, 3),
+          ('spectrum', int, 40),
+          ('temps', float, 20),
+          (None, None, 2),
+          ('checksum', int)]
+
+
+def reference_parse(fields, tokens):
+    result = []
+    offset = 0
+    for field in fields:
+        name, value_type = field[:2]
+        count = field[2] if len(field) > 2 else None
+        width = count or 1
+        if name is not None:
+            values = [value_type(token) for token in tokens[offset:offset + width]]
+            result.append((name, values if count else values[0]))
+        offset += width
+    return result
+
+
+@attr('UNIT', group='mi')
+class TestRecordSchema(MiUnitTest):
+    def setUp(self):
+        self.schema = RecordSchema(FIELDS)
+        rand = random.Random(42)
+        self.records = []
+        for _ in xrange(100):
+            tokens = ['SATSLF0344', str(rand.randint(2000000, 2100000)), repr(rand.uniform(0, 24))]
+            tokens += [str(rand.randint(-5000, 5000)) for _ in xrange(43)]
+            tokens += [rand.choice(['%.4f', '%.2e', '%+g', '%f']) % rand.uniform(-1e4, 1e4) for _ in xrange(20)]
+            tokens += ['', '']
+            tokens.append(str(rand.randint(0, 255)))
+            self.records.append(tokens)
+
+    def assert_parse_error(self, tokens):
+        self.assertRaises(ValueError, reference_parse, FIELDS, tokens)
+        self.assertRaises(ValueError, self.schema.parse, ','.join(tokens))
+
+    def test_parse(self):
+        for tokens in self.records:
+            parsed = self.schema.parse(','.join(tokens))
+            self.assertEqual(parsed, reference_parse(FIELDS, tokens))
+            for (_, value), (_, expected) in zip(parsed, reference_parse(FIELDS, tokens)):
+                self.assertEqual(type(value), type(expected))
+
+        self.assertEqual([name for name, _ in self.schema.parse(','.join(self.records[0]))],
+                         ['frame', 'date', 'time', 'counts', 'spectrum', 'temps', 'checksum'])
+
+    def test_parse_python(self):
+        with patch('mi.core.numeric_record.numpy', None):
+            for tokens in self.records:
+                self.assertEqual(self.schema.parse(','.join(tokens)), reference_parse(FIELDS, tokens))
+
+    def test_values_numpy_does_not_read(self):
+        tokens = self.records[0]
+        # accepted by int() or float() but not read as such by numpy
+        for index, value in [(10, ' 12 '), (10, '99999999999999999999'), (10, '-99999999999999999999'),
+                             (50, 'nan'), (50, '-inf'), (50, '5.')]:
+            changed = tokens[:]
+            changed[index] = value
+            # repr, as nan != nan
+            self.assertEqual(repr(self.schema.parse(','.join(changed))), repr(reference_parse(FIELDS, changed)))
+
+        # rejected by int() or float()
+        for index, value in [(10, ''), (10, '12.0'), (10, '1e3'), (10, '0x12'), (10, '1 2'),
+                             (50, ''), (50, '.'), (50, '1.2.3'), (1, '1.5'), (2, 'x')]:
+            changed = tokens[:]
+            changed[index] = value
+            self.assert_parse_error(changed)
+
+    def test_field_count(self):
+        tokens = self.records[0]
+        self.assertRaises(ValueError, self.schema.parse, ','.join(tokens[:-1]))
+        self.assertRaises(ValueError, self.schema.parse, ','.join(tokens + ['1']))
+        self.assertRaises(ValueError, self.schema.parse, '')
+
+    def test_schema(self):
+        self.assertEqual(self.schema.width, 69)
+        self.assertEqual(RecordSchema([RecordField('a', int), ('b', float, 2)], delimiter=' ').parse('1 2 3.5'),
+                         [('a', 1), ('b', [2.0, 3.5])])
+        self.assertRaises(TypeError, RecordField, 'a', long)
+        self.assertRaises(ValueError, RecordField, 'a', int, 0)
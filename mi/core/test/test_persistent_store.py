@@ -12,11 +12,16 @@
 __author__ = 'Johnathon Rusk'
 __license__ = 'Apache 2.0'
 
+from mock import Mock, patch
 from nose.plugins.attrib import attr
 from mi.core.unit_test import MiUnitTest
+import re
+import sqlite3
 import sys
+import threading
 
-from mi.core.persistent_store import PersistentStoreDict
+from mi.core import persistent_store
+from mi.core.persistent_store import PersistentStoreDict, BlockingConnectionPool, getConnectionPool
 
 @attr('UNIT', group='mi')
 class TestPersistentStoreDict(MiUnitTest):
@@ -35,7 +40,10 @@ class TestPersistentStoreDict(MiUnitTest):
         self.DICT_VALUES = [{u"KEY_1":1, u"KEY_2":2, u"KEY_3":3}, {u"KEY_4":4, u"KEY_5":5, u"KEY_6":6}]
         self.LIST_KEY = "LIST_KEY" # Test 'str' type key
         self.LIST_VALUES = [[1, 2, 3, 4, 5], [6, 7, 8, 9, 0]]
-        self.persistentStoreDict = PersistentStoreDict("unit_test", "GI01SUMO-00001")
+        self.persistentStoreDict = self.createPersistentStoreDict()
+
+    def createPersistentStoreDict(self):
+        return PersistentStoreDict("unit_test", "GI01SUMO-00001")
 
     def tearDown(self):
         self.persistentStoreDict.clear() # NOTE: This technically assumes the delete functionality works.
@@ -235,3 +243,254 @@ class TestPersistentStoreDict(MiUnitTest):
             del self.persistentStoreDict[key]
         self.assertEqual(contextManager.exception.args[0], "No item found with key: '{0}'".format(key))
 
+
+
+class SqliteCursor(object):
+    """
+    Cursor translating the PostgreSQL statements and parameters of
+    PersistentStoreDict for SQLite
+
+    There is no executemany, batches must be sent as a single statement.
+    """
+    def __init__(self, connection):
+        self.connection = connection
+        self.cursor = connection.db.cursor()
+
+    @staticmethod
+    def translate(statement, parameters):
+        if isinstance(parameters, dict):
+            return re.sub(r'%\((\w+)\)s', r':\1', statement), parameters
+        parts = statement.split('%s')
+        translated = [parts[0]]
+        values = []
+        for parameter, part in zip(parameters or [], parts[1:]):
+            if isinstance(parameter, tuple):
+                translated.append('(%s)' % ', '.join('?' * len(parameter)))
+                values.extend(parameter)
+            else:
+                translated.append('?')
+                values.append(parameter)
+            translated.append(part)
+        return ''.join(translated), values
+
+    def execute(self, statement, parameters = None):
+        self.connection.statements.append(statement)
+        schema = re.match(r'CREATE SCHEMA (\w+)', statement)
+        if schema:
+            self.cursor.execute("ATTACH DATABASE ':memory:' AS %s" % schema.group(1))
+            self.cursor.execute("INSERT INTO pg_namespace VALUES (?)", [schema.group(1)])
+            return
+        self.cursor.execute(*self.translate(statement, parameters))
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def close(self):
+        self.cursor.close()
+
+
+class SqliteConnection(object):
+    server_version = 90500
+
+    def __init__(self):
+        self.db = sqlite3.connect(':memory:', check_same_thread = False)
+        self.db.execute("CREATE TABLE pg_namespace (nspname text)")
+        self.statements = []
+
+    def cursor(self):
+        return SqliteCursor(self)
+
+    def commit(self):
+        self.db.commit()
+
+    def rollback(self):
+        self.db.rollback()
+
+
+class SqlitePool(object):
+    """
+    Stand-in for the psycopg2 connection pool, handing out a single in-memory SQLite database
+    """
+    def __init__(self):
+        self.connection = SqliteConnection()
+        self.borrowed = 0
+
+    def getconn(self):
+        self.borrowed += 1
+        return self.connection
+
+    def putconn(self, connection, close = False):
+        pass
+
+    def rows(self):
+        return sorted(self.connection.db.execute("SELECT key, json_value FROM instrument_driver.persistent_store"))
+
+
+@attr('UNIT', group='mi')
+class TestPersistentStoreDictSqlite(TestPersistentStoreDict):
+    def createPersistentStoreDict(self):
+        self.pool = SqlitePool()
+        return PersistentStoreDict("unit_test", "GI01SUMO-00001", pool = self.pool)
+
+    def test_upsert_single_statement(self):
+        statements = self.pool.connection.statements
+        self.persistentStoreDict[u"KEY"] = 1
+        del statements[:]
+        self.persistentStoreDict[u"KEY"] = 2
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(self.persistentStoreDict[u"KEY"], 2)
+        self.assertEqual(self.pool.rows(), [(u"KEY", u"2")])
+
+    def test_batch(self):
+        statements = self.pool.connection.statements
+        del statements[:]
+        self.persistentStoreDict.update({u"A": 1, u"B": [1, 2]}, C = {u"D": True})
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(len(self.persistentStoreDict), 3)
+
+        del statements[:]
+        self.assertEqual(self.persistentStoreDict.get_many([u"A", "C", u"missing"]), {u"A": 1, u"C": {u"D": True}})
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(self.persistentStoreDict.get_many([]), {})
+
+        with self.assertRaises(TypeError):
+            self.persistentStoreDict.update({u"E": 1, u"F": 1+2j})
+        self.assertNotIn(u"E", self.persistentStoreDict)
+
+
+@attr('UNIT', group='mi')
+class TestPersistentStoreDictCached(TestPersistentStoreDictSqlite):
+    def createPersistentStoreDict(self):
+        self.pool = SqlitePool()
+        return PersistentStoreDict("unit_test", "GI01SUMO-00001", cache = True, flushInterval = 3600, pool = self.pool)
+
+    def tearDown(self):
+        TestPersistentStoreDictSqlite.tearDown(self)
+        self.persistentStoreDict.close()
+
+    def test_upsert_single_statement(self):
+        self.persistentStoreDict[u"KEY"] = 1
+        self.persistentStoreDict.flush()
+        statements = self.pool.connection.statements
+        del statements[:]
+        self.persistentStoreDict[u"KEY"] = 2
+        self.persistentStoreDict.flush()
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(self.pool.rows(), [(u"KEY", u"2")])
+
+    def test_batch(self):
+        self.persistentStoreDict.update({u"A": 1, u"B": [1, 2]}, C = {u"D": True})
+        self.assertEqual(self.persistentStoreDict.get_many([u"A", "C", u"missing"]), {u"A": 1, u"C": {u"D": True}})
+
+    def test_write_behind(self):
+        statements = self.pool.connection.statements
+        del statements[:]
+        for value in xrange(100):
+            self.persistentStoreDict[u"COUNTER"] = value
+            self.assertEqual(self.persistentStoreDict[u"COUNTER"], value)
+        self.persistentStoreDict.update({u"OTHER": u"x", u"THIRD": 3, u"FOURTH": 4})
+        del self.persistentStoreDict[u"OTHER"]
+        del self.persistentStoreDict[u"THIRD"]
+        self.assertEqual(statements, [])
+        self.assertEqual(self.pool.rows(), [])
+
+        self.persistentStoreDict.flush()
+        self.assertEqual(len(statements), 2)
+        self.assertEqual(self.pool.rows(), [(u"COUNTER", u"99"), (u"FOURTH", u"4")])
+        del self.persistentStoreDict[u"FOURTH"]
+        self.persistentStoreDict.flush()
+        self.assertEqual(self.pool.rows(), [(u"COUNTER", u"99")])
+
+        # a new store reads the persisted items
+        borrowed = self.pool.borrowed
+        other = PersistentStoreDict("unit_test", "GI01SUMO-00001", cache = True, pool = self.pool)
+        self.assertEqual(dict(other), {u"COUNTER": 99})
+        self.assertEqual(other.get_many([u"COUNTER"]), {u"COUNTER": 99})
+        self.assertEqual(self.pool.borrowed, borrowed + 3)
+
+        self.persistentStoreDict[u"COUNTER"] = 100
+        self.persistentStoreDict.close()
+        self.assertEqual(self.pool.rows(), [(u"COUNTER", u"100")])
+
+    def test_flush_failure(self):
+        self.persistentStoreDict[u"KEY"] = 1
+        self.pool.connection.db.execute("DETACH DATABASE instrument_driver")
+        with self.assertRaises(sqlite3.OperationalError):
+            self.persistentStoreDict.flush()
+        self.assertEqual(self.persistentStoreDict.pending, {u"KEY": 1})
+
+        self.pool.connection.db.execute("ATTACH DATABASE ':memory:' AS instrument_driver")
+        self.pool.connection.db.execute(self.persistentStoreDict.stmt_setupDatabase_createTableIfNotExists)
+        self.persistentStoreDict.flush()
+        self.assertEqual(self.pool.rows(), [(u"KEY", u"1")])
+
+
+@attr('UNIT', group='mi')
+class TestPersistentStoreDictWriteThrough(TestPersistentStoreDictSqlite):
+    def createPersistentStoreDict(self):
+        self.pool = SqlitePool()
+        return PersistentStoreDict("unit_test", "GI01SUMO-00001", cache = True, pool = self.pool)
+
+    def test_batch(self):
+        self.persistentStoreDict.update({u"A": 1, u"B": [1, 2]}, C = {u"D": True})
+        self.assertEqual(self.pool.rows(), [(u"A", u"1"), (u"B", u"[1, 2]"), (u"C", u'{"D": true}')])
+        self.assertEqual(self.persistentStoreDict.get_many([u"A", "C", u"missing"]), {u"A": 1, u"C": {u"D": True}})
+
+    def test_write_failure(self):
+        self.persistentStoreDict[u"KEY"] = 1
+        self.pool.connection.db.execute("DETACH DATABASE instrument_driver")
+        try:
+            # failed writes do not reach the cache
+            with self.assertRaises(sqlite3.OperationalError):
+                self.persistentStoreDict[u"KEY"] = 2
+            with self.assertRaises(sqlite3.OperationalError):
+                self.persistentStoreDict.update({u"OTHER": 3})
+            with self.assertRaises(sqlite3.OperationalError):
+                del self.persistentStoreDict[u"KEY"]
+            self.assertEqual(dict(self.persistentStoreDict), {u"KEY": 1})
+            self.assertEqual(self.persistentStoreDict.pending, {})
+        finally:
+            self.pool.connection.db.execute("ATTACH DATABASE ':memory:' AS instrument_driver")
+            self.pool.connection.db.execute(self.persistentStoreDict.stmt_setupDatabase_createTableIfNotExists)
+
+
+@attr('UNIT', group='mi')
+class TestConnectionPool(MiUnitTest):
+    def setUp(self):
+        patcher = patch('psycopg2.connect')
+        self.connect = patcher.start()
+        self.connect.side_effect = lambda *args, **kwargs: Mock()
+        self.addCleanup(patcher.stop)
+
+    def test_pool_key(self):
+        self.addCleanup(persistent_store._pools.clear)
+        pool = getConnectionPool("metadata", "awips", "awips", "localhost", "5432")
+        self.assertIsInstance(pool, BlockingConnectionPool)
+        self.assertIs(getConnectionPool("metadata", "awips", "awips", "localhost", "5432"), pool)
+        self.assertIsNot(getConnectionPool("metadata", "awips", "secret", "localhost", "5432"), pool)
+
+    def test_blocking(self):
+        pool = BlockingConnectionPool(0, 2)
+        connections = [pool.getconn(), pool.getconn()]
+
+        # a third session waits for a connection to be returned
+        borrowed = []
+        thread = threading.Thread(target = lambda: borrowed.append(pool.getconn()))
+        thread.start()
+        thread.join(.2)
+        self.assertEqual(borrowed, [])
+
+        pool.putconn(connections[0])
+        thread.join(5)
+        self.assertEqual(len(borrowed), 1)
+
+        pool.putconn(connections[1], close = True)
+        pool.putconn(borrowed[0])
+        self.assertEqual(len([pool.getconn(), pool.getconn()]), 2)
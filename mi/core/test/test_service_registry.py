@@ -6,8 +6,14 @@
 @author Peter Cable
 @brief Unit tests for ConsulServiceRegistry module
 """
+import base64
+import json
 import threading
+import urlparse
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
 
+import consul
 import time
 from mock import mock
 from nose.plugins.attrib import attr
@@ -122,7 +128,10 @@ class TestConsulPersistentStore(MiUnitTest):
         self.DICT_VALUES = [{u"KEY_1":1, u"KEY_2":2, u"KEY_3":3}, {u"KEY_4":4, u"KEY_5":5, u"KEY_6":6}]
         self.LIST_KEY = "LIST_KEY" # Test 'str' type key
         self.LIST_VALUES = [[1, 2, 3, 4, 5], [6, 7, 8, 9, 0]]
-        self.persistentStoreDict = ConsulPersistentStore("unit_test", "GI01SUMO-00001")
+        self.persistentStoreDict = self.create_persistent_store()
+
+    def create_persistent_store(self):
+        return ConsulPersistentStore("unit_test", "GI01SUMO-00001")
 
     def tearDown(self):
         self.persistentStoreDict.clear() # NOTE: This technically assumes the delete functionality works.
@@ -315,3 +324,174 @@ class TestConsulPersistentStore(MiUnitTest):
         with self.assertRaises(KeyError):
             del self.persistentStoreDict[key]
 
+
+
+class ConsulKVStandIn(ThreadingMixIn, HTTPServer):
+    """
+    Local HTTP server implementing the consul KV (including blocking queries) and txn endpoints
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), ConsulKVHandler)
+        self.kv = {}
+        self.index = 1
+        self.changed = threading.Condition()
+        self.requests = []
+        thread = threading.Thread(target=self.serve_forever, args=(0.01,))
+        thread.setDaemon(True)
+        thread.start()
+
+    def client(self):
+        return consul.Consul(host='127.0.0.1', port=self.server_address[1])
+
+    def modify(self, operations):
+        with self.changed:
+            for verb, key, value in operations:
+                if verb == 'set':
+                    self.kv[key] = value
+                else:
+                    self.kv.pop(key, None)
+            self.index += 1
+            self.changed.notify_all()
+
+    def count(self, method, path):
+        return len([r for r in self.requests if r == (method, path)])
+
+
+class ConsulKVHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def respond(self, status, body=None):
+        self.send_response(status)
+        self.send_header('X-Consul-Index', str(self.server.index))
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        if body is not None:
+            self.wfile.write(json.dumps(body))
+
+    def parse(self):
+        url = urlparse.urlsplit(self.path)
+        self.server.requests.append((self.command, url.path.split('/')[2]))
+        return url.path[len('/v1/kv/'):], urlparse.parse_qs(url.query, keep_blank_values=True)
+
+    def body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+    def do_GET(self):
+        key, query = self.parse()
+        server = self.server
+        with server.changed:
+            if 'index' in query:
+                deadline = time.time() + min(float(query.get('wait', ['1s'])[0].rstrip('s')), 1)
+                while server.index <= int(query['index'][0]) and time.time() < deadline:
+                    server.changed.wait(deadline - time.time())
+            if 'recurse' in query:
+                keys = sorted(k for k in server.kv if k.startswith(key))
+            else:
+                keys = [key] if key in server.kv else []
+            values = [{'Key': k, 'Value': base64.b64encode(server.kv[k]), 'Flags': 0,
+                       'CreateIndex': 1, 'ModifyIndex': 1, 'LockIndex': 0} for k in keys]
+            self.respond(200 if values else 404, values or None)
+
+    def do_PUT(self):
+        key, _ = self.parse()
+        body = self.body()
+        if self.path.startswith('/v1/txn'):
+            operations = [(op['KV']['Verb'], op['KV']['Key'], base64.b64decode(op['KV'].get('Value', '')))
+                          for op in json.loads(body)]
+            self.server.modify(operations)
+            self.respond(200, {'Results': [], 'Errors': None})
+        else:
+            self.server.modify([('set', key, body)])
+            self.respond(200, True)
+
+    def do_DELETE(self):
+        key, _ = self.parse()
+        self.server.modify([('delete', key, None)])
+        self.respond(200, True)
+
+
+@attr('UNIT', group='mi')
+class TestConsulPersistentStoreStandIn(TestConsulPersistentStore):
+    def create_persistent_store(self):
+        self.consul = ConsulKVStandIn()
+        return ConsulPersistentStore("unit_test", "GI01SUMO-00001", client=self.consul.client())
+
+    def tearDown(self):
+        TestConsulPersistentStore.tearDown(self)
+        self.consul.shutdown()
+        self.consul.server_close()
+
+
+@attr('UNIT', group='mi')
+class TestConsulPersistentStoreCached(TestConsulPersistentStoreStandIn):
+    def create_persistent_store(self):
+        self.consul = ConsulKVStandIn()
+        return ConsulPersistentStore("unit_test", "GI01SUMO-00001", cache=True, flush_interval=3600,
+                                     client=self.consul.client())
+
+    def tearDown(self):
+        self.persistentStoreDict.clear()
+        self.persistentStoreDict.close()
+        self.assertEqual(self.consul.kv, {})
+        # wake up and wait for the watch before stopping the server
+        self.consul.modify([])
+        self.persistentStoreDict._watcher.join(5)
+        self.consul.shutdown()
+        self.consul.server_close()
+
+    def wait_for(self, condition):
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(condition())
+
+    def test_coalesced_writes(self):
+        store = self.persistentStoreDict
+        for pktid in xrange(200):
+            store['pktid'] = pktid
+            self.assertEqual(store['pktid'], pktid)
+        store['other'] = 'x'
+        del store['other']
+        for n in xrange(100):
+            store['key%d' % n] = n
+        self.assertIn('pktid', store)
+        self.assertEqual(len(store), 101)
+        self.assertEqual(self.consul.count('PUT', 'kv'), 0)
+        self.assertEqual(self.consul.count('PUT', 'txn'), 0)
+
+        store.flush()
+        # a transaction holds at most 64 operations
+        self.assertEqual(self.consul.count('PUT', 'txn'), 2)
+        self.assertEqual(self.consul.kv['unit_test/GI01SUMO-00001/pktid'], '199')
+        self.assertNotIn('unit_test/GI01SUMO-00001/other', self.consul.kv)
+        self.assertEqual(len(self.consul.kv), 101)
+
+    def test_watch(self):
+        store = self.persistentStoreDict
+        store['pktid'] = 1
+        store.flush()
+        reads = self.consul.count('GET', 'kv')
+
+        # changed by someone else
+        self.consul.modify([('set', 'unit_test/GI01SUMO-00001/pktid', '2'),
+                            ('set', 'unit_test/GI01SUMO-00001/new', '"value"')])
+        self.wait_for(lambda: store.get('new') == 'value')
+        self.assertEqual(store['pktid'], 2)
+        self.assertGreater(self.consul.count('GET', 'kv'), reads)
+
+        # pending local changes are kept
+        store['pktid'] = 3
+        self.consul.modify([('delete', 'unit_test/GI01SUMO-00001/new', None)])
+        self.wait_for(lambda: 'new' not in store)
+        self.assertEqual(store['pktid'], 3)
+
+    def test_write_through(self):
+        store = ConsulPersistentStore("unit_test", "write_through", cache=True, client=self.consul.client())
+        store['pktid'] = 1
+        self.assertEqual(self.consul.kv['unit_test/write_through/pktid'], '1')
+        del store['pktid']
+        self.assertEqual(self.consul.kv, {})
+        store.close()
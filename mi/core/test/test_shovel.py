@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.test.test_shovel
+@file mi/core/test/test_shovel.py
+@brief Test cases for the rabbitMQ to QPID shovel, using the kombu memory transport
+and a local stand-in for the QPID broker
+"""
+
+__license__ = 'Apache 2.0'
+
+import threading
+import time
+import uuid
+from collections import deque
+
+from kombu import Connection, Exchange, Queue, Producer
+from mock import patch
+from nose.plugins.attrib import attr
+
+from mi.core.log import get_logger
+from mi.core.shovel import QpidProducer, RabbitConsumer
+from mi.core.unit_test import MiUnitTest
+
+log = get_logger()
+
+ROUTING_KEY = 'shovel_test'
+
+
+class LocalSender(object):
+    """
+    Stand-in for a qpid.messaging Sender. The broker settles each message,
+    in order, <latency> seconds after it is sent.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.capacity = None
+        self.delivered = []
+        self.fail_after = None
+        self._unsettled = deque()
+        self._condition = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def send(self, message, sync=True, timeout=None):
+        with self._condition:
+            if self.fail_after is not None:
+                if self.fail_after == 0:
+                    # the connection is lost along with the unsettled messages
+                    self.fail_after = None
+                    self._unsettled.clear()
+                    raise IOError('connection lost')
+                self.fail_after -= 1
+            while self.capacity and len(self._unsettled) >= self.capacity:
+                self._condition.wait()
+            self._unsettled.append((time.time() + self.latency, message))
+            self._condition.notify_all()
+            while sync and self._unsettled:
+                self._condition.wait()
+
+    def unsettled(self):
+        return len(self._unsettled)
+
+    def _run(self):
+        while self._running:
+            with self._condition:
+                now = time.time()
+                while self._unsettled and self._unsettled[0][0] <= now:
+                    self.delivered.append(self._unsettled.popleft()[1].content)
+                    self._condition.notify_all()
+                wait = self._unsettled[0][0] - now if self._unsettled else .1
+                self._condition.wait(max(wait, 0.0005))
+
+    def stop(self):
+        self._running = False
+        self._thread.join()
+
+
+@attr('UNIT', group='mi')
+class TestShovel(MiUnitTest):
+    def setUp(self):
+        self.queue_name = 'shovel_test_%s' % uuid.uuid4()
+        self.connection = Connection(hostname='memory://')
+        self.addCleanup(self.connection.release)
+        self.exchange = Exchange(name='amq.direct', type='direct')
+        # predeclared by rabbitMQ, kombu does not declare amq. exchanges
+        self.connection.channel().exchange_declare('amq.direct', 'direct')
+        Queue(name=self.queue_name, exchange=self.exchange, routing_key=ROUTING_KEY)(self.connection.channel()).declare()
+
+    def publish(self, count):
+        messages = ['message %d' % index for index in xrange(count)]
+        producer = Producer(self.connection.channel(), exchange=self.exchange, routing_key=ROUTING_KEY)
+        for message in messages:
+            producer.publish(message, headers={'sensor': 'REFDES'})
+        return messages
+
+    def queue_depth(self):
+        return self.connection.channel().queue_declare(self.queue_name, passive=True).message_count
+
+    def shovel(self, count, latency=.002, window=100, prefetch=200, ack_batch=50, fail_after=None):
+        """
+        Shovel <count> messages to a local QPID stand-in
+        @return (sender, consumer, messages per second)
+        """
+        messages = self.publish(count)
+        sender = LocalSender(latency)
+        sender.fail_after = fail_after
+        self.addCleanup(sender.stop)
+
+        with patch('mi.core.shovel.qm.Connection') as qpid_connection:
+            qpid_connection.return_value.session.return_value.sender.return_value = sender
+            qpid = QpidProducer('localhost:5672', 'shovel_test', window=window)
+            consumer = RabbitConsumer('memory://', self.queue_name, ROUTING_KEY, qpid,
+                                      prefetch=prefetch, ack_batch=ack_batch)
+
+            start_time = time.time()
+            thread = threading.Thread(target=consumer.run)
+            thread.start()
+            end_time = start_time + 60
+            while consumer.count < count and time.time() < end_time:
+                time.sleep(.01)
+            elapsed = time.time() - start_time
+            consumer.should_stop = True
+            thread.join()
+            consumer.connection.release()
+
+        self.assertEqual(consumer.count, count)
+        self.assertEqual(consumer.in_flight(), 0)
+        self.assertEqual(self.queue_depth(), 0)
+        if fail_after is None:
+            self.assertEqual(sender.delivered, messages)
+            self.assertEqual(consumer.sent, count)
+        else:
+            # at least once delivery
+            self.assertEqual(set(sender.delivered), set(messages))
+        return sender, consumer, count / elapsed
+
+    def test_window(self):
+        sender, consumer, rate = self.shovel(2000)
+        # the stand-in is settling while messages are sent, acks are batched
+        self.assertLessEqual(sender.capacity, 100)
+        self.assertLess(consumer.acks, 2000 / 10)
+        log.info('shovel window 100: %.0f messages/s, %d ack batches', rate, consumer.acks)
+
+        _, _, sync_rate = self.shovel(200, window=1, ack_batch=1)
+        log.info('shovel window 1: %.0f messages/s', sync_rate)
+        self.assertGreater(rate, sync_rate * 5)
+
+    def test_partial_batch(self):
+        # fewer messages than a batch are acked after ACK_INTERVAL
+        _, consumer, _ = self.shovel(10)
+        self.assertEqual(consumer.acks, 1)
+
+    def test_connection_lost(self):
+        _, consumer, _ = self.shovel(500, fail_after=250)
+        self.assertGreater(consumer.sent, 500)
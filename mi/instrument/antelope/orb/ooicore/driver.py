@@ -24,6 +24,8 @@ log = get_logger()
 META_LOGGER = get_logging_metaclass('trace')
 
 ORBOLDEST = -13
+# seconds between writes of the packet id to the persistent store
+PERSISTENT_STORE_FLUSH_INTERVAL = 10
 
 
 class ProtocolState(BaseEnum):
@@ -224,7 +226,10 @@ class Protocol(InstrumentProtocol):
     def _build_persistent_dict(self):
         refdes = self._param_dict.get(Parameter.REFDES)
 
-        self._persistent_store = ConsulPersistentStore(refdes)
+        if self._persistent_store is not None:
+            self._persistent_store.close()
+        self._persistent_store = ConsulPersistentStore(refdes, cache=True,
+                                                       flush_interval=PERSISTENT_STORE_FLUSH_INTERVAL)
         if 'pktid' not in self._persistent_store:
             self._persistent_store['pktid'] = ORBOLDEST
 
@@ -443,6 +448,11 @@ class Protocol(InstrumentProtocol):
         """
         self.stop_scheduled_job(ScheduledJob.FLUSH)
         self._orbstop()
+        if self._persistent_store is not None:
+            try:
+                self._persistent_store.flush()
+            except InstrumentParameterException as e:
+                log.error('Unable to save the packet id: %r', e)
 
     def _handler_config_error(self, *args, **kwargs):
         next_state = ProtocolState.CONFIG_ERROR
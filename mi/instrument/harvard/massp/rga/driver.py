@@ -232,6 +232,7 @@ class RGASampleParticle(DataParticle):
     """
     __metaclass__ = META_LOGGER
     _data_particle_type = DataParticleType.RGA_SAMPLE
+    _array_dtypes = {RGASampleParticleKey.SCAN_DATA: '<i4'}
 
     def _build_parsed_values(self):
         my_struct = struct.Struct('<%di' % (len(self.raw_data) / 4))
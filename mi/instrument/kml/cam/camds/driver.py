@@ -11,7 +11,7 @@ import re
 import os
 import struct
 
-from threading import Timer
+from functools import partial
 
 from mi.core.common import BaseEnum
 from mi.core.common import Units
@@ -37,6 +37,7 @@ from mi.core.instrument.instrument_protocol import CommandResponseInstrumentProt
 
 from mi.core.driver_scheduler import DriverSchedulerConfigKey
 from mi.core.driver_scheduler import TriggerType
+from mi.core.heap_scheduler import get_timer_heap
 
 from mi.core.log import get_logger
 
@@ -61,6 +62,15 @@ DEFAULT_WRITE_DELAY = 0
 # Time taken by the camera to 'recover' from taking a single image, in seconds
 CAMERA_RECOVERY_TIME = 30
 
+# Time taken by the camera to apply a new parameter value, in seconds
+PARAMETER_SETTLE_TIME = 12
+
+# Camera mode and image resolution changes take longer to apply
+CAMERA_MODE_SETTLE_TIME = 37
+
+# Time given to the camera to move to a preset position, in seconds
+PRESET_MOVE_TIME = 30
+
 ZERO_TIME_INTERVAL = '00:00:00'
 
 # Enforce  maximum duration for auto capture
@@ -563,6 +573,11 @@ class ProtocolEvent(BaseEnum):
     EXECUTE_AUTO_CAPTURE = 'DRIVER_EVENT_EXECUTE_AUTO_CAPTURE'
     STOP_CAPTURE = 'DRIVER_EVENT_STOP_CAPTURE'
 
+    # internal events driving the timed sequences
+    CONFIGURE = 'DRIVER_EVENT_CONFIGURE'
+    SETTLED = 'DRIVER_EVENT_SETTLED'
+    POSITIONED = 'DRIVER_EVENT_POSITIONED'
+
 
 class Capability(BaseEnum):
     """
@@ -607,6 +622,9 @@ class ProtocolState(DriverProtocolState):
     COMMAND = DriverProtocolState.COMMAND
     AUTOSAMPLE = DriverProtocolState.AUTOSAMPLE
     RECOVERY = "DRIVER_STATE_RECOVERY"
+    CONFIGURING = "DRIVER_STATE_CONFIGURING"
+    POSITIONING = "DRIVER_STATE_POSITIONING"
+    CAPTURE = "DRIVER_STATE_CAPTURE"
     DIRECT_ACCESS = DriverProtocolState.DIRECT_ACCESS
 
 
@@ -760,6 +778,15 @@ class CAMDSProtocol(CommandResponseInstrumentProtocol):
 
         self.disable_autosample_recover = False
 
+        # Timed sequences (settling after a set, moving to a preset, capturing, recovering)
+        # run in a busy state and return to the state they started from when the camera is ready
+        self._return_state = ProtocolState.COMMAND
+        self._pending_sets = []
+        self._next_action = None
+        self._queued_events = []
+        self._sequence_timer = None
+        self._timer_id = 0
+
         self.initialize_scheduler()
 
         self._connection = None
@@ -869,6 +896,8 @@ class CAMDSProtocol(CommandResponseInstrumentProtocol):
                                        self._handler_command_start_capture)
         self._protocol_fsm.add_handler(ProtocolState.COMMAND, ProtocolEvent.START_RECOVER,
                                        self._handler_command_start_recovery)
+        self._protocol_fsm.add_handler(ProtocolState.COMMAND, ProtocolEvent.CONFIGURE,
+                                       self._handler_command_configure)
 
         self._protocol_fsm.add_handler(ProtocolState.AUTOSAMPLE, ProtocolEvent.ENTER,
                                        self._handler_autosample_enter)
@@ -902,11 +931,40 @@ class CAMDSProtocol(CommandResponseInstrumentProtocol):
                                        self._handler_autosample_start_capture)
         self._protocol_fsm.add_handler(ProtocolState.AUTOSAMPLE, ProtocolEvent.START_RECOVER,
                                        self._handler_command_start_recovery)
-
-        self._protocol_fsm.add_handler(ProtocolState.RECOVERY, ProtocolEvent.ENTER,
-                                       self._handler_recovery_enter)
-        self._protocol_fsm.add_handler(ProtocolState.RECOVERY, ProtocolEvent.EXIT,
-                                       self._handler_recovery_exit)
+        self._protocol_fsm.add_handler(ProtocolState.AUTOSAMPLE, ProtocolEvent.CONFIGURE,
+                                       self._handler_command_configure)
+
+        # Busy states. Gets are always answered, sample requests are queued until the
+        # sequence completes and anything else is rejected as not handled in the state.
+        for state in [ProtocolState.CONFIGURING, ProtocolState.POSITIONING,
+                      ProtocolState.CAPTURE, ProtocolState.RECOVERY]:
+            self._protocol_fsm.add_handler(state, ProtocolEvent.ENTER, self._handler_busy_enter)
+            self._protocol_fsm.add_handler(state, ProtocolEvent.EXIT, self._handler_busy_exit)
+            self._protocol_fsm.add_handler(state, ProtocolEvent.GET, self._handler_get)
+            for event in [ProtocolEvent.ACQUIRE_SAMPLE, ProtocolEvent.EXECUTE_AUTO_CAPTURE]:
+                self._protocol_fsm.add_handler(state, event, partial(self._handler_busy_queue, event))
+
+        # status is read while the camera moves or captures, after it has settled otherwise
+        for state in [ProtocolState.POSITIONING, ProtocolState.CAPTURE]:
+            self._protocol_fsm.add_handler(state, ProtocolEvent.ACQUIRE_STATUS,
+                                           self._handler_command_acquire_status)
+        for state in [ProtocolState.CONFIGURING, ProtocolState.RECOVERY]:
+            self._protocol_fsm.add_handler(state, ProtocolEvent.ACQUIRE_STATUS,
+                                           partial(self._handler_busy_queue, ProtocolEvent.ACQUIRE_STATUS))
+
+        # startup parameters applied during a sequence are sent once it completes
+        for state in [ProtocolState.POSITIONING, ProtocolState.CAPTURE, ProtocolState.RECOVERY]:
+            self._protocol_fsm.add_handler(state, ProtocolEvent.CONFIGURE,
+                                           partial(self._handler_busy_queue, ProtocolEvent.CONFIGURE))
+
+        self._protocol_fsm.add_handler(ProtocolState.CONFIGURING, ProtocolEvent.CONFIGURE,
+                                       self._handler_configuring_configure)
+        self._protocol_fsm.add_handler(ProtocolState.CONFIGURING, ProtocolEvent.SETTLED,
+                                       self._handler_configuring_settled)
+        self._protocol_fsm.add_handler(ProtocolState.POSITIONING, ProtocolEvent.POSITIONED,
+                                       self._handler_positioning_positioned)
+        self._protocol_fsm.add_handler(ProtocolState.CAPTURE, ProtocolEvent.STOP_CAPTURE,
+                                       self._handler_capture_stop_capture)
         self._protocol_fsm.add_handler(ProtocolState.RECOVERY, ProtocolEvent.RECOVER_COMPLETE,
                                        self._handler_recovery_complete)
 
@@ -1276,7 +1334,9 @@ class CAMDSProtocol(CommandResponseInstrumentProtocol):
 
     def _set_params(self, *args, **kwargs):
         """
-        Issue commands to the instrument to set various parameters. The UI values are set in the _update_params call
+        Issue commands to the instrument to set various parameters. The UI values are set in the _update_params call.
+        The camera needs time to apply each new value, so dirty parameters are queued and sent one at a time
+        from the CONFIGURING state.
         """
 
         # Retrieve required parameter.
@@ -1327,22 +1387,15 @@ class CAMDSProtocol(CommandResponseInstrumentProtocol):
                 if self._param_dict.get(key) != params[key]:
                     log.debug("Parameter %s is dirty: old: %s - new: %s" % (key, self._param_dict.get(key), params[key]))
 
-                    result = self._do_cmd_resp(InstrumentCommands.SET, key, val, **kwargs)
-                    time.sleep(2)
-
-                    # The instrument needs extra time to process these commands
-                    if key in [Parameter.CAMERA_MODE[ParameterIndex.KEY],
-                               Parameter.IMAGE_RESOLUTION[ParameterIndex.KEY]]:
-                        log.debug("Just set Camera parameters, sleeping for 25 seconds")
-                        time.sleep(25)
-                    elif key in [Parameter.IRIS_POSITION[ParameterIndex.KEY],
-                                 Parameter.FOCUS_POSITION[ParameterIndex.KEY],
-                                 Parameter.ZOOM_POSITION[ParameterIndex.KEY]]:
-                        log.debug("Just set Camera parameters, sleeping for 10 seconds")
+                    self._pending_sets = [(k, v) for k, v in self._pending_sets if k != key]
+                    self._pending_sets.append((key, val))
 
-                    time.sleep(10)
+        if self._pending_sets:
+            self._async_raise_fsm_event(ProtocolEvent.CONFIGURE)
+        else:
+            self._update_params()
 
-        self._update_params()
+        return result
 
     def build_simple_command(self, cmd):
         command = '<\x03:%s:>' % cmd
@@ -1656,7 +1709,7 @@ class CAMDSProtocol(CommandResponseInstrumentProtocol):
         if self._init_type != InitializationType.NONE:
             self._update_params()
 
-        # Command device to initialize parameters
+        # Command device to initialize parameters, changed values are sent from the CONFIGURING state
         self._init_params()
 
         # Tell driver superclass to send a state change event.
@@ -1686,6 +1739,23 @@ class CAMDSProtocol(CommandResponseInstrumentProtocol):
     def _handler_command_start_recovery(self, *args, **kwargs):
         next_state = ProtocolState.RECOVERY
         result = []
+
+        self._begin_sequence()
+        self._do_recover(CAMERA_RECOVERY_TIME)
+
+        return next_state, (next_state, result)
+
+    def _handler_command_configure(self, *args, **kwargs):
+        """
+        Send the queued parameter changes, waiting for the camera to settle after each one
+        """
+        next_state = None
+        result = []
+
+        if self._pending_sets:
+            self._begin_sequence()
+            next_state = self._send_next_set()
+
         return next_state, (next_state, result)
 
     def _handler_command_start_autosample(self, *args, **kwargs):
@@ -1717,22 +1787,10 @@ class CAMDSProtocol(CommandResponseInstrumentProtocol):
         """
         Acquire Sample
         """
-        next_state = ProtocolState.RECOVERY
         result = []
 
-        kwargs['timeout'] = 30
-
-        # Before taking a snapshot, update parameters
-        self._update_metadata_params()
-
-        log.debug("Acquire Sample: about to take a snapshot")
-
-        self._do_cmd_resp(InstrumentCommands.TAKE_SNAPSHOT, *args, **kwargs)
-
-        log.debug("Acquire Sample: Captured snapshot!")
-
-        # Camera needs time to recover after taking a snapshot
-        self._do_recover(CAMERA_RECOVERY_TIME)
+        self._begin_sequence()
+        next_state = self._take_snapshot()
 
         return next_state, (next_state, result)
 
@@ -1842,30 +1900,10 @@ class CAMDSProtocol(CommandResponseInstrumentProtocol):
         """
         Start Auto Capture
         """
-        next_state = None
         result = []
 
-        kwargs['timeout'] = 2
-
-        capturing_duration = self._param_dict.get(Parameter.AUTO_CAPTURE_DURATION[ParameterIndex.KEY])
-
-        if capturing_duration == 0:
-            # If duration = 0, then just take a single snapshot
-            return self._handler_command_acquire_sample(*args, **kwargs)
-        elif 0 < capturing_duration < 6:
-            # Before performing capture, update parameters
-            self._update_metadata_params()
-
-            self._do_cmd_resp(InstrumentCommands.START_CAPTURE, *args, **kwargs)
-
-            time.sleep(capturing_duration)
-
-            next_state = self._handler_command_stop_capture()
-
-            return next_state
-
-        else:
-            log.error("Capturing Duration %s out of range: Not Performing Capture." % capturing_duration)
+        self._begin_sequence()
+        next_state = self._start_capture()
 
         return next_state, (next_state, result)
 
@@ -1873,15 +1911,10 @@ class CAMDSProtocol(CommandResponseInstrumentProtocol):
         """
         Stop Auto capture
         """
-        next_state = ProtocolState.RECOVERY
         result = []
 
-        kwargs['timeout'] = 2
-
-        self._do_cmd_resp(InstrumentCommands.STOP_CAPTURE, *args, **kwargs)
-
-        # Camera needs time to recover after capturing images
-        self._do_recover(self._calculate_recovery_time())
+        self._begin_sequence()
+        next_state = self._stop_capture()
 
         return next_state, (next_state, result)
 
@@ -1889,30 +1922,10 @@ class CAMDSProtocol(CommandResponseInstrumentProtocol):
         """
         Go to the preset position
         """
-        next_state = None
         result = []
 
-        kwargs['timeout'] = 2
-
-        # set to default user preset position
-        preset_number = DEFAULT_USER_PRESET_POSITION
-
-        # Check if the user set a preset position, if so, make the camera go to that position
-        pd = self._param_dict.get_all()
-
-        for key, value in pd.items():
-            if key == Parameter.PRESET_NUMBER[ParameterIndex.KEY]:
-                preset_number = value
-
-        log.debug("Commanding camera to go to preset position %s then sleeping for 30 seconds " % preset_number)
-
-        self._do_cmd_resp(InstrumentCommands.GO_TO_PRESET, preset_number, *args, **kwargs)
-
-        # Give camera 30 seconds to move to new position
-        time.sleep(30)
-
-        # Update parameters to get new position data
-        self._update_params()
+        self._begin_sequence()
+        next_state = self._goto_preset()
 
         return next_state, (next_state, result)
 
@@ -1959,10 +1972,313 @@ class CAMDSProtocol(CommandResponseInstrumentProtocol):
         return recovery_time
 
     def _do_recover(self, recovery_time):
-
-        # start timer here
+        """
+        Give the camera time to recover, RECOVER_COMPLETE is raised when it is ready
+        @param recovery_time: seconds to wait
+        """
         log.debug("Starting timer for %s seconds" % recovery_time)
-        Timer(recovery_time, self._recovery_timer_expired, [self._protocol_fsm.get_current_state()]).start()
+        self._start_timer(recovery_time, ProtocolEvent.RECOVER_COMPLETE)
+
+    ###################################################################################
+    # Timed sequences
+    ###################################################################################
+    def _start_timer(self, delay, event):
+        """
+        Raise event once delay seconds have passed, replacing any running sequence timer.
+        The event carries the timer id so that handlers can ignore a timer cancelled
+        after it fired.
+        @param delay: seconds to wait
+        @param event: protocol event to raise
+        """
+        self._cancel_timer()
+        self._timer_id += 1
+        self._sequence_timer = get_timer_heap().schedule(time.time() + delay,
+                                                         partial(self._timer_expired, self._timer_id, event))
+
+    def _cancel_timer(self):
+        """
+        Cancel the running sequence timer, if any
+        """
+        if self._sequence_timer is not None:
+            get_timer_heap().cancel(self._sequence_timer)
+            self._sequence_timer = None
+
+    def _timer_expired(self, timer_id, event):
+        """
+        Timer heap callback, raises the event from its own thread
+        """
+        if timer_id == self._timer_id:
+            self._async_raise_fsm_event(event, timer_id)
+
+    def _stale_timer(self, *args):
+        """
+        @return: True if the event was raised by a timer which has since been cancelled
+        """
+        if args and args[0] != self._timer_id:
+            log.debug("Ignoring event from cancelled timer %s", args[0])
+            return True
+        return False
+
+    def _begin_sequence(self):
+        """
+        Remember the state to return to when the sequence started from it completes
+        """
+        current_state = self._protocol_fsm.get_current_state()
+        if current_state in [ProtocolState.COMMAND, ProtocolState.AUTOSAMPLE]:
+            self._return_state = current_state
+
+    def _end_sequence(self):
+        """
+        Complete a sequence: notify the agent and replay the events queued while the camera was busy
+        @return: the state to return to
+        """
+        next_state = self._return_state
+
+        log.debug("Sequence complete, returning to %s" % next_state)
+
+        if next_state == ProtocolState.AUTOSAMPLE:
+            next_agent_state = ResourceAgentState.STREAMING
+        else:
+            next_agent_state = ResourceAgentState.COMMAND
+
+        self._async_agent_state_change(next_agent_state)
+
+        queued_events, self._queued_events = self._queued_events, []
+        for event in queued_events:
+            self._async_raise_fsm_event(event)
+
+        return next_state
+
+    def _sequence_step(self, step):
+        """
+        Run the next step of a sequence from a timer event. If the step fails the sequence is
+        abandoned and the driver returns to the state the sequence started from, rather than
+        staying busy with no timer running.
+        @param step: callable returning the next state
+        @return: next_state, (next_state, result)
+        """
+        result = []
+
+        try:
+            next_state = step()
+        except Exception as e:
+            log.error("Sequence failed in %s: %r", self._protocol_fsm.get_current_state(), e)
+            self._cancel_timer()
+            self._pending_sets = []
+            self._next_action = None
+            self._driver_event(DriverAsyncEvent.ERROR, e)
+            next_state = self._end_sequence()
+
+        return next_state, (next_state, result)
+
+    def _settle_time(self, key):
+        """
+        @return: seconds the camera needs to apply a new value of the parameter
+        """
+        if key in [Parameter.CAMERA_MODE[ParameterIndex.KEY],
+                   Parameter.IMAGE_RESOLUTION[ParameterIndex.KEY]]:
+            return CAMERA_MODE_SETTLE_TIME
+        return PARAMETER_SETTLE_TIME
+
+    def _send_next_set(self):
+        """
+        Send the next queued parameter change, or read back the parameters once all are applied
+        @return: the next state
+        """
+        if not self._pending_sets:
+            self._update_params()
+            return self._end_sequence()
+
+        key, val = self._pending_sets.pop(0)
+        settle_time = self._settle_time(key)
+
+        log.debug("Setting %s, waiting %s seconds for the camera to settle" % (key, settle_time))
+
+        self._do_cmd_resp(InstrumentCommands.SET, key, val)
+        self._start_timer(settle_time, ProtocolEvent.SETTLED)
+
+        return ProtocolState.CONFIGURING
+
+    def _goto_preset(self, next_action=None):
+        """
+        Command the camera to the user preset position and wait for it to get there
+        @param next_action: ACQUIRE_SAMPLE or EXECUTE_AUTO_CAPTURE to perform once positioned
+        @return: the next state
+        """
+        preset_number = self._param_dict.get(Parameter.PRESET_NUMBER[ParameterIndex.KEY])
+        if preset_number is None:
+            preset_number = DEFAULT_USER_PRESET_POSITION
+
+        log.debug("Commanding camera to go to preset position %s, waiting %s seconds" %
+                  (preset_number, PRESET_MOVE_TIME))
+
+        self._do_cmd_resp(InstrumentCommands.GO_TO_PRESET, preset_number, timeout=2)
+
+        self._next_action = next_action
+        self._start_timer(PRESET_MOVE_TIME, ProtocolEvent.POSITIONED)
+
+        return ProtocolState.POSITIONING
+
+    def _take_snapshot(self):
+        """
+        Take a single image
+        @return: the next state
+        """
+        # Before taking a snapshot, update parameters
+        self._update_metadata_params()
+
+        log.debug("Acquire Sample: about to take a snapshot")
+
+        self._do_cmd_resp(InstrumentCommands.TAKE_SNAPSHOT, timeout=30)
+
+        log.debug("Acquire Sample: Captured snapshot!")
+
+        # Camera needs time to recover after taking a snapshot
+        self._do_recover(CAMERA_RECOVERY_TIME)
+
+        return ProtocolState.RECOVERY
+
+    def _start_capture(self):
+        """
+        Start capturing images for the auto capture duration
+        @return: the next state, None if the duration is out of range
+        """
+        capturing_duration = self._param_dict.get(Parameter.AUTO_CAPTURE_DURATION[ParameterIndex.KEY])
+
+        if capturing_duration == 0:
+            # If duration = 0, then just take a single snapshot
+            return self._take_snapshot()
+
+        if not 0 < capturing_duration <= MAX_AUTO_CAPTURE_DURATION:
+            log.error("Capturing Duration %s out of range: Not Performing Capture." % capturing_duration)
+            return None
+
+        # Before performing capture, update parameters
+        self._update_metadata_params()
+
+        self._do_cmd_resp(InstrumentCommands.START_CAPTURE, timeout=2)
+        self._start_timer(capturing_duration, ProtocolEvent.STOP_CAPTURE)
+
+        return ProtocolState.CAPTURE
+
+    def _stop_capture(self):
+        """
+        Stop capturing images
+        @return: the next state
+        """
+        self._cancel_timer()
+
+        self._do_cmd_resp(InstrumentCommands.STOP_CAPTURE, timeout=2)
+
+        # Camera needs time to recover after capturing images
+        self._do_recover(self._calculate_recovery_time())
+
+        return ProtocolState.RECOVERY
+
+    def _positioned(self):
+        """
+        The camera has reached the preset position, carry on with the action it was moved for
+        @return: the next state
+        """
+        next_action, self._next_action = self._next_action, None
+
+        # Update parameters to get new position data
+        self._update_params()
+
+        next_state = None
+        if next_action == ProtocolEvent.ACQUIRE_SAMPLE:
+            next_state = self._take_snapshot()
+        elif next_action == ProtocolEvent.EXECUTE_AUTO_CAPTURE:
+            next_state = self._start_capture()
+
+        return next_state or self._end_sequence()
+
+    def _recovered(self):
+        """
+        The camera has recovered, return to the state the sequence started from
+        @return: the next state
+        """
+        if self._return_state == ProtocolState.AUTOSAMPLE:
+            # return camera back to default position
+            log.debug("time to return camera to default position")
+            self._do_cmd_resp(InstrumentCommands.GO_TO_PRESET, DEFAULT_PRESET_POSITION)
+
+        return self._end_sequence()
+
+    ###################################################################################
+    # Busy State handlers
+    ###################################################################################
+    def _handler_busy_enter(self, *args, **kwargs):
+        """
+        Enter a busy state
+        """
+        # Tell driver superclass to send a state change event.
+        # Superclass will query the state.
+
+        self._driver_event(DriverAsyncEvent.STATE_CHANGE)
+
+    def _handler_busy_exit(self, *args, **kwargs):
+        """
+        Exit a busy state.
+        """
+
+    def _handler_busy_queue(self, event, *args, **kwargs):
+        """
+        Queue an event until the camera is no longer busy. Repeated requests are coalesced.
+        @param event: the queued event
+        """
+        next_state = None
+        result = []
+
+        if event not in self._queued_events:
+            log.info("%s queued until the camera is ready (%s)", event, self._protocol_fsm.get_current_state())
+            self._queued_events.append(event)
+
+        return next_state, (next_state, result)
+
+    def _handler_configuring_configure(self, *args, **kwargs):
+        """
+        New parameter changes are already queued, they are sent by the running sequence
+        """
+        next_state = None
+        result = []
+        return next_state, (next_state, result)
+
+    def _handler_configuring_settled(self, *args, **kwargs):
+        """
+        The camera has applied the last parameter change
+        """
+        if self._stale_timer(*args):
+            return None, (None, [])
+
+        return self._sequence_step(self._send_next_set)
+
+    def _handler_positioning_positioned(self, *args, **kwargs):
+        """
+        The camera has had time to reach the preset position
+        """
+        if self._stale_timer(*args):
+            return None, (None, [])
+
+        return self._sequence_step(self._positioned)
+
+    def _handler_capture_stop_capture(self, *args, **kwargs):
+        """
+        Stop capturing, at the end of the capture duration or on request
+        """
+        if self._stale_timer(*args):
+            return None, (None, [])
+
+        return self._sequence_step(self._stop_capture)
+
+    def _handler_recovery_complete(self, *args, **kwargs):
+        """
+        Protocol method to transition back to the previous state once recovery is complete
+        """
+        if self._stale_timer(*args):
+            return None, (None, [])
+
+        return self._sequence_step(self._recovered)
 
 
     ###################################################################################
@@ -2010,6 +2326,7 @@ class CAMDSProtocol(CommandResponseInstrumentProtocol):
         """
         Enter autosample state.
         """
+        # Command device to initialize parameters, changed values are sent from the CONFIGURING state
         self._init_params()
 
         # Tell driver superclass to send a state change event.
@@ -2026,25 +2343,11 @@ class CAMDSProtocol(CommandResponseInstrumentProtocol):
         """
         Acquire Sample
         """
-        next_state = ProtocolState.RECOVERY
         result = []
 
-        kwargs['timeout'] = 30
-
-        # First, go to the user defined preset position
-        self._handler_command_goto_preset()
-
-        # Before taking a snapshot, update parameters
-        self._update_metadata_params()
-
-        log.debug("Acquire Sample: about to take a snapshot")
-
-        self._do_cmd_resp(InstrumentCommands.TAKE_SNAPSHOT, *args, **kwargs)
-
-        log.debug("Acquire Sample: Captured snapshot!")
-
-        # Camera needs time to recover after taking a snapshot
-        self._do_recover(CAMERA_RECOVERY_TIME)
+        # First, go to the user defined preset position, the snapshot is taken once there
+        self._begin_sequence()
+        next_state = self._goto_preset(ProtocolEvent.ACQUIRE_SAMPLE)
 
         return next_state, (next_state, result)
 
@@ -2052,10 +2355,13 @@ class CAMDSProtocol(CommandResponseInstrumentProtocol):
         """
         Start Auto Capture
         """
-        # First, go to the user defined preset position
-        self._handler_command_goto_preset()
+        result = []
 
-        self._handler_command_start_capture(*args, **kwargs)
+        # First, go to the user defined preset position, the capture starts once there
+        self._begin_sequence()
+        next_state = self._goto_preset(ProtocolEvent.EXECUTE_AUTO_CAPTURE)
+
+        return next_state, (next_state, result)
 
     def _handler_autosample_stop_autosample(self, *args, **kwargs):
         """
@@ -2070,50 +2376,6 @@ class CAMDSProtocol(CommandResponseInstrumentProtocol):
 
         return next_state, (next_state, result)
 
-    def _handler_recovery_enter(self, *args, **kwargs):
-        """
-        Enter the Recovery state
-        """
-        # Tell driver superclass to send a state change event.
-        # Superclass will query the state.
-
-        self._driver_event(DriverAsyncEvent.STATE_CHANGE)
-
-    def _handler_recovery_exit(self, *args, **kwargs):
-        """
-        Exit recovery state.
-        """
-
-    def _handler_recovery_complete(self, *args, **kwargs):
-        """
-        Protocol method to transition back to the previous state once recovery is complete
-        """
-        next_state = args[0]
-        result = []
-
-        log.debug("Recovery complete, returning to %s" % next_state)
-
-        # Recovery complete, return back to the previous state
-        if next_state == ProtocolState.AUTOSAMPLE:
-            # return camera back to default position
-            log.debug("time to return camera to default position")
-            self._do_cmd_resp(InstrumentCommands.GO_TO_PRESET, DEFAULT_PRESET_POSITION, **kwargs)
-            next_agent_state = ResourceAgentState.STREAMING
-        else:
-            next_agent_state = ResourceAgentState.COMMAND
-
-        self._async_agent_state_change(next_agent_state)
-
-        return next_state, (next_state, result)
-
-    def _recovery_timer_expired(self, *args, **kwargs):
-        """
-        Callback method for when the timer for the recovery state expires
-        """
-        next_state = args[0]
-
-        self._async_raise_fsm_event(ProtocolEvent.RECOVER_COMPLETE, next_state)
-
     def _handler_command_set(self, *args, **kwargs):
         """
         Perform a set command.
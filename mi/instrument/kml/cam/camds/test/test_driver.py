@@ -13,9 +13,12 @@ __license__ = 'Apache 2.0'
 import copy
 import time
 
+from threading import Thread
+
 from nose.plugins.attrib import attr
-from mock import Mock
+from mock import Mock, patch
 
+from mi.core.exceptions import InstrumentStateException
 from mi.core.instrument.chunker import StringChunker
 from mi.core.log import get_logger
 
@@ -206,14 +209,20 @@ class CAMDSMixin(DriverTestMixin):
         Capability.DISCOVER: {STATES: [ProtocolState.UNKNOWN]},
         Capability.START_AUTOSAMPLE: {STATES: [ProtocolState.COMMAND, ProtocolState.AUTOSAMPLE]},
         Capability.STOP_AUTOSAMPLE: {STATES: [ProtocolState.COMMAND, ProtocolState.AUTOSAMPLE]},
-        Capability.ACQUIRE_STATUS: {STATES: [ProtocolState.COMMAND, ProtocolState.AUTOSAMPLE]},
+        Capability.ACQUIRE_STATUS: {STATES: [ProtocolState.COMMAND, ProtocolState.AUTOSAMPLE,
+                                             ProtocolState.CONFIGURING, ProtocolState.POSITIONING,
+                                             ProtocolState.CAPTURE, ProtocolState.RECOVERY]},
         Capability.GOTO_PRESET: {STATES: [ProtocolState.COMMAND, ProtocolState.AUTOSAMPLE]},
         Capability.LAMP_OFF: {STATES: [ProtocolState.COMMAND, ProtocolState.AUTOSAMPLE]},
         Capability.LAMP_ON: {STATES: [ProtocolState.COMMAND, ProtocolState.AUTOSAMPLE]},
         Capability.LASERS_OFF: {STATES: [ProtocolState.COMMAND, ProtocolState.AUTOSAMPLE]},
         Capability.LASERS_ON: {STATES: [ProtocolState.COMMAND, ProtocolState.AUTOSAMPLE]},
-        Capability.ACQUIRE_SAMPLE: {STATES: [ProtocolState.COMMAND, ProtocolState.AUTOSAMPLE]},
-        Capability.EXECUTE_AUTO_CAPTURE: {STATES: [ProtocolState.COMMAND, ProtocolState.AUTOSAMPLE]},
+        Capability.ACQUIRE_SAMPLE: {STATES: [ProtocolState.COMMAND, ProtocolState.AUTOSAMPLE,
+                                             ProtocolState.CONFIGURING, ProtocolState.POSITIONING,
+                                             ProtocolState.CAPTURE, ProtocolState.RECOVERY]},
+        Capability.EXECUTE_AUTO_CAPTURE: {STATES: [ProtocolState.COMMAND, ProtocolState.AUTOSAMPLE,
+                                                   ProtocolState.CONFIGURING, ProtocolState.POSITIONING,
+                                                   ProtocolState.CAPTURE, ProtocolState.RECOVERY]},
     }
 
     size_1 = chr(0x01)
@@ -282,6 +291,53 @@ class CAMDSMixin(DriverTestMixin):
         self.assert_data_particle_parameters(data_particle, self._disk_status_dict)  # , verify_values
 
 
+class SimulatedCamera(object):
+    """
+    Answers the commands the driver writes to the port agent the way the camera does,
+    and records when each command was received
+    """
+
+    def __init__(self, test, driver):
+        self._test = test
+        self._driver = driver
+        self.commands = []
+
+        # get commands answer with the default value of each parameter they return
+        self._get_responses = {}
+        for param in Parameter.list():
+            if not isinstance(param, tuple) or param[ParameterIndex.GET] is None:
+                continue
+            code = param[ParameterIndex.GET][3:5]
+            data = self._get_responses.get(code, '')
+            start = param[ParameterIndex.Start] - 1
+            value = param[ParameterIndex.DEFAULT_DATA]
+            data = data.ljust(start, '\x00')
+            self._get_responses[code] = data[:start] + value + data[start + len(value):]
+
+        driver._protocol._connection.send.side_effect = self.send
+
+    def send(self, data):
+        code = data[3:5]
+        self.commands.append((time.time(), code))
+
+        if code == InstrumentCommands.HEALTH_REQUEST:
+            response = CAMDSMixin._health_data
+        elif code == InstrumentCommands.GET_DISK_USAGE:
+            response = CAMDSMixin._disk_data
+        elif code in self._get_responses:
+            response = '<%s:\x06:%s%s>' % (chr(len(self._get_responses[code]) + 5), code, self._get_responses[code])
+        else:
+            response = '<\x04:\x06:%s>' % code
+
+        self._test.push_data_to_driver(self._driver, response)
+
+    def sent(self, code):
+        """
+        @return: times at which the command was received
+        """
+        return [when for when, command in self.commands if command == code]
+
+
 ###############################################################################
 #                                UNIT TESTS                                   #
 #         Unit tests test the method calls and parameters using Mock.         #
@@ -380,6 +436,119 @@ class DriverUnitTest(InstrumentDriverUnitTestCase, CAMDSMixin):
         # Verify "BOGUS_CAPABILITY was filtered out
         self.assertEquals(driver_capabilities, protocol._filter_capabilities(test_capabilities))
 
+    def assert_state_reached(self, protocol, state, timeout=10):
+        """
+        Wait for the protocol to reach a state
+        """
+        end_time = time.time() + timeout
+        while protocol.get_current_state() != state:
+            self.assertLess(time.time(), end_time, 'timed out waiting for %s, state is %s' %
+                            (state, protocol.get_current_state()))
+            time.sleep(.05)
+
+    def test_status_during_capture(self):
+        """
+        Verify status requests are answered while the camera captures, and that conflicting
+        commands are queued or rejected until the capture sequence completes
+        """
+        driver = InstrumentDriver(self._got_data_event_callback)
+        self.assert_initialize_driver(driver, ProtocolState.COMMAND)
+        camera = SimulatedCamera(self, driver)
+        protocol = driver._protocol
+        fsm = protocol._protocol_fsm
+
+        capture_duration = 2
+        protocol._param_dict.set_value(Parameter.AUTO_CAPTURE_DURATION[ParameterIndex.KEY], capture_duration)
+
+        with patch('mi.instrument.kml.cam.camds.driver.CAMERA_RECOVERY_TIME', .01):
+            start_time = time.time()
+            fsm.on_event(ProtocolEvent.EXECUTE_AUTO_CAPTURE)
+            self.assertEqual(protocol.get_current_state(), ProtocolState.CAPTURE)
+            self.assertEqual(len(camera.sent(InstrumentCommands.START_CAPTURE)), 1)
+
+            results = []
+
+            def acquire_status():
+                results.append(fsm.on_event(ProtocolEvent.ACQUIRE_STATUS))
+
+            threads = [Thread(target=acquire_status) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(capture_duration)
+
+            # all answered, with both status particles, before the capture ended
+            self.assertEqual(len(results), 3)
+            for next_state, particles in results:
+                self.assertIsNone(next_state)
+                self.assertEqual(len(particles), 2)
+            self.assertLess(time.time() - start_time, capture_duration)
+            self.assertEqual(protocol.get_current_state(), ProtocolState.CAPTURE)
+
+            self.assertIsNotNone(fsm.on_event(ProtocolEvent.GET, [Parameter.FRAME_RATE[ParameterIndex.KEY]]))
+
+            # conflicting commands are rejected, samples are queued
+            self.assertRaises(InstrumentStateException, fsm.on_event, ProtocolEvent.GOTO_PRESET)
+            self.assertRaises(InstrumentStateException, fsm.on_event, ProtocolEvent.START_AUTOSAMPLE)
+            fsm.on_event(ProtocolEvent.ACQUIRE_SAMPLE)
+            fsm.on_event(ProtocolEvent.ACQUIRE_SAMPLE)
+            self.assertEqual(camera.sent(InstrumentCommands.TAKE_SNAPSHOT), [])
+
+            self.assert_state_reached(protocol, ProtocolState.COMMAND)
+
+            # the queued sample is taken once after the capture
+            stop_times = camera.sent(InstrumentCommands.STOP_CAPTURE)
+            self.assertEqual(len(stop_times), 1)
+            self.assertGreaterEqual(stop_times[0] - start_time, capture_duration - .1)
+
+            end_time = time.time() + 10
+            while not camera.sent(InstrumentCommands.TAKE_SNAPSHOT):
+                self.assertLess(time.time(), end_time)
+                time.sleep(.05)
+            self.assertGreater(camera.sent(InstrumentCommands.TAKE_SNAPSHOT)[0], stop_times[0])
+            self.assert_state_reached(protocol, ProtocolState.COMMAND)
+            self.assertEqual(len(camera.sent(InstrumentCommands.TAKE_SNAPSHOT)), 1)
+
+    def test_set_sequence(self):
+        """
+        Verify parameter changes are applied one at a time, waiting for the camera to settle,
+        while gets are still answered
+        """
+        driver = InstrumentDriver(self._got_data_event_callback)
+        self.assert_initialize_driver(driver, ProtocolState.COMMAND)
+        camera = SimulatedCamera(self, driver)
+        protocol = driver._protocol
+        fsm = protocol._protocol_fsm
+
+        with patch.multiple('mi.instrument.kml.cam.camds.driver', PARAMETER_SETTLE_TIME=.2,
+                            CAMERA_MODE_SETTLE_TIME=.5):
+            fsm.on_event(ProtocolEvent.SET, {Parameter.CAMERA_MODE[ParameterIndex.KEY]: 10,
+                                             Parameter.COMPRESSION_RATIO[ParameterIndex.KEY]: 50})
+            self.assert_state_reached(protocol, ProtocolState.CONFIGURING)
+
+            self.assertIsNotNone(fsm.on_event(ProtocolEvent.GET, [Parameter.CAMERA_MODE[ParameterIndex.KEY]]))
+            self.assertRaises(InstrumentStateException, fsm.on_event, ProtocolEvent.LAMP_ON)
+            fsm.on_event(ProtocolEvent.ACQUIRE_STATUS)
+
+            self.assert_state_reached(protocol, ProtocolState.COMMAND)
+
+            mode_time = camera.sent(Parameter.CAMERA_MODE[ParameterIndex.SET])
+            ratio_time = camera.sent(Parameter.COMPRESSION_RATIO[ParameterIndex.SET])
+            self.assertEqual(len(mode_time), 1)
+            self.assertEqual(len(ratio_time), 1)
+            first, second = sorted([mode_time[0], ratio_time[0]])
+            if first == mode_time[0]:
+                self.assertGreaterEqual(second - first, .5)
+            else:
+                self.assertGreaterEqual(second - first, .2)
+
+            # the parameters are read back, then the queued status request is answered
+            end_time = time.time() + 10
+            while not camera.sent(InstrumentCommands.HEALTH_REQUEST):
+                self.assertLess(time.time(), end_time)
+                time.sleep(.05)
+            self.assertGreater(camera.sent(InstrumentCommands.HEALTH_REQUEST)[0], second)
+
     def test_set(self):
         params = [
             (Parameter.CAMERA_GAIN, 1, '<\x04:GS:\x01>'),
@@ -351,6 +351,9 @@ class McLaneProtocol(CommandResponseInstrumentProtocol):
     """
     # __metaclass__ = get_logging_metaclass(log_level='debug')
 
+    # the RAS drops characters sent faster than this, even once the previous one is echoed
+    _min_write_gap = INTER_CHARACTER_DELAY
+
     def __init__(self, prompts, newline, driver_event):
         """
         Protocol constructor.
@@ -571,9 +574,7 @@ class McLaneProtocol(CommandResponseInstrumentProtocol):
         log.debug('_do_cmd_resp: %s, timeout=%s, write_delay=%s, response_regex=%s',
                   repr(cmd_line), timeout, write_delay, response_regex)
 
-        for char in cmd_line:
-            self._connection.send(char)
-            time.sleep(write_delay)
+        self._send_paced(cmd_line, write_delay)
 
         # Wait for the prompt, prepare result and return, timeout exception
         return self._get_response(timeout, response_regex=response_regex)
@@ -400,6 +400,9 @@ class Protocol(CommandResponseInstrumentProtocol):
     Instrument protocol class
     Subclasses CommandResponseInstrumentProtocol
     """
+    # the RAS drops characters sent faster than this, even once the previous one is echoed
+    _min_write_gap = INTER_CHARACTER_DELAY
+
     def __init__(self, prompts, newline, driver_event):
         """
         Protocol constructor.
@@ -627,6 +627,8 @@ class Protocol(CommandResponseInstrumentProtocol):
         if len(self._promptbuf) > max_size:
             self._promptbuf = self._linebuf[max_size * -1:]
 
+        self._notify_buffer()
+
     def _max_buffer_size(self):
         """
         Overriding base class to increase max buffer size
@@ -888,6 +888,7 @@ class mavs4InstrumentProtocol(MenuInstrumentProtocol):
                 prompt_list = expected_prompt
 
         while True:
+            update = self._buffer_updates
             for item in prompt_list:
                 if item in self._promptbuf:
                     return item, self._linebuf
@@ -897,7 +898,7 @@ class mavs4InstrumentProtocol(MenuInstrumentProtocol):
                           self._promptbuf, prompt_list)
                 raise InstrumentTimeoutException("in InstrumentProtocol._get_response()")
 
-            time.sleep(.1)
+            self._wait_for_buffer(update, starttime + timeout)
 
     def _navigate_and_execute(self, cmd, **kwargs):
         """
@@ -10,6 +10,7 @@ import re
 
 from mi.core.common import Units
 from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.framer import BinaryFramer
 from mi.core.instrument.instrument_driver import SingleConnectionInstrumentDriver
 from mi.core.instrument.protocol_param_dict import ParameterDictType
 from mi.core.instrument.protocol_param_dict import ParameterDictVisibility
@@ -37,6 +38,7 @@ VELOCITY_DATA_SYNC_BYTES = '\xa5\x01\x15\x00'
 
 VELOCITY_DATA_PATTERN = r'%s.{38}' % VELOCITY_DATA_SYNC_BYTES
 VELOCITY_DATA_REGEX = re.compile(VELOCITY_DATA_PATTERN, re.DOTALL)
+VELOCITY_DATA_FRAMER = BinaryFramer(VELOCITY_DATA_SYNC_BYTES, length=VELOCITY_DATA_LEN)
 
 
 ###############################################################################
@@ -97,13 +99,14 @@ class Protocol(NortekInstrumentProtocol):
         Should be in the format [[structure_sync_bytes, structure_len]*]
         """
         return_list = []
-        sieve_matchers = common.NORTEK_COMMON_REGEXES + [VELOCITY_DATA_REGEX]
 
-        for matcher in sieve_matchers:
+        for matcher in common.NORTEK_COMMON_REGEXES:
             for match in matcher.finditer(raw_data):
                 return_list.append((match.start(), match.end()))
                 log.debug("sieve_function: regex found %r", raw_data[match.start():match.end()])
 
+        return_list.extend(VELOCITY_DATA_FRAMER.sieve(raw_data))
+
         return return_list
 
     def _got_chunk(self, structure, timestamp):
@@ -6,6 +6,7 @@ from datetime import datetime
 from mi.core.common import BaseEnum
 from mi.core.exceptions import SampleException
 from mi.core.instrument.data_particle import DataParticle, CommonDataParticleType, DataParticleKey, DataParticleValue
+from mi.core.instrument.framer import sum16
 from mi.instrument.nortek import common
 from mi.instrument.nortek.user_configuration import UserConfigKey, UserConfigCompositeKey, UserConfiguration
 from mi.logging import log
@@ -18,9 +19,7 @@ namedtuple_store = {}
 
 def validate_checksum(str_struct, raw_data, offset=-2):
     checksum = struct.unpack_from('<H', raw_data, offset)[0]
-    if (0xb58c + sum(struct.unpack_from(str_struct, raw_data))) & 0xffff != checksum:
-        return False
-    return True
+    return sum16(raw_data[:struct.calcsize(str_struct)], common.CHECK_SUM_SEED) == checksum
 
 
 def unpack_from_format(name, unpack_format, data):
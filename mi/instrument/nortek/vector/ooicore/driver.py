@@ -14,13 +14,13 @@ import re
 
 from mi.core.instrument.chunker import StringChunker
 from mi.core.instrument.data_particle import DataParticleKey
+from mi.core.instrument.framer import BinaryFramer, ChecksumType
 from mi.core.instrument.instrument_driver import DriverAsyncEvent, SingleConnectionInstrumentDriver
 from mi.core.instrument.protocol_param_dict import ParameterDictVisibility
 from mi.core.log import get_logger
 from mi.instrument.nortek import common
 from mi.instrument.nortek.driver import InstrumentPrompts, Parameter
 from mi.instrument.nortek.driver import NortekInstrumentProtocol
-from mi.instrument.nortek.driver import validate_checksum
 from mi.instrument.nortek.particles import (VectorVelocityDataParticle, VectorSystemDataParticle,
                                             VectorVelocityHeaderDataParticle, VectorHardwareConfigDataParticle,
                                             VectorEngIdDataParticle, VectorEngBatteryDataParticle,
@@ -46,7 +46,14 @@ SYSTEM_DATA_REGEX = re.compile(SYSTEM_DATA_PATTERN, re.DOTALL)
 VELOCITY_HEADER_DATA_PATTERN = r'%s.{38}' % VELOCITY_HEADER_DATA_SYNC_BYTES
 VELOCITY_HEADER_DATA_REGEX = re.compile(VELOCITY_HEADER_DATA_PATTERN, re.DOTALL)
 
-VECTOR_SAMPLE_REGEX = [VELOCITY_DATA_REGEX, SYSTEM_DATA_REGEX, VELOCITY_HEADER_DATA_REGEX]
+# two sync bytes are not enough for an accurate match, velocity data is also checked for a valid checksum
+VELOCITY_DATA_FRAMER = BinaryFramer(VELOCITY_DATA_SYNC_BYTES, length=VELOCITY_DATA_LEN - 2,
+                                    checksum=ChecksumType.SUM16, checksum_seed=common.CHECK_SUM_SEED,
+                                    checksum_format='<H')
+SYSTEM_DATA_FRAMER = BinaryFramer(SYSTEM_DATA_SYNC_BYTES, length=SYSTEM_DATA_LEN)
+VELOCITY_HEADER_DATA_FRAMER = BinaryFramer(VELOCITY_HEADER_DATA_SYNC_BYTES, length=VELOCITY_HEADER_DATA_LEN)
+
+VECTOR_SAMPLE_FRAMERS = [VELOCITY_DATA_FRAMER, SYSTEM_DATA_FRAMER, VELOCITY_HEADER_DATA_FRAMER]
 
 
 ###############################################################################
@@ -104,19 +111,14 @@ class Protocol(NortekInstrumentProtocol):
         Should be in the format [[structure_sync_bytes, structure_len]*]
         """
         return_list = []
-        sieve_matchers = common.NORTEK_COMMON_REGEXES + VECTOR_SAMPLE_REGEX
 
-        for matcher in sieve_matchers:
+        for matcher in common.NORTEK_COMMON_REGEXES:
             for match in matcher.finditer(raw_data):
-                if matcher == VELOCITY_DATA_REGEX:
-                    # two bytes is not enough for an accurate match
-                    # check for a valid checksum
-                    data = raw_data[match.start():match.end()]
-                    if validate_checksum('<11H', data):
-                        return_list.append((match.start(), match.end()))
-                else:
-                    return_list.append((match.start(), match.end()))
-                    log.debug("sieve_function: regex found %r", raw_data[match.start():match.end()])
+                return_list.append((match.start(), match.end()))
+                log.debug("sieve_function: regex found %r", raw_data[match.start():match.end()])
+
+        for framer in VECTOR_SAMPLE_FRAMERS:
+            return_list.extend(framer.sieve(raw_data))
 
         return return_list
 
@@ -605,15 +605,16 @@ class InstrumentProtocol(CommandResponseInstrumentProtocol):
                 prompt_list = expected_prompt
 
         while True:
+            update = self._buffer_updates
             for item in prompt_list:
                 if item in self._promptbuf:
                     return item, self._linebuf
-                else:
-                    time.sleep(.1)
 
             if time.time() > starttime + timeout:
                 raise InstrumentTimeoutException("in InstrumentProtocol._get_response()")
 
+            self._wait_for_buffer(update, starttime + timeout)
+
     def _do_cmd_resp(self, cmd, *args, **kwargs):
         """
         overridden to retrieve the expected response from the build handler
@@ -652,13 +653,7 @@ class InstrumentProtocol(CommandResponseInstrumentProtocol):
         # Send command.
         log.debug('_do_cmd_resp: cmd=%r, timeout=%s, write_delay=%s, expected_prompt=%s,',
                   repr(cmd_line), timeout, write_delay, expected_prompt)
-
-        if write_delay == 0:
-            self._connection.send(cmd_line)
-        else:
-            for char in cmd_line:
-                self._connection.send(char)
-                time.sleep(write_delay)
+        self._send_paced(cmd_line, write_delay)
 
         # Wait for the prompt, prepare result and return, timeout exception
         (prompt, result) = self._get_response(timeout, expected_prompt=expected_prompt)
@@ -1325,14 +1325,7 @@ class Protocol(MenuInstrumentProtocol):
 
         log.debug('_do_cmd_resp: cmd=%s, timeout=%s, write_delay=%s, expected_prompt=%s,' %
                         (repr(cmd_line), timeout, write_delay, expected_prompt))
-        if (write_delay == 0):
-            self._connection.send(cmd_line)
-        else:
-            debug_string = "---> DHE: do_cmd_resp() sending cmd_line: " + cmd_line
-            log.debug(debug_string)
-            for char in cmd_line:
-                self._connection.send(char)
-                time.sleep(write_delay)
+        self._send_paced(cmd_line, write_delay)
 
         # Wait for the prompt, prepare result and return, timeout exception
         (prompt, result) = self._get_response(timeout, expected_prompt=expected_prompt)
@@ -24,7 +24,7 @@ from mi.core.instrument.instrument_driver import (SingleConnectionInstrumentDriv
                                                   DriverEvent, DriverAsyncEvent)
 from mi.core.instrument.instrument_fsm import ThreadSafeFSM
 from mi.core.instrument.instrument_protocol import (CommandResponseInstrumentProtocol, RE_PATTERN,
-                                                    DEFAULT_CMD_TIMEOUT, InitializationType)
+                                                    DEFAULT_CMD_TIMEOUT, InitializationType, EchoPacedTransmitter)
 from mi.core.instrument.protocol_param_dict import ParameterDictType, ParameterDictVisibility
 from mi.core.log import get_logger, get_logging_metaclass
 
@@ -75,6 +75,8 @@ init_pattern = r'Press <Ctrl\+C> for command console. \r\nInitializing system. P
 init_regex = re.compile(init_pattern)
 COMMAND_PATTERN = 'Command Console'
 RESET_DELAY = 6
+# pause before the end of line, which the instrument misses if sent right after the command
+EOLN_DELAY = 0.115
 NEWLINE = '\r\n'
 RETRY = 3
 STATUS_TIMEOUT = 30
@@ -523,7 +525,8 @@ class SatlanticOCR507InstrumentProtocol(CommandResponseInstrumentProtocol):
 
         self._chunker = StringChunker(self.sieve_function)
 
-        self._character_delay = 0.0015
+        # commands are typed a character at a time, each waiting for its echo
+        self._transmitter = EchoPacedTransmitter(self, echo_timeout=3)
 
         self._direct_commands['Newline'] = self._newline
         command_dict = Commands.dict()
@@ -586,21 +589,9 @@ class SatlanticOCR507InstrumentProtocol(CommandResponseInstrumentProtocol):
         if len(cmd_line) == 1:
             self._connection.send(cmd_line)
         else:
-            for char in cmd_line:
-                starttime = time.time()
-                self._connection.send(char)
-                while len(self._promptbuf) == 0 or char not in self._promptbuf[-1]:
-                    time.sleep(self._character_delay)
-                    if time.time() > starttime + 3:
-                        break
-
-            time.sleep(0.115)
-            starttime = time.time()
-            self._connection.send(NEWLINE)
-            while NEWLINE not in self._promptbuf[len(cmd_line):len(cmd_line) + 2]:
-                time.sleep(self._character_delay)
-                if time.time() > starttime + 3:
-                    break
+            self._transmitter.send(cmd_line)
+            time.sleep(EOLN_DELAY)
+            self._transmitter.send([NEWLINE])
 
             # Limit resend_check_value from expected_prompt to one of the two below
             resend_check_value = None
@@ -614,15 +605,16 @@ class SatlanticOCR507InstrumentProtocol(CommandResponseInstrumentProtocol):
             starttime = time.time()
             if resend_check_value is not None:
                 while True:
-                    time.sleep(0.1)
-                    if time.time() > starttime + 2:
-                        log.debug("Sending eoln again.")
-                        self._connection.send(NEWLINE)
-                        starttime = time.time()
+                    update = self._buffer_updates
                     if resend_check_value in self._promptbuf:
                         break
                     if Prompt.INVALID_COMMAND in self._promptbuf:
                         break
+                    if time.time() > starttime + 2:
+                        log.debug("Sending eoln again.")
+                        self._connection.send(NEWLINE)
+                        starttime = time.time()
+                    self._wait_for_buffer(update, starttime + 2)
 
         return cmd_line
 
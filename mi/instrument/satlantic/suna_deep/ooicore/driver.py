@@ -35,6 +35,7 @@ from mi.core.exceptions import InstrumentStateException
 from mi.core.exceptions import InstrumentTimeoutException
 from mi.core.exceptions import InstrumentException
 from mi.core.time_tools import get_timestamp_delayed
+from mi.core.numeric_record import RecordSchema
 
 log = get_logger()
 
@@ -454,6 +455,37 @@ class SUNASampleDataParticleKey(BaseEnum):
     CHECKSUM = "checksum"
 
 
+# Numeric fields of an ASCII frame, after the frame type and serial number
+SUNA_SAMPLE_SCHEMA = RecordSchema([
+    (SUNASampleDataParticleKey.SAMPLE_DATE, int),
+    (SUNASampleDataParticleKey.SAMPLE_TIME, float),
+    (SUNASampleDataParticleKey.NITRATE_CONCEN, float),
+    (SUNASampleDataParticleKey.NITROGEN, float),
+    (SUNASampleDataParticleKey.ABSORB_254, float),
+    (SUNASampleDataParticleKey.ABSORB_350, float),
+    (SUNASampleDataParticleKey.BROMIDE_TRACE, float),
+    (SUNASampleDataParticleKey.SPECTRUM_AVE, int),
+    (SUNASampleDataParticleKey.FIT_DARK_VALUE, int),
+    (SUNASampleDataParticleKey.TIME_FACTOR, int),
+    (SUNASampleDataParticleKey.SPECTRAL_CHANNELS, int, 256),
+    (SUNASampleDataParticleKey.TEMP_SPECTROMETER, float),
+    (SUNASampleDataParticleKey.TEMP_INTERIOR, float),
+    (SUNASampleDataParticleKey.TEMP_LAMP, float),
+    (SUNASampleDataParticleKey.LAMP_TIME, int),
+    (SUNASampleDataParticleKey.HUMIDITY, float),
+    (SUNASampleDataParticleKey.VOLTAGE_MAIN, float),
+    (SUNASampleDataParticleKey.VOLTAGE_LAMP, float),
+    (SUNASampleDataParticleKey.VOLTAGE_INT, float),
+    (SUNASampleDataParticleKey.CURRENT_MAIN, float),
+    (SUNASampleDataParticleKey.FIT_1, float),
+    (SUNASampleDataParticleKey.FIT_2, float),
+    (SUNASampleDataParticleKey.FIT_BASE_1, float),
+    (SUNASampleDataParticleKey.FIT_BASE_2, float),
+    (SUNASampleDataParticleKey.FIT_RMSE, float),
+    (None, None, 4),  # CTD time, salinity, temperature and pressure, not reported
+    (SUNASampleDataParticleKey.CHECKSUM, int)])
+
+
 ###############################################################################
 # Data Particles
 ###############################################################################
@@ -475,59 +507,12 @@ class SUNASampleDataParticle(DataParticle):
                 {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.FRAME_TYPE,
                  DataParticleKey.VALUE: str(matched.group(1))},
                 {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.SERIAL_NUM,
-                 DataParticleKey.VALUE: str(matched.group(2))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.SAMPLE_DATE,
-                 DataParticleKey.VALUE: int(matched.group(3))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.SAMPLE_TIME,
-                 DataParticleKey.VALUE: float(matched.group(4))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.NITRATE_CONCEN,
-                 DataParticleKey.VALUE: float(matched.group(5))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.NITROGEN,
-                 DataParticleKey.VALUE: float(matched.group(6))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.ABSORB_254,
-                 DataParticleKey.VALUE: float(matched.group(7))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.ABSORB_350,
-                 DataParticleKey.VALUE: float(matched.group(8))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.BROMIDE_TRACE,
-                 DataParticleKey.VALUE: float(matched.group(9))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.SPECTRUM_AVE,
-                 DataParticleKey.VALUE: int(matched.group(10))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.FIT_DARK_VALUE,
-                 DataParticleKey.VALUE: int(matched.group(11))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.TIME_FACTOR,
-                 DataParticleKey.VALUE: int(matched.group(12))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.SPECTRAL_CHANNELS,
-                 DataParticleKey.VALUE: [int(s) for s in matched.group(13).split(',')]},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.TEMP_SPECTROMETER,
-                 DataParticleKey.VALUE: float(matched.group(14))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.TEMP_INTERIOR,
-                 DataParticleKey.VALUE: float(matched.group(15))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.TEMP_LAMP,
-                 DataParticleKey.VALUE: float(matched.group(16))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.LAMP_TIME,
-                 DataParticleKey.VALUE: int(matched.group(17))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.HUMIDITY,
-                 DataParticleKey.VALUE: float(matched.group(18))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.VOLTAGE_MAIN,
-                 DataParticleKey.VALUE: float(matched.group(19))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.VOLTAGE_LAMP,
-                 DataParticleKey.VALUE: float(matched.group(20))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.VOLTAGE_INT,
-                 DataParticleKey.VALUE: float(matched.group(21))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.CURRENT_MAIN,
-                 DataParticleKey.VALUE: float(matched.group(22))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.FIT_1,
-                 DataParticleKey.VALUE: float(matched.group(23))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.FIT_2,
-                 DataParticleKey.VALUE: float(matched.group(24))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.FIT_BASE_1,
-                 DataParticleKey.VALUE: float(matched.group(25))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.FIT_BASE_2,
-                 DataParticleKey.VALUE: float(matched.group(26))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.FIT_RMSE,
-                 DataParticleKey.VALUE: float(matched.group(27))},
-                {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.CHECKSUM,
-                 DataParticleKey.VALUE: int(matched.group(28))}]
+                 DataParticleKey.VALUE: str(matched.group(2))}]
+
+            # fields from the date through the checksum
+            values = SUNA_SAMPLE_SCHEMA.parse(self.raw_data[matched.start(3):matched.end(28)])
+            parsed_data_list.extend({DataParticleKey.VALUE_ID: key, DataParticleKey.VALUE: value}
+                                    for key, value in values)
 
             date = datetime.datetime.strptime(matched.group(3), '%Y%j')
 
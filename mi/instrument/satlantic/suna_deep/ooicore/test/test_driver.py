@@ -22,6 +22,9 @@ __author__ = 'Rachel Manoni'
 __license__ = 'Apache 2.0'
 
 
+import random
+import timeit
+
 from nose.plugins.attrib import attr
 from mock import Mock
 from collections import OrderedDict
@@ -55,6 +58,7 @@ from mi.instrument.satlantic.suna_deep.ooicore.driver import Protocol
 from mi.instrument.satlantic.suna_deep.ooicore.driver import Prompt
 from mi.instrument.satlantic.suna_deep.ooicore.driver import NEWLINE
 from mi.instrument.satlantic.suna_deep.ooicore.driver import SUNASampleDataParticle
+from mi.instrument.satlantic.suna_deep.ooicore.driver import SUNA_SAMPLE_REGEX
 
 from mi.core.exceptions import SampleException, InstrumentCommandException, InstrumentParameterException, \
     InstrumentProtocolException
@@ -220,6 +224,53 @@ class ParameterConstraints(BaseEnum):
     INTEG_TIME_MAX = (Parameter.INTEG_TIME_MAX, int, 1, 20)
 
 
+def regex_sample_values(raw_data):
+    """
+    Sample particle values parsed field by field from the regex groups, as the particle used to
+    """
+    matched = SUNA_SAMPLE_REGEX.match(raw_data)
+    keys = [SUNASampleDataParticleKey.SAMPLE_DATE, SUNASampleDataParticleKey.SAMPLE_TIME,
+            SUNASampleDataParticleKey.NITRATE_CONCEN, SUNASampleDataParticleKey.NITROGEN,
+            SUNASampleDataParticleKey.ABSORB_254, SUNASampleDataParticleKey.ABSORB_350,
+            SUNASampleDataParticleKey.BROMIDE_TRACE, SUNASampleDataParticleKey.SPECTRUM_AVE,
+            SUNASampleDataParticleKey.FIT_DARK_VALUE, SUNASampleDataParticleKey.TIME_FACTOR,
+            SUNASampleDataParticleKey.SPECTRAL_CHANNELS, SUNASampleDataParticleKey.TEMP_SPECTROMETER,
+            SUNASampleDataParticleKey.TEMP_INTERIOR, SUNASampleDataParticleKey.TEMP_LAMP,
+            SUNASampleDataParticleKey.LAMP_TIME, SUNASampleDataParticleKey.HUMIDITY,
+            SUNASampleDataParticleKey.VOLTAGE_MAIN, SUNASampleDataParticleKey.VOLTAGE_LAMP,
+            SUNASampleDataParticleKey.VOLTAGE_INT, SUNASampleDataParticleKey.CURRENT_MAIN,
+            SUNASampleDataParticleKey.FIT_1, SUNASampleDataParticleKey.FIT_2,
+            SUNASampleDataParticleKey.FIT_BASE_1, SUNASampleDataParticleKey.FIT_BASE_2,
+            SUNASampleDataParticleKey.FIT_RMSE, SUNASampleDataParticleKey.CHECKSUM]
+    int_groups = [3, 10, 11, 12, 17, 28]
+    values = [{DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.FRAME_TYPE, DataParticleKey.VALUE: matched.group(1)},
+              {DataParticleKey.VALUE_ID: SUNASampleDataParticleKey.SERIAL_NUM, DataParticleKey.VALUE: matched.group(2)}]
+    for group, key in enumerate(keys, 3):
+        if group == 13:
+            value = [int(s) for s in matched.group(group).split(',')]
+        elif group in int_groups:
+            value = int(matched.group(group))
+        else:
+            value = float(matched.group(group))
+        values.append({DataParticleKey.VALUE_ID: key, DataParticleKey.VALUE: value})
+    return values
+
+
+def random_sample(sample, rand):
+    """
+    A sample with the numeric values after the date replaced by random values of the same format
+    """
+    tokens = sample.split(',')
+    # the CTD fields and checksum are left as they are
+    for index in range(2, len(tokens) - 5):
+        if '.' in tokens[index]:
+            decimals = len(tokens[index].split('.')[1])
+            tokens[index] = '%.*f' % (decimals, rand.uniform(-100, 100))
+        else:
+            tokens[index] = str(rand.randint(0, 65535))
+    return ','.join(tokens)
+
+
 ###############################################################################
 #                        DATA PARTICLE TEST MIXIN      	                  #
 #     Defines a set of constants and assert methods used for data particle    #
@@ -645,6 +696,33 @@ class DriverUnitTest(InstrumentDriverUnitTestCase, DriverTestMixinSub):
         }
         self.compare_parsed_data_particle(SUNASampleDataParticle, SUNA_ASCII_SAMPLE, expected_light)
 
+    def test_sample_values_match_regex_parse(self):
+        """
+        Verify the sample schema parses the same values as int() and float() of the regex groups
+        """
+        rand = random.Random(42)
+        samples = [SUNA_ASCII_SAMPLE, SUNA_ASCII_DARK_SAMPLE]
+        samples += [random_sample(rand.choice(samples), rand) for _ in range(50)]
+
+        for sample in samples:
+            values = SUNASampleDataParticle(sample)._build_parsed_values()
+            expected = regex_sample_values(sample)
+            self.assertEqual(values, expected)
+            for value, expected_value in zip(values, expected):
+                self.assertEqual(type(value[DataParticleKey.VALUE]), type(expected_value[DataParticleKey.VALUE]))
+
+    def test_sample_parse_throughput(self):
+        """
+        Log the sample parse rate with the schema and when parsing each regex group.
+        Wall clock rates vary with the host, so they are not compared here.
+        """
+        count = 200
+        schema_time = min(timeit.repeat(lambda: SUNASampleDataParticle(SUNA_ASCII_SAMPLE)._build_parsed_values(),
+                                        repeat=3, number=count))
+        regex_time = min(timeit.repeat(lambda: regex_sample_values(SUNA_ASCII_SAMPLE), repeat=3, number=count))
+
+        log.info('SUNA sample parse: schema %.0f/s, regex groups %.0f/s', count / schema_time, count / regex_time)
+
     def test_got_data(self):
         """
         Verify sample data passed through the got data method produces the correct data particles
@@ -8,8 +8,10 @@ Release notes:
 None.
 """
 import datetime
-
+import functools
 import re
+import sre_parse
+from sre_constants import AT, CATEGORY, CATEGORY_SPACE, IN, LITERAL, MAX_REPEAT, MIN_REPEAT
 
 from mi.core.log import get_logger, get_logging_metaclass
 from mi.core.instrument.instrument_protocol import CommandResponseInstrumentProtocol, InitializationType
@@ -42,6 +44,143 @@ SBE_EPOCH = (datetime.date(2000, 1, 1) - datetime.date(1970, 1, 1)).total_second
 TIMEOUT = 20
 DEFAULT_ENCODER_KEY = '__default__'
 
+# leading token of a line: optional punctuation (e.g. '<') and the first word
+LEADING_TOKEN_MATCHER = re.compile(r'\s*([^\w\s]*\w*)')
+
+
+def compile_once(func):
+    """
+    Decorator for the regex_compiled static methods of the particles, the
+    regex is compiled on the first call and the same pattern returned after.
+    """
+    compiled = []
+
+    @functools.wraps(func)
+    def wrapper():
+        if not compiled:
+            compiled.append(func())
+        return compiled[0]
+
+    return wrapper
+
+
+def _is_whitespace(op, av):
+    """
+    True if a parsed regex item only matches whitespace
+    """
+    if op == LITERAL:
+        return av < 256 and chr(av).isspace()
+    if op == IN:
+        return all(_is_whitespace(*item) for item in av)
+    if op == CATEGORY:
+        return av == CATEGORY_SPACE
+    if op in (MAX_REPEAT, MIN_REPEAT):
+        return all(_is_whitespace(*item) for item in av[2])
+    return False
+
+
+def leading_literal(pattern):
+    """
+    The literal text every match of a compiled regex starts with, after any
+    leading whitespace. Empty if there is none.
+    """
+    if pattern.flags & (re.IGNORECASE | re.LOCALE | re.UNICODE) or not isinstance(pattern.pattern, str):
+        return ''
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except (re.error, OverflowError):
+        return ''
+
+    literal = []
+    for op, av in parsed:
+        if op == LITERAL and av < 256 and (literal or not chr(av).isspace()):
+            literal.append(chr(av))
+        elif not literal and (op == AT or _is_whitespace(op, av)):
+            continue
+        else:
+            break
+    return ''.join(literal)
+
+
+class LineMatcher(object):
+    """
+    Matches the lines of a multiline response against a set of regexes. The
+    regexes are compiled once and regexes shared by several keys are only
+    matched once per line.
+
+    Lines are not tried against every regex: in match mode the regexes are
+    indexed by the leading token of their literal text (e.g. 'CSLOPE' for
+    ' +CSLOPE = (...)') and a line is only matched against the regexes with
+    the same leading token. In search mode a line is only searched with the
+    regexes whose literal text it contains. Regexes without literal text are
+    always tried.
+    """
+    def __init__(self, patterns, flags=0, search=False):
+        """
+        @param patterns (key, regex) pairs or dict, in matching order. A regex may be
+            a string or a compiled regex.
+        @param flags flags for compiling the regex strings
+        @param search use search instead of match
+        """
+        if isinstance(patterns, dict):
+            patterns = patterns.iteritems()
+
+        self.search = search
+        self.compiled = {}
+        self._patterns = []
+        self._keys = []
+        positions = {}
+        for key, regex in patterns:
+            if isinstance(regex, basestring):
+                regex = re.compile(regex, flags)
+            self.compiled[key] = regex
+            position = positions.setdefault((regex.pattern, regex.flags), len(self._patterns))
+            if position == len(self._patterns):
+                self._patterns.append(regex)
+                self._keys.append([])
+            self._keys[position].append(key)
+
+        # search mode: (literal, position) for every regex
+        self._literals = []
+        # match mode: positions of the regexes by leading token, and without one
+        self._by_token = {}
+        self._any = []
+        for position, regex in enumerate(self._patterns):
+            literal = leading_literal(regex)
+            if search:
+                self._literals.append((literal, position))
+                continue
+            token_match = LEADING_TOKEN_MATCHER.match(literal)
+            # the token must end within the literal text to be the line's token as well
+            if token_match.group(1) and token_match.end() < len(literal):
+                self._by_token.setdefault(token_match.group(1), []).append(position)
+            else:
+                self._any.append(position)
+
+        for token, token_positions in self._by_token.iteritems():
+            self._by_token[token] = sorted(token_positions + self._any)
+
+    def _candidates(self, line):
+        if self.search:
+            return [position for literal, position in self._literals if literal in line]
+        return self._by_token.get(LEADING_TOKEN_MATCHER.match(line).group(1), self._any)
+
+    def matches(self, lines):
+        """
+        Match the lines
+        @param lines iterable of lines
+        @return generator of (key, match) for each line and each key with a matching
+            regex, in line and then in regex order
+        """
+        for line in lines:
+            for position in self._candidates(line):
+                regex = self._patterns[position]
+                match = regex.search(line) if self.search else regex.match(line)
+                if match:
+                    for key in self._keys[position]:
+                        yield key, match
+
+
 ###############################################################################
 # Particles
 ###############################################################################
@@ -52,6 +191,9 @@ class SeaBirdParticle(DataParticle):
     instruments.  Add regex methods to help identify and parse multiline
     strings.
     """
+    # line matchers for regex_multiline by particle class
+    _line_matchers = {}
+
     @staticmethod
     def regex():
         """
@@ -85,11 +227,19 @@ class SeaBirdParticle(DataParticle):
         in SBE multiline results.
         @return: dictionary of compiled regexs
         """
-        result = {}
-        for (key, regex) in self.regex_multiline().iteritems():
-            result[key] = re.compile(regex, re.DOTALL)
+        return dict(self._line_matcher().compiled)
 
-        return result
+    def _line_matcher(self):
+        """
+        return the line matcher for the multiline regexs, built once per
+        particle class
+        @return: LineMatcher
+        """
+        matcher = self._line_matchers.get(type(self))
+        if matcher is None:
+            matcher = LineMatcher(self.regex_multiline(), re.DOTALL, search=True)
+            self._line_matchers[type(self)] = matcher
+        return matcher
 
     def encoders(self):
         """
@@ -111,27 +261,22 @@ class SeaBirdParticle(DataParticle):
         if split_fun is None:
             split_fun = self._split_on_newline
 
-        matchers = self.regex_multiline_compiled()
-        regexs = self.regex_multiline()
+        encoders = self.encoders()
+        default_encoder = encoders.get(DEFAULT_ENCODER_KEY)
 
-        for line in split_fun(self.raw_data):
-            log.trace("Line: %s" % line)
-            for key in matchers.keys():
-                log.trace("match: %s" % regexs.get(key))
-                match = matchers[key].search(line)
-                if match:
-                    encoder = self._get_encoder(key)
-                    if encoder:
-                        log.debug("encoding value %s (%s)" % (key, match.group(1)))
-                        value = encoder(match.group(1))
-                    else:
-                        value = match.group(1)
-
-                    log.trace("multiline match %s = %s (%s)" % (key, match.group(1), value))
-                    result.append({
-                        DataParticleKey.VALUE_ID: key,
-                        DataParticleKey.VALUE: value
-                    })
+        for key, match in self._line_matcher().matches(split_fun(self.raw_data)):
+            encoder = encoders.get(key) or default_encoder
+            if encoder:
+                log.debug("encoding value %s (%s)", key, match.group(1))
+                value = encoder(match.group(1))
+            else:
+                value = match.group(1)
+
+            log.trace("multiline match %s = %s (%s)", key, match.group(1), value)
+            result.append({
+                DataParticleKey.VALUE_ID: key,
+                DataParticleKey.VALUE: value
+            })
 
         return result
 
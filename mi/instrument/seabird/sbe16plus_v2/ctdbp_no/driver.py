@@ -29,6 +29,7 @@ from mi.instrument.seabird.sbe16plus_v2.ctdpf_jb.driver import SBE19StatusPartic
 from mi.instrument.seabird.sbe16plus_v2.ctdpf_jb.driver import SBE19ConfigurationParticle
 from mi.instrument.seabird.sbe16plus_v2.ctdpf_jb.driver import OptodeSettingsParticle
 
+from mi.instrument.seabird.driver import compile_once
 from mi.instrument.seabird.sbe16plus_v2.driver import \
     Prompt, SBE16InstrumentDriver, Sbe16plusBaseParticle, WAKEUP_TIMEOUT, NEWLINE, TIMEOUT, ProtocolState
 from mi.core.instrument.protocol_param_dict import ParameterDictType, ParameterDictVisibility
@@ -113,6 +114,7 @@ class SBE16NOHardwareParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def regex_compiled():
         """
         get the compiled regex pattern
@@ -130,6 +132,7 @@ class SBE16NOHardwareParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def resp_regex_compiled():
         """
         get the compiled regex pattern
@@ -318,6 +321,7 @@ class SBE16NOCalibrationParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def regex_compiled():
         return re.compile(SBE16NOCalibrationParticle.regex(), re.DOTALL)
 
@@ -327,6 +331,7 @@ class SBE16NOCalibrationParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def resp_regex_compiled():
         return re.compile(SBE16NOCalibrationParticle.resp_regex(), re.DOTALL)
 
@@ -28,6 +28,7 @@ from mi.core.exceptions import SampleException
 
 from xml.dom.minidom import parseString
 
+from mi.instrument.seabird.driver import compile_once
 from mi.instrument.seabird.sbe16plus_v2.driver import \
     SBE16Protocol, SBE16InstrumentDriver, Sbe16plusBaseParticle, NEWLINE, \
     DEFAULT_ENCODER_KEY, TIMEOUT, WAKEUP_TIMEOUT, ScheduledJob, Command, ProtocolState, ProtocolEvent, \
@@ -131,6 +132,7 @@ class SBE19ConfigurationParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def regex_compiled():
         return re.compile(SBE19ConfigurationParticle.regex(), re.DOTALL)
 
@@ -140,6 +142,7 @@ class SBE19ConfigurationParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def resp_regex_compiled():
         return re.compile(SBE19ConfigurationParticle.resp_regex(), re.DOTALL)
 
@@ -262,6 +265,7 @@ class SBE19StatusParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def regex_compiled():
         return re.compile(SBE19StatusParticle.regex(), re.DOTALL)
 
@@ -271,6 +275,7 @@ class SBE19StatusParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def resp_regex_compiled():
         return re.compile(SBE19StatusParticle.resp_regex(), re.DOTALL)
 
@@ -377,6 +382,7 @@ class SBE19HardwareParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def regex_compiled():
         """
         get the compiled regex pattern
@@ -394,6 +400,7 @@ class SBE19HardwareParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def resp_regex_compiled():
         """
         get the compiled regex pattern
@@ -584,6 +591,7 @@ class SBE19CalibrationParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def regex_compiled():
         return re.compile(SBE19CalibrationParticle.regex(), re.DOTALL)
 
@@ -593,6 +601,7 @@ class SBE19CalibrationParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def resp_regex_compiled():
         return re.compile(SBE19CalibrationParticle.resp_regex(), re.DOTALL)
 
@@ -797,6 +806,7 @@ class SBE19DataParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def regex_compiled():
         """
         get the compiled regex pattern
@@ -876,6 +886,7 @@ class OptodeSettingsParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def regex_compiled():
         return re.compile(OptodeSettingsParticle.regex(), re.DOTALL)
 
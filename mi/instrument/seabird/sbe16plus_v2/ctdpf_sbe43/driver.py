@@ -32,6 +32,7 @@ from mi.instrument.seabird.sbe16plus_v2.ctdpf_jb.driver import ProtocolState
 from mi.instrument.seabird.sbe16plus_v2.ctdpf_jb.driver import SBE19ConfigurationParticle
 from mi.instrument.seabird.sbe16plus_v2.ctdpf_jb.driver import SBE19CalibrationParticle
 
+from mi.instrument.seabird.driver import compile_once
 from mi.instrument.seabird.sbe16plus_v2.driver import Prompt, SBE16InstrumentDriver, SBE16Protocol, \
     ConfirmedParameter, CommonParameter, Sbe16plusBaseParticle, NEWLINE, TIMEOUT, WAKEUP_TIMEOUT, Command, \
     ProtocolEvent, Capability, DISCOVER_TIMEOUT, ACQUIRE_STATUS_TIMEOUT
@@ -121,6 +122,7 @@ class SBE43DataParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def regex_compiled():
         """
         get the compiled regex pattern
@@ -199,6 +201,7 @@ class SBE43StatusParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def regex_compiled():
         return re.compile(SBE43StatusParticle.regex(), re.DOTALL)
 
@@ -208,6 +211,7 @@ class SBE43StatusParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def resp_regex_compiled():
         return re.compile(SBE43StatusParticle.resp_regex(), re.DOTALL)
 
@@ -320,6 +324,7 @@ class SBE43HardwareParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def regex_compiled():
         """
         get the compiled regex pattern
@@ -337,6 +342,7 @@ class SBE43HardwareParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def resp_regex_compiled():
         """
         get the compiled regex pattern
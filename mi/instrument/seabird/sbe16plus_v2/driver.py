@@ -35,6 +35,7 @@ from mi.core.exceptions import NotImplementedException
 from mi.core.exceptions import SampleException
 from xml.dom.minidom import parseString
 from mi.core.time_tools import get_timestamp_delayed
+from mi.instrument.seabird.driver import LineMatcher, compile_once
 
 __author__ = 'David Everett'
 __license__ = 'Apache 2.0'
@@ -208,6 +209,8 @@ class Sbe16plusBaseParticle(DataParticle):
     instruments.  Add regex methods to help identify and parse multi-line
     strings.
     """
+    # line matchers for regex_multiline by particle class
+    _line_matchers = {}
 
     @staticmethod
     def regex():
@@ -240,11 +243,19 @@ class Sbe16plusBaseParticle(DataParticle):
         in SBE multiline results.
         @return: dictionary of compiled regexs
         """
-        result = {}
-        for (key, regex) in self.regex_multiline().iteritems():
-            result[key] = re.compile(regex, re.DOTALL)
+        return dict(self._line_matcher().compiled)
 
-        return result
+    def _line_matcher(self):
+        """
+        return the line matcher for the multiline regexs, built once per
+        particle class
+        @return: LineMatcher
+        """
+        matcher = self._line_matchers.get(type(self))
+        if matcher is None:
+            matcher = LineMatcher(self.regex_multiline(), re.DOTALL, search=True)
+            self._line_matchers[type(self)] = matcher
+        return matcher
 
     def encoders(self):
         """
@@ -266,27 +277,22 @@ class Sbe16plusBaseParticle(DataParticle):
         if split_fun is None:
             split_fun = self._split_on_newline
 
-        matchers = self.regex_multiline_compiled()
-        regexs = self.regex_multiline()
-
-        for line in split_fun(self.raw_data):
-            log.trace("Line: %s" % line)
-            for key in matchers.keys():
-                log.trace("match: %s" % regexs.get(key))
-                match = matchers[key].search(line)
-                if match:
-                    encoder = self._get_encoder(key)
-                    if encoder:
-                        log.debug("encoding value %s (%s)" % (key, match.group(1)))
-                        value = encoder(match.group(1))
-                    else:
-                        value = match.group(1)
-
-                    log.trace("multiline match %s = %s (%s)" % (key, match.group(1), value))
-                    result.append({
-                        DataParticleKey.VALUE_ID: key,
-                        DataParticleKey.VALUE: value
-                    })
+        encoders = self.encoders()
+        default_encoder = encoders.get(DEFAULT_ENCODER_KEY)
+
+        for key, match in self._line_matcher().matches(split_fun(self.raw_data)):
+            encoder = encoders.get(key) or default_encoder
+            if encoder:
+                log.debug("encoding value %s (%s)", key, match.group(1))
+                value = encoder(match.group(1))
+            else:
+                value = match.group(1)
+
+            log.trace("multiline match %s = %s (%s)", key, match.group(1), value)
+            result.append({
+                DataParticleKey.VALUE_ID: key,
+                DataParticleKey.VALUE: value
+            })
 
         return result
 
@@ -325,11 +331,31 @@ class Sbe16plusBaseParticle(DataParticle):
         @param: raise_exception_if_none_found - raise an exception if no element is found
         @return: return list of elements found; empty list if none found
         """
-        elements = node.getElementsByTagName(tag)
+        elements = self._xml_elements_by_tag(node).get(tag, [])
         if raise_exception_if_none_found and len(elements) == 0:
             raise SampleException("_extract_xml_elements: No %s in input data: [%s]" % (tag, self.raw_data))
         return elements
 
+    def _xml_elements_by_tag(self, node):
+        """
+        index the elements below an XML node by tag, in document order. The
+        particles look up dozens of tags in the same node, this walks the node
+        once instead of once per tag.
+        @param: node - XML node to index
+        @return: dictionary of element lists by tag
+        """
+        indexes = self.__dict__.setdefault('_xml_indexes', {})
+        index = indexes.get(node)
+        if index is None:
+            index = indexes[node] = {}
+            stack = list(reversed(node.childNodes))
+            while stack:
+                child = stack.pop()
+                if child.nodeType == child.ELEMENT_NODE:
+                    index.setdefault(child.tagName, []).append(child)
+                    stack.extend(reversed(child.childNodes))
+        return index
+
     def _extract_xml_element_value(self, node, tag, raise_exception_if_none_found=True):
         """
         extract element value that has tag from an XML node
@@ -350,13 +376,18 @@ class Sbe16plusBaseParticle(DataParticle):
 
     def _get_xml_parameter(self, xml_element, parameter_name, dtype=float, raise_exception_if_none_found=True):
 
-        try:
-            value = dtype(self._extract_xml_element_value(xml_element, self._map_param_to_xml_tag(parameter_name)))
+        tag = self._map_param_to_xml_tag(parameter_name)
+        elements = self._xml_elements_by_tag(xml_element).get(tag)
 
-        except SampleException:
-            if raise_exception_if_none_found:
-                raise SampleException
+        # missing optional parameters are common, skip building the exception for them
+        if not raise_exception_if_none_found and not (elements and elements[0].childNodes):
             value = None
+        else:
+            try:
+                value = dtype(self._extract_xml_element_value(xml_element, tag))
+
+            except SampleException:
+                raise SampleException
 
         return {DataParticleKey.VALUE_ID: parameter_name,
                 DataParticleKey.VALUE: value}
@@ -468,6 +499,7 @@ class SBE16DataParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def regex_compiled():
         """
         get the compiled regex pattern
@@ -566,6 +598,7 @@ class SBE16StatusParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def regex_compiled():
         return re.compile(SBE16StatusParticle.regex(), re.DOTALL)
 
@@ -760,6 +793,7 @@ class SBE16CalibrationParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def regex_compiled():
         return re.compile(SBE16CalibrationParticle.regex(), re.DOTALL)
 
@@ -769,6 +803,7 @@ class SBE16CalibrationParticle(Sbe16plusBaseParticle):
         return pattern
 
     @staticmethod
+    @compile_once
     def resp_regex_compiled():
         return re.compile(SBE16CalibrationParticle.resp_regex(), re.DOTALL)
 
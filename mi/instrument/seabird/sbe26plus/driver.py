@@ -32,6 +32,7 @@ from mi.core.instrument.protocol_param_dict import ParameterDictVisibility
 from mi.core.log import get_logger
 from mi.core.time_tools import timegm_to_float
 from mi.core.util import dict_equal
+from mi.instrument.seabird.driver import LineMatcher
 from mi.instrument.seabird.driver import NEWLINE
 from mi.instrument.seabird.driver import SeaBirdInstrumentDriver
 from mi.instrument.seabird.driver import SeaBirdProtocol
@@ -598,6 +599,130 @@ class SBE26plusDeviceCalibrationDataParticle(DataParticle):
     """
     _data_particle_type = DataParticleType.DEVICE_CALIBRATION
 
+    _single_var_matchers = {
+        SBE26plusDeviceCalibrationDataParticleKey.PCALDATE: (
+            re.compile(r'Pressure coefficients: +(\d+-[a-zA-Z]+-\d+)'),
+            lambda match: match.group(1)
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.PU0: (
+            re.compile(r' +U0 = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.PY1: (
+            re.compile(r' +Y1 = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.PY2: (
+            re.compile(r' +Y2 = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.PY3: (
+            re.compile(r' +Y3 = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.PC1: (
+            re.compile(r' +C1 = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.PC2: (
+            re.compile(r' +C2 = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.PC3: (
+            re.compile(r' +C3 = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.PD1: (
+            re.compile(r' +D1 = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.PD2: (
+            re.compile(r' +D2 = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.PT1: (
+            re.compile(r' +T1 = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.PT2: (
+            re.compile(r' +T2 = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.PT3: (
+            re.compile(r' +T3 = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.PT4: (
+            re.compile(r' +T4 = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.FACTORY_M: (
+            re.compile(r' +M = ([\d\.]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.FACTORY_B: (
+            re.compile(r' +B = ([\d\.]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.POFFSET: (
+            re.compile(r' +OFFSET = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.TCALDATE: (
+            re.compile(r'Temperature coefficients: +(\d+-[a-zA-Z]+-\d+)'),
+            lambda match: str(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.TA0: (
+            re.compile(r' +TA0 = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.TA1: (
+            re.compile(r' +TA1 = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.TA2: (
+            re.compile(r' +TA2 = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.TA3: (
+            re.compile(r' +TA3 = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.CCALDATE: (
+            re.compile(r'Conductivity coefficients: +(\d+-[a-zA-Z]+-\d+)'),
+            lambda match: str(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.CG: (
+            re.compile(r' +CG = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.CH: (
+            re.compile(r' +CH = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.CI: (
+            re.compile(r' +CI = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.CJ: (
+            re.compile(r' +CJ = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.CTCOR: (
+            re.compile(r' +CTCOR = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.CPCOR: (
+            re.compile(r' +CPCOR = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceCalibrationDataParticleKey.CSLOPE: (
+            re.compile(r' +CSLOPE = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+    }
+    _line_matcher = LineMatcher((key, matcher) for key, (matcher, _) in _single_var_matchers.iteritems())
+
     def _build_parsed_values(self):
         """
         Take something in the autosample format and split it into
@@ -606,140 +731,15 @@ class SBE26plusDeviceCalibrationDataParticle(DataParticle):
         @throws SampleException If there is a problem with sample creation
         """
         log.debug("in SBE26plusDeviceCalibrationDataParticle._build_parsed_values")
-        single_var_matchers = {
-            SBE26plusDeviceCalibrationDataParticleKey.PCALDATE: (
-                re.compile(r'Pressure coefficients: +(\d+-[a-zA-Z]+-\d+)'),
-                lambda match: match.group(1)
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.PU0: (
-                re.compile(r' +U0 = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.PY1: (
-                re.compile(r' +Y1 = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.PY2: (
-                re.compile(r' +Y2 = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.PY3: (
-                re.compile(r' +Y3 = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.PC1: (
-                re.compile(r' +C1 = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.PC2: (
-                re.compile(r' +C2 = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.PC3: (
-                re.compile(r' +C3 = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.PD1: (
-                re.compile(r' +D1 = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.PD2: (
-                re.compile(r' +D2 = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.PT1: (
-                re.compile(r' +T1 = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.PT2: (
-                re.compile(r' +T2 = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.PT3: (
-                re.compile(r' +T3 = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.PT4: (
-                re.compile(r' +T4 = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.FACTORY_M: (
-                re.compile(r' +M = ([\d\.]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.FACTORY_B: (
-                re.compile(r' +B = ([\d\.]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.POFFSET: (
-                re.compile(r' +OFFSET = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.TCALDATE: (
-                re.compile(r'Temperature coefficients: +(\d+-[a-zA-Z]+-\d+)'),
-                lambda match: str(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.TA0: (
-                re.compile(r' +TA0 = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.TA1: (
-                re.compile(r' +TA1 = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.TA2: (
-                re.compile(r' +TA2 = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.TA3: (
-                re.compile(r' +TA3 = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.CCALDATE: (
-                re.compile(r'Conductivity coefficients: +(\d+-[a-zA-Z]+-\d+)'),
-                lambda match: str(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.CG: (
-                re.compile(r' +CG = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.CH: (
-                re.compile(r' +CH = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.CI: (
-                re.compile(r' +CI = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.CJ: (
-                re.compile(r' +CJ = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.CTCOR: (
-                re.compile(r' +CTCOR = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.CPCOR: (
-                re.compile(r' +CPCOR = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceCalibrationDataParticleKey.CSLOPE: (
-                re.compile(r' +CSLOPE = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-        }
 
         result = []  # Final storage for particle
         vals = {}  # intermediate storage for particle values so they can be set to null first.
 
-        for (key, (matcher, l_func)) in single_var_matchers.iteritems():
+        for key in self._single_var_matchers:
             vals[key] = None
 
-        for line in self.raw_data.split(NEWLINE):
-            for (key, (matcher, l_func)) in single_var_matchers.iteritems():
-                match = matcher.match(line)
-                if match:
-                    vals[key] = l_func(match)
+        for key, match in self._line_matcher.matches(self.raw_data.split(NEWLINE)):
+            vals[key] = self._single_var_matchers[key][1](match)
 
         for (key, val) in vals.iteritems():
             result.append({DataParticleKey.VALUE_ID: key, DataParticleKey.VALUE: val})
@@ -807,6 +807,200 @@ class SBE26plusDeviceStatusDataParticle(DataParticle):
     """
     _data_particle_type = DataParticleType.DEVICE_STATUS
 
+    # VAR_LABEL: (regex, lambda)
+    _single_var_matchers = {
+        SBE26plusDeviceStatusDataParticleKey.DEVICE_VERSION: (
+            re.compile(r'SBE 26plus V ([\w.]+) +SN (\d+) +(\d{2} [a-zA-Z]{3,4} \d{4} +[\d:]+)'),
+            lambda match: match.group(1)
+        ),
+        SBE26plusDeviceStatusDataParticleKey.SERIAL_NUMBER: (
+            re.compile(r'SBE 26plus V ([\w.]+) +SN (\d+) +(\d{2} [a-zA-Z]{3,4} \d{4} +[\d:]+)'),
+            lambda match: str(match.group(2))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.DS_DEVICE_DATE_TIME: (
+            re.compile(r'SBE 26plus V ([\w.]+) +SN (\d+) +(\d{2} [a-zA-Z]{3,4} \d{4} +[\d:]+)'),
+            lambda match: match.group(3)
+        ),
+        SBE26plusDeviceStatusDataParticleKey.USER_INFO: (
+            re.compile(r'user info=(.*)$'),
+            lambda match: match.group(1)
+        ),
+        SBE26plusDeviceStatusDataParticleKey.QUARTZ_PRESSURE_SENSOR_SERIAL_NUMBER: (
+            re.compile(r'quartz pressure sensor: serial number = ([\d\.\-]+), range = ([\d\.\-]+) psia'),
+            lambda match: str(match.group(1))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.QUARTZ_PRESSURE_SENSOR_RANGE: (
+            re.compile(r'quartz pressure sensor: serial number = ([\d\.\-]+), range = ([\d\.\-]+) psia'),
+            lambda match: float(match.group(2))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.EXTERNAL_TEMPERATURE_SENSOR: (
+            re.compile(r'(external|internal) temperature sensor'),
+            lambda match: False if (match.group(1) == 'internal') else True
+        ),
+        SBE26plusDeviceStatusDataParticleKey.CONDUCTIVITY: (
+            re.compile(r'conductivity = (YES|NO)'),
+            lambda match: False if (match.group(1) == 'NO') else True
+        ),
+        SBE26plusDeviceStatusDataParticleKey.IOP_MA: (
+            re.compile(r'iop = +([\d\.\-]+) ma  vmain = +([\d\.\-]+) V  vlith = +([\d\.\-]+) V'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.VMAIN_V: (
+            re.compile(r'iop = +([\d\.\-]+) ma  vmain = +([\d\.\-]+) V  vlith = +([\d\.\-]+) V'),
+            lambda match: float(match.group(2))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.VLITH_V: (
+            re.compile(r'iop = +([\d\.\-]+) ma  vmain = +([\d\.\-]+) V  vlith = +([\d\.\-]+) V'),
+            lambda match: float(match.group(3))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.LAST_SAMPLE_P: (
+            re.compile(r'last sample: p = +([\d\.\-]+), t = +([\d\.\-]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.LAST_SAMPLE_T: (
+            re.compile(r'last sample: p = +([\d\.\-]+), t = +([\d\.\-]+)'),
+            lambda match: float(match.group(2))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.LAST_SAMPLE_S: (
+            re.compile(r'last sample: .*?, s = +([\d\.\-]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.TIDE_INTERVAL: (
+            re.compile(r'tide measurement: interval = (\d+).000 minutes, duration = ([\d\.\-]+) seconds'),
+            lambda match: int(match.group(1))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.TIDE_MEASUREMENT_DURATION: (
+            re.compile(r'tide measurement: interval = (\d+).000 minutes, duration = ([\d\.\-]+) seconds'),
+            lambda match: int(match.group(2))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.TIDE_SAMPLES_BETWEEN_WAVE_BURST_MEASUREMENTS: (
+            re.compile(r'measure waves every ([\d]+) tide samples'),
+            lambda match: int(match.group(1))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.WAVE_SAMPLES_PER_BURST: (
+            re.compile(r'([\d\.\-]+) wave samples/burst at ([\d\.\-]+) scans/sec, duration = ([\d\.\-]+) seconds'),
+            lambda match: int(match.group(1))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.WAVE_SAMPLES_SCANS_PER_SECOND: (
+            re.compile(r'([\d\.\-]+) wave samples/burst at ([\d\.\-]+) scans/sec, duration = ([\d\.\-]+) seconds'),
+            lambda match: float(match.group(2))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.WAVE_SAMPLES_DURATION: (
+            re.compile(r'([\d\.\-]+) wave samples/burst at ([\d\.\-]+) scans/sec, duration = ([\d\.\-]+) seconds'),
+            lambda match: int(match.group(3))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.USE_START_TIME: (
+            re.compile(r'logging start time = (do not) use start time'),
+            lambda match: False if (match.group(1) == 'do not') else True
+        ),
+        SBE26plusDeviceStatusDataParticleKey.USE_STOP_TIME: (
+            re.compile(r'logging stop time = (do not) use stop time'),
+            lambda match: False if (match.group(1) == 'do not') else True
+        ),
+        SBE26plusDeviceStatusDataParticleKey.TIDE_SAMPLES_PER_DAY: (
+            re.compile(r'tide samples/day = (\d+\.\d+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.WAVE_BURSTS_PER_DAY: (
+            re.compile(r'wave bursts/day = (\d+\.\d+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.MEMORY_ENDURANCE: (
+            re.compile(r'memory endurance = (\d+\.\d+) days'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.NOMINAL_ALKALINE_BATTERY_ENDURANCE: (
+            re.compile(r'nominal alkaline battery endurance = (\d+\.\d+) days'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.TOTAL_RECORDED_TIDE_MEASUREMENTS: (
+            re.compile(r'total recorded tide measurements = ([\d\.\-]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.TOTAL_RECORDED_WAVE_BURSTS: (
+            re.compile(r'total recorded wave bursts = ([\d\.\-]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.TIDE_MEASUREMENTS_SINCE_LAST_START: (
+            re.compile(r'tide measurements since last start = ([\d\.\-]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.WAVE_BURSTS_SINCE_LAST_START: (
+            re.compile(r'wave bursts since last start = ([\d\.\-]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.TXREALTIME: (
+            re.compile(r'transmit real-time tide data = (YES|NO)'),
+            lambda match: False if (match.group(1) == 'NO') else True
+        ),
+        SBE26plusDeviceStatusDataParticleKey.TXWAVEBURST: (
+            re.compile(r'transmit real-time wave burst data = (YES|NO)'),
+            lambda match: False if (match.group(1) == 'NO') else True
+        ),
+        SBE26plusDeviceStatusDataParticleKey.TXWAVESTATS: (
+            re.compile(r'transmit real-time wave statistics = (YES|NO)'),
+            lambda match: False if (match.group(1) == 'NO') else True
+        ),
+        SBE26plusDeviceStatusDataParticleKey.NUM_WAVE_SAMPLES_PER_BURST_FOR_WAVE_STASTICS: (
+            re.compile(r' +number of wave samples per burst to use for wave statistics = (\d+)'),
+            lambda match: int(match.group(1))
+        ),
+        # combined this into the regex of below.
+        # SBE26plusDeviceStatusDataParticleKey.USE_MEASURED_TEMP_AND_CONDUCTIVITY_FOR_DENSITY_CALC:  (
+        #    re.compile(r' +(do not|) use measured temperature and conductivity for density calculation'),
+        #    lambda match : False if (match.group(1)=='do not') else True
+        # ),
+        SBE26plusDeviceStatusDataParticleKey.USE_MEASURED_TEMP_AND_CONDUCTIVITY_FOR_DENSITY_CALC: (
+            re.compile(r' +(do not|) use measured temperature (and conductivity |)for density calculation'),
+            lambda match: True if (match.group(1) == 'do not') else False
+        ),
+        # SBE26plusDeviceStatusDataParticleKey.AVERAGE_WATER_TEMPERATURE_ABOVE_PRESSURE_SENSOR:  (
+        #    re.compile(r' +average water temperature above the pressure sensor \(deg C\) = ([\-\d\.]+)'),
+        #    lambda match : float(match.group(1))
+        # ),
+        # SBE26plusDeviceStatusDataParticleKey.AVERAGE_SALINITY_ABOVE_PRESSURE_SENSOR:  (
+        #    re.compile(r' +average salinity above the pressure sensor \(PSU\) = ([\-\d\.]+)'),
+        #    lambda match : float(match.group(1))
+        # ),
+        SBE26plusDeviceStatusDataParticleKey.PRESSURE_SENSOR_HEIGHT_FROM_BOTTOM: (
+            re.compile(r' +height of pressure sensor from bottom \(meters\) = ([\d\.]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.SPECTRAL_ESTIMATES_FOR_EACH_FREQUENCY_BAND: (
+            re.compile(r' +number of spectral estimates for each frequency band = (\d+)'),
+            lambda match: int(match.group(1))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.MIN_ALLOWABLE_ATTENUATION: (
+            re.compile(r' +minimum allowable attenuation = ([\d\.]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.MIN_PERIOD_IN_AUTO_SPECTRUM: (
+            re.compile(r' +minimum period \(seconds\) to use in auto-spectrum = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.MAX_PERIOD_IN_AUTO_SPECTRUM: (
+            re.compile(r' +maximum period \(seconds\) to use in auto-spectrum = (-?[\d\.e\-\+]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.HANNING_WINDOW_CUTOFF: (
+            re.compile(r' +hanning window cutoff = ([\d\.]+)'),
+            lambda match: float(match.group(1))
+        ),
+        SBE26plusDeviceStatusDataParticleKey.SHOW_PROGRESS_MESSAGES: (
+            re.compile(r' +(do not show|show) progress messages'),
+            lambda match: True if (match.group(1) == 'show') else False
+        ),
+        SBE26plusDeviceStatusDataParticleKey.STATUS: (
+            re.compile(r'status = ([\w ]+)'),
+            lambda match: match.group(1)
+        ),
+        SBE26plusDeviceStatusDataParticleKey.LOGGING: (
+            re.compile(r'logging = (YES|NO)'),
+            lambda match: False if (match.group(1) == 'NO') else True,
+        )
+    }
+    _line_matcher = LineMatcher((key, matcher) for key, (matcher, _) in _single_var_matchers.iteritems())
+
     def _build_parsed_values(self):
         """
         Take something in the autosample format and split it into
@@ -815,209 +1009,15 @@ class SBE26plusDeviceStatusDataParticle(DataParticle):
         @throws SampleException If there is a problem with sample creation
         """
         log.debug("in SBE26plusDeviceStatusDataParticle._build_parsed_values")
-        # VAR_LABEL: (regex, lambda)
-        single_var_matchers = {
-            SBE26plusDeviceStatusDataParticleKey.DEVICE_VERSION: (
-                re.compile(r'SBE 26plus V ([\w.]+) +SN (\d+) +(\d{2} [a-zA-Z]{3,4} \d{4} +[\d:]+)'),
-                lambda match: match.group(1)
-            ),
-            SBE26plusDeviceStatusDataParticleKey.SERIAL_NUMBER: (
-                re.compile(r'SBE 26plus V ([\w.]+) +SN (\d+) +(\d{2} [a-zA-Z]{3,4} \d{4} +[\d:]+)'),
-                lambda match: str(match.group(2))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.DS_DEVICE_DATE_TIME: (
-                re.compile(r'SBE 26plus V ([\w.]+) +SN (\d+) +(\d{2} [a-zA-Z]{3,4} \d{4} +[\d:]+)'),
-                lambda match: match.group(3)
-            ),
-            SBE26plusDeviceStatusDataParticleKey.USER_INFO: (
-                re.compile(r'user info=(.*)$'),
-                lambda match: match.group(1)
-            ),
-            SBE26plusDeviceStatusDataParticleKey.QUARTZ_PRESSURE_SENSOR_SERIAL_NUMBER: (
-                re.compile(r'quartz pressure sensor: serial number = ([\d\.\-]+), range = ([\d\.\-]+) psia'),
-                lambda match: str(match.group(1))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.QUARTZ_PRESSURE_SENSOR_RANGE: (
-                re.compile(r'quartz pressure sensor: serial number = ([\d\.\-]+), range = ([\d\.\-]+) psia'),
-                lambda match: float(match.group(2))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.EXTERNAL_TEMPERATURE_SENSOR: (
-                re.compile(r'(external|internal) temperature sensor'),
-                lambda match: False if (match.group(1) == 'internal') else True
-            ),
-            SBE26plusDeviceStatusDataParticleKey.CONDUCTIVITY: (
-                re.compile(r'conductivity = (YES|NO)'),
-                lambda match: False if (match.group(1) == 'NO') else True
-            ),
-            SBE26plusDeviceStatusDataParticleKey.IOP_MA: (
-                re.compile(r'iop = +([\d\.\-]+) ma  vmain = +([\d\.\-]+) V  vlith = +([\d\.\-]+) V'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.VMAIN_V: (
-                re.compile(r'iop = +([\d\.\-]+) ma  vmain = +([\d\.\-]+) V  vlith = +([\d\.\-]+) V'),
-                lambda match: float(match.group(2))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.VLITH_V: (
-                re.compile(r'iop = +([\d\.\-]+) ma  vmain = +([\d\.\-]+) V  vlith = +([\d\.\-]+) V'),
-                lambda match: float(match.group(3))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.LAST_SAMPLE_P: (
-                re.compile(r'last sample: p = +([\d\.\-]+), t = +([\d\.\-]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.LAST_SAMPLE_T: (
-                re.compile(r'last sample: p = +([\d\.\-]+), t = +([\d\.\-]+)'),
-                lambda match: float(match.group(2))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.LAST_SAMPLE_S: (
-                re.compile(r'last sample: .*?, s = +([\d\.\-]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.TIDE_INTERVAL: (
-                re.compile(r'tide measurement: interval = (\d+).000 minutes, duration = ([\d\.\-]+) seconds'),
-                lambda match: int(match.group(1))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.TIDE_MEASUREMENT_DURATION: (
-                re.compile(r'tide measurement: interval = (\d+).000 minutes, duration = ([\d\.\-]+) seconds'),
-                lambda match: int(match.group(2))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.TIDE_SAMPLES_BETWEEN_WAVE_BURST_MEASUREMENTS: (
-                re.compile(r'measure waves every ([\d]+) tide samples'),
-                lambda match: int(match.group(1))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.WAVE_SAMPLES_PER_BURST: (
-                re.compile(r'([\d\.\-]+) wave samples/burst at ([\d\.\-]+) scans/sec, duration = ([\d\.\-]+) seconds'),
-                lambda match: int(match.group(1))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.WAVE_SAMPLES_SCANS_PER_SECOND: (
-                re.compile(r'([\d\.\-]+) wave samples/burst at ([\d\.\-]+) scans/sec, duration = ([\d\.\-]+) seconds'),
-                lambda match: float(match.group(2))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.WAVE_SAMPLES_DURATION: (
-                re.compile(r'([\d\.\-]+) wave samples/burst at ([\d\.\-]+) scans/sec, duration = ([\d\.\-]+) seconds'),
-                lambda match: int(match.group(3))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.USE_START_TIME: (
-                re.compile(r'logging start time = (do not) use start time'),
-                lambda match: False if (match.group(1) == 'do not') else True
-            ),
-            SBE26plusDeviceStatusDataParticleKey.USE_STOP_TIME: (
-                re.compile(r'logging stop time = (do not) use stop time'),
-                lambda match: False if (match.group(1) == 'do not') else True
-            ),
-            SBE26plusDeviceStatusDataParticleKey.TIDE_SAMPLES_PER_DAY: (
-                re.compile(r'tide samples/day = (\d+\.\d+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.WAVE_BURSTS_PER_DAY: (
-                re.compile(r'wave bursts/day = (\d+\.\d+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.MEMORY_ENDURANCE: (
-                re.compile(r'memory endurance = (\d+\.\d+) days'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.NOMINAL_ALKALINE_BATTERY_ENDURANCE: (
-                re.compile(r'nominal alkaline battery endurance = (\d+\.\d+) days'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.TOTAL_RECORDED_TIDE_MEASUREMENTS: (
-                re.compile(r'total recorded tide measurements = ([\d\.\-]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.TOTAL_RECORDED_WAVE_BURSTS: (
-                re.compile(r'total recorded wave bursts = ([\d\.\-]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.TIDE_MEASUREMENTS_SINCE_LAST_START: (
-                re.compile(r'tide measurements since last start = ([\d\.\-]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.WAVE_BURSTS_SINCE_LAST_START: (
-                re.compile(r'wave bursts since last start = ([\d\.\-]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.TXREALTIME: (
-                re.compile(r'transmit real-time tide data = (YES|NO)'),
-                lambda match: False if (match.group(1) == 'NO') else True
-            ),
-            SBE26plusDeviceStatusDataParticleKey.TXWAVEBURST: (
-                re.compile(r'transmit real-time wave burst data = (YES|NO)'),
-                lambda match: False if (match.group(1) == 'NO') else True
-            ),
-            SBE26plusDeviceStatusDataParticleKey.TXWAVESTATS: (
-                re.compile(r'transmit real-time wave statistics = (YES|NO)'),
-                lambda match: False if (match.group(1) == 'NO') else True
-            ),
-            SBE26plusDeviceStatusDataParticleKey.NUM_WAVE_SAMPLES_PER_BURST_FOR_WAVE_STASTICS: (
-                re.compile(r' +number of wave samples per burst to use for wave statistics = (\d+)'),
-                lambda match: int(match.group(1))
-            ),
-            # combined this into the regex of below.
-            # SBE26plusDeviceStatusDataParticleKey.USE_MEASURED_TEMP_AND_CONDUCTIVITY_FOR_DENSITY_CALC:  (
-            #    re.compile(r' +(do not|) use measured temperature and conductivity for density calculation'),
-            #    lambda match : False if (match.group(1)=='do not') else True
-            # ),
-            SBE26plusDeviceStatusDataParticleKey.USE_MEASURED_TEMP_AND_CONDUCTIVITY_FOR_DENSITY_CALC: (
-                re.compile(r' +(do not|) use measured temperature (and conductivity |)for density calculation'),
-                lambda match: True if (match.group(1) == 'do not') else False
-            ),
-            # SBE26plusDeviceStatusDataParticleKey.AVERAGE_WATER_TEMPERATURE_ABOVE_PRESSURE_SENSOR:  (
-            #    re.compile(r' +average water temperature above the pressure sensor \(deg C\) = ([\-\d\.]+)'),
-            #    lambda match : float(match.group(1))
-            # ),
-            # SBE26plusDeviceStatusDataParticleKey.AVERAGE_SALINITY_ABOVE_PRESSURE_SENSOR:  (
-            #    re.compile(r' +average salinity above the pressure sensor \(PSU\) = ([\-\d\.]+)'),
-            #    lambda match : float(match.group(1))
-            # ),
-            SBE26plusDeviceStatusDataParticleKey.PRESSURE_SENSOR_HEIGHT_FROM_BOTTOM: (
-                re.compile(r' +height of pressure sensor from bottom \(meters\) = ([\d\.]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.SPECTRAL_ESTIMATES_FOR_EACH_FREQUENCY_BAND: (
-                re.compile(r' +number of spectral estimates for each frequency band = (\d+)'),
-                lambda match: int(match.group(1))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.MIN_ALLOWABLE_ATTENUATION: (
-                re.compile(r' +minimum allowable attenuation = ([\d\.]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.MIN_PERIOD_IN_AUTO_SPECTRUM: (
-                re.compile(r' +minimum period \(seconds\) to use in auto-spectrum = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.MAX_PERIOD_IN_AUTO_SPECTRUM: (
-                re.compile(r' +maximum period \(seconds\) to use in auto-spectrum = (-?[\d\.e\-\+]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.HANNING_WINDOW_CUTOFF: (
-                re.compile(r' +hanning window cutoff = ([\d\.]+)'),
-                lambda match: float(match.group(1))
-            ),
-            SBE26plusDeviceStatusDataParticleKey.SHOW_PROGRESS_MESSAGES: (
-                re.compile(r' +(do not show|show) progress messages'),
-                lambda match: True if (match.group(1) == 'show') else False
-            ),
-            SBE26plusDeviceStatusDataParticleKey.STATUS: (
-                re.compile(r'status = ([\w ]+)'),
-                lambda match: match.group(1)
-            ),
-            SBE26plusDeviceStatusDataParticleKey.LOGGING: (
-                re.compile(r'logging = (YES|NO)'),
-                lambda match: False if (match.group(1) == 'NO') else True,
-            )
-        }
 
         result = []  # Final storage for particle
         vals = {}  # intermediate storage for particle values so they can be set to null first.
 
-        for (key, (matcher, l_func)) in single_var_matchers.iteritems():
+        for key in self._single_var_matchers:
             vals[key] = None
-        for line in self.raw_data.split(NEWLINE):
-            for (key, (matcher, l_func)) in single_var_matchers.iteritems():
-                match = matcher.match(line)
-                if match:
-                    vals[key] = l_func(match)
+
+        for key, match in self._line_matcher.matches(self.raw_data.split(NEWLINE)):
+            vals[key] = self._single_var_matchers[key][1](match)
 
         for (key, val) in vals.iteritems():
             result.append({DataParticleKey.VALUE_ID: key, DataParticleKey.VALUE: val})
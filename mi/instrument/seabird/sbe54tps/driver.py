@@ -32,6 +32,7 @@ from mi.core.exceptions import InstrumentProtocolException
 from mi.core.exceptions import InstrumentTimeoutException
 from mi.core.exceptions import InstrumentDataException
 
+from mi.instrument.seabird.driver import LineMatcher
 from mi.instrument.seabird.driver import SeaBirdInstrumentDriver
 from mi.instrument.seabird.driver import SeaBirdProtocol
 from mi.instrument.seabird.driver import NEWLINE
@@ -232,6 +233,17 @@ class SBE54tpsStatusDataParticle(DataParticle):
     LINE6 = r"<Bytes>(\d+)</Bytes>"
     LINE7 = r"<BytesFree>(\d+)</BytesFree>"
 
+    _line_matcher = LineMatcher([
+        ((SBE54tpsStatusDataParticleKey.DEVICE_TYPE,
+          SBE54tpsStatusDataParticleKey.SERIAL_NUMBER), LINE1),
+        ((SBE54tpsStatusDataParticleKey.TIME,), LINE2),
+        ((SBE54tpsStatusDataParticleKey.EVENT_COUNT,), LINE3),
+        ((SBE54tpsStatusDataParticleKey.MAIN_SUPPLY_VOLTAGE,), LINE4),
+        ((SBE54tpsStatusDataParticleKey.NUMBER_OF_SAMPLES,), LINE5),
+        ((SBE54tpsStatusDataParticleKey.BYTES_USED,), LINE6),
+        ((SBE54tpsStatusDataParticleKey.BYTES_FREE,), LINE7)
+    ])
+
     def _build_parsed_values(self):
         """
         Take something in the StatusData format and split it into
@@ -250,42 +262,27 @@ class SBE54tpsStatusDataParticle(DataParticle):
             SBE54tpsStatusDataParticleKey.BYTES_FREE: None
         }
 
-        matchers = {
-            re.compile(self.LINE1): [SBE54tpsStatusDataParticleKey.DEVICE_TYPE,
-                                     SBE54tpsStatusDataParticleKey.SERIAL_NUMBER],
-            re.compile(self.LINE2): [SBE54tpsStatusDataParticleKey.TIME],
-            re.compile(self.LINE3): [SBE54tpsStatusDataParticleKey.EVENT_COUNT],
-            re.compile(self.LINE4): [SBE54tpsStatusDataParticleKey.MAIN_SUPPLY_VOLTAGE],
-            re.compile(self.LINE5): [SBE54tpsStatusDataParticleKey.NUMBER_OF_SAMPLES],
-            re.compile(self.LINE6): [SBE54tpsStatusDataParticleKey.BYTES_USED],
-            re.compile(self.LINE7): [SBE54tpsStatusDataParticleKey.BYTES_FREE]
-        }
-
-        for line in self.raw_data.split(NEWLINE):
-            for matcher, keys in matchers.iteritems():
-                match = matcher.match(line)
+        for keys, match in self._line_matcher.matches(self.raw_data.split(NEWLINE)):
+            for index, key in enumerate(keys):
+                val = match.group(index + 1)
 
-                if match:
-                    for index, key in enumerate(keys):
-                        val = match.group(index + 1)
+                if key in [SBE54tpsStatusDataParticleKey.DEVICE_TYPE,
+                           SBE54tpsStatusDataParticleKey.SERIAL_NUMBER]:
+                    values[key] = val
 
-                        if key in [SBE54tpsStatusDataParticleKey.DEVICE_TYPE,
-                                   SBE54tpsStatusDataParticleKey.SERIAL_NUMBER]:
-                            values[key] = val
+                elif key in [SBE54tpsStatusDataParticleKey.EVENT_COUNT,
+                             SBE54tpsStatusDataParticleKey.NUMBER_OF_SAMPLES,
+                             SBE54tpsStatusDataParticleKey.BYTES_USED,
+                             SBE54tpsStatusDataParticleKey.BYTES_FREE]:
+                    values[key] = int(val)
 
-                        elif key in [SBE54tpsStatusDataParticleKey.EVENT_COUNT,
-                                     SBE54tpsStatusDataParticleKey.NUMBER_OF_SAMPLES,
-                                     SBE54tpsStatusDataParticleKey.BYTES_USED,
-                                     SBE54tpsStatusDataParticleKey.BYTES_FREE]:
-                            values[key] = int(val)
+                elif key in [SBE54tpsStatusDataParticleKey.MAIN_SUPPLY_VOLTAGE]:
+                    values[key] = float(val)
 
-                        elif key in [SBE54tpsStatusDataParticleKey.MAIN_SUPPLY_VOLTAGE]:
-                            values[key] = float(val)
-
-                        elif key in [SBE54tpsStatusDataParticleKey.TIME]:
-                            values[key] = val
-                            py_timestamp = time.strptime(val, "%Y-%m-%dT%H:%M:%S")
-                            self.set_internal_timestamp(unix_time=timegm_to_float(py_timestamp))
+                elif key in [SBE54tpsStatusDataParticleKey.TIME]:
+                    values[key] = val
+                    py_timestamp = time.strptime(val, "%Y-%m-%dT%H:%M:%S")
+                    self.set_internal_timestamp(unix_time=timegm_to_float(py_timestamp))
 
         result = []
         for key, value in values.iteritems():
@@ -362,6 +359,38 @@ class SBE54tpsConfigurationDataParticle(DataParticle):
     LINE27 = r"uploadType='(\d+)'"
     LINE28 = r"samplePeriod='(\d+)'"
 
+    _line_matcher = LineMatcher([
+        ((SBE54tpsConfigurationDataParticleKey.DEVICE_TYPE,
+          SBE54tpsConfigurationDataParticleKey.SERIAL_NUMBER), LINE1),
+        ((SBE54tpsConfigurationDataParticleKey.ACQ_OSC_CAL_DATE,), LINE2),
+        ((SBE54tpsConfigurationDataParticleKey.FRA0,), LINE3),
+        ((SBE54tpsConfigurationDataParticleKey.FRA1,), LINE4),
+        ((SBE54tpsConfigurationDataParticleKey.FRA2,), LINE5),
+        ((SBE54tpsConfigurationDataParticleKey.FRA3,), LINE6),
+        ((SBE54tpsConfigurationDataParticleKey.PRESSURE_SERIAL_NUM,), LINE7),
+        ((SBE54tpsConfigurationDataParticleKey.PRESSURE_CAL_DATE,), LINE8),
+        ((SBE54tpsConfigurationDataParticleKey.PU0,), LINE9),
+        ((SBE54tpsConfigurationDataParticleKey.PY1,), LINE10),
+        ((SBE54tpsConfigurationDataParticleKey.PY2,), LINE11),
+        ((SBE54tpsConfigurationDataParticleKey.PY3,), LINE12),
+        ((SBE54tpsConfigurationDataParticleKey.PC1,), LINE13),
+        ((SBE54tpsConfigurationDataParticleKey.PC2,), LINE14),
+        ((SBE54tpsConfigurationDataParticleKey.PC3,), LINE15),
+        ((SBE54tpsConfigurationDataParticleKey.PD1,), LINE16),
+        ((SBE54tpsConfigurationDataParticleKey.PD2,), LINE17),
+        ((SBE54tpsConfigurationDataParticleKey.PT1,), LINE18),
+        ((SBE54tpsConfigurationDataParticleKey.PT2,), LINE19),
+        ((SBE54tpsConfigurationDataParticleKey.PT3,), LINE20),
+        ((SBE54tpsConfigurationDataParticleKey.PT4,), LINE21),
+        ((SBE54tpsConfigurationDataParticleKey.PRESSURE_OFFSET,), LINE22),
+        ((SBE54tpsConfigurationDataParticleKey.PRESSURE_RANGE,), LINE23),
+        ((SBE54tpsConfigurationDataParticleKey.BATTERY_TYPE,), LINE24),
+        ((SBE54tpsConfigurationDataParticleKey.BAUD_RATE,), LINE25),
+        ((SBE54tpsConfigurationDataParticleKey.ENABLE_ALERTS,), LINE26),
+        ((SBE54tpsConfigurationDataParticleKey.UPLOAD_TYPE,), LINE27),
+        ((SBE54tpsConfigurationDataParticleKey.SAMPLE_PERIOD,), LINE28)
+    ])
+
     def _build_parsed_values(self):
         """
         Take something in the StatusData format and split it into
@@ -402,80 +431,44 @@ class SBE54tpsConfigurationDataParticle(DataParticle):
             SBE54tpsConfigurationDataParticleKey.SAMPLE_PERIOD: None
         }
 
-        matchers = {
-            re.compile(self.LINE1): [SBE54tpsConfigurationDataParticleKey.DEVICE_TYPE,
-                                     SBE54tpsConfigurationDataParticleKey.SERIAL_NUMBER],
-            re.compile(self.LINE2): [SBE54tpsConfigurationDataParticleKey.ACQ_OSC_CAL_DATE],
-            re.compile(self.LINE3): [SBE54tpsConfigurationDataParticleKey.FRA0],
-            re.compile(self.LINE4): [SBE54tpsConfigurationDataParticleKey.FRA1],
-            re.compile(self.LINE5): [SBE54tpsConfigurationDataParticleKey.FRA2],
-            re.compile(self.LINE6): [SBE54tpsConfigurationDataParticleKey.FRA3],
-            re.compile(self.LINE7): [SBE54tpsConfigurationDataParticleKey.PRESSURE_SERIAL_NUM],
-            re.compile(self.LINE8): [SBE54tpsConfigurationDataParticleKey.PRESSURE_CAL_DATE],
-            re.compile(self.LINE9): [SBE54tpsConfigurationDataParticleKey.PU0],
-            re.compile(self.LINE10): [SBE54tpsConfigurationDataParticleKey.PY1],
-            re.compile(self.LINE11): [SBE54tpsConfigurationDataParticleKey.PY2],
-            re.compile(self.LINE12): [SBE54tpsConfigurationDataParticleKey.PY3],
-            re.compile(self.LINE13): [SBE54tpsConfigurationDataParticleKey.PC1],
-            re.compile(self.LINE14): [SBE54tpsConfigurationDataParticleKey.PC2],
-            re.compile(self.LINE15): [SBE54tpsConfigurationDataParticleKey.PC3],
-            re.compile(self.LINE16): [SBE54tpsConfigurationDataParticleKey.PD1],
-            re.compile(self.LINE17): [SBE54tpsConfigurationDataParticleKey.PD2],
-            re.compile(self.LINE18): [SBE54tpsConfigurationDataParticleKey.PT1],
-            re.compile(self.LINE19): [SBE54tpsConfigurationDataParticleKey.PT2],
-            re.compile(self.LINE20): [SBE54tpsConfigurationDataParticleKey.PT3],
-            re.compile(self.LINE21): [SBE54tpsConfigurationDataParticleKey.PT4],
-            re.compile(self.LINE22): [SBE54tpsConfigurationDataParticleKey.PRESSURE_OFFSET],
-            re.compile(self.LINE23): [SBE54tpsConfigurationDataParticleKey.PRESSURE_RANGE],
-            re.compile(self.LINE24): [SBE54tpsConfigurationDataParticleKey.BATTERY_TYPE],
-            re.compile(self.LINE25): [SBE54tpsConfigurationDataParticleKey.BAUD_RATE],
-            re.compile(self.LINE26): [SBE54tpsConfigurationDataParticleKey.ENABLE_ALERTS],
-            re.compile(self.LINE27): [SBE54tpsConfigurationDataParticleKey.UPLOAD_TYPE],
-            re.compile(self.LINE28): [SBE54tpsConfigurationDataParticleKey.SAMPLE_PERIOD]
-        }
-
-        for line in self.raw_data.split(NEWLINE):
-            for matcher, keys in matchers.iteritems():
-                match = matcher.match(line)
-
-                if match:
-                    for index, key in enumerate(keys):
-                        val = match.group(index + 1)
-
-                        if key in [SBE54tpsConfigurationDataParticleKey.DEVICE_TYPE,
-                                   SBE54tpsConfigurationDataParticleKey.PRESSURE_CAL_DATE,
-                                   SBE54tpsConfigurationDataParticleKey.ACQ_OSC_CAL_DATE,
-                                   SBE54tpsConfigurationDataParticleKey.PRESSURE_SERIAL_NUM,
-                                   SBE54tpsConfigurationDataParticleKey.SERIAL_NUMBER]:
-                            values[key] = val
-
-                        elif key in [SBE54tpsConfigurationDataParticleKey.BATTERY_TYPE,
-                                     SBE54tpsConfigurationDataParticleKey.UPLOAD_TYPE,
-                                     SBE54tpsConfigurationDataParticleKey.SAMPLE_PERIOD,
-                                     SBE54tpsConfigurationDataParticleKey.BAUD_RATE,
-                                     SBE54tpsConfigurationDataParticleKey.ENABLE_ALERTS]:
-                            values[key] = int(val)
-
-                        elif key in [SBE54tpsConfigurationDataParticleKey.FRA0,
-                                     SBE54tpsConfigurationDataParticleKey.FRA1,
-                                     SBE54tpsConfigurationDataParticleKey.FRA2,
-                                     SBE54tpsConfigurationDataParticleKey.FRA3,
-                                     SBE54tpsConfigurationDataParticleKey.PU0,
-                                     SBE54tpsConfigurationDataParticleKey.PY1,
-                                     SBE54tpsConfigurationDataParticleKey.PY2,
-                                     SBE54tpsConfigurationDataParticleKey.PY3,
-                                     SBE54tpsConfigurationDataParticleKey.PC1,
-                                     SBE54tpsConfigurationDataParticleKey.PC2,
-                                     SBE54tpsConfigurationDataParticleKey.PC3,
-                                     SBE54tpsConfigurationDataParticleKey.PD1,
-                                     SBE54tpsConfigurationDataParticleKey.PD2,
-                                     SBE54tpsConfigurationDataParticleKey.PT1,
-                                     SBE54tpsConfigurationDataParticleKey.PT2,
-                                     SBE54tpsConfigurationDataParticleKey.PT3,
-                                     SBE54tpsConfigurationDataParticleKey.PT4,
-                                     SBE54tpsConfigurationDataParticleKey.PRESSURE_OFFSET,
-                                     SBE54tpsConfigurationDataParticleKey.PRESSURE_RANGE]:
-                            values[key] = float(val)
+        for keys, match in self._line_matcher.matches(self.raw_data.split(NEWLINE)):
+            for index, key in enumerate(keys):
+                val = match.group(index + 1)
+
+                if key in [SBE54tpsConfigurationDataParticleKey.DEVICE_TYPE,
+                           SBE54tpsConfigurationDataParticleKey.PRESSURE_CAL_DATE,
+                           SBE54tpsConfigurationDataParticleKey.ACQ_OSC_CAL_DATE,
+                           SBE54tpsConfigurationDataParticleKey.PRESSURE_SERIAL_NUM,
+                           SBE54tpsConfigurationDataParticleKey.SERIAL_NUMBER]:
+                    values[key] = val
+
+                elif key in [SBE54tpsConfigurationDataParticleKey.BATTERY_TYPE,
+                             SBE54tpsConfigurationDataParticleKey.UPLOAD_TYPE,
+                             SBE54tpsConfigurationDataParticleKey.SAMPLE_PERIOD,
+                             SBE54tpsConfigurationDataParticleKey.BAUD_RATE,
+                             SBE54tpsConfigurationDataParticleKey.ENABLE_ALERTS]:
+                    values[key] = int(val)
+
+                elif key in [SBE54tpsConfigurationDataParticleKey.FRA0,
+                             SBE54tpsConfigurationDataParticleKey.FRA1,
+                             SBE54tpsConfigurationDataParticleKey.FRA2,
+                             SBE54tpsConfigurationDataParticleKey.FRA3,
+                             SBE54tpsConfigurationDataParticleKey.PU0,
+                             SBE54tpsConfigurationDataParticleKey.PY1,
+                             SBE54tpsConfigurationDataParticleKey.PY2,
+                             SBE54tpsConfigurationDataParticleKey.PY3,
+                             SBE54tpsConfigurationDataParticleKey.PC1,
+                             SBE54tpsConfigurationDataParticleKey.PC2,
+                             SBE54tpsConfigurationDataParticleKey.PC3,
+                             SBE54tpsConfigurationDataParticleKey.PD1,
+                             SBE54tpsConfigurationDataParticleKey.PD2,
+                             SBE54tpsConfigurationDataParticleKey.PT1,
+                             SBE54tpsConfigurationDataParticleKey.PT2,
+                             SBE54tpsConfigurationDataParticleKey.PT3,
+                             SBE54tpsConfigurationDataParticleKey.PT4,
+                             SBE54tpsConfigurationDataParticleKey.PRESSURE_OFFSET,
+                             SBE54tpsConfigurationDataParticleKey.PRESSURE_RANGE]:
+                    values[key] = float(val)
 
         result = []
         for key, value in values.iteritems():
@@ -520,6 +513,22 @@ class SBE54tpsEventCounterDataParticle(DataParticle):
     LINE10 = r"<Event type='Error10' count='(\d+)'/>"
     LINE11 = r"<Event type='Error12' count='(\d+)'/>"
 
+    _line_matcher = LineMatcher([
+        ((SBE54tpsEventCounterDataParticleKey.NUMBER_EVENTS,
+          SBE54tpsEventCounterDataParticleKey.MAX_STACK), LINE1),
+        ((SBE54tpsEventCounterDataParticleKey.DEVICE_TYPE,
+          SBE54tpsEventCounterDataParticleKey.SERIAL_NUMBER), LINE2),
+        ((SBE54tpsEventCounterDataParticleKey.POWER_ON_RESET,), LINE3),
+        ((SBE54tpsEventCounterDataParticleKey.POWER_FAIL_RESET,), LINE4),
+        ((SBE54tpsEventCounterDataParticleKey.SERIAL_BYTE_ERROR,), LINE5),
+        ((SBE54tpsEventCounterDataParticleKey.COMMAND_BUFFER_OVERFLOW,), LINE6),
+        ((SBE54tpsEventCounterDataParticleKey.SERIAL_RECEIVE_OVERFLOW,), LINE7),
+        ((SBE54tpsEventCounterDataParticleKey.LOW_BATTERY,), LINE8),
+        ((SBE54tpsEventCounterDataParticleKey.SIGNAL_ERROR,), LINE9),
+        ((SBE54tpsEventCounterDataParticleKey.ERROR_10,), LINE10),
+        ((SBE54tpsEventCounterDataParticleKey.ERROR_12,), LINE11)
+    ])
+
     def _build_parsed_values(self):
         """
         Take something in the StatusData format and split it into
@@ -543,46 +552,26 @@ class SBE54tpsEventCounterDataParticle(DataParticle):
             SBE54tpsEventCounterDataParticleKey.ERROR_12: None
         }
 
-        matchers = {
-            re.compile(self.LINE1): [SBE54tpsEventCounterDataParticleKey.NUMBER_EVENTS,
-                                     SBE54tpsEventCounterDataParticleKey.MAX_STACK],
-            re.compile(self.LINE2): [SBE54tpsEventCounterDataParticleKey.DEVICE_TYPE,
-                                     SBE54tpsEventCounterDataParticleKey.SERIAL_NUMBER],
-            re.compile(self.LINE3): [SBE54tpsEventCounterDataParticleKey.POWER_ON_RESET],
-            re.compile(self.LINE4): [SBE54tpsEventCounterDataParticleKey.POWER_FAIL_RESET],
-            re.compile(self.LINE5): [SBE54tpsEventCounterDataParticleKey.SERIAL_BYTE_ERROR],
-            re.compile(self.LINE6): [SBE54tpsEventCounterDataParticleKey.COMMAND_BUFFER_OVERFLOW],
-            re.compile(self.LINE7): [SBE54tpsEventCounterDataParticleKey.SERIAL_RECEIVE_OVERFLOW],
-            re.compile(self.LINE8): [SBE54tpsEventCounterDataParticleKey.LOW_BATTERY],
-            re.compile(self.LINE9): [SBE54tpsEventCounterDataParticleKey.SIGNAL_ERROR],
-            re.compile(self.LINE10): [SBE54tpsEventCounterDataParticleKey.ERROR_10],
-            re.compile(self.LINE11): [SBE54tpsEventCounterDataParticleKey.ERROR_12]
-        }
-
-        for line in self.raw_data.split(NEWLINE):
-            for matcher, keys in matchers.iteritems():
-                match = matcher.match(line)
-
-                if match:
-                    for index, key in enumerate(keys):
-                        val = match.group(index + 1)
-
-                        if key in [SBE54tpsEventCounterDataParticleKey.DEVICE_TYPE,
-                                   SBE54tpsEventCounterDataParticleKey.SERIAL_NUMBER]:
-                            values[key] = val
-
-                        elif key in [SBE54tpsEventCounterDataParticleKey.NUMBER_EVENTS,
-                                     SBE54tpsEventCounterDataParticleKey.MAX_STACK,
-                                     SBE54tpsEventCounterDataParticleKey.POWER_ON_RESET,
-                                     SBE54tpsEventCounterDataParticleKey.POWER_FAIL_RESET,
-                                     SBE54tpsEventCounterDataParticleKey.SERIAL_BYTE_ERROR,
-                                     SBE54tpsEventCounterDataParticleKey.COMMAND_BUFFER_OVERFLOW,
-                                     SBE54tpsEventCounterDataParticleKey.SERIAL_RECEIVE_OVERFLOW,
-                                     SBE54tpsEventCounterDataParticleKey.LOW_BATTERY,
-                                     SBE54tpsEventCounterDataParticleKey.SIGNAL_ERROR,
-                                     SBE54tpsEventCounterDataParticleKey.ERROR_10,
-                                     SBE54tpsEventCounterDataParticleKey.ERROR_12]:
-                            values[key] = int(val)
+        for keys, match in self._line_matcher.matches(self.raw_data.split(NEWLINE)):
+            for index, key in enumerate(keys):
+                val = match.group(index + 1)
+
+                if key in [SBE54tpsEventCounterDataParticleKey.DEVICE_TYPE,
+                           SBE54tpsEventCounterDataParticleKey.SERIAL_NUMBER]:
+                    values[key] = val
+
+                elif key in [SBE54tpsEventCounterDataParticleKey.NUMBER_EVENTS,
+                             SBE54tpsEventCounterDataParticleKey.MAX_STACK,
+                             SBE54tpsEventCounterDataParticleKey.POWER_ON_RESET,
+                             SBE54tpsEventCounterDataParticleKey.POWER_FAIL_RESET,
+                             SBE54tpsEventCounterDataParticleKey.SERIAL_BYTE_ERROR,
+                             SBE54tpsEventCounterDataParticleKey.COMMAND_BUFFER_OVERFLOW,
+                             SBE54tpsEventCounterDataParticleKey.SERIAL_RECEIVE_OVERFLOW,
+                             SBE54tpsEventCounterDataParticleKey.LOW_BATTERY,
+                             SBE54tpsEventCounterDataParticleKey.SIGNAL_ERROR,
+                             SBE54tpsEventCounterDataParticleKey.ERROR_10,
+                             SBE54tpsEventCounterDataParticleKey.ERROR_12]:
+                    values[key] = int(val)
 
         result = []
         for key, value in values.iteritems():
@@ -620,6 +609,18 @@ class SBE54tpsHardwareDataParticle(DataParticle):
     LINE7 = r"<PCBType>([^<]+)</PCBType>"
     LINE8 = r"<MfgDate>([^<]+)</MfgDate>"
 
+    _line_matcher = LineMatcher([
+        ((SBE54tpsHardwareDataParticleKey.DEVICE_TYPE,
+          SBE54tpsHardwareDataParticleKey.SERIAL_NUMBER), LINE1),
+        ((SBE54tpsHardwareDataParticleKey.MANUFACTURER,), LINE2),
+        ((SBE54tpsHardwareDataParticleKey.FIRMWARE_VERSION,), LINE3),
+        ((SBE54tpsHardwareDataParticleKey.FIRMWARE_DATE,), LINE4),
+        ((SBE54tpsHardwareDataParticleKey.HARDWARE_VERSION,), LINE5),
+        ((SBE54tpsHardwareDataParticleKey.PCB_SERIAL_NUMBER,), LINE6),
+        ((SBE54tpsHardwareDataParticleKey.PCB_TYPE,), LINE7),
+        ((SBE54tpsHardwareDataParticleKey.MANUFACTURE_DATE,), LINE8)
+    ])
+
     def _build_parsed_values(self):
         """
         Take something in the StatusData format and split it into
@@ -630,33 +631,17 @@ class SBE54tpsHardwareDataParticle(DataParticle):
         arrays = [SBE54tpsHardwareDataParticleKey.HARDWARE_VERSION,
                   SBE54tpsHardwareDataParticleKey.PCB_SERIAL_NUMBER]
 
-        matchers = {
-            re.compile(self.LINE1): [SBE54tpsHardwareDataParticleKey.DEVICE_TYPE,
-                                     SBE54tpsHardwareDataParticleKey.SERIAL_NUMBER],
-            re.compile(self.LINE2): [SBE54tpsHardwareDataParticleKey.MANUFACTURER],
-            re.compile(self.LINE3): [SBE54tpsHardwareDataParticleKey.FIRMWARE_VERSION],
-            re.compile(self.LINE4): [SBE54tpsHardwareDataParticleKey.FIRMWARE_DATE],
-            re.compile(self.LINE5): [SBE54tpsHardwareDataParticleKey.HARDWARE_VERSION],
-            re.compile(self.LINE6): [SBE54tpsHardwareDataParticleKey.PCB_SERIAL_NUMBER],
-            re.compile(self.LINE7): [SBE54tpsHardwareDataParticleKey.PCB_TYPE],
-            re.compile(self.LINE8): [SBE54tpsHardwareDataParticleKey.MANUFACTURE_DATE]
-        }
-
         values = {}
         result = []
 
-        for line in self.raw_data.split(NEWLINE):
-            for matcher, keys in matchers.iteritems():
-                match = matcher.match(line)
-
-                if match:
-                    for index, key in enumerate(keys):
-                        val = match.group(index + 1)
+        for keys, match in self._line_matcher.matches(self.raw_data.split(NEWLINE)):
+            for index, key in enumerate(keys):
+                val = match.group(index + 1)
 
-                        if key in arrays:
-                            values.setdefault(key, []).append(val)
-                        else:
-                            values[key] = val
+                if key in arrays:
+                    values.setdefault(key, []).append(val)
+                else:
+                    values[key] = val
 
         for key, val in values.iteritems():
             result.append({DataParticleKey.VALUE_ID: key,
@@ -685,6 +670,14 @@ class SBE54tpsSampleDataParticle(DataParticle):
     LINE3 = r"<PressurePSI>([0-9.+-]+)</PressurePSI>"
     LINE4 = r"<PTemp>([0-9.+-]+)</PTemp>"
 
+    _line_matcher = LineMatcher([
+        ((SBE54tpsSampleDataParticleKey.SAMPLE_NUMBER,
+          SBE54tpsSampleDataParticleKey.SAMPLE_TYPE), LINE1),
+        ((SBE54tpsSampleDataParticleKey.INST_TIME,), LINE2),
+        ((SBE54tpsSampleDataParticleKey.PRESSURE,), LINE3),
+        ((SBE54tpsSampleDataParticleKey.PRESSURE_TEMP,), LINE4)
+    ])
+
     def _build_parsed_values(self):
         """
         Take something in the StatusData format and split it into
@@ -701,38 +694,26 @@ class SBE54tpsSampleDataParticle(DataParticle):
             SBE54tpsSampleDataParticleKey.PRESSURE_TEMP: None
         }
 
-        matchers = {
-            re.compile(self.LINE1): [SBE54tpsSampleDataParticleKey.SAMPLE_NUMBER,
-                                     SBE54tpsSampleDataParticleKey.SAMPLE_TYPE],
-            re.compile(self.LINE2): [SBE54tpsSampleDataParticleKey.INST_TIME],
-            re.compile(self.LINE3): [SBE54tpsSampleDataParticleKey.PRESSURE],
-            re.compile(self.LINE4): [SBE54tpsSampleDataParticleKey.PRESSURE_TEMP]
-        }
-
-        for line in self.raw_data.split(NEWLINE):
-            for matcher, keys in matchers.iteritems():
-                match = matcher.match(line)
-
-                if match:
-                    for index, key in enumerate(keys):
-                        val = match.group(index + 1)
+        for keys, match in self._line_matcher.matches(self.raw_data.split(NEWLINE)):
+            for index, key in enumerate(keys):
+                val = match.group(index + 1)
 
-                        if key in [SBE54tpsSampleDataParticleKey.SAMPLE_TYPE]:
-                            values[key] = val
+                if key in [SBE54tpsSampleDataParticleKey.SAMPLE_TYPE]:
+                    values[key] = val
 
-                        elif key in [SBE54tpsSampleDataParticleKey.SAMPLE_NUMBER]:
-                            values[key] = int(val)
+                elif key in [SBE54tpsSampleDataParticleKey.SAMPLE_NUMBER]:
+                    values[key] = int(val)
 
-                        elif key in [SBE54tpsSampleDataParticleKey.PRESSURE,
-                                     SBE54tpsSampleDataParticleKey.PRESSURE_TEMP]:
-                            values[key] = float(val)
+                elif key in [SBE54tpsSampleDataParticleKey.PRESSURE,
+                             SBE54tpsSampleDataParticleKey.PRESSURE_TEMP]:
+                    values[key] = float(val)
 
-                        elif key in [SBE54tpsSampleDataParticleKey.INST_TIME]:
-                            # <Time>2012-11-07T12:21:25</Time>
-                            # yyyy-mm-ddThh:mm:ss
-                            py_timestamp = time.strptime(val, "%Y-%m-%dT%H:%M:%S")
-                            self.set_internal_timestamp(unix_time=timegm_to_float(py_timestamp))
-                            values[key] = val
+                elif key in [SBE54tpsSampleDataParticleKey.INST_TIME]:
+                    # <Time>2012-11-07T12:21:25</Time>
+                    # yyyy-mm-ddThh:mm:ss
+                    py_timestamp = time.strptime(val, "%Y-%m-%dT%H:%M:%S")
+                    self.set_internal_timestamp(unix_time=timegm_to_float(py_timestamp))
+                    values[key] = val
 
         result = []
         for key, value in values.iteritems():
@@ -770,6 +751,18 @@ class SBE54tpsSampleRefOscDataParticle(DataParticle):
     LINE7 = r"<PCBTempRaw>([0-9.+-]+)</PCBTempRaw>"
     LINE8 = r"<RefErrorPPM>([0-9.+-]+)</RefErrorPPM>"
 
+    _line_matcher = LineMatcher([
+        ((SBE54tpsSampleRefOscDataParticleKey.SET_TIMEOUT,), LINE1),
+        ((SBE54tpsSampleRefOscDataParticleKey.SET_TIMEOUT_MAX,), LINE2),
+        ((SBE54tpsSampleRefOscDataParticleKey.SET_TIMEOUT_ICD,), LINE3),
+        ((SBE54tpsSampleRefOscDataParticleKey.SAMPLE_NUMBER,
+          SBE54tpsSampleRefOscDataParticleKey.SAMPLE_TYPE), LINE4),
+        ((SBE54tpsSampleRefOscDataParticleKey.SAMPLE_TIMESTAMP,), LINE5),
+        ((SBE54tpsSampleRefOscDataParticleKey.REF_OSC_FREQ,), LINE6),
+        ((SBE54tpsSampleRefOscDataParticleKey.PCB_TEMP_RAW,), LINE7),
+        ((SBE54tpsSampleRefOscDataParticleKey.REF_ERROR_PPM,), LINE8)
+    ])
+
     def _build_parsed_values(self):
         """
         Take something in the StatusData format and split it into
@@ -790,48 +783,32 @@ class SBE54tpsSampleRefOscDataParticle(DataParticle):
             SBE54tpsSampleRefOscDataParticleKey.REF_ERROR_PPM: None
         }
 
-        matchers = {
-            re.compile(self.LINE1): [SBE54tpsSampleRefOscDataParticleKey.SET_TIMEOUT],
-            re.compile(self.LINE2): [SBE54tpsSampleRefOscDataParticleKey.SET_TIMEOUT_MAX],
-            re.compile(self.LINE3): [SBE54tpsSampleRefOscDataParticleKey.SET_TIMEOUT_ICD],
-            re.compile(self.LINE4): [SBE54tpsSampleRefOscDataParticleKey.SAMPLE_NUMBER,
-                                     SBE54tpsSampleRefOscDataParticleKey.SAMPLE_TYPE],
-            re.compile(self.LINE5): [SBE54tpsSampleRefOscDataParticleKey.SAMPLE_TIMESTAMP],
-            re.compile(self.LINE6): [SBE54tpsSampleRefOscDataParticleKey.REF_OSC_FREQ],
-            re.compile(self.LINE7): [SBE54tpsSampleRefOscDataParticleKey.PCB_TEMP_RAW],
-            re.compile(self.LINE8): [SBE54tpsSampleRefOscDataParticleKey.REF_ERROR_PPM]
-        }
-
-        for line in self.raw_data.split(NEWLINE):
-            for matcher, keys in matchers.iteritems():
-                match = matcher.match(line)
-
-                if match:
-                    for index, key in enumerate(keys):
-                        val = match.group(index + 1)
-
-                        if key in [SBE54tpsSampleRefOscDataParticleKey.SAMPLE_TYPE]:
-                            values[key] = val
-
-                        elif key in [SBE54tpsSampleRefOscDataParticleKey.SET_TIMEOUT,
-                                     SBE54tpsSampleRefOscDataParticleKey.SAMPLE_NUMBER,
-                                     SBE54tpsSampleRefOscDataParticleKey.SET_TIMEOUT_MAX,
-                                     SBE54tpsSampleRefOscDataParticleKey.SET_TIMEOUT_ICD,
-                                     SBE54tpsSampleRefOscDataParticleKey.PCB_TEMP_RAW]:
-                            if key == SBE54tpsSampleRefOscDataParticleKey.SET_TIMEOUT_MAX and val.lower() == 'off':
-                                val = 0
-                            values[key] = int(val)
-
-                        elif key in [SBE54tpsSampleRefOscDataParticleKey.REF_OSC_FREQ,
-                                     SBE54tpsSampleRefOscDataParticleKey.REF_ERROR_PPM]:
-                            values[key] = float(val)
-
-                        elif key in [SBE54tpsSampleRefOscDataParticleKey.SAMPLE_TIMESTAMP]:
-                            # <Time>2012-11-07T12:21:25</Time>
-                            # yyyy-mm-ddThh:mm:ss
-                            values[key] = val
-                            py_timestamp = time.strptime(val, "%Y-%m-%dT%H:%M:%S")
-                            self.set_internal_timestamp(unix_time=timegm_to_float(py_timestamp))
+        for keys, match in self._line_matcher.matches(self.raw_data.split(NEWLINE)):
+            for index, key in enumerate(keys):
+                val = match.group(index + 1)
+
+                if key in [SBE54tpsSampleRefOscDataParticleKey.SAMPLE_TYPE]:
+                    values[key] = val
+
+                elif key in [SBE54tpsSampleRefOscDataParticleKey.SET_TIMEOUT,
+                             SBE54tpsSampleRefOscDataParticleKey.SAMPLE_NUMBER,
+                             SBE54tpsSampleRefOscDataParticleKey.SET_TIMEOUT_MAX,
+                             SBE54tpsSampleRefOscDataParticleKey.SET_TIMEOUT_ICD,
+                             SBE54tpsSampleRefOscDataParticleKey.PCB_TEMP_RAW]:
+                    if key == SBE54tpsSampleRefOscDataParticleKey.SET_TIMEOUT_MAX and val.lower() == 'off':
+                        val = 0
+                    values[key] = int(val)
+
+                elif key in [SBE54tpsSampleRefOscDataParticleKey.REF_OSC_FREQ,
+                             SBE54tpsSampleRefOscDataParticleKey.REF_ERROR_PPM]:
+                    values[key] = float(val)
+
+                elif key in [SBE54tpsSampleRefOscDataParticleKey.SAMPLE_TIMESTAMP]:
+                    # <Time>2012-11-07T12:21:25</Time>
+                    # yyyy-mm-ddThh:mm:ss
+                    values[key] = val
+                    py_timestamp = time.strptime(val, "%Y-%m-%dT%H:%M:%S")
+                    self.set_internal_timestamp(unix_time=timegm_to_float(py_timestamp))
 
         result = []
         for key, value in values.iteritems():
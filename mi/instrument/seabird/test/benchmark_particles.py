@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+@package mi.instrument.seabird.test.benchmark_particles
+@file mi/instrument/seabird/test/benchmark_particles.py
+@brief Time of building the Sea-Bird status and calibration particles.
+
+Times _build_parsed_values of the sbe16plus, sbe26plus and sbe54tps particles
+on the unit test samples. To compare two revisions, run with --save on one
+and --compare on the other, which also checks the particle values are
+unchanged.
+
+Usage:
+    benchmark_particles [--number=<n>] [--save=<file> | --compare=<file>]
+
+Options:
+    -h, --help          Show this screen
+    --number=<n>        Particles built per timing [default: 300]
+    --save=<file>       Save the particle values to file
+    --compare=<file>    Compare the particle values to those saved in file
+
+    To run without installing:
+    python -m mi.instrument.seabird.test.benchmark_particles ...
+"""
+import cPickle as pickle
+import timeit
+
+from docopt import docopt
+
+from mi.instrument.seabird.sbe16plus_v2.ctdpf_jb.driver import OptodeSettingsParticle
+from mi.instrument.seabird.sbe16plus_v2.ctdpf_jb.test.test_driver import SeaBird19plusMixin
+from mi.instrument.seabird.sbe16plus_v2.driver import SBE16CalibrationParticle, SBE16DataParticle, \
+    SBE16StatusParticle
+from mi.instrument.seabird.sbe16plus_v2.test.sample_particles import VALID_DCAL_QUARTZ, VALID_SAMPLE, \
+    VALID_STATUS_RESPONSE
+from mi.instrument.seabird.sbe26plus import driver as sbe26plus
+from mi.instrument.seabird.sbe26plus.test import sample_data as sbe26plus_samples
+from mi.instrument.seabird.sbe54tps import driver as sbe54tps
+from mi.instrument.seabird.sbe54tps.test import sample_data as sbe54tps_samples
+
+__license__ = 'Apache 2.0'
+
+CASES = [
+    ('sbe16plus sample', SBE16DataParticle, VALID_SAMPLE),
+    ('sbe16plus status', SBE16StatusParticle, VALID_STATUS_RESPONSE),
+    ('sbe16plus calibration', SBE16CalibrationParticle, VALID_DCAL_QUARTZ),
+    ('sbe26plus status', sbe26plus.SBE26plusDeviceStatusDataParticle, sbe26plus_samples.SAMPLE_DEVICE_STATUS),
+    ('sbe26plus calibration', sbe26plus.SBE26plusDeviceCalibrationDataParticle,
+     sbe26plus_samples.SAMPLE_DEVICE_CALIBRATION),
+    ('sbe26plus statistics', sbe26plus.SBE26plusStatisticsDataParticle, sbe26plus_samples.SAMPLE_STATISTICS),
+    ('sbe54tps status', sbe54tps.SBE54tpsStatusDataParticle, sbe54tps_samples.SAMPLE_GETSD),
+    ('sbe54tps configuration', sbe54tps.SBE54tpsConfigurationDataParticle, sbe54tps_samples.SAMPLE_GETCD),
+    ('sbe54tps event counter', sbe54tps.SBE54tpsEventCounterDataParticle, sbe54tps_samples.SAMPLE_GETEC),
+    ('sbe54tps hardware', sbe54tps.SBE54tpsHardwareDataParticle, sbe54tps_samples.SAMPLE_GETHD),
+    ('ctdpf_jb optode', OptodeSettingsParticle, SeaBird19plusMixin.VALID_SEND_OPTODE_RESPONSE),
+]
+
+
+def main():
+    options = docopt(__doc__)
+    number = int(options['--number'])
+
+    values = {}
+    for label, particle_class, sample in CASES:
+        build = lambda: particle_class(sample, port_timestamp=3600000000.0)._build_parsed_values()
+        values[label] = build()
+        elapsed = min(timeit.repeat(build, number=number, repeat=3)) / number
+        print '%-24s %8.3f ms' % (label, elapsed * 1000)
+
+    if options['--save']:
+        with open(options['--save'], 'wb') as fh:
+            pickle.dump(values, fh, pickle.HIGHEST_PROTOCOL)
+    elif options['--compare']:
+        with open(options['--compare'], 'rb') as fh:
+            saved = pickle.load(fh)
+        changed = sorted(label for label in saved if saved[label] != values.get(label))
+        print 'changed values: %s' % (', '.join(changed) if changed else 'none')
+
+
+if __name__ == '__main__':
+    main()
@@ -16,6 +16,7 @@ USAGE:
 __author__ = 'Bill French'
 __license__ = 'Apache 2.0'
 
+import re
 import time
 
 from mi.core.log import get_logger ; log = get_logger()
@@ -26,7 +27,8 @@ from mi.idk.unit_test import InstrumentDriverIntegrationTestCase
 from mi.idk.unit_test import InstrumentDriverQualificationTestCase
 from mi.idk.unit_test import InstrumentDriverPublicationTestCase
 
-from mi.instrument.seabird.driver import SeaBirdParticle
+from mi.instrument.seabird.driver import SeaBirdParticle, LineMatcher, compile_once, leading_literal
+from mi.core.unit_test import MiUnitTestCase
 from mi.core.exceptions import InstrumentParameterException
 from mi.core.instrument.instrument_driver import DriverEvent
 from mi.core.time_tools import get_timestamp_delayed
@@ -91,6 +93,66 @@ class SeaBirdUnitTest(InstrumentDriverUnitTestCase):
         self.assertEqual("1999-12-31 23:59:59", time.strftime("%Y-%m-%d %H:%M:%S", value))
 
 
+@attr('UNIT', group='mi')
+class LineMatcherUnitTest(MiUnitTestCase):
+    PATTERNS = [
+        ('version', r'SBE 26plus V ([\w.]+) +SN (\d+)'),
+        ('serial', r'SBE 26plus V ([\w.]+) +SN (\d+)'),
+        ('pressure', r'last sample: p = +([\d\.\-]+), t = +([\d\.\-]+)'),
+        ('salinity', r'last sample: .*?, s = +([\d\.\-]+)'),
+        ('slope', r' +CSLOPE = (-?[\d\.e\-\+]+)'),
+        ('time', r'<DateTime>([^<]+)</DateTime>'),
+        ('bytes', r'[\s]*<Bytes>(\d+)</Bytes>'),
+        ('sensor', r'(external|internal) temperature sensor'),
+        ('prefix', r'ab\d+'),
+        ('either', r'user (\w+)|info (\w+)'),
+    ]
+
+    LINES = [
+        'SBE 26plus V 6.1e  SN 1329', 'last sample: p = 14.5, t = 24.0, s = 0.0', '    CSLOPE = 1.0e+00',
+        'CSLOPE = 2', '<DateTime>2012-11-06T10:55:44</DateTime>', '  <Bytes>30</Bytes>', '<BytesFree>7</BytesFree>',
+        'internal temperature sensor', 'ab12', 'abc', 'user x', 'info y', '', '   ', 'S>CSLOPE = 3',
+    ]
+
+    def expected(self, lines, search=False):
+        result = []
+        for line in lines:
+            for key, pattern in self.PATTERNS:
+                match = re.search(pattern, line) if search else re.match(pattern, line)
+                if match:
+                    result.append((key, match.groups()))
+        return result
+
+    def test_leading_literal(self):
+        self.assertEqual(leading_literal(re.compile(r' +CSLOPE = (\d+)')), 'CSLOPE = ')
+        self.assertEqual(leading_literal(re.compile(r'^\s*<Time>(.*)')), '<Time>')
+        self.assertEqual(leading_literal(re.compile(r'ab*c')), 'a')
+        self.assertEqual(leading_literal(re.compile(r'(a|b)c')), '')
+        self.assertEqual(leading_literal(re.compile(r'abc|def')), '')
+        self.assertEqual(leading_literal(re.compile(r'abc', re.IGNORECASE)), '')
+
+    def test_matches(self):
+        for search in (False, True):
+            matcher = LineMatcher(self.PATTERNS, search=search)
+            actual = [(key, match.groups()) for key, match in matcher.matches(self.LINES)]
+            self.assertEqual(actual, self.expected(self.LINES, search))
+
+        # keys sharing a regex share the match
+        matches = dict(LineMatcher(self.PATTERNS).matches(self.LINES[:1]))
+        self.assertIs(matches['version'], matches['serial'])
+
+    def test_compile_once(self):
+        calls = []
+
+        @compile_once
+        def compiled():
+            calls.append(1)
+            return re.compile('x')
+
+        self.assertIs(compiled(), compiled())
+        self.assertEqual(len(calls), 1)
+
+
 ###############################################################################
 #                            INTEGRATION TESTS                                #
 #     Integration test test the direct driver / instrument interaction        #
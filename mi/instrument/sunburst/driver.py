@@ -20,6 +20,7 @@ import time
 import datetime
 
 from mi.core.log import get_logger
+from mi.core.checksum import sum_hex_bytes
 from mi.core.exceptions import InstrumentTimeoutException
 from mi.core.driver_scheduler import DriverSchedulerConfigKey, TriggerType
 
@@ -872,13 +873,7 @@ class SamiProtocol(CommandResponseInstrumentProtocol):
         # Send command.
         log.debug('_do_cmd_resp_no_wakeup: %r, timeout=%s, write_delay=%s, expected_prompt=%s, response_regex=%s',
                   cmd_line, timeout, write_delay, expected_prompt, response_regex)
-
-        if write_delay == 0:
-            self._connection.send(cmd_line)
-        else:
-            for char in cmd_line:
-                self._connection.send(char)
-                time.sleep(write_delay)
+        self._send_paced(cmd_line, write_delay)
 
         # Wait for the prompt, prepare result and return, timeout exception
         if response_regex:
@@ -1879,11 +1874,7 @@ class SamiProtocol(CommandResponseInstrumentProtocol):
         @param s: string for check-sum analysis.
         """
 
-        cs = 0
-        for index in xrange(0, len(s), 2):
-            cs += int(s[index:index + 2], 16)
-        cs &= 0xFF
-        return cs
+        return sum_hex_bytes(s)
 
     def _build_param_dict(self):
         """
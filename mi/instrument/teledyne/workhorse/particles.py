@@ -198,6 +198,26 @@ class Pd0DataParticle(DataParticle):
 
 
 class Pd0VelocityParticle(Pd0DataParticle):
+    # cell data, as unpacked by the PD0 parser
+    _array_dtypes = dict(
+        [(key, '<i2') for key in (AdcpPd0ParsedKey.BEAM_1_VELOCITY, AdcpPd0ParsedKey.BEAM_2_VELOCITY,
+                                  AdcpPd0ParsedKey.BEAM_3_VELOCITY, AdcpPd0ParsedKey.BEAM_4_VELOCITY,
+                                  AdcpPd0ParsedKey.BEAM_5_VELOCITY, AdcpPd0ParsedKey.WATER_VELOCITY_EAST,
+                                  AdcpPd0ParsedKey.WATER_VELOCITY_NORTH, AdcpPd0ParsedKey.WATER_VELOCITY_UP,
+                                  AdcpPd0ParsedKey.ERROR_VELOCITY)] +
+        [(key, 'u1') for key in (AdcpPd0ParsedKey.CORRELATION_MAGNITUDE_BEAM1,
+                                 AdcpPd0ParsedKey.CORRELATION_MAGNITUDE_BEAM2,
+                                 AdcpPd0ParsedKey.CORRELATION_MAGNITUDE_BEAM3,
+                                 AdcpPd0ParsedKey.CORRELATION_MAGNITUDE_BEAM4,
+                                 AdcpPd0ParsedKey.CORRELATION_MAGNITUDE_BEAM5,
+                                 AdcpPd0ParsedKey.ECHO_INTENSITY_BEAM1, AdcpPd0ParsedKey.ECHO_INTENSITY_BEAM2,
+                                 AdcpPd0ParsedKey.ECHO_INTENSITY_BEAM3, AdcpPd0ParsedKey.ECHO_INTENSITY_BEAM4,
+                                 AdcpPd0ParsedKey.ECHO_INTENSITY_BEAM5, AdcpPd0ParsedKey.PERCENT_GOOD_BEAM1,
+                                 AdcpPd0ParsedKey.PERCENT_GOOD_BEAM2, AdcpPd0ParsedKey.PERCENT_GOOD_BEAM3,
+                                 AdcpPd0ParsedKey.PERCENT_GOOD_BEAM4, AdcpPd0ParsedKey.PERCENT_GOOD_BEAM5,
+                                 AdcpPd0ParsedKey.PERCENT_GOOD_3BEAM, AdcpPd0ParsedKey.PERCENT_TRANSFORMS_REJECT,
+                                 AdcpPd0ParsedKey.PERCENT_BAD_BEAMS, AdcpPd0ParsedKey.PERCENT_GOOD_4BEAM)])
+
     def _build_scalar_values(self):
         record = self.raw_data
         ensemble_number = (record.variable_data.ensemble_roll_over << 16) + record.variable_data.ensemble_number
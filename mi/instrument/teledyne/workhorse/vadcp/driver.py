@@ -314,6 +314,7 @@ class Protocol(WorkhorseProtocol):
         log.debug('_get_response: timeout=%s, prompt_list=%s, expected_prompt=%r, response_regex=%r, promptbuf=%r',
                   timeout, prompt_list, expected_prompt, pattern, self._promptbuf)
         while time.time() < end_time:
+            update = self._buffer_updates
             if response_regex:
                 # noinspection PyArgumentList
                 match = response_regex.search(self._linebuf[connection])
@@ -326,7 +327,7 @@ class Protocol(WorkhorseProtocol):
                         result = self._promptbuf[connection][0:index + len(item)]
                         return item, result
 
-            time.sleep(.1)
+            self._wait_for_buffer(update, end_time)
 
         raise InstrumentTimeoutException("in InstrumentProtocol._get_response()")
 
@@ -492,6 +493,7 @@ class Protocol(WorkhorseProtocol):
 
         log.debug("LINE BUF: %r", self._linebuf[connection][-50:])
         log.debug("PROMPT BUF: %r", self._promptbuf[connection][-50:])
+        self._notify_buffer()
 
     ########################################################################
     # Wakeup helpers.
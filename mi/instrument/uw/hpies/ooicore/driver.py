@@ -53,6 +53,8 @@ common_matches = {
     'crc': r'[0-9a-fA-F]{4}'
 }
 
+CRC_MATCHER = re.compile(r'(?P<resp>%(data)s)\*(?P<crc>%(crc)s)' % common_matches)
+
 
 def build_command(address, command, *args):
     """
@@ -84,9 +86,7 @@ def calc_crc(line):
         - computed value of the CRC for the data
         - regex match for the crc value provided with the data
     """
-    pattern = re.compile(
-        r'(?P<resp>%(data)s)\*(?P<crc>%(crc)s)' % common_matches)
-    matches = re.search(pattern, line)
+    matches = CRC_MATCHER.search(line)
     if not matches:  # skip any lines that do not have a checksum match
         return 0, 0
     resp_crc = int(matches.group('crc'), 16)
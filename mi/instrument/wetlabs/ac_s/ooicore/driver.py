@@ -7,15 +7,12 @@ Release notes:
 
 initial version
 """
-from _ctypes import sizeof
-from collections import OrderedDict
-from ctypes import BigEndianStructure, c_ushort, c_uint, c_ubyte
-from io import BytesIO
-import struct
 from datetime import datetime
 import os
 import re
 
+import numpy
+
 from mi.core.log import get_logger
 from mi.core.common import BaseEnum
 from mi.core.exceptions import SampleException
@@ -31,6 +28,7 @@ from mi.core.instrument.data_particle import DataParticleKey
 from mi.core.instrument.data_particle import CommonDataParticleType
 from mi.core.instrument.chunker import StringChunker
 from mi.core.instrument.driver_dict import DriverDictKey
+from mi.core.instrument.framer import BinaryFramer, ChecksumType
 
 __author__ = 'Rachel Manoni'
 __license__ = 'Apache 2.0'
@@ -48,6 +46,19 @@ SIZE_OF_CHECKSUM_PLUS_PAD = 3  # three bytes for 2 byte checksum and 1 byte pad
 PACKET_REGISTRATION_PATTERN = '\xff\x00\xff\x00'
 PACKET_REGISTRATION_REGEX = re.compile(PACKET_REGISTRATION_PATTERN)
 
+# OPTAA record looks like this:
+# ff00ff00  <- packet registration
+# 02d0      <- record length minus checksum
+# ...       <- data
+# 2244      <- checksum
+# 00        <- pad
+OPTAA_SAMPLE_FRAMER = BinaryFramer(PACKET_REGISTRATION_PATTERN,
+                                   length_offset=INDEX_OF_PACKET_RECORD_LENGTH,
+                                   length_format='>H',
+                                   checksum=ChecksumType.SUM8,
+                                   checksum_format='>H',
+                                   pad=SIZE_OF_CHECKSUM_PLUS_PAD - 2)
+
 STATUS_PATTERN = r'AC-Spectra .+? quit\.'
 STATUS_REGEX = re.compile(STATUS_PATTERN, re.DOTALL)
 
@@ -127,82 +138,164 @@ class OptaaSampleDataParticleKey(BaseEnum):
     A_SIGNAL_COUNTS = 'a_signal_counts'
 
 
-class OptaaSampleHeader(BigEndianStructure):
-    _fields_ = [
-        ('packet_registration', c_uint),
-        ('record_length', c_ushort),
-        ('packet_type', c_ubyte),
-        ('reserved', c_ubyte),
-        ('meter_type', c_ubyte),
-        ('serial_number_high', c_ubyte),
-        ('serial_number_low', c_ushort),
-        ('a_ref_dark_counts', c_ushort),
-        ('pressure_counts', c_ushort),
-        ('a_signal_dark_counts', c_ushort),
-        ('raw_external_temp_counts', c_ushort),
-        ('raw_internal_temp_counts', c_ushort),
-        ('c_ref_dark_counts', c_ushort),
-        ('c_signal_dark_counts', c_ushort),
-        ('time_high', c_ushort),
-        ('time_low', c_ushort),
-        ('reserved2', c_ubyte),
-        ('num_wavelengths', c_ubyte),
-    ]
+OPTAA_HEADER_FIELDS = [
+    ('packet_registration', '>u4'),
+    ('record_length', '>u2'),
+    ('packet_type', 'u1'),
+    ('reserved', 'u1'),
+    ('meter_type', 'u1'),
+    ('serial_number_high', 'u1'),
+    ('serial_number_low', '>u2'),
+    ('a_ref_dark_counts', '>u2'),
+    ('pressure_counts', '>u2'),
+    ('a_signal_dark_counts', '>u2'),
+    ('raw_external_temp_counts', '>u2'),
+    ('raw_internal_temp_counts', '>u2'),
+    ('c_ref_dark_counts', '>u2'),
+    ('c_signal_dark_counts', '>u2'),
+    ('time_high', '>u2'),
+    ('time_low', '>u2'),
+    ('reserved2', 'u1'),
+    ('num_wavelengths', 'u1'),
+]
+OPTAA_HEADER_DTYPE = numpy.dtype(OPTAA_HEADER_FIELDS)
+SIZE_OF_HEADER = OPTAA_HEADER_DTYPE.itemsize
+INDEX_OF_NUM_WAVELENGTHS = SIZE_OF_HEADER - 1
+
+_record_dtypes = {}
+
+
+def optaa_record_dtype(num_wavelengths):
+    """
+    Return the structured dtype of a complete OPTAA record (header, interleaved
+    cref/aref/csig/asig counts for each wavelength, checksum and pad byte).
+    """
+    dtype = _record_dtypes.get(num_wavelengths)
+    if dtype is None:
+        dtype = numpy.dtype(OPTAA_HEADER_FIELDS + [('counts', '>u2', (num_wavelengths, 4)),
+                                                   ('checksum', '>u2'),
+                                                   ('pad', 'u1')])
+        _record_dtypes[num_wavelengths] = dtype
+    return dtype
+
+
+def decode_optaa_record(raw_data):
+    """
+    Decode a single OPTAA record
+    @param raw_data A complete OPTAA record
+    @return numpy record of dtype optaa_record_dtype
+    @throws SampleException if the record is too short
+    """
+    if len(raw_data) < SIZE_OF_HEADER:
+        raise SampleException('OPTAA record too short: %d bytes' % len(raw_data))
+
+    dtype = optaa_record_dtype(ord(raw_data[INDEX_OF_NUM_WAVELENGTHS]))
+    if len(raw_data) < dtype.itemsize:
+        raise SampleException('OPTAA record too short: %d bytes, expected %d' % (len(raw_data), dtype.itemsize))
+
+    return numpy.frombuffer(raw_data, dtype=dtype, count=1)[0]
 
-    @staticmethod
-    def from_string(input_str):
-        header = OptaaSampleHeader()
-        BytesIO(input_str).readinto(header)
-        return header
 
-    def __str__(self):
-        d = OrderedDict()
-        for name, _ in self._fields_:
-            d[name] = getattr(self, name)
-        return str(d)
+def _decode_frames(raw_data, frames):
+    """
+    Decode the OPTAA records at the given frames of a buffer. Records with the
+    same number of wavelengths are decoded together with a single numpy call.
+    @param raw_data buffer
+    @param frames list of (start, end) of the records in the buffer
+    @return dict of start: record, without the frames too short for their record dtype
+    """
+    groups = {}
+    for start, end in frames:
+        dtype = optaa_record_dtype(ord(raw_data[start + INDEX_OF_NUM_WAVELENGTHS]))
+        if end - start >= dtype.itemsize:
+            groups.setdefault(dtype, []).append(start)
+
+    records = {}
+    for dtype, starts in groups.iteritems():
+        records.update(zip(starts, numpy.frombuffer(''.join([raw_data[start:start + dtype.itemsize]
+                                                             for start in starts]), dtype=dtype)))
+    return records
+
+
+def decode_optaa_records(raw_data):
+    """
+    Locate and decode every valid OPTAA record in a buffer
+    @param raw_data buffer (e.g. the contents of a file)
+    @return list of (start, end, record) in buffer order
+    """
+    frames = OPTAA_SAMPLE_FRAMER.sieve(raw_data)
+    records = _decode_frames(raw_data, frames)
+    return [(start, end, records[start]) for start, end in frames if start in records]
+
+
+def decode_optaa_chunks(chunks):
+    """
+    Decode the OPTAA records among the chunks produced by the chunker
+    @param chunks list of chunks, each a complete OPTAA record or other data
+    @return list of the record decoded from each chunk, None for the chunks
+        that are not (valid) OPTAA records
+    """
+    starts = []
+    frames = []
+    start = 0
+    for chunk in chunks:
+        starts.append(start)
+        if len(chunk) >= SIZE_OF_HEADER and chunk.startswith(PACKET_REGISTRATION_PATTERN):
+            frames.append((start, start + len(chunk)))
+        start += len(chunk)
+
+    records = _decode_frames(''.join(chunks), frames)
+    return [records.get(start) for start in starts]
 
 
 class OptaaSampleDataParticle(DataParticle):
     _data_particle_type = DataParticleType.OPTAA_SAMPLE
 
     def __init__(self, *args, **kwargs):
+        # a record may be supplied if it was already decoded by decode_optaa_records/chunks
+        record = kwargs.pop('record', None)
         super(OptaaSampleDataParticle, self).__init__(*args, **kwargs)
         # for playback, we want to obtain the elapsed run time prior to generating
         # the particle, so we'll go ahead and parse the header on object creation
-        self.header = OptaaSampleHeader.from_string(self.raw_data)
-        self.data = struct.unpack_from('>%dH' % (self.header.num_wavelengths * 4), self.raw_data, sizeof(self.header))
-        self.elapsed = (self.header.time_high << 16) + self.header.time_low
+        if record is None:
+            record = decode_optaa_record(self.raw_data)
+        self.record = record
+        self.elapsed = (int(record['time_high']) << 16) + int(record['time_low'])
+
+    @classmethod
+    def from_buffer(cls, raw_data, **kwargs):
+        """
+        Create a particle for every valid OPTAA record in a buffer
+        """
+        return [cls(raw_data[start:end], record=record, **kwargs)
+                for start, end, record in decode_optaa_records(raw_data)]
 
     def _build_parsed_values(self):
-        cref = self.data[::4]
-        aref = self.data[1::4]
-        csig = self.data[2::4]
-        asig = self.data[3::4]
+        record = self.record
+        counts = record['counts']
 
         key = OptaaSampleDataParticleKey
-        header = self.header
-        identity = lambda x: x
-
-        serial_number = (header.serial_number_high << 16) + header.serial_number_low
+        serial_number = (int(record['serial_number_high']) << 16) + int(record['serial_number_low'])
+        to_list = numpy.ndarray.tolist
 
         result = [
-            self._encode_value(key.RECORD_LENGTH, header.record_length, identity),
-            self._encode_value(key.PACKET_TYPE, header.packet_type, identity),
-            self._encode_value(key.METER_TYPE, header.meter_type, identity),
+            self._encode_value(key.RECORD_LENGTH, record['record_length'], int),
+            self._encode_value(key.PACKET_TYPE, record['packet_type'], int),
+            self._encode_value(key.METER_TYPE, record['meter_type'], int),
             self._encode_value(key.SERIAL_NUMBER, serial_number, str),
-            self._encode_value(key.A_REFERENCE_DARK_COUNTS, header.a_ref_dark_counts, identity),
-            self._encode_value(key.PRESSURE_COUNTS, header.pressure_counts, identity),
-            self._encode_value(key.A_SIGNAL_DARK_COUNTS, header.a_signal_dark_counts, identity),
-            self._encode_value(key.EXTERNAL_TEMP_RAW, header.raw_external_temp_counts, identity),
-            self._encode_value(key.INTERNAL_TEMP_RAW, header.raw_internal_temp_counts, identity),
-            self._encode_value(key.C_REFERENCE_DARK_COUNTS, header.c_ref_dark_counts, identity),
-            self._encode_value(key.C_SIGNAL_DARK_COUNTS, header.c_signal_dark_counts, identity),
-            self._encode_value(key.ELAPSED_RUN_TIME, self.elapsed, identity),
-            self._encode_value(key.NUM_WAVELENGTHS, header.num_wavelengths, identity),
-            self._encode_value(key.C_REFERENCE_COUNTS, cref, list),
-            self._encode_value(key.A_REFERENCE_COUNTS, aref, list),
-            self._encode_value(key.C_SIGNAL_COUNTS, csig, list),
-            self._encode_value(key.A_SIGNAL_COUNTS, asig, list),
+            self._encode_value(key.A_REFERENCE_DARK_COUNTS, record['a_ref_dark_counts'], int),
+            self._encode_value(key.PRESSURE_COUNTS, record['pressure_counts'], int),
+            self._encode_value(key.A_SIGNAL_DARK_COUNTS, record['a_signal_dark_counts'], int),
+            self._encode_value(key.EXTERNAL_TEMP_RAW, record['raw_external_temp_counts'], int),
+            self._encode_value(key.INTERNAL_TEMP_RAW, record['raw_internal_temp_counts'], int),
+            self._encode_value(key.C_REFERENCE_DARK_COUNTS, record['c_ref_dark_counts'], int),
+            self._encode_value(key.C_SIGNAL_DARK_COUNTS, record['c_signal_dark_counts'], int),
+            self._encode_value(key.ELAPSED_RUN_TIME, self.elapsed, int),
+            self._encode_value(key.NUM_WAVELENGTHS, record['num_wavelengths'], int),
+            self._encode_value(key.C_REFERENCE_COUNTS, counts[:, 0], to_list),
+            self._encode_value(key.A_REFERENCE_COUNTS, counts[:, 1], to_list),
+            self._encode_value(key.C_SIGNAL_COUNTS, counts[:, 2], to_list),
+            self._encode_value(key.A_SIGNAL_COUNTS, counts[:, 3], to_list),
         ]
 
         log.debug("raw data = %r", self.raw_data)
@@ -333,6 +426,7 @@ class Protocol(CommandResponseInstrumentProtocol):
         self._protocol_fsm.start(ProtocolState.UNKNOWN)
 
         self._chunker = StringChunker(Protocol.sieve_function)
+        self._chunks = []
 
         self._build_driver_dict()
         self._cmd_dict.add(Capability.DISCOVER, display_name='Discover')
@@ -343,28 +437,8 @@ class Protocol(CommandResponseInstrumentProtocol):
         The method that splits samples and status
         :param raw_data: raw data from instrument
         """
-        raw_data_len = len(raw_data)
-        return_list = []
-
         # look for samples
-        # OPTAA record looks like this:
-        # ff00ff00  <- packet registration
-        # 02d0      <- record length minus checksum
-        # ...       <- data
-        # 2244      <- checksum
-        # 00        <- pad
-        for match in PACKET_REGISTRATION_REGEX.finditer(raw_data):
-            # make sure I have at least 6 bytes (packet registration plus 2 bytes for record length)
-            start = match.start()
-            if (start + 6) <= raw_data_len:
-                packet_length = struct.unpack_from('>H', raw_data, start + 4)[0]
-                # make sure we have enough data to construct a whole packet
-                if (start + packet_length + SIZE_OF_CHECKSUM_PLUS_PAD) <= raw_data_len:
-                    # validate the checksum, if valid add to the return list
-                    checksum = struct.unpack_from('>H', raw_data, start + packet_length)[0]
-                    calulated_checksum = sum(bytearray(raw_data[start:start + packet_length])) & 0xffff
-                    if checksum == calulated_checksum:
-                        return_list.append((match.start(), match.start() + packet_length + SIZE_OF_CHECKSUM_PLUS_PAD))
+        return_list = OPTAA_SAMPLE_FRAMER.sieve(raw_data)
 
         # look for status
         for match in STATUS_REGEX.finditer(raw_data):
@@ -372,13 +446,39 @@ class Protocol(CommandResponseInstrumentProtocol):
 
         return return_list
 
+    def got_data(self, port_agent_packet):
+        """
+        Called by the instrument connection when data is available. The chunks
+        completed by the data are collected by _got_chunk, then the samples among
+        them are decoded together and published in order with the status chunks.
+        """
+        super(Protocol, self).got_data(port_agent_packet)
+
+        chunks, self._chunks = self._chunks, []
+        records = decode_optaa_chunks([chunk for chunk, _ in chunks])
+        for (chunk, timestamp), record in zip(chunks, records):
+            if record is not None:
+                self._publish_sample(OptaaSampleDataParticle(chunk, port_timestamp=timestamp, record=record))
+            else:
+                self._extract_sample(OptaaSampleDataParticle, PACKET_REGISTRATION_REGEX, chunk, timestamp)
+                self._extract_sample(OptaaStatusDataParticle, STATUS_REGEX, chunk, timestamp)
+
     def _got_chunk(self, chunk, timestamp):
         """
-        The base class got_data has gotten a chunk from the chunker.  Pass it to extract_sample
-        with the appropriate particle objects and REGEXes.
+        The base class got_data has gotten a chunk from the chunker. Hold it until
+        got_data has all the chunks of the data.
         """
-        self._extract_sample(OptaaSampleDataParticle, PACKET_REGISTRATION_REGEX, chunk, timestamp)
-        self._extract_sample(OptaaStatusDataParticle, STATUS_REGEX, chunk, timestamp)
+        self._chunks.append((chunk, timestamp))
+
+    def _publish_sample(self, particle):
+        """
+        Publish a sample particle decoded by got_data
+        """
+        parsed_sample = particle.generate()
+        self._particle_dict[particle.data_particle_type()] = parsed_sample
+
+        if self._driver_event:
+            self._driver_event(DriverAsyncEvent.SAMPLE, parsed_sample)
 
     def _filter_capabilities(self, events):
         """
@@ -432,32 +532,17 @@ class PlaybackProtocol(Protocol):
         dt = datetime.strptime(date_time_regex.search(filename).group(1), date_format)
         self.offset_timestamp = (dt - datetime(1900, 1, 1)).total_seconds()
 
-    def _got_chunk(self, chunk, timestamp):
+    def _publish_sample(self, particle):
         """
-        The base class got_data has gotten a chunk from the chunker.  Pass it to extract_sample
-        with the appropriate particle objects and REGEXes.
+        Set the internal timestamp of a sample from its elapsed run time, taking
+        the time of the first sample of the file from the file name
         """
-        self._extract_sample(OptaaSampleDataParticle, PACKET_REGISTRATION_REGEX, chunk, timestamp)
-        self._extract_sample(OptaaStatusDataParticle, STATUS_REGEX, chunk, timestamp)
-
-    def _extract_sample(self, particle_class, regex, line, timestamp, publish=True):
-        if regex.match(line):
-            particle = particle_class(line, port_timestamp=timestamp)
-
-            if hasattr(particle, 'elapsed'):
-                if self.offset_timestamp is not None:
-                    self.offset = self.offset_timestamp - particle.elapsed
-                    self.offset_timestamp = None
-
-                new_timestamp = particle.elapsed + self.offset
-                particle.set_internal_timestamp(new_timestamp)
-
-            parsed_sample = particle.generate()
-
-            if publish and self._driver_event:
-                self._driver_event(DriverAsyncEvent.SAMPLE, parsed_sample)
+        if self.offset_timestamp is not None:
+            self.offset = self.offset_timestamp - particle.elapsed
+            self.offset_timestamp = None
 
-            return parsed_sample
+        particle.set_internal_timestamp(particle.elapsed + self.offset)
+        super(PlaybackProtocol, self)._publish_sample(particle)
 
 
 def create_playback_protocol(callback):
@@ -1,6 +1,6 @@
 """
 @package mi.instrument.wetlabs.ac_s.ooicore.test.test_driver
-@file marine-integrations/mi/instrument/wetlabs/ac_s/ooicore/driver.py
+@file marine-integrations/mi/instrument/wetlabs/ac_s/ooicore/test/test_driver.py
 @author Rachel Manoni
 @brief Test cases for ooicore driver
 
@@ -16,12 +16,13 @@ USAGE:
 __author__ = 'Rachel Manoni'
 __license__ = 'Apache 2.0'
 
-from mock import Mock
+from mock import Mock, patch
 from nose.plugins.attrib import attr
 
 from mi.core.log import get_logger
 log = get_logger()
 import unittest
+from datetime import datetime
 
 from mi.idk.unit_test import InstrumentDriverTestCase
 from mi.idk.unit_test import InstrumentDriverUnitTestCase
@@ -31,21 +32,24 @@ from mi.idk.unit_test import DriverTestMixin
 from mi.idk.unit_test import AgentCapabilityType
 
 from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.data_particle import DataParticleKey
 from mi.core.instrument.instrument_driver import DriverProtocolState, DriverParameter
-from mi.core.instrument.instrument_driver import DriverEvent
+from mi.core.instrument.instrument_driver import DriverEvent, DriverAsyncEvent
 
-from mi.core.instrument.port_agent_client import PortAgentClient
+from mi.core.instrument.port_agent_client import PortAgentClient, PortAgentPacket
 
+from mi.instrument.wetlabs.ac_s.ooicore import driver as ac_s
 from mi.instrument.wetlabs.ac_s.ooicore.driver import InstrumentDriver
 from mi.instrument.wetlabs.ac_s.ooicore.driver import DataParticleType
 from mi.instrument.wetlabs.ac_s.ooicore.driver import ProtocolState
 from mi.instrument.wetlabs.ac_s.ooicore.driver import ProtocolEvent
 from mi.instrument.wetlabs.ac_s.ooicore.driver import Capability
-from mi.instrument.wetlabs.ac_s.ooicore.driver import Protocol
+from mi.instrument.wetlabs.ac_s.ooicore.driver import Protocol, PlaybackProtocol
 from mi.instrument.wetlabs.ac_s.ooicore.driver import Prompt
 from mi.instrument.wetlabs.ac_s.ooicore.driver import NEWLINE
 from mi.instrument.wetlabs.ac_s.ooicore.driver import OptaaSampleDataParticleKey
 from mi.instrument.wetlabs.ac_s.ooicore.driver import OptaaSampleDataParticle
+from mi.instrument.wetlabs.ac_s.ooicore.driver import decode_optaa_records
 from mi.instrument.wetlabs.ac_s.ooicore.driver import OptaaStatusDataParticleKey
 
 from mi.core.exceptions import SampleException
@@ -354,6 +358,70 @@ class TestUNIT(InstrumentDriverUnitTestCase, UtilMixin):
         self.assertEqual(timestamp, None)
         self.assertEqual(result, None)
 
+    def test_decode_records(self):
+        """
+        Verify batch decoding of a buffer yields the same particles as decoding each record
+        """
+        raw_data = 'noise' + OPTAA_SAMPLE_DATA + OPTAA_STATUS_DATA + OPTAA_SAMPLE_DATA * 2
+        records = decode_optaa_records(raw_data)
+        self.assertEqual(len(records), 3)
+
+        particles = OptaaSampleDataParticle.from_buffer(raw_data, port_timestamp=1.0)
+        for particle in particles:
+            self.assertEqual(particle.raw_data, OPTAA_SAMPLE_DATA)
+            expected = OptaaSampleDataParticle(OPTAA_SAMPLE_DATA, port_timestamp=1.0)
+            self.assertEqual(particle.elapsed, expected.elapsed)
+            self.assertEqual(particle.generate()[DataParticleKey.VALUES], expected.generate()[DataParticleKey.VALUES])
+            self.assert_data_particle_sample(particle.generate(), True)
+
+        self.assertRaises(SampleException, OptaaSampleDataParticle, OPTAA_SAMPLE_DATA[:100])
+
+    @staticmethod
+    def _sample_callback(events):
+        def callback(event_type, event=None):
+            if event_type == DriverAsyncEvent.SAMPLE:
+                events.append(event)
+        return callback
+
+    def test_got_data_batch(self):
+        """
+        Verify the samples completed by one packet are decoded together and
+        published in order with the status
+        """
+        events = []
+        protocol = Protocol(Prompt, NEWLINE, self._sample_callback(events))
+        packet = PortAgentPacket()
+        packet.attach_data(OPTAA_SAMPLE_DATA * 2 + OPTAA_STATUS_DATA + OPTAA_SAMPLE_DATA)
+        packet.attach_timestamp(1.0)
+        packet.pack_header()
+
+        with patch.object(ac_s, '_decode_frames', wraps=ac_s._decode_frames) as decode_frames:
+            protocol.got_data(packet)
+        self.assertEqual(decode_frames.call_count, 1)
+
+        self.assertEqual([event[DataParticleKey.STREAM_NAME] for event in events],
+                         [DataParticleType.OPTAA_SAMPLE, DataParticleType.OPTAA_SAMPLE,
+                          DataParticleType.OPTAA_STATUS, DataParticleType.OPTAA_SAMPLE])
+        for event in events:
+            if event[DataParticleKey.STREAM_NAME] == DataParticleType.OPTAA_SAMPLE:
+                self.assert_data_particle_sample(event, True)
+
+    def test_playback_timestamps(self):
+        """
+        Verify playback times the samples from the file name and their elapsed run time
+        """
+        events = []
+        protocol = PlaybackProtocol(self._sample_callback(events))
+        protocol.got_filename('/tmp/OPTAA_20140918T0000_UTC.dat')
+        packet = PortAgentPacket()
+        packet.attach_data(OPTAA_SAMPLE_DATA * 2)
+        packet.attach_timestamp(1.0)
+        packet.pack_header()
+        protocol.got_data(packet)
+
+        start = (datetime(2014, 9, 18) - datetime(1900, 1, 1)).total_seconds()
+        self.assertEqual([event[DataParticleKey.INTERNAL_TIMESTAMP] for event in events], [start, start])
+
     def test_got_data(self):
         """
         Verify sample data passed through the got data method produces the correct data particles
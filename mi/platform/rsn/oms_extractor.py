@@ -1,8 +1,13 @@
 #!/usr/bin/env python
 import datetime
 import functools
+import json
+import os
 import socket
+import tempfile
 import time
+from contextlib import contextmanager
+from Queue import Queue
 from threading import Lock
 from xmlrpclib import ServerProxy
 from pkg_resources import resource_string
@@ -10,7 +15,7 @@ from pkg_resources import resource_string
 import ntplib
 import yaml
 from concurrent.futures import ThreadPoolExecutor
-from toolz import concat, pluck, keyfilter
+from toolz import concat, pluck
 
 import mi.platform.rsn
 from mi.core.instrument.data_particle import DataParticle, DataParticleKey
@@ -18,6 +23,7 @@ from mi.core.instrument.instrument_driver import DriverAsyncEvent
 from mi.core.instrument.publisher import Publisher
 from mi.core.log import get_logger
 from mi.platform.exceptions import PlatformException
+from mi.platform.util.attribute_table import AttributeTable
 from mi.platform.util.node_configuration import NodeConfiguration
 
 log = get_logger()
@@ -25,6 +31,14 @@ log = get_logger()
 __license__ = 'Apache 2.0'
 DEFAULT_POOL_SIZE = 5
 DEFAULT_STREAM_DEF_FILENAME = 'node_config_files/stream_defs.yml'
+# how far back to fetch for a platform with no high water mark
+DEFAULT_INITIAL_LOOKBACK = 90
+# never request data older than this, even when resuming from a stale high water mark
+DEFAULT_MAX_LOOKBACK = 3600
+DEFAULT_MIN_INTERVAL = 5
+DEFAULT_MAX_INTERVAL = 300
+# weight given to the newest observation when adapting the polling interval
+INTERVAL_SMOOTHING = 0.5
 
 
 class stopwatch(object):
@@ -66,6 +80,160 @@ class stopwatch(object):
         return decorated
 
 
+class HighWaterMarkStore(object):
+    """
+    Per-platform high water marks (the newest NTP timestamp fetched), optionally
+    persisted to a local JSON file so that a restarted extractor resumes where it left off.
+    The file is replaced atomically on save.
+    """
+    def __init__(self, filename=None):
+        self.filename = filename
+        self._lock = Lock()
+        self._marks = self._load()
+
+    def _load(self):
+        if self.filename is None or not os.path.exists(self.filename):
+            return {}
+        try:
+            with open(self.filename) as fh:
+                return json.load(fh)
+        except (IOError, ValueError):
+            log.exception('Unable to load high water marks from %r, starting fresh', self.filename)
+            return {}
+
+    def get(self, platform_id, default=None):
+        with self._lock:
+            return self._marks.get(platform_id, default)
+
+    def update(self, platform_id, value):
+        """
+        Advance the high water mark for platform_id, it will never move backwards
+        @return True if the mark was advanced
+        """
+        with self._lock:
+            if value > self._marks.get(platform_id, 0):
+                self._marks[platform_id] = value
+                return True
+        return False
+
+    def save(self):
+        if self.filename is None:
+            return
+
+        with self._lock:
+            contents = json.dumps(self._marks)
+
+        dirname = os.path.dirname(os.path.abspath(self.filename))
+        fd, tmp_name = tempfile.mkstemp(dir=dirname, prefix='.hwm')
+        try:
+            with os.fdopen(fd, 'w') as fh:
+                fh.write(contents)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.rename(tmp_name, self.filename)
+        except (IOError, OSError):
+            log.exception('Unable to save high water marks to %r', self.filename)
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+
+
+class ProxyPool(object):
+    """
+    A fixed pool of ServerProxy objects. Each proxy owns a keep-alive transport
+    which is reused across fetch cycles. ServerProxy is not thread safe, so a
+    proxy is checked out for the duration of each request.
+    """
+    def __init__(self, uri, size):
+        self._queue = Queue()
+        for _ in xrange(size):
+            self._queue.put(ServerProxy(uri, allow_none=True))
+
+    @contextmanager
+    def proxy(self):
+        proxy = self._queue.get()
+        try:
+            yield proxy
+        finally:
+            self._queue.put(proxy)
+
+
+class PollSchedule(object):
+    """
+    Adaptive polling interval for a single node. The interval tracks the update
+    period of the node's fastest attribute and backs off while no new data arrives.
+    """
+    def __init__(self, interval, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = self._clamp(interval)
+        self.next_poll = 0
+
+    def _clamp(self, interval):
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def due(self, now):
+        return now >= self.next_poll
+
+    def update(self, fetched, now):
+        """
+        Adapt the interval to the fetched data and schedule the next poll
+        @param fetched {attribute: [(value, timestamp), ...]}
+        @param now current time
+        """
+        periods = []
+        for values in fetched.itervalues():
+            if len(values) > 1:
+                times = [timestamp for _, timestamp in values]
+                periods.append((max(times) - min(times)) / (len(times) - 1))
+
+        if periods:
+            target = self._clamp(min(periods))
+            self.interval = self._clamp(INTERVAL_SMOOTHING * target + (1 - INTERVAL_SMOOTHING) * self.interval)
+        elif not any(fetched.itervalues()):
+            self.interval = self._clamp(self.interval * 2)
+
+        self.next_poll = now + self.interval
+
+
+class FetchMetrics(object):
+    """
+    Fetch latency and item counts for a single node
+    """
+    def __init__(self):
+        self.fetches = 0
+        self.errors = 0
+        self.items = 0
+        self.last_items = 0
+        self.last_latency = None
+        self.total_latency = 0.0
+
+    def record(self, latency, items):
+        self.fetches += 1
+        self.items += items
+        self.last_items = items
+        self.last_latency = latency
+        self.total_latency += latency
+
+    def record_error(self):
+        self.errors += 1
+
+    @property
+    def mean_latency(self):
+        if self.fetches == 0:
+            return None
+        return self.total_latency / self.fetches
+
+    def as_dict(self):
+        return {
+            'fetches': self.fetches,
+            'errors': self.errors,
+            'items': self.items,
+            'last_items': self.last_items,
+            'last_latency': self.last_latency,
+            'mean_latency': self.mean_latency,
+        }
+
+
 class PlatformParticle(DataParticle):
     """
     The contents of the parameter dictionary, published at the start of a scan
@@ -80,27 +248,48 @@ class OmsExtractor(object):
     def __init__(self, config):
         self.oms_uri = config.get('oms_uri')
         self.pool_size = config.get('pool_size', DEFAULT_POOL_SIZE)
+        self.initial_lookback = config.get('initial_lookback', DEFAULT_INITIAL_LOOKBACK)
+        self.max_lookback = config.get('max_lookback', DEFAULT_MAX_LOOKBACK)
+        self.min_interval = config.get('min_interval', DEFAULT_MIN_INTERVAL)
+        self.max_interval = config.get('max_interval', DEFAULT_MAX_INTERVAL)
         self.thread_pool = ThreadPoolExecutor(self.pool_size)
+        self.proxy_pool = ProxyPool(self.oms_uri, self.pool_size)
         self.publisher = Publisher.from_url(config.get('publish_uri', 'log://'),
                                             headers=self.headers, max_events=1000, publish_interval=1)
         self.publisher.start()
         self.node_configs = []
         self._get_nodes(config)
-        self.times_lock = Lock()
-        self._last_times = {}
+        self.high_water_marks = HighWaterMarkStore(config.get('state_file'))
+        self.schedules = {}
+        self.metrics = {}
+        self.instances = {}
+        for nc in self.node_configs:
+            interval = nc.node_meta_data.get('oms_sample_rate', self.min_interval)
+            self.schedules[nc.platform_id] = PollSchedule(interval, self.min_interval, self.max_interval)
+            self.metrics[nc.platform_id] = FetchMetrics()
+            self.instances[nc.platform_id] = self._stream_instances(nc)
 
     @stopwatch(label='fetch_all', logger=log.warn)
-    def fetch_all(self):
+    def fetch_all(self, force=False):
+        """
+        Fetch new data from every node which is due to be polled
+        @param force poll every node regardless of its schedule
+        @return the number of nodes polled
+        """
         log.info('Begin fetching all data')
-        ntp_time = ntplib.system_to_ntp_time(time.time())
-        max_time = ntp_time - 90
+        now = time.time()
+        ntp_time = ntplib.system_to_ntp_time(now)
 
         futures = []
         for nc in self.node_configs:
-            with self.times_lock:
-                t = max(max_time, self._last_times.get(nc.platform_id))
-            proxy = ServerProxy(self.oms_uri)
-            futures.append(self.thread_pool.submit(self._fetch, proxy, nc, t))
+            if not force and not self.schedules[nc.platform_id].due(now):
+                continue
+            last_time = self.high_water_marks.get(nc.platform_id)
+            if last_time is None:
+                t = ntp_time - self.initial_lookback
+            else:
+                t = max(ntp_time - self.max_lookback, last_time)
+            futures.append(self.thread_pool.submit(self._fetch, nc, t))
 
         for f in futures:
             result = f.result()
@@ -108,6 +297,31 @@ class OmsExtractor(object):
                 for event in result:
                     self.publisher.enqueue(event)
 
+        if futures:
+            self.high_water_marks.save()
+            log.info('OMS fetch metrics: %r', self.get_metrics())
+
+        return len(futures)
+
+    def next_poll_time(self):
+        """
+        Time at which the next node is due to be polled
+        """
+        return min([schedule.next_poll for schedule in self.schedules.itervalues()] or [time.time()])
+
+    def run(self):
+        """
+        Poll forever, sleeping until the next node is due
+        """
+        while True:
+            self.fetch_all()
+            delay = self.next_poll_time() - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+    def get_metrics(self):
+        return {platform_id: metrics.as_dict() for platform_id, metrics in self.metrics.iteritems()}
+
     # INTERNAL METHODS
     def _get_nodes(self, config, stream_definition_filename=DEFAULT_STREAM_DEF_FILENAME):
         stream_config_string = resource_string(mi.platform.rsn.__name__, stream_definition_filename)
@@ -116,26 +330,18 @@ class OmsExtractor(object):
             self.node_configs.append(NodeConfiguration(node_config_file, stream_definitions))
 
     @staticmethod
-    def _group_by_timestamp(attr_dict):
-        return_dict = {}
-        # go through all of the returned values and get the unique timestamps. Each
-        # particle will have data for a unique timestamp
-        for attr_id, attr_vals in attr_dict.iteritems():
-            for value, timestamp in attr_vals:
-                return_dict.setdefault(timestamp, []).append((attr_id, value))
-
-        return return_dict
-
-    @staticmethod
-    def _convert_attrs_to_ion(stream, attrs):
-        attrs_return = []
-        # convert back to ION parameter name and scale from OMS to ION
-        for key, v in attrs:
-            param = stream[key]
-            v = v * param.scale_factor if v else v
-            attrs_return.append((param.ion_parameter_name, v))
-
-        return attrs_return
+    def _stream_instances(node_config):
+        """
+        Flatten the node streams into the (instance, parameters) list used to build particles
+        @return [((stream_name, key), {attr_id: (ion_parameter_name, scale_factor)}), ...]
+        """
+        instances = []
+        for stream_name, stream_instances in node_config.node_streams.iteritems():
+            for key, parameters in stream_instances.iteritems():
+                instances.append(((stream_name, key),
+                                  {attr_id: (param.ion_parameter_name, param.scale_factor)
+                                   for attr_id, param in parameters.iteritems()}))
+        return instances
 
     @staticmethod
     def _fetch_attrs(proxy, platform_id, attrs):
@@ -168,26 +374,34 @@ class OmsExtractor(object):
         return particle
 
     @stopwatch(label='_fetch', logger=log.debug)
-    def _fetch(self, proxy, node_config, last_time):
-        log.info('_fetch: %r %r', node_config.platform_id, last_time)
+    def _fetch(self, node_config, last_time):
+        platform_id = node_config.platform_id
+        log.info('_fetch: %r %r', platform_id, last_time)
         base_refdes = node_config.node_meta_data['reference_designator']
         attrs = [(k, last_time) for k in node_config.attributes]
-        fetched = OmsExtractor._fetch_attrs(proxy, node_config.platform_id, attrs)
-        self._set_last_times(node_config.platform_id, fetched)
-        for stream_name, stream_instances in node_config.node_streams.iteritems():
-            for key, parameters in stream_instances.iteritems():
-                particles = OmsExtractor._build_particles(stream_name, parameters, fetched)
-                for particle in particles:
-                    self.publisher.enqueue(self._asevent(particle, base_refdes, key))
+
+        start = time.time()
+        try:
+            with self.proxy_pool.proxy() as proxy:
+                fetched = OmsExtractor._fetch_attrs(proxy, platform_id, attrs)
+        except Exception:
+            self.metrics[platform_id].record_error()
+            self.schedules[platform_id].update({}, time.time())
+            raise
+
+        now = time.time()
+        self.metrics[platform_id].record(now - start, sum(len(v) for v in fetched.itervalues()))
+        self.schedules[platform_id].update(fetched, now)
+        self._set_last_times(platform_id, fetched)
+
+        for (stream_name, key), particle in self._build_particles(self.instances[platform_id], fetched):
+            self.publisher.enqueue(self._asevent(particle, base_refdes, key))
 
     def _set_last_times(self, platform_id, fetched):
-        with self.times_lock:
-            try:
-                new_max = max(pluck(1, concat(fetched.itervalues())))
-                if new_max > self._last_times.get(platform_id, 0):
-                    self._last_times[platform_id] = new_max
-            except ValueError:
-                pass
+        try:
+            self.high_water_marks.update(platform_id, max(pluck(1, concat(fetched.itervalues()))))
+        except ValueError:
+            pass
 
     @staticmethod
     def _asevent(particle, base_refdes, key):
@@ -199,22 +413,23 @@ class OmsExtractor(object):
         }
 
     @staticmethod
-    def _build_particles(stream_name, parameters, data):
-        subset = keyfilter(lambda k: k in parameters, data)
-        grouped = OmsExtractor._group_by_timestamp(subset)
-        particles = []
-        for timestamp, attrs in grouped.iteritems():
-            attrs = OmsExtractor._convert_attrs_to_ion(parameters, attrs)
-            particles.append(OmsExtractor._build_particle(stream_name, timestamp, attrs))
-        return particles
+    def _build_particles(instances, data):
+        """
+        Build the particles for all stream instances of a platform in one pass
+        @param instances as returned by _stream_instances
+        @param data fetched attribute values {attr_id: [(value, timestamp), ...]}
+        @return [((stream_name, key), particle), ...]
+        """
+        table = AttributeTable(data)
+        return [(instance, OmsExtractor._build_particle(instance[0], timestamp, attrs))
+                for instance, timestamp, attrs in table.build_records(instances)]
 
 
 def main():
     import sys
     config_file = sys.argv[1]
     extractor = OmsExtractor(yaml.load(open(config_file)))
-    while True:
-        extractor.fetch_all()
+    extractor.run()
 
 if __name__ == '__main__':
     main()
@@ -22,6 +22,7 @@ from mi.platform.platform_driver import PlatformDriverEvent
 from mi.platform.platform_driver import PlatformDriverState
 from mi.platform.responses import InvalidResponse
 from mi.platform.rsn.oms_client_factory import CIOMSClientFactory
+from mi.platform.util import attribute_table
 from mi.platform.util.node_configuration import NodeConfiguration
 
 log = mi.core.log.get_logger()
@@ -97,14 +98,7 @@ class RSNPlatformDriver(PlatformDriver):
 
     @staticmethod
     def group_by_timestamp(attr_dict):
-        return_dict = {}
-        # go through all of the returned values and get the unique timestamps. Each
-        # particle will have data for a unique timestamp
-        for attr_id, attr_vals in attr_dict.iteritems():
-            for value, timestamp in attr_vals:
-                return_dict.setdefault(timestamp, []).append((attr_id, value))
-
-        return return_dict
+        return attribute_table.group_by_timestamp(attr_dict)
 
     @staticmethod
     def convert_attrs_to_ion(stream, attrs):
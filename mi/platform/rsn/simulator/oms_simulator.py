@@ -366,10 +366,8 @@ class CIOMSSimulator(CIOMSClient):
 
     def get_checksum(self, platform_id):
         """
-        @note the checksum is always computed, which is fine for the simulator.
-        A more realistic and presumably more efficient implementation would
-        exploit some caching mechanism along with appropriate invalidation
-        upon modifications to the platform information.
+        @note the checksum is cached in the platform node and only recomputed
+        for the parts of the network modified since the last call.
         """
         self._enter()
 
@@ -377,6 +375,6 @@ class CIOMSSimulator(CIOMSClient):
             return {platform_id: InvalidResponse.PLATFORM_ID}
 
         pnode = self._pnodes[platform_id]
-        checksum = pnode.compute_checksum()
+        checksum = pnode.checksum
 
         return {platform_id: checksum}
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+
+"""
+@package mi.platform.rsn.test.test_oms_extractor
+@file    mi/platform/rsn/test/test_oms_extractor.py
+@brief   Test the OMS extractor against the OMS simulator served over XML/RPC
+"""
+
+__license__ = 'Apache 2.0'
+
+import json
+import os
+import shutil
+import tempfile
+from SimpleXMLRPCServer import SimpleXMLRPCServer
+from threading import Thread
+
+import yaml
+from nose.plugins.attrib import attr
+from pkg_resources import resource_string
+
+import mi.platform.rsn
+from mi.core.unit_test import MiUnitTestCase
+from mi.platform.rsn.oms_extractor import OmsExtractor, HighWaterMarkStore, PollSchedule, DEFAULT_STREAM_DEF_FILENAME
+from mi.platform.rsn.simulator.oms_simulator import CIOMSSimulator
+from mi.platform.util.node_configuration import NodeConfiguration
+
+NODE_CONFIG_FILE = 'node_config_files/LPJBox_LJ0CI.yml'
+
+
+class OmsNamespace(object):
+    """
+    The OMS exposes the attribute calls under the "attr" namespace
+    """
+    def __init__(self, simulator):
+        self.attr = simulator
+
+
+@attr('UNIT', group='mi')
+class TestOmsExtractor(MiUnitTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+        stream_definitions = yaml.load(resource_string(mi.platform.rsn.__name__, DEFAULT_STREAM_DEF_FILENAME))
+        node_config = NodeConfiguration(NODE_CONFIG_FILE, stream_definitions)
+        self.platform_id = node_config.platform_id
+
+        # build a simulated network containing just this node and its attributes
+        attrs = [{'attr_id': name, 'units': 'xyz', 'monitor_cycle_seconds': 5, 'type': 'float'}
+                 for name in node_config.attributes]
+        network = {'platform_types': [],
+                   'network': [{'platform_id': self.platform_id, 'platform_types': [], 'attrs': attrs}]}
+        network_file = os.path.join(self.tmpdir, 'network.yml')
+        with open(network_file, 'w') as fh:
+            yaml.dump(network, fh)
+
+        self.simulator = CIOMSSimulator(network_file)
+        self.server = SimpleXMLRPCServer(('localhost', 0), allow_none=True, logRequests=False)
+        self.server.register_instance(OmsNamespace(self.simulator), allow_dotted_names=True)
+        thread = Thread(target=self.server.serve_forever)
+        thread.setDaemon(True)
+        thread.start()
+        self.uri = 'http://localhost:%d/' % self.server.socket.getsockname()[1]
+        self.state_file = os.path.join(self.tmpdir, 'state.json')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.simulator._deactivate_simulator()
+        shutil.rmtree(self.tmpdir)
+
+    def create_extractor(self, **kwargs):
+        config = {'oms_uri': self.uri, 'node_config_files': [NODE_CONFIG_FILE], 'publish_uri': 'count://',
+                  'pool_size': 2, 'state_file': self.state_file}
+        config.update(kwargs)
+        extractor = OmsExtractor(config)
+        extractor.publisher.stop()
+        return extractor
+
+    def test_fetch(self):
+        extractor = self.create_extractor()
+        self.assertEqual(extractor.fetch_all(), 1)
+        self.assertGreater(len(extractor.publisher._deque), 0)
+
+        events = list(extractor.publisher._deque)
+        streams = set(event['value']['stream_name'] for event in events)
+        self.assertIn('secondary_node_eng_data', streams)
+
+        metrics = extractor.get_metrics()[self.platform_id]
+        self.assertEqual(metrics['fetches'], 1)
+        self.assertGreater(metrics['items'], 0)
+        self.assertIsNotNone(metrics['last_latency'])
+
+        # the high water mark is persisted
+        with open(self.state_file) as fh:
+            marks = json.load(fh)
+        self.assertIn(self.platform_id, marks)
+
+        # not due yet, nothing fetched unless forced
+        self.assertEqual(extractor.fetch_all(), 0)
+        self.assertEqual(extractor.fetch_all(force=True), 1)
+        self.assertEqual(extractor.get_metrics()[self.platform_id]['fetches'], 2)
+
+    def test_resume(self):
+        extractor = self.create_extractor()
+        extractor.fetch_all()
+        mark = extractor.high_water_marks.get(self.platform_id)
+
+        # a new extractor resumes from the persisted mark
+        extractor = self.create_extractor()
+        self.assertEqual(extractor.high_water_marks.get(self.platform_id), mark)
+        extractor.fetch_all()
+        events = list(extractor.publisher._deque)
+        self.assertTrue(all(event['value']['internal_timestamp'] >= mark for event in events))
+
+    def test_proxy_reuse(self):
+        extractor = self.create_extractor(pool_size=1)
+        with extractor.proxy_pool.proxy() as proxy:
+            first = proxy
+        extractor.fetch_all(force=True)
+        extractor.fetch_all(force=True)
+        with extractor.proxy_pool.proxy() as proxy:
+            self.assertIs(proxy, first)
+
+    def test_high_water_mark_store(self):
+        store = HighWaterMarkStore(self.state_file)
+        self.assertTrue(store.update('a', 10.0))
+        self.assertFalse(store.update('a', 5.0))
+        store.save()
+        self.assertEqual(HighWaterMarkStore(self.state_file).get('a'), 10.0)
+        self.assertEqual(os.listdir(self.tmpdir).count('state.json'), 1)
+        self.assertFalse([name for name in os.listdir(self.tmpdir) if name.startswith('.hwm')])
+
+        with open(self.state_file, 'w') as fh:
+            fh.write('garbage')
+        self.assertIsNone(HighWaterMarkStore(self.state_file).get('a'))
+
+    def test_poll_schedule(self):
+        schedule = PollSchedule(60, min_interval=5, max_interval=300)
+        # attribute updating every 10 seconds pulls the interval towards 10
+        schedule.update({'a': [(1, 100.0), (2, 110.0), (3, 120.0)], 'b': [(1, 100.0)]}, 1000)
+        self.assertEqual(schedule.interval, 35)
+        self.assertEqual(schedule.next_poll, 1035)
+        for _ in xrange(10):
+            schedule.update({'a': [(1, 100.0), (2, 110.0)]}, 1000)
+        self.assertAlmostEqual(schedule.interval, 10, places=1)
+
+        # no data, back off up to the maximum
+        for _ in xrange(20):
+            schedule.update({'a': []}, 1000)
+        self.assertEqual(schedule.interval, 300)
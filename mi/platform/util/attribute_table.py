@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+
+"""
+@package mi.platform.util.attribute_table
+@file    mi/platform/util/attribute_table.py
+@brief   Columnar grouping of OMS attribute values by timestamp
+
+The OMS returns attribute values as {attr_id: [(value, timestamp), ...]}.
+Each particle holds the values of one stream instance which share a
+timestamp. Rather than building a dictionary keyed by timestamp for every
+stream instance, the fetched values are converted into sorted timestamp
+arrays once per platform and every stream instance is joined in a single
+sort of the combined table.
+"""
+
+import numpy
+
+__license__ = 'Apache 2.0'
+
+
+def scale_values(values, scale_factor):
+    """
+    Scale OMS values to ION units. As with the original per-value conversion,
+    false values (0, None) are passed through unscaled.
+    @param values list of values
+    @param scale_factor multiplier applied to each value
+    @return list of scaled values
+    """
+    if scale_factor == 1:
+        return list(values)
+
+    array = numpy.asarray(values)
+    if array.dtype.kind in 'iuf':
+        return numpy.where(array != 0, array * scale_factor, array).tolist()
+
+    # None, strings or mixed types
+    return [v * scale_factor if v else v for v in values]
+
+
+class AttributeTable(object):
+    """
+    Fetched attribute values for a single platform, stored as columns
+    """
+    def __init__(self, attr_dict):
+        """
+        @param attr_dict {attr_id: [(value, timestamp), ...]} as returned by the OMS
+        """
+        self.columns = {}
+        self._scaled = {}
+        for attr_id, attr_vals in attr_dict.iteritems():
+            if not attr_vals:
+                continue
+            values, timestamps = zip(*attr_vals)
+            self.columns[attr_id] = (numpy.array(timestamps, dtype=numpy.float64), values)
+
+    def scaled_values(self, attr_id, scale_factor):
+        """
+        Values of attr_id scaled by scale_factor, computed once per (attribute, scale factor)
+        """
+        key = (attr_id, scale_factor)
+        if key not in self._scaled:
+            self._scaled[key] = scale_values(self.columns[attr_id][1], scale_factor)
+        return self._scaled[key]
+
+    def build_records(self, instances):
+        """
+        Join the attributes of each instance by timestamp
+        @param instances list of (instance, {attr_id: (name, scale_factor)})
+        @return list of (instance, timestamp, [(name, value), ...]) ordered by instance, then timestamp
+        """
+        index_parts = []
+        time_parts = []
+        names = []
+        values = []
+        for index, (_, parameters) in enumerate(instances):
+            for attr_id, (name, scale_factor) in parameters.iteritems():
+                column = self.columns.get(attr_id)
+                if column is None:
+                    continue
+                timestamps = column[0]
+                index_parts.append(numpy.full(len(timestamps), index, dtype=numpy.int32))
+                time_parts.append(timestamps)
+                names.extend([name] * len(timestamps))
+                values.extend(self.scaled_values(attr_id, scale_factor))
+
+        if not time_parts:
+            return []
+
+        indices = numpy.concatenate(index_parts)
+        timestamps = numpy.concatenate(time_parts)
+        order = numpy.lexsort((timestamps, indices))
+        indices = indices[order]
+        timestamps = timestamps[order]
+
+        # a new record starts wherever the instance or the timestamp changes
+        changed = (numpy.diff(indices) != 0) | (numpy.diff(timestamps) != 0)
+        bounds = [0] + (numpy.flatnonzero(changed) + 1).tolist() + [len(order)]
+
+        order = order.tolist()
+        names = [names[i] for i in order]
+        values = [values[i] for i in order]
+        indices = indices.tolist()
+        timestamps = timestamps.tolist()
+
+        records = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            records.append((instances[indices[start]][0], timestamps[start],
+                            zip(names[start:end], values[start:end])))
+        return records
+
+    def group_by_timestamp(self):
+        """
+        @return {timestamp: [(attr_id, value), ...]} for all attributes, unscaled
+        """
+        parameters = {attr_id: (attr_id, 1) for attr_id in self.columns}
+        return {timestamp: attrs for _, timestamp, attrs in self.build_records([(None, parameters)])}
+
+
+def group_by_timestamp(attr_dict):
+    """
+    Group OMS attribute values by timestamp
+    @param attr_dict {attr_id: [(value, timestamp), ...]}
+    @return {timestamp: [(attr_id, value), ...]}
+    """
+    return AttributeTable(attr_dict).group_by_timestamp()
@@ -25,6 +25,8 @@ class BaseNode(object):
     def __init__(self):
         # cached value for the checksum property.
         self._checksum = None
+        # node containing this one, whose checksum depends on ours.
+        self._owner = None
 
     def diff(self, other):
         """
@@ -36,40 +38,68 @@ class BaseNode(object):
     @property
     def checksum(self):
         """
-        Gets the last value computed by compute_checksum, if any.
-        If no such value is available (for example, compute_checksum hasn't
-        been called yet, or the cached checksum has been invalidated), then
-        this method calls compute_checksum to obtain the checksum.
+        Gets the checksum of this node, recomputing it (and that of any
+        changed children) only if the node has been modified since the
+        last computation.
 
-        @note Unless client code has good control about the changes done on
-        instances of this class (including changes in children nodes), that is,
-        by making sure to invalidate the corresponding cached values upon any
-        changes, the use of this property is *not* recommended; instead call
-        compute_checksum, which always compute the checksum based on the
-        current state of the node and its children.
+        The mutation methods of the network classes (add_port, add_attribute,
+        add_subplatform, PortNode.add_instrument, PortNode.set_state, ...)
+        invalidate the cached value of the modified node and its ancestors.
+
+        @note Client code modifying the exposed dicts directly (for example,
+        AttrNode.defn or InstrumentNode.attrs) must call invalidate on the
+        modified node, or call compute_checksum instead.
 
         @return SHA1 hash value as string of hexadecimal digits.
         """
-        if not self._checksum:
-            self._checksum = self.compute_checksum()
+        if self._checksum is None:
+            self._checksum = self._compute_checksum()
         return self._checksum
 
     def compute_checksum(self):
         """
-        Computes the checksum for this object, updating the cached value for
-        future calls to the checksum property. Subclasses do not need
-        overwrite this method.
+        Computes the checksum for this object and all of its children from
+        scratch, updating the cached values for future calls to the checksum
+        property. Subclasses do not need overwrite this method.
 
         @return SHA1 hash value as string of hexadecimal digits
         """
-        self._checksum = self._compute_checksum()
-        return self._checksum
+        previous = self._checksum
+        self._clear_checksums()
+        checksum = self.checksum
+        if checksum != previous and self._owner is not None:
+            self._owner.invalidate()
+        return checksum
+
+    def invalidate(self):
+        """
+        Discards the cached checksum of this node and of all its ancestors.
+        """
+        node = self
+        while node is not None:
+            node._checksum = None
+            node = node._owner
+
+    def _adopt(self, node):
+        """
+        Registers node as a child of this one for checksum invalidation.
+        """
+        node._owner = self
+        self.invalidate()
+
+    def _clear_checksums(self):
+        """
+        Discards the cached checksum of this node and of all its children.
+        Subclasses with children extend this method.
+        """
+        self._checksum = None
 
     def _compute_checksum(self):
         """
         Subclasses implement this method to compute the checksum for
         this object. For any checksum computation of subcomponents,
-        the implementation should call compute_checksum on the subcomponent.
+        the implementation should use the checksum property of the
+        subcomponent so unchanged subtrees are not recomputed.
 
         @return SHA1 hash value as string of hexadecimal digits
         """
@@ -179,7 +209,9 @@ class PortNode(BaseNode):
         return self._state
 
     def set_state(self, state):
-        self._state = state
+        if state != self._state:
+            self._state = state
+            self.invalidate()
 
     @property
     def instruments(self):
@@ -192,11 +224,13 @@ class PortNode(BaseNode):
         if instrument.instrument_id in self._instruments:
             raise Exception('%s: duplicate instrument ID' % instrument.instrument_id)
         self._instruments[instrument.instrument_id] = instrument
+        self._adopt(instrument)
 
     def remove_instrument(self, instrument_id):
         if instrument_id not in self._instruments:
             raise Exception('%s: Not such instrument ID' % instrument_id)
         del self._instruments[instrument_id]
+        self.invalidate()
 
     def diff(self, other):
         """
@@ -207,6 +241,9 @@ class PortNode(BaseNode):
             return "Port IDs are different: %r != %r" % (
                 self.port_id, other.port_id)
 
+        if self.checksum == other.checksum:
+            return None
+
         if self.state != other.state:
             return "Port state values are different: %r != %r" % (
                 self.state, other.state)
@@ -238,10 +275,15 @@ class PortNode(BaseNode):
         hash_obj.update("port_instruments:")
         for key in sorted(self.instruments.keys()):
             instrument = self.instruments[key]
-            hash_obj.update(instrument.compute_checksum())
+            hash_obj.update(instrument.checksum)
 
         return hash_obj.hexdigest()
 
+    def _clear_checksums(self):
+        BaseNode._clear_checksums(self)
+        for instrument in self.instruments.itervalues():
+            instrument._clear_checksums()
+
 
 class MissionNode(BaseNode):
     """
@@ -383,11 +425,13 @@ class PlatformNode(BaseNode):
         if port.port_id in self._ports:
             raise Exception('%s: duplicate port ID' % port.port_id)
         self._ports[port.port_id] = port
+        self._adopt(port)
 
     def add_attribute(self, attr):
         if attr.attr_id in self._attrs:
             raise Exception('%s: duplicate attribute ID' % attr.attr_id)
         self._attrs[attr.attr_id] = attr
+        self._adopt(attr)
 
     def add_mission(self, mission):
         if mission.mission_id in self._missions:
@@ -438,6 +482,7 @@ class PlatformNode(BaseNode):
             raise Exception('%s: duplicate subplatform ID' % pn.platform_id)
         self._subplatforms[pn.platform_id] = pn
         pn._parent = self
+        self._adopt(pn)
 
     @property
     def instruments(self):
@@ -501,6 +546,15 @@ class PlatformNode(BaseNode):
             return "platform parents are different: %r != %r" % (
                 self.parent.platform_id, other.parent.platform_id)
 
+        if self.checksum == other.checksum:
+            # same attributes, ports and subplatforms all the way down, only
+            # the properties not covered by the checksum remain to be compared.
+            for platform_id, node in self.subplatforms.iteritems():
+                diff = node.diff(other.subplatforms[platform_id])
+                if diff:
+                    return diff
+            return None
+
         # compare attributes:
         attr_ids = set(self.attrs.iterkeys())
         other_attr_ids = set(other.attrs.iterkeys())
@@ -548,7 +602,7 @@ class PlatformNode(BaseNode):
         hash_obj.update("subplatforms:")
         for key in sorted(self.subplatforms.keys()):
             subplatform = self.subplatforms[key]
-            hash_obj.update(subplatform.compute_checksum())
+            hash_obj.update(subplatform.checksum)
 
         # now, with info about the platform itself.
 
@@ -564,16 +618,25 @@ class PlatformNode(BaseNode):
         hash_obj.update("platform_attributes:")
         for key in sorted(self.attrs.keys()):
             attr = self.attrs[key]
-            hash_obj.update(attr.compute_checksum())
+            hash_obj.update(attr.checksum)
 
         # ports:
         hash_obj.update("platform_ports:")
         for key in sorted(self.ports.keys()):
             port = self.ports[key]
-            hash_obj.update(port.compute_checksum())
+            hash_obj.update(port.checksum)
 
         return hash_obj.hexdigest()
 
+    def _clear_checksums(self):
+        BaseNode._clear_checksums(self)
+        for node in self.subplatforms.itervalues():
+            node._clear_checksums()
+        for attr in self.attrs.itervalues():
+            attr._clear_checksums()
+        for port in self.ports.itervalues():
+            port._clear_checksums()
+
 
 class NetworkDefinition(BaseNode):
     """
@@ -631,6 +694,19 @@ class NetworkDefinition(BaseNode):
         """
         return self._dummy_root.get_map([])
 
+    @property
+    def checksum(self):
+        """
+        The platform types are assigned directly by NetworkUtil, so only the
+        (cheap to combine) checksum of the platform tree is cached.
+        """
+        return self._compute_checksum()
+
+    def _clear_checksums(self):
+        BaseNode._clear_checksums(self)
+        if self._dummy_root is not None:
+            self._dummy_root._clear_checksums()
+
     def diff(self, other):
         """
         Returns None if the two objects represent the same network definition.
@@ -661,6 +737,6 @@ class NetworkDefinition(BaseNode):
             hash_obj.update("%s=%s;" % (key, platform_type))
 
         # root PlatformNode:
-        hash_obj.update("root_platform=%s;" % self.root.compute_checksum())
+        hash_obj.update("root_platform=%s;" % self.root.checksum)
 
         return hash_obj.hexdigest()
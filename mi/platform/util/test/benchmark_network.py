@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+@package mi.platform.util.test.benchmark_network
+@file mi/platform/util/test/benchmark_network.py
+@brief Time of the platform network checksums and diffs.
+
+Builds a network with a platform for each node configuration file, carrying
+the attributes of its streams and its ports, and times the checksum of the
+whole network, its update after a port state change and the comparison of
+two copies of the network.
+
+Usage:
+    benchmark_network [--repeat=<n>]
+
+Options:
+    -h, --help          Show this screen
+    --repeat=<n>        Number of times each operation is timed [default: 20]
+
+    To run without installing:
+    python -m mi.platform.util.test.benchmark_network ...
+"""
+import os
+import timeit
+
+import yaml
+from docopt import docopt
+from pkg_resources import resource_listdir, resource_string
+
+import mi.platform.rsn
+from mi.platform.exceptions import NodeConfigurationFileException
+from mi.platform.rsn.oms_extractor import DEFAULT_STREAM_DEF_FILENAME
+from mi.platform.util.network_util import NetworkUtil
+from mi.platform.util.node_configuration import NodeConfiguration
+
+__license__ = 'Apache 2.0'
+
+NODE_CONFIG_DIR = 'node_config_files'
+
+
+def load_node_configs():
+    stream_definitions = yaml.load(resource_string(mi.platform.rsn.__name__, DEFAULT_STREAM_DEF_FILENAME))
+    configs = []
+    for name in sorted(resource_listdir(mi.platform.rsn.__name__, NODE_CONFIG_DIR)):
+        if not name.endswith('.yml') or name == os.path.basename(DEFAULT_STREAM_DEF_FILENAME):
+            continue
+        try:
+            configs.append((os.path.splitext(name)[0],
+                            NodeConfiguration(os.path.join(NODE_CONFIG_DIR, name), stream_definitions)))
+        except NodeConfigurationFileException:
+            pass
+    return configs
+
+
+def build_network(configs):
+    """
+    @return serialized network with a platform for each node configuration,
+        all below a single shore station
+    """
+    platforms = []
+    for platform_id, config in configs:
+        platforms.append({
+            'platform_id': platform_id,
+            'platform_types': [],
+            'attrs': [{'attr_id': attr_id, 'units': 'x', 'monitor_cycle_seconds': 5}
+                      for attr_id in sorted(set(config.attributes))],
+            'ports': [{'port_id': port_id, 'state': 'OFF'} for port_id in sorted(config.node_port_info or {})],
+        })
+    network = {'platform_types': [], 'network': [{'platform_id': 'ShoreStation', 'platform_types': [],
+                                                  'subplatforms': platforms}]}
+    return yaml.dump(network)
+
+
+def run(label, function, repeat):
+    elapsed = min(timeit.repeat(function, number=1, repeat=repeat))
+    print '  %-24s %9.3f ms' % (label, elapsed * 1000)
+
+
+def main():
+    options = docopt(__doc__)
+    repeat = int(options['--repeat'])
+
+    serialized = build_network(load_node_configs())
+    ndef = NetworkUtil.deserialize_network_definition(serialized)
+    other = NetworkUtil.deserialize_network_definition(serialized)
+    platforms = [pnode for pnode in ndef.pnodes.itervalues() if pnode.ports]
+    port = platforms[0].ports.values()[0]
+    print '%d platforms, %d attributes, %d ports' % (len(ndef.pnodes) - 1,
+                                                     sum(len(pnode.attrs) for pnode in ndef.pnodes.itervalues()),
+                                                     sum(len(pnode.ports) for pnode in ndef.pnodes.itervalues()))
+
+    def port_change():
+        port.set_state('ON' if port.state != 'ON' else 'OFF')
+        return ndef.checksum
+
+    run('compute_checksum', ndef.compute_checksum, repeat)
+    run('checksum', lambda: ndef.checksum, repeat)
+    run('checksum after set_state', port_change, repeat)
+    run('diff equal', lambda: ndef.diff(other), repeat)
+    port.set_state('ON')
+    run('diff changed port', lambda: ndef.diff(other), repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+"""
+@package mi.platform.util.test.test_attribute_table
+@file    mi/platform/util/test/test_attribute_table.py
+@brief   Test cases for the columnar OMS attribute grouping
+"""
+
+__license__ = 'Apache 2.0'
+
+import random
+
+from nose.plugins.attrib import attr
+
+from mi.core.unit_test import MiUnitTestCase
+from mi.platform.util.attribute_table import AttributeTable, group_by_timestamp, scale_values
+
+
+def reference_records(instances, attr_dict):
+    """
+    The original dictionary based grouping and conversion, one instance at a time
+    """
+    records = []
+    for instance, parameters in instances:
+        grouped = {}
+        for attr_id, attr_vals in attr_dict.iteritems():
+            if attr_id not in parameters:
+                continue
+            for value, timestamp in attr_vals:
+                grouped.setdefault(timestamp, []).append((attr_id, value))
+        for timestamp, attrs in sorted(grouped.iteritems()):
+            converted = []
+            for key, v in attrs:
+                name, scale_factor = parameters[key]
+                converted.append((name, v * scale_factor if v else v))
+            records.append((instance, timestamp, sorted(converted)))
+    return records
+
+
+@attr('UNIT', group='mi')
+class TestAttributeTable(MiUnitTestCase):
+    def test_scale_values(self):
+        self.assertEqual(scale_values([1, 0, 3], 1), [1, 0, 3])
+        self.assertEqual(scale_values([1, 0, -2], 0.5), [0.5, 0, -1.0])
+        self.assertEqual(scale_values([1.5, None, 0], 2), [3.0, None, 0])
+        self.assertEqual(scale_values(['a', ''], 2), ['aa', ''])
+
+    def test_group_by_timestamp(self):
+        attr_dict = {'a': [(1, 10.0), (2, 11.0)], 'b': [(3, 11.0)], 'c': []}
+        grouped = group_by_timestamp(attr_dict)
+        self.assertEqual(sorted(grouped), [10.0, 11.0])
+        self.assertEqual(grouped[10.0], [('a', 1)])
+        self.assertEqual(sorted(grouped[11.0]), [('a', 2), ('b', 3)])
+        self.assertEqual(group_by_timestamp({}), {})
+
+    def test_build_records(self):
+        rand = random.Random(42)
+        attr_dict = {}
+        for n in xrange(20):
+            timestamps = sorted(rand.sample(xrange(100), rand.randint(0, 30)))
+            values = [rand.choice([0, None, rand.randint(-50, 50), rand.uniform(-1, 1)]) for _ in timestamps]
+            attr_dict['attr%d' % n] = [(v, 3600000000.0 + t) for v, t in zip(values, timestamps)]
+
+        instances = []
+        for n in xrange(5):
+            attrs = rand.sample(sorted(attr_dict) + ['missing'], 6)
+            instances.append((('stream', 'port%d' % n),
+                              {a: ('ion_' + a, rand.choice([1, 0.001, 10])) for a in attrs}))
+
+        records = [(instance, timestamp, sorted(attrs))
+                   for instance, timestamp, attrs in AttributeTable(attr_dict).build_records(instances)]
+        expected = reference_records(instances, attr_dict)
+        self.assertEqual(len(records), len(expected))
+        for record, reference in zip(records, expected):
+            self.assertEqual(record[:2], reference[:2])
+            for (name, value), (ref_name, ref_value) in zip(record[2], reference[2]):
+                self.assertEqual(name, ref_name)
+                if value is None:
+                    self.assertIsNone(ref_value)
+                else:
+                    self.assertAlmostEqual(value, ref_value)
+
+    def test_no_matching_attributes(self):
+        table = AttributeTable({'a': [(1, 10.0)]})
+        self.assertEqual(table.build_records([('x', {'b': ('b', 1)})]), [])
+        self.assertEqual(table.build_records([]), [])
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+"""
+@package mi.platform.util.test.test_network
+@file    mi/platform/util/test/test_network.py
+@brief   Test cases for the incremental checksums of the network definition
+"""
+
+__license__ = 'Apache 2.0'
+
+import copy
+
+from mock import patch
+from nose.plugins.attrib import attr
+from pkg_resources import resource_string
+
+import mi.platform.rsn.simulator
+from mi.core.unit_test import MiUnitTestCase
+from mi.platform.util.network import AttrNode, InstrumentNode, PlatformNode, PortNode
+from mi.platform.util.network_util import NetworkUtil
+
+
+def load_network():
+    return NetworkUtil.deserialize_network_definition(
+        resource_string(mi.platform.rsn.simulator.__name__, 'network.yml'))
+
+
+@attr('UNIT', group='mi')
+class TestNetworkChecksum(MiUnitTestCase):
+    def setUp(self):
+        self.ndef = load_network()
+        self.other = load_network()
+
+    def leaf(self):
+        """
+        A platform with ports at the bottom of the tree
+        """
+        for pnode in self.ndef.pnodes.itervalues():
+            if pnode.ports and not pnode.subplatforms and pnode.parent.parent is not None:
+                return pnode
+
+    def test_cached_checksum_matches_full(self):
+        checksum = self.ndef.checksum
+        self.assertEqual(checksum, self.ndef.compute_checksum())
+        self.assertEqual(checksum, self.other.checksum)
+
+        port = self.leaf().ports.values()[0]
+        port.set_state('ON' if port.state != 'ON' else 'OFF')
+        self.assertNotEqual(self.ndef.checksum, checksum)
+        self.assertEqual(self.ndef.checksum, self.ndef.compute_checksum())
+
+        port.add_instrument(InstrumentNode('new_instrument'))
+        changed = self.ndef.checksum
+        self.assertEqual(changed, self.ndef.compute_checksum())
+        port.remove_instrument('new_instrument')
+        self.assertEqual(self.ndef.checksum, self.ndef.compute_checksum())
+
+    def test_only_changed_path_recomputed(self):
+        self.ndef.checksum
+        pnode = self.leaf()
+        # the platform and its ancestors up to the root
+        depth = 0
+        node = pnode
+        while node.parent is not None:
+            depth += 1
+            node = node.parent
+
+        with patch.object(PlatformNode, '_compute_checksum', autospec=True,
+                          side_effect=PlatformNode._compute_checksum) as platform_mock, \
+                patch.object(AttrNode, '_compute_checksum', autospec=True,
+                             side_effect=AttrNode._compute_checksum) as attr_mock:
+            self.ndef.checksum
+            self.assertEqual(platform_mock.call_count, 0)
+
+            pnode.add_attribute(AttrNode('new_attr', {'units': 'V', 'monitor_cycle_seconds': 5}))
+            self.ndef.checksum
+            self.assertEqual(platform_mock.call_count, depth)
+            self.assertEqual(attr_mock.call_count, 1)
+
+    def test_invalidate(self):
+        checksum = self.ndef.checksum
+        attr_node = self.leaf().attrs.values()[0]
+        attr_node.defn['units'] = 'furlongs'
+        self.assertEqual(self.ndef.checksum, checksum)
+        attr_node.invalidate()
+        self.assertNotEqual(self.ndef.checksum, checksum)
+
+        # compute_checksum always reflects the current state
+        attr_node.defn['units'] = 'parsecs'
+        self.assertNotEqual(attr_node.compute_checksum(), checksum)
+        self.assertEqual(self.ndef.checksum, self.ndef.compute_checksum())
+
+    def test_diff(self):
+        self.assertIsNone(self.ndef.diff(self.other))
+
+        # names are not part of the checksum, but still compared
+        pnode = self.leaf()
+        pnode.set_name('renamed')
+        self.assertIn('names are different', self.ndef.diff(self.other))
+        pnode.set_name(None)
+
+        port = pnode.ports.values()[0]
+        port.set_state('ON' if port.state != 'ON' else 'OFF')
+        self.assertIn('state values are different', self.ndef.diff(self.other))
+
+        other_port = copy.copy(port)
+        self.assertIsNone(port.diff(other_port))
+        self.assertIsNotNone(port.diff(PortNode(port.port_id)))